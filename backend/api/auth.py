@@ -7,6 +7,7 @@ from flask_login import login_user, logout_user, current_user
 from models import db, Usuario
 from utils.api_response import APIResponse, APIError
 from utils.validators import UsuarioValidator, Validator
+from utils.cache_sesiones import invalidar_sesion
 
 auth_api_bp = Blueprint('auth_api', __name__)
 
@@ -189,6 +190,9 @@ def register():
         
         db.session.add(nuevo_usuario)
         db.session.commit()
+        if nuevo_usuario.telefono:
+            # El chatbot pudo haber guardado en caché este teléfono sin usuario
+            invalidar_sesion(nuevo_usuario.telefono)
         
         return APIResponse.success(
             data={
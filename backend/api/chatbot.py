@@ -2,13 +2,23 @@
 API de Chatbot
 Endpoints para interacción con el chatbot
 """
-from flask import Blueprint, request
-from models import db, SesionChatbot
-from utils.api_response import APIResponse, APIError, api_login_required
+import csv
+import io
+import json
+from datetime import datetime
+from flask import Blueprint, request, Response, stream_with_context
+from models import db, SesionChatbot, SesionChatbotArchivada, HistorialChat
+from utils.api_response import APIResponse, APIError, api_login_required, api_tecnico_required
+from utils.whatsapp_client import WhatsAppClient
+from utils.bandeja_salida import obtener_bandeja
+from utils.transcripciones import escribir_transcripciones
+from utils.cache_sesiones import obtener_cache_sesiones, escribir_sesiones_pendientes, invalidar_sesion
+from utils.bloqueos import bloqueos_conversacion, bloquear_en_bd
+from utils.barrido_sesiones import obtener_barredor
 from flask_login import current_user
 
 # Importar el gestor de flujo del chatbot existente
-from routes.chatbot import flow_manager, procesar_mensaje_whatsapp
+from routes.chatbot import flow_manager, procesar_mensaje_whatsapp, recibir_webhook
 
 chatbot_api_bp = Blueprint('chatbot_api', __name__)
 
@@ -81,6 +91,9 @@ def obtener_sesion():
     """
     telefono = request.args.get('telefono', current_user.telefono or f'+57{current_user.id}')
     
+    # Incluir los cambios de estado que aún no se escribieron (caché de sesiones)
+    escribir_sesiones_pendientes()
+    
     sesion = SesionChatbot.query.filter_by(
         usuario_telefono=telefono,
         activa=True
@@ -110,16 +123,22 @@ def reiniciar_sesion():
     telefono = request.args.get('telefono', current_user.telefono or f'+57{current_user.id}')
     
     try:
-        # Desactivar sesiones anteriores
-        sesiones = SesionChatbot.query.filter_by(
-            usuario_telefono=telefono,
-            activa=True
-        ).all()
-        
-        for sesion in sesiones:
-            sesion.activa = False
-        
-        db.session.commit()
+        # Con el bloqueo de la conversación: ningún mensaje de este teléfono
+        # vuelve a guardar la sesión en caché mientras se desactiva
+        with bloqueos_conversacion.bloquear(telefono):
+            bloquear_en_bd(telefono)
+            invalidar_sesion(telefono)
+            
+            # Desactivar sesiones anteriores
+            sesiones = SesionChatbot.query.filter_by(
+                usuario_telefono=telefono,
+                activa=True
+            ).all()
+            
+            for sesion in sesiones:
+                sesion.activa = False
+            
+            db.session.commit()
         
         return APIResponse.success(message='Sesión reiniciada correctamente')
         
@@ -133,6 +152,125 @@ def reiniciar_sesion():
         )
 
 
+@chatbot_api_bp.route('/sesiones/<int:id>/transcripcion', methods=['GET'])
+@api_tecnico_required
+def exportar_transcripcion(id):
+    """
+    GET /api/chatbot/sesiones/{id}/transcripcion?formato=jsonl|csv
+    
+    Transcripción completa de una sesión en streaming (se lee por bloques,
+    sin cargarla entera en memoria)
+    """
+    formato = request.args.get('formato', 'jsonl').lower()
+    if formato not in ('jsonl', 'csv'):
+        return APIResponse.error(
+            APIError.VALIDATION_ERROR,
+            'Formato no válido (jsonl o csv)',
+            400
+        )
+    
+    sesion = db.session.get(SesionChatbot, id)
+    if sesion is not None:
+        # Incluir los mensajes que aún están en el buffer de escritura
+        escribir_transcripciones()
+        
+        consulta = db.session.query(
+            HistorialChat.fecha, HistorialChat.emisor, HistorialChat.mensaje
+        ).filter(
+            HistorialChat.sesion_id == id
+        ).order_by(HistorialChat.fecha, HistorialChat.id).yield_per(500)
+    else:
+        # Sesión ya archivada por el barrido: la transcripción está en una sola fila
+        archivada = db.session.get(SesionChatbotArchivada, id)
+        if archivada is None:
+            return APIResponse.error(APIError.NOT_FOUND, 'Sesión no encontrada', 404)
+        consulta = [
+            (datetime.fromisoformat(m['fecha']) if m['fecha'] else None, m['emisor'], m['mensaje'])
+            for m in archivada.historial
+        ]
+    
+    def generar_jsonl():
+        for fecha, emisor, mensaje in consulta:
+            yield json.dumps({
+                'fecha': fecha.isoformat() if fecha else None,
+                'emisor': emisor,
+                'mensaje': mensaje
+            }, ensure_ascii=False) + '\n'
+    
+    def generar_csv():
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        escritor.writerow(['fecha', 'emisor', 'mensaje'])
+        for fecha, emisor, mensaje in consulta:
+            escritor.writerow([fecha.isoformat() if fecha else '', emisor, mensaje])
+            if buffer.tell() > 8192:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    if formato == 'csv':
+        generador, mimetype = generar_csv(), 'text/csv; charset=utf-8'
+    else:
+        generador, mimetype = generar_jsonl(), 'application/x-ndjson'
+    
+    return Response(
+        stream_with_context(generador),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=transcripcion_sesion_{id}.{formato}'}
+    )
+
+
+@chatbot_api_bp.route('/metricas-envio', methods=['GET'])
+@api_tecnico_required
+def metricas_envio():
+    """
+    GET /api/chatbot/metricas-envio
+    
+    Histogramas de latencia de los envíos a WhatsApp por tipo y código de respuesta
+    """
+    return APIResponse.success(data=WhatsAppClient.metricas())
+
+
+@chatbot_api_bp.route('/bandeja-salida', methods=['GET'])
+@api_tecnico_required
+def estado_bandeja_salida():
+    """
+    GET /api/chatbot/bandeja-salida
+    
+    Respuestas del chatbot por estado de entrega (pendiente, enviando, enviado, error)
+    """
+    bandeja = obtener_bandeja()
+    if bandeja is None:
+        return APIResponse.success(data={'activa': False})
+    return APIResponse.success(data={'activa': True, **bandeja.estadisticas()})
+
+
+@chatbot_api_bp.route('/barrido-sesiones', methods=['GET'])
+@api_tecnico_required
+def estado_barrido_sesiones():
+    """
+    GET /api/chatbot/barrido-sesiones
+    
+    Sesiones activas, inactivas y archivadas, y resultado del último barrido
+    """
+    return APIResponse.success(data=obtener_barredor().estadisticas())
+
+
+@chatbot_api_bp.route('/cache-sesiones', methods=['GET'])
+@api_tecnico_required
+def estado_cache_sesiones():
+    """
+    GET /api/chatbot/cache-sesiones
+    
+    Aciertos, fallos y escrituras pendientes de la caché de sesiones del chatbot
+    """
+    cache = obtener_cache_sesiones()
+    if cache is None:
+        return APIResponse.success(data={'activa': False})
+    return APIResponse.success(data={'activa': True, **cache.estadisticas()})
+
+
 @chatbot_api_bp.route('/webhook', methods=['GET', 'POST'])
 def webhook():
     """
@@ -148,26 +286,5 @@ def webhook():
         return 'Token de verificación inválido', 403
     
     elif request.method == 'POST':
-        # Procesar mensaje entrante
-        data = request.get_json()
-        
-        try:
-            entry = data['entry'][0]
-            changes = entry['changes'][0]
-            value = changes['value']
-            
-            if 'messages' in value:
-                message = value['messages'][0]
-                from_number = message['from']
-                message_text = message['text']['body']
-                
-                # Procesar mensaje
-                response = procesar_mensaje_whatsapp(from_number, message_text)
-                
-                # Enviar respuesta usando WhatsApp Business API
-                WhatsAppClient.enviar_mensaje(from_number, response)
-                
-        except Exception as e:
-            print(f"Error procesando webhook: {e}")
-        
-        return 'OK', 200
+        # Encolar (o procesar, en modo síncrono) todos los mensajes entrantes
+        return recibir_webhook(request.get_json(silent=True))
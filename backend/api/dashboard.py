@@ -2,11 +2,17 @@
 API de Dashboard
 Endpoints para estadísticas y datos del dashboard
 """
-from flask import Blueprint, request
+from flask import Blueprint, request, Response, current_app, stream_with_context
 from sqlalchemy import func, desc
-from models import db, Ticket, Usuario, BaseConocimiento
+from models import db, Ticket
 from utils.api_response import APIResponse, APIError, api_login_required, api_tecnico_required, serialize_model
-from datetime import datetime, timedelta
+from utils.query_counter import query_budget
+from utils.search import sugerir_articulos
+from utils.resumen_dashboard import resumen_home
+from utils.estadisticas_tickets import resumen_general
+from utils.eventos import obtener_bus_eventos
+from utils.cache_respuestas import cache_respuesta, obtener_cache_respuestas
+from utils.notificaciones import EstadoNotificaciones, stream_notificaciones, obtener_bus_notificaciones
 from flask_login import current_user
 
 dashboard_api_bp = Blueprint('dashboard_api', __name__)
@@ -14,49 +20,20 @@ dashboard_api_bp = Blueprint('dashboard_api', __name__)
 
 @dashboard_api_bp.route('/home', methods=['GET'])
 @api_login_required
+@query_budget(4)
 def home():
     """
     GET /api/dashboard/home
     
     Datos del dashboard principal del usuario
     """
-    # Tickets abiertos del usuario
-    tickets_abiertos = Ticket.query.filter_by(
-        usuario_id=current_user.id
-    ).filter(
-        Ticket.estado.notin_(['resuelto', 'cerrado'])
-    ).count()
-    
-    # Últimos tickets
-    tickets_recientes = Ticket.query.filter_by(
-        usuario_id=current_user.id
-    ).order_by(desc(Ticket.fecha_creacion)).limit(5).all()
-    
-    # Artículos populares
-    articulos_populares = BaseConocimiento.query.filter_by(
-        activo=True
-    ).order_by(desc(BaseConocimiento.vistas)).limit(3).all()
-    
-    # Estadísticas para técnicos
-    stats_tecnico = {}
-    if current_user.es_tecnico:
-        stats_tecnico = {
-            'tickets_asignados': Ticket.query.filter_by(
-                tecnico_id=current_user.id
-            ).filter(
-                Ticket.estado.notin_(['resuelto', 'cerrado'])
-            ).count(),
-            'tickets_nuevos': Ticket.query.filter_by(estado='nuevo').count(),
-            'tickets_criticos': Ticket.query.filter_by(prioridad='critica').filter(
-                Ticket.estado.notin_(['resuelto', 'cerrado'])
-            ).count()
-        }
+    resumen = resumen_home(current_user)
     
     return APIResponse.success(data={
-        'tickets_abiertos': tickets_abiertos,
-        'tickets_recientes': [serialize_model(t, exclude=['descripcion', 'datos_adicionales']) for t in tickets_recientes],
-        'articulos_populares': [serialize_model(a, exclude=['contenido']) for a in articulos_populares],
-        'stats_tecnico': stats_tecnico
+        'tickets_abiertos': resumen['tickets_abiertos'],
+        'tickets_recientes': [serialize_model(t, exclude=['descripcion', 'datos_adicionales']) for t in resumen['tickets_recientes']],
+        'articulos_populares': [serialize_model(a, exclude=['contenido']) for a in resumen['articulos_populares']],
+        'stats_tecnico': resumen['stats_tecnico']
     })
 
 
@@ -71,15 +48,7 @@ def buscar_ayuda():
     if not query or len(query) < 3:
         return APIResponse.success(data={'resultados': []})
     
-    resultados = BaseConocimiento.query.filter(
-        BaseConocimiento.activo == True
-    ).filter(
-        db.or_(
-            BaseConocimiento.titulo.contains(query),
-            BaseConocimiento.contenido.contains(query),
-            BaseConocimiento.palabras_clave.contains(query)
-        )
-    ).order_by(desc(BaseConocimiento.vistas)).limit(10).all()
+    resultados = sugerir_articulos(query, limite=10)
     
     resultados_data = [{
         'id': art.id,
@@ -155,110 +124,95 @@ def accesos_rapidos():
 
 @dashboard_api_bp.route('/estadisticas', methods=['GET'])
 @api_tecnico_required
+@cache_respuesta('tickets')
 def estadisticas():
     """
     GET /api/dashboard/estadisticas
     
     Estadísticas generales del sistema (solo técnicos)
     """
-    # Estadísticas generales
-    total_tickets = Ticket.query.count()
-    tickets_abiertos = Ticket.query.filter(
-        Ticket.estado.notin_(['resuelto', 'cerrado'])
-    ).count()
-    
-    # Por estado
-    tickets_por_estado = db.session.query(
-        Ticket.estado,
-        func.count(Ticket.id).label('count')
-    ).group_by(Ticket.estado).all()
-    
-    # Por categoría (últimos 30 días)
-    fecha_limite = datetime.utcnow() - timedelta(days=30)
-    tickets_por_categoria = db.session.query(
-        Ticket.categoria,
-        func.count(Ticket.id).label('count')
-    ).filter(
-        Ticket.fecha_creacion >= fecha_limite
-    ).group_by(Ticket.categoria).all()
-    
-    # Técnicos más activos
-    tecnicos_activos = db.session.query(
-        Usuario.nombre,
-        func.count(Ticket.id).label('tickets_asignados')
-    ).join(
-        Ticket, Usuario.id == Ticket.tecnico_id
-    ).filter(
-        Usuario.es_tecnico == True,
-        Ticket.fecha_creacion >= fecha_limite
-    ).group_by(Usuario.id, Usuario.nombre).order_by(
-        desc('tickets_asignados')
-    ).limit(5).all()
+    stats = resumen_general(dias=30)
     
     return APIResponse.success(data={
-        'total_tickets': total_tickets,
-        'tickets_abiertos': tickets_abiertos,
-        'tickets_por_estado': [{'estado': e, 'count': c} for e, c in tickets_por_estado],
-        'tickets_por_categoria': [{'categoria': cat, 'count': c} for cat, c in tickets_por_categoria],
-        'tecnicos_activos': [{'nombre': n, 'tickets_asignados': t} for n, t in tecnicos_activos]
+        'total_tickets': stats['total_tickets'],
+        'tickets_abiertos': stats['tickets_abiertos'],
+        'tickets_por_estado': [{'estado': e, 'count': c} for e, c in stats['tickets_por_estado']],
+        'tickets_por_categoria': [{'categoria': cat, 'count': c} for cat, c in stats['tickets_por_categoria']],
+        'tecnicos_activos': [{'nombre': n, 'tickets_asignados': t} for n, t in stats['tecnicos_activos']]
     })
 
 
+@dashboard_api_bp.route('/estadisticas-cache', methods=['GET'])
+@api_tecnico_required
+def estadisticas_cache():
+    """
+    GET /api/dashboard/estadisticas-cache
+    
+    Aciertos, fallos, esperas coalescidas e invalidaciones de la caché de
+    respuestas de estadísticas, por endpoint
+    """
+    return APIResponse.success(data=obtener_cache_respuestas().estadisticas())
+
+
+@dashboard_api_bp.route('/estadisticas-eventos', methods=['GET'])
+@api_tecnico_required
+def estadisticas_eventos():
+    """
+    GET /api/dashboard/estadisticas-eventos
+    
+    Eventos publicados por tipo y, por suscriptor, procesados, errores,
+    descartes, profundidad de la cola y latencias del bus de eventos
+    """
+    return APIResponse.success(data=obtener_bus_eventos().estadisticas())
+
+
 @dashboard_api_bp.route('/notificaciones', methods=['GET'])
 @api_tecnico_required
+@query_budget(4)
 def notificaciones():
     """
     GET /api/dashboard/notificaciones
     
     Notificaciones en tiempo real para técnicos
     """
-    # Tickets nuevos (últimos 5 minutos)
-    hace_5_min = datetime.utcnow() - timedelta(minutes=5)
-    tickets_nuevos = Ticket.query.filter(
-        Ticket.fecha_creacion >= hace_5_min,
-        Ticket.estado == 'nuevo'
-    ).order_by(desc(Ticket.fecha_creacion)).all()
-    
-    # Tickets críticos sin asignar
-    tickets_criticos = Ticket.query.filter(
-        Ticket.prioridad == 'critica',
-        Ticket.tecnico_id.is_(None),
-        Ticket.estado == 'nuevo'
-    ).count()
-    
-    # Tickets asignados al técnico actual
-    mis_tickets_pendientes = Ticket.query.filter(
-        Ticket.tecnico_id == current_user.id,
-        Ticket.estado.in_(['asignado_a_tecnico', 'en_proceso'])
-    ).count()
-    
-    notificaciones = []
+    # Tickets nuevos (últimos 5 minutos), críticos sin asignar y mis pendientes
+    return APIResponse.success(data=EstadoNotificaciones.desde_bd(current_user.id).a_dict())
+
+
+@dashboard_api_bp.route('/notificaciones/stream', methods=['GET'])
+@api_tecnico_required
+def notificaciones_stream():
+    """
+    GET /api/dashboard/notificaciones/stream
     
-    # Notificaciones de tickets nuevos
-    for ticket in tickets_nuevos:
-        notificaciones.append({
-            'tipo': 'nuevo_ticket',
-            'titulo': f'Nuevo ticket #{ticket.id}',
-            'mensaje': f'{ticket.titulo} - {ticket.usuario.nombre}',
-            'url': f'/tickets/{ticket.id}',
-            'tiempo': ticket.fecha_creacion.strftime('%H:%M'),
-            'prioridad': ticket.prioridad
-        })
+    Las mismas notificaciones como Server-Sent Events: un evento
+    `notificaciones` al conectarse y cada vez que cambian (tickets creados o
+    con cambio de estado), sin volver a consultar la base de datos.
     
-    # Notificación de tickets críticos
-    if tickets_criticos > 0:
-        notificaciones.append({
-            'tipo': 'critico',
-            'titulo': f'{tickets_criticos} ticket(s) crítico(s)',
-            'mensaje': 'Requieren atención inmediata',
-            'url': '/tickets?prioridad=critica&estado=nuevo',
-            'tiempo': 'Ahora',
-            'prioridad': 'critica'
-        })
+    503 si el proceso ya tiene NOTIFICACIONES_SSE_MAXIMO streams abiertos:
+    el navegador vuelve a consultar /dashboard/notificaciones periódicamente
+    """
+    bus = obtener_bus_notificaciones()
+    suscripcion = bus.suscribir()
+    if suscripcion is None:
+        return APIResponse.error(
+            APIError.SERVICE_UNAVAILABLE,
+            'Demasiados streams de notificaciones abiertos; consultar periódicamente',
+            503
+        )
     
-    return APIResponse.success(data={
-        'notificaciones': notificaciones,
-        'total_nuevos': len(tickets_nuevos),
-        'total_criticos': tickets_criticos,
-        'mis_pendientes': mis_tickets_pendientes
+    stream = stream_notificaciones(
+        current_user.id,
+        suscripcion,
+        latido=current_app.config.get('NOTIFICACIONES_SSE_LATIDO', 15),
+        resincronizar=current_app.config.get('NOTIFICACIONES_SSE_RESINCRONIZAR', 300),
+        duracion=current_app.config.get('NOTIFICACIONES_SSE_DURACION', 600)
+    )
+    respuesta = Response(stream_with_context(stream), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Sin buffer en nginx: cada evento sale al momento
+        'X-Accel-Buffering': 'no'
     })
+    # Libera el cupo aunque el generador no llegue a arrancar (cliente desconectado)
+    respuesta.call_on_close(lambda: bus.cancelar(suscripcion))
+    return respuesta
@@ -4,10 +4,18 @@ Endpoints para gestión de artículos
 """
 from flask import Blueprint, request
 from sqlalchemy import desc, or_
+from sqlalchemy.orm import joinedload
 from models import db, BaseConocimiento
 from config import Config
 from utils.api_response import APIResponse, APIError, api_login_required, api_tecnico_required, serialize_model
 from utils.validators import ConocimientoValidator
+from utils.pagination import paginar_consulta
+from utils.query_counter import query_budget
+from utils.search import buscar_articulos, estadisticas_indices
+from utils.cache_respuestas import cache_respuesta
+from utils.autocompletado import autocompletar
+from utils.contador_vistas import registrar_vista, vistas_actuales
+from utils.eventos import registrar_evento, articulo_cambiado
 from flask_login import current_user
 
 knowledge_api_bp = Blueprint('knowledge_api', __name__)
@@ -15,38 +23,51 @@ knowledge_api_bp = Blueprint('knowledge_api', __name__)
 
 @knowledge_api_bp.route('/', methods=['GET'])
 @api_login_required
+@query_budget(4)
 def lista_articulos():
     """
     GET /api/knowledge?q=impresora&categoria=problemas_tecnicos&page=1
+    GET /api/knowledge?cursor=&per_page=12&include_total=false
+    
+    Con el parámetro `cursor` se usa paginación keyset sobre
+    (vistas, fecha_creacion, id) en lugar de offset.
     """
     query = request.args.get('q', '').strip()
     categoria_filtro = request.args.get('categoria', '')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 12, type=int)
+    cursor = request.args.get('cursor')
+    include_total = request.args.get(
+        'include_total', 'false' if cursor is not None else 'true'
+    ).lower() != 'false'
     
     # Construir query
     articulos_query = BaseConocimiento.query.filter_by(activo=True)
     
     if query:
-        articulos_query = articulos_query.filter(
-            or_(
-                BaseConocimiento.titulo.contains(query),
-                BaseConocimiento.contenido.contains(query),
-                BaseConocimiento.palabras_clave.contains(query)
-            )
-        )
+        # En modo cursor se conserva el orden keyset en lugar del de relevancia
+        articulos_query = buscar_articulos(articulos_query, query, ordenar=cursor is None)
     
     if categoria_filtro:
         articulos_query = articulos_query.filter_by(categoria=categoria_filtro)
     
-    # Contar total
-    total = articulos_query.count()
+    # Cargar el autor en la misma consulta (evita N+1)
+    articulos_query = articulos_query.options(joinedload(BaseConocimiento.autor))
     
     # Ordenar y paginar
-    articulos = articulos_query.order_by(
-        desc(BaseConocimiento.vistas),
-        desc(BaseConocimiento.fecha_creacion)
-    ).offset((page - 1) * per_page).limit(per_page).all()
+    try:
+        pagina = paginar_consulta(
+            articulos_query,
+            [BaseConocimiento.vistas, BaseConocimiento.fecha_creacion, BaseConocimiento.id],
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            include_total=include_total
+        )
+    except ValueError as e:
+        return APIResponse.error(APIError.VALIDATION_ERROR, str(e), 400)
+    
+    articulos = pagina['items']
     
     # Serializar
     articulos_data = []
@@ -58,10 +79,12 @@ def lista_articulos():
     
     return APIResponse.paginated(
         items=articulos_data,
-        page=page,
+        page=page if cursor is None else None,
         per_page=per_page,
-        total=total,
-        data_key='articulos'
+        total=pagina['total'],
+        data_key='articulos',
+        has_next=pagina['has_next'],
+        next_cursor=pagina['next_cursor']
     )
 
 
@@ -80,8 +103,8 @@ def detalle_articulo(id):
             404
         )
     
-    # Incrementar vistas
-    articulo.incrementar_vistas()
+    # Registrar la vista (se escribe por lotes, la lectura no hace commit)
+    registrar_vista(articulo.id)
     
     # Artículos relacionados
     relacionados = BaseConocimiento.query.filter(
@@ -96,6 +119,7 @@ def detalle_articulo(id):
     
     # Serializar
     art_dict = serialize_model(articulo)
+    art_dict['vistas'] = vistas_actuales(articulo)
     art_dict['autor'] = {'id': articulo.autor.id, 'nombre': articulo.autor.nombre}
     art_dict['relacionados'] = [
         {
@@ -150,6 +174,8 @@ def crear_articulo():
         )
         
         db.session.add(nuevo_articulo)
+        db.session.flush()
+        registrar_evento(articulo_cambiado(nuevo_articulo))
         db.session.commit()
         
         art_dict = serialize_model(nuevo_articulo)
@@ -206,6 +232,7 @@ def editar_articulo(id):
         articulo.categoria = data['categoria']
         articulo.subcategoria = data.get('subcategoria', '')
         
+        registrar_evento(articulo_cambiado(articulo))
         db.session.commit()
         
         art_dict = serialize_model(articulo)
@@ -244,6 +271,7 @@ def eliminar_articulo(id):
     try:
         # Marcar como inactivo
         articulo.activo = False
+        registrar_evento(articulo_cambiado(articulo))
         db.session.commit()
         
         return APIResponse.success(message='Artículo eliminado exitosamente')
@@ -264,17 +292,14 @@ def buscar_sugerencias():
     """
     GET /api/knowledge/buscar-sugerencias?q=impre
     
-    Autocompletado de búsqueda
+    Autocompletado de búsqueda (trie en memoria con top-K por vistas)
     """
     query = request.args.get('q', '').strip()
     
     if len(query) < 2:
         return APIResponse.success(data={'sugerencias': []})
     
-    sugerencias = BaseConocimiento.query.filter(
-        BaseConocimiento.activo == True,
-        BaseConocimiento.titulo.contains(query)
-    ).order_by(desc(BaseConocimiento.vistas)).limit(5).all()
+    sugerencias = autocompletar(query, limite=5)
     
     sugerencias_data = [{
         'titulo': art.titulo,
@@ -287,6 +312,7 @@ def buscar_sugerencias():
 
 @knowledge_api_bp.route('/estadisticas', methods=['GET'])
 @api_tecnico_required
+@cache_respuesta('articulos')
 def estadisticas():
     """
     GET /api/knowledge/estadisticas
@@ -311,3 +337,14 @@ def estadisticas():
             'vistas_totales': vistas or 0
         } for cat, total, vistas in por_categoria]
     })
+
+
+@knowledge_api_bp.route('/estadisticas-indices', methods=['GET'])
+@api_tecnico_required
+def estadisticas_indices_memoria():
+    """
+    GET /api/knowledge/estadisticas-indices
+    
+    Tamaño y memoria aproximada del autocompletado y del índice invertido
+    """
+    return APIResponse.success(data=estadisticas_indices())
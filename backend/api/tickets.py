@@ -2,12 +2,20 @@
 API de Tickets
 Endpoints para gestión de tickets de soporte
 """
-from flask import Blueprint, request
+from flask import Blueprint, request, current_app
 from sqlalchemy import desc, or_
-from models import db, Ticket, ComentarioTicket, BaseConocimiento
+from sqlalchemy.orm import joinedload
+from models import db, Ticket, ComentarioTicket, BaseConocimiento, Usuario, MensajeSaliente
 from config import Config
 from utils.api_response import APIResponse, APIError, api_login_required, api_tecnico_required, serialize_model, serialize_list
 from utils.validators import TicketValidator, Validator
+from utils.pagination import paginar_consulta
+from utils.query_counter import query_budget
+from utils.search import sugerir_articulos
+from utils.estadisticas_tickets import totales_por_categoria
+from utils.cache_respuestas import cache_respuesta
+from utils.eventos import registrar_evento, ticket_creado, ticket_estado_cambiado, comentario_agregado
+from utils.bandeja_salida import obtener_bandeja
 from datetime import datetime
 
 tickets_api_bp = Blueprint('tickets_api', __name__)
@@ -15,11 +23,17 @@ tickets_api_bp = Blueprint('tickets_api', __name__)
 
 @tickets_api_bp.route('/', methods=['GET'])
 @api_login_required
+@query_budget(4)
 def lista_tickets():
     """
     GET /api/tickets?page=1&estado=nuevo&categoria=problemas_tecnicos
+    GET /api/tickets?cursor=&per_page=50&include_total=false
     
-    Lista tickets con filtros y paginación
+    Lista tickets con filtros y paginación. Con el parámetro `cursor`
+    se usa paginación keyset sobre (fecha_creacion, id): la primera página
+    se pide con `cursor=` vacío y las siguientes con `meta.pagination.next_cursor`.
+    `include_total=false` omite el conteo total (por defecto solo se omite
+    en modo cursor).
     
     Response:
         {
@@ -39,6 +53,10 @@ def lista_tickets():
     estado_filtro = request.args.get('estado', '')
     categoria_filtro = request.args.get('categoria', '')
     prioridad_filtro = request.args.get('prioridad', '')
+    cursor = request.args.get('cursor')
+    include_total = request.args.get(
+        'include_total', 'false' if cursor is not None else 'true'
+    ).lower() != 'false'
     
     # Construir query base
     query = Ticket.query
@@ -55,13 +73,23 @@ def lista_tickets():
     if prioridad_filtro:
         query = query.filter_by(prioridad=prioridad_filtro)
     
-    # Contar total
-    total = query.count()
+    # Cargar usuario y técnico en la misma consulta (evita N+1)
+    query = query.options(joinedload(Ticket.usuario), joinedload(Ticket.tecnico))
     
     # Ordenar y paginar
-    tickets = query.order_by(desc(Ticket.fecha_creacion)).offset(
-        (page - 1) * per_page
-    ).limit(per_page).all()
+    try:
+        pagina = paginar_consulta(
+            query,
+            [Ticket.fecha_creacion, Ticket.id],
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            include_total=include_total
+        )
+    except ValueError as e:
+        return APIResponse.error(APIError.VALIDATION_ERROR, str(e), 400)
+    
+    tickets = pagina['items']
     
     # Serializar tickets
     tickets_data = []
@@ -81,15 +109,18 @@ def lista_tickets():
     
     return APIResponse.paginated(
         items=tickets_data,
-        page=page,
+        page=page if cursor is None else None,
         per_page=per_page,
-        total=total,
-        data_key='tickets'
+        total=pagina['total'],
+        data_key='tickets',
+        has_next=pagina['has_next'],
+        next_cursor=pagina['next_cursor']
     )
 
 
 @tickets_api_bp.route('/<int:id>', methods=['GET'])
 @api_login_required
+@query_budget(3)
 def detalle_ticket(id):
     """
     GET /api/tickets/{id}
@@ -98,7 +129,9 @@ def detalle_ticket(id):
     """
     from flask_login import current_user
     
-    ticket = Ticket.query.get_or_404(id)
+    ticket = Ticket.query.options(
+        joinedload(Ticket.usuario), joinedload(Ticket.tecnico)
+    ).get_or_404(id)
     
     # Verificar permisos
     if not current_user.es_tecnico and ticket.usuario_id != current_user.id:
@@ -108,8 +141,10 @@ def detalle_ticket(id):
             403
         )
     
-    # Obtener comentarios
-    comentarios = ComentarioTicket.query.filter_by(
+    # Obtener comentarios con su autor
+    comentarios = ComentarioTicket.query.options(
+        joinedload(ComentarioTicket.autor)
+    ).filter_by(
         ticket_id=id
     ).order_by(ComentarioTicket.fecha_creacion).all()
     
@@ -218,6 +253,8 @@ def crear_ticket():
         )
         
         db.session.add(nuevo_ticket)
+        db.session.flush()
+        registrar_evento(ticket_creado(nuevo_ticket, 'api', current_user.nombre))
         db.session.commit()
         
         # Crear comentario inicial
@@ -310,6 +347,8 @@ def agregar_comentario(id):
         
         # Actualizar fecha de última modificación
         ticket.fecha_actualizacion = datetime.utcnow()
+        db.session.flush()
+        registrar_evento(comentario_agregado(comentario))
         db.session.commit()
         
         # Serializar respuesta
@@ -392,6 +431,7 @@ def actualizar_estado(id):
         )
         
         db.session.add(comentario_sistema)
+        registrar_evento(ticket_estado_cambiado(ticket))
         db.session.commit()
         
         ticket_dict = serialize_model(ticket)
@@ -411,6 +451,91 @@ def actualizar_estado(id):
         )
 
 
+@tickets_api_bp.route('/notificar-estado', methods=['POST'])
+@api_tecnico_required
+def notificar_estado():
+    """
+    POST /api/tickets/notificar-estado
+
+    Encola en la bandeja de salida un WhatsApp con el estado actual de cada
+    ticket para su usuario y responde 202 de inmediato; el despachador de la
+    bandeja los envía con reintentos y en orden por teléfono (se omiten
+    usuarios sin teléfono)
+
+    Body:
+        {
+            "ids": [10, 11, 12],
+            "mensaje": "Texto adicional opcional"
+        }
+    """
+    if not current_app.config.get('BANDEJA_SALIDA'):
+        return APIResponse.error(
+            APIError.SERVICE_UNAVAILABLE,
+            'El envío de notificaciones requiere la bandeja de salida (BANDEJA_SALIDA)',
+            503
+        )
+
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+        return APIResponse.error(
+            APIError.VALIDATION_ERROR,
+            'Se requiere una lista de ids de tickets',
+            400
+        )
+
+    if len(ids) > Config.NOTIFICAR_ESTADO_MAX_TICKETS:
+        return APIResponse.error(
+            APIError.VALIDATION_ERROR,
+            f'Máximo {Config.NOTIFICAR_ESTADO_MAX_TICKETS} tickets por envío',
+            400
+        )
+
+    extra = (data.get('mensaje') or '').strip()
+    filas = db.session.query(Ticket, Usuario.telefono).join(
+        Usuario, Ticket.usuario_id == Usuario.id
+    ).filter(
+        Ticket.id.in_(ids),
+        Usuario.telefono.isnot(None),
+        Usuario.telefono != ''
+    ).all()
+
+    mensajes = []
+    for ticket, telefono in filas:
+        texto = f"🎫 Ticket #{ticket.id}: {ticket.titulo}\nEstado: {ticket.get_estado_display()}"
+        if extra:
+            texto += f"\n\n{extra}"
+        mensajes.append({'telefono': telefono, 'respuesta': {'mensaje': texto, 'tipo': 'texto'}})
+
+    try:
+        if mensajes:
+            # Un solo INSERT con muchos parámetros; los envía el despachador de la bandeja
+            db.session.execute(MensajeSaliente.__table__.insert(), mensajes)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return APIResponse.error(
+            APIError.DATABASE_ERROR,
+            'Error al encolar las notificaciones',
+            500,
+            details={'error': str(e)}
+        )
+
+    bandeja = obtener_bandeja()
+    if bandeja is not None:
+        bandeja.avisar()
+
+    return APIResponse.success(
+        data={
+            'encolados': len(mensajes),
+            'omitidos': len(set(ids)) - len(filas)  # Sin teléfono o inexistentes
+        },
+        message=f"{len(mensajes)} notificaciones encoladas",
+        status=202
+    )
+
+
 @tickets_api_bp.route('/buscar-articulos', methods=['GET'])
 @api_login_required
 def buscar_articulos():
@@ -426,23 +551,7 @@ def buscar_articulos():
     if len(query) < 3:
         return APIResponse.success(data={'articulos': []})
     
-    # Construir query de búsqueda
-    busqueda = BaseConocimiento.query.filter_by(activo=True)
-    
-    if categoria:
-        busqueda = busqueda.filter_by(categoria=categoria)
-    if subcategoria:
-        busqueda = busqueda.filter_by(subcategoria=subcategoria)
-    
-    busqueda = busqueda.filter(
-        or_(
-            BaseConocimiento.titulo.contains(query),
-            BaseConocimiento.contenido.contains(query),
-            BaseConocimiento.palabras_clave.contains(query)
-        )
-    ).order_by(desc(BaseConocimiento.vistas)).limit(5)
-    
-    articulos = busqueda.all()
+    articulos = sugerir_articulos(query, categoria, subcategoria, limite=5)
     
     articulos_data = [{
         'id': art.id,
@@ -457,6 +566,7 @@ def buscar_articulos():
 
 @tickets_api_bp.route('/estadisticas', methods=['GET'])
 @api_tecnico_required
+@cache_respuesta('tickets')
 def estadisticas():
     """
     GET /api/tickets/estadisticas?categoria=problemas_tecnicos
@@ -465,31 +575,7 @@ def estadisticas():
     """
     categoria = request.args.get('categoria')
     
-    if categoria:
-        # Estadísticas por subcategoría
-        stats = db.session.query(
-            Ticket.subcategoria,
-            db.func.count(Ticket.id).label('total'),
-            db.func.sum(db.case([(Ticket.estado.in_(['resuelto', 'cerrado']), 0)], else_=1)).label('abiertos')
-        ).filter_by(categoria=categoria).group_by(Ticket.subcategoria).all()
-        
-        stats_data = [{
-            'subcategoria': stat.subcategoria,
-            'total': stat.total,
-            'abiertos': stat.abiertos or 0
-        } for stat in stats]
-    else:
-        # Estadísticas generales
-        stats = db.session.query(
-            Ticket.categoria,
-            db.func.count(Ticket.id).label('total'),
-            db.func.sum(db.case([(Ticket.estado.in_(['resuelto', 'cerrado']), 0)], else_=1)).label('abiertos')
-        ).group_by(Ticket.categoria).all()
-        
-        stats_data = [{
-            'categoria': stat.categoria,
-            'total': stat.total,
-            'abiertos': stat.abiertos or 0
-        } for stat in stats]
+    # Por subcategoría si se indica la categoría; si no, por categoría
+    stats_data = totales_por_categoria(categoria)
     
     return APIResponse.success(data={'estadisticas': stats_data})
@@ -4,7 +4,14 @@ from config import Config
 from models import db, Usuario, Ticket, ComentarioTicket, BaseConocimiento, SesionChatbot
 import os
 
-def create_app():
+def create_app(iniciar_trabajadores=None):
+    """
+    Crea la aplicación
+
+    Args:
+        iniciar_trabajadores: Arrancar los hilos en segundo plano; solo el
+            proceso que atiende peticiones. None usa INICIAR_TRABAJADORES
+    """
     # Configurar rutas para templates y static en la carpeta frontend
     frontend_folder = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frontend')
     template_folder = os.path.join(frontend_folder, 'templates')
@@ -14,10 +21,48 @@ def create_app():
                 template_folder=template_folder,
                 static_folder=static_folder)
     app.config.from_object(Config)
+    if iniciar_trabajadores is not None:
+        app.config['INICIAR_TRABAJADORES'] = iniciar_trabajadores
     
     # Inicializar extensiones
     db.init_app(app)
     
+    # Contador de queries por petición (detección de N+1)
+    from utils.query_counter import init_query_counter
+    init_query_counter(app)
+    
+    # Vistas de artículos acumuladas en memoria y escritas por lotes
+    from utils.contador_vistas import init_contador_vistas
+    init_contador_vistas(app)
+    
+    # Transcripciones del chatbot escritas por lotes
+    from utils.transcripciones import init_transcripciones
+    init_transcripciones(app)
+    
+    # Sesión activa del chatbot en caché, con escritura diferida de los cambios
+    from utils.cache_sesiones import init_cache_sesiones
+    init_cache_sesiones(app)
+    
+    # Bus de eventos de tickets y artículos (utils/eventos.py)
+    from utils.eventos import init_eventos
+    init_eventos(app)
+    
+    # Respuestas de los endpoints de estadísticas en caché por unos segundos
+    from utils.cache_respuestas import init_cache_respuestas
+    init_cache_respuestas(app)
+    
+    # Notificaciones en tiempo real (SSE) de los eventos de tickets
+    from utils.notificaciones import init_notificaciones
+    init_notificaciones(app)
+    
+    # Desactivación de sesiones inactivas y archivado de las antiguas
+    from utils.barrido_sesiones import init_barrido_sesiones
+    init_barrido_sesiones(app)
+    
+    # Modelo de NLP del chatbot: bajo demanda o precargado en segundo plano
+    from utils.nlp import init_nlp
+    init_nlp(app)
+    
     # Configurar Flask-Login
     login_manager = LoginManager()
     login_manager.init_app(app)
@@ -45,6 +90,15 @@ def create_app():
     from api import api_bp
     app.register_blueprint(api_bp)
     
+    # Cola asíncrona del webhook de WhatsApp (workers en segundo plano)
+    from utils.cola_webhook import init_cola_webhook
+    from routes.chatbot import responder_mensajes
+    init_cola_webhook(app, responder_mensajes)
+    
+    # Bandeja de salida de las respuestas del chatbot (envío con reintentos)
+    from utils.bandeja_salida import init_bandeja_salida
+    init_bandeja_salida(app)
+    
     # Ruta principal
     @app.route('/')
     def index():
@@ -119,7 +173,8 @@ def create_app():
     return app
 
 if __name__ == '__main__':
-    app = create_app()
+    # Con el recargador de debug solo el proceso hijo atiende peticiones
+    app = create_app(iniciar_trabajadores=os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
     with app.app_context():
         db.create_all()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -8,10 +8,136 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///focusit.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Presupuesto de queries por endpoint: en modo estricto (tests) se lanza error
+    QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'false').lower() == 'true'
+    
+    # Búsqueda en la base de conocimiento: 'auto' (FTS si existe el índice), 'fts',
+    # 'memoria' (índice invertido en el proceso) o 'like'
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto').lower()
+    SEARCH_PESO_VISTAS = float(os.environ.get('SEARCH_PESO_VISTAS', '0.5'))
+    # Cada cuántos segundos el índice en memoria busca artículos cambiados por
+    # otros procesos (max(fecha_actualizacion)); 0 = solo los del propio proceso
+    SEARCH_MEMORIA_SINCRONIZAR = int(os.environ.get('SEARCH_MEMORIA_SINCRONIZAR', '30'))
+
+    # Autocompletado: artículos más vistos que se guardan en cada nodo del trie
+    AUTOCOMPLETE_TOP_K = int(os.environ.get('AUTOCOMPLETE_TOP_K', '10'))
+
+    # Hilos en segundo plano (escrituras por lotes, barrido de sesiones, cola del
+    # webhook, bandeja de salida y suscriptores en hilos del bus de eventos): solo
+    # en el proceso que atiende peticiones. Apagados, lo que harían se hace en
+    # línea o no se hace (scripts, migraciones, tests). run.py y
+    # create_app(iniciar_trabajadores=True) los activan sin tocar el entorno
+    INICIAR_TRABAJADORES = os.environ.get('INICIAR_TRABAJADORES', 'false').lower() == 'true'
+
+    # Vistas de artículos: se acumulan en memoria y se escriben por lotes cada
+    # VISTAS_FLUSH_INTERVALO segundos o al llegar a VISTAS_FLUSH_UMBRAL pendientes
+    VISTAS_FLUSH_INTERVALO = float(os.environ.get('VISTAS_FLUSH_INTERVALO', '30'))
+    VISTAS_FLUSH_UMBRAL = int(os.environ.get('VISTAS_FLUSH_UMBRAL', '100'))
+
+    # Transcripciones del chatbot (historial_chat): se insertan por lotes cada
+    # TRANSCRIPCION_FLUSH_INTERVALO segundos o al llegar a TRANSCRIPCION_FLUSH_UMBRAL filas
+    TRANSCRIPCION_FLUSH_INTERVALO = float(os.environ.get('TRANSCRIPCION_FLUSH_INTERVALO', '5'))
+    TRANSCRIPCION_FLUSH_UMBRAL = int(os.environ.get('TRANSCRIPCION_FLUSH_UMBRAL', '200'))
+
+    # Caché de la sesión activa del chatbot por teléfono (utils/cache_sesiones.py):
+    # 'off', 'memoria' (LRU en el proceso; solo con un proceso de la app) o
+    # 'redis' (compartida). Los cambios de estado se escriben por lotes cada
+    # SESION_CACHE_FLUSH_INTERVALO segundos o al llegar a SESION_CACHE_FLUSH_UMBRAL
+    SESION_CACHE = os.environ.get('SESION_CACHE', 'off').lower()
+    SESION_CACHE_MAXIMO = int(os.environ.get('SESION_CACHE_MAXIMO', '10000'))
+    SESION_CACHE_TTL = float(os.environ.get('SESION_CACHE_TTL', '1800'))
+    SESION_CACHE_REDIS_URL = os.environ.get('SESION_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    SESION_CACHE_FLUSH_INTERVALO = float(os.environ.get('SESION_CACHE_FLUSH_INTERVALO', '2'))
+    SESION_CACHE_FLUSH_UMBRAL = int(os.environ.get('SESION_CACHE_FLUSH_UMBRAL', '200'))
+
+    # Barrido de sesiones del chatbot (utils/barrido_sesiones.py): cada
+    # SESIONES_BARRIDO_INTERVALO segundos (0 = nunca) desactiva las sesiones sin
+    # actividad en SESIONES_TTL_MINUTOS y archiva las inactivas con más de
+    # SESIONES_RETENCION_DIAS días (0 = no archivar) en la tabla
+    # sesiones_chatbot_archivo o en archivos JSONL (SESIONES_ARCHIVO=tabla|jsonl)
+    SESIONES_BARRIDO_INTERVALO = float(os.environ.get('SESIONES_BARRIDO_INTERVALO', '300'))
+    SESIONES_TTL_MINUTOS = float(os.environ.get('SESIONES_TTL_MINUTOS', '1440'))
+    SESIONES_RETENCION_DIAS = float(os.environ.get('SESIONES_RETENCION_DIAS', '90'))
+    SESIONES_BARRIDO_LOTE = int(os.environ.get('SESIONES_BARRIDO_LOTE', '500'))
+    SESIONES_ARCHIVO = os.environ.get('SESIONES_ARCHIVO', 'tabla').lower()
+    SESIONES_ARCHIVO_RUTA = os.environ.get('SESIONES_ARCHIVO_RUTA', 'archivo_sesiones')
+
+    # Estadísticas de tickets desde la tabla resumen ticket_stats
+    # (utils/estadisticas_tickets.py). Activar después de cargarla con
+    # `python estadisticas_tickets.py reconstruir`; con false se calcula sobre tickets.
+    # Solo decide la lectura: la tabla se mantiene siempre que exista
+    TICKET_STATS_ROLLUP = os.environ.get('TICKET_STATS_ROLLUP', 'false').lower() == 'true'
+
+    # Bus de eventos (utils/eventos.py): eventos en cola por suscriptor en
+    # hilos y segundos que espera quien publica si la cola está llena antes de
+    # descartar el evento (0 = descartar sin esperar)
+    EVENTOS_COLA_MAXIMA = int(os.environ.get('EVENTOS_COLA_MAXIMA', '1000'))
+    EVENTOS_ESPERA = float(os.environ.get('EVENTOS_ESPERA', '0.05'))
+
+    # Caché de las respuestas de estadísticas (utils/cache_respuestas.py):
+    # segundos de vigencia por defecto (0 = sin caché) y máximo de respuestas guardadas
+    CACHE_RESPUESTAS_TTL = float(os.environ.get('CACHE_RESPUESTAS_TTL', '10'))
+    CACHE_RESPUESTAS_MAXIMO = int(os.environ.get('CACHE_RESPUESTAS_MAXIMO', '256'))
+
+    # Notificaciones de técnicos por Server-Sent Events (utils/notificaciones.py):
+    # segundos entre latidos, segundos entre recálculos desde la base de datos
+    # (0 = solo al desbordarse la cola), eventos en cola por conexión, streams
+    # abiertos por proceso (cada uno ocupa un hilo del servidor: por debajo de
+    # gunicorn --threads, 0 = sin límite; con el cupo lleno se responde 503 y el navegador
+    # consulta periódicamente) y segundos que dura cada stream antes de que
+    # el navegador se reconecte
+    NOTIFICACIONES_SSE_LATIDO = float(os.environ.get('NOTIFICACIONES_SSE_LATIDO', '15'))
+    NOTIFICACIONES_SSE_RESINCRONIZAR = float(os.environ.get('NOTIFICACIONES_SSE_RESINCRONIZAR', '300'))
+    NOTIFICACIONES_SSE_COLA = int(os.environ.get('NOTIFICACIONES_SSE_COLA', '100'))
+    NOTIFICACIONES_SSE_MAXIMO = int(os.environ.get('NOTIFICACIONES_SSE_MAXIMO', '8'))
+    NOTIFICACIONES_SSE_DURACION = float(os.environ.get('NOTIFICACIONES_SSE_DURACION', '600'))
+
+    # NLP del chatbot (spaCy): 'lazy' carga el modelo en el primer mensaje,
+    # 'background' lo precarga en un hilo al arrancar y 'off' lo desactiva
+    NLP_MODO = os.environ.get('NLP_MODO', 'lazy').lower()
+    NLP_MODELO = os.environ.get('NLP_MODELO', 'es_core_news_sm')
+    # Componentes que no se cargan: el chatbot solo usa token.lemma_
+    NLP_EXCLUIR = [c.strip() for c in os.environ.get('NLP_EXCLUIR', 'parser,ner,senter').split(',') if c.strip()]
+    # Mensajes por lote en nlp.pipe (ráfagas de mensajes del webhook)
+    NLP_BATCH_SIZE = int(os.environ.get('NLP_BATCH_SIZE', '64'))
+    
     # WhatsApp Business API Configuration
     WHATSAPP_TOKEN = os.environ.get('WHATSAPP_TOKEN')
     WHATSAPP_VERIFY_TOKEN = os.environ.get('WHATSAPP_VERIFY_TOKEN')
     WHATSAPP_PHONE_NUMBER_ID = os.environ.get('WHATSAPP_PHONE_NUMBER_ID')
+    # URL base de la Graph API (se puede apuntar a benchmarks/fake_graph_api.py en pruebas de carga)
+    WHATSAPP_API_URL = os.environ.get('WHATSAPP_API_URL', 'https://graph.facebook.com/v17.0')
+    # Sesión HTTP compartida: timeouts (conexión, lectura) en segundos, tamaño del
+    # pool keep-alive y reintentos con backoff exponencial ante 429/5xx
+    WHATSAPP_TIMEOUT_CONEXION = float(os.environ.get('WHATSAPP_TIMEOUT_CONEXION', '3.05'))
+    WHATSAPP_TIMEOUT_LECTURA = float(os.environ.get('WHATSAPP_TIMEOUT_LECTURA', '10'))
+    WHATSAPP_POOL_SIZE = int(os.environ.get('WHATSAPP_POOL_SIZE', '10'))
+    WHATSAPP_MAX_REINTENTOS = int(os.environ.get('WHATSAPP_MAX_REINTENTOS', '3'))
+    WHATSAPP_BACKOFF_BASE = float(os.environ.get('WHATSAPP_BACKOFF_BASE', '0.5'))
+    WHATSAPP_ESPERA_MAXIMA = float(os.environ.get('WHATSAPP_ESPERA_MAXIMA', '30'))
+    # Envío masivo asíncrono (utils/envio_masivo.py): peticiones en vuelo, mensajes/s
+    # según el nivel del número en la Graph API y tamaño de los lotes de resultados
+    WHATSAPP_MASIVO_CONCURRENCIA = int(os.environ.get('WHATSAPP_MASIVO_CONCURRENCIA', '20'))
+    WHATSAPP_MASIVO_TASA = float(os.environ.get('WHATSAPP_MASIVO_TASA', '80'))
+    WHATSAPP_MASIVO_LOTE = int(os.environ.get('WHATSAPP_MASIVO_LOTE', '100'))
+    NOTIFICAR_ESTADO_MAX_TICKETS = int(os.environ.get('NOTIFICAR_ESTADO_MAX_TICKETS', '5000'))
+
+    # Webhook asíncrono: se responde 200 de inmediato y los mensajes se guardan en
+    # la tabla cola_webhook; WEBHOOK_WORKERS hilos los procesan (en orden por teléfono)
+    WEBHOOK_ASINCRONO = os.environ.get('WEBHOOK_ASINCRONO', 'true').lower() == 'true'
+    WEBHOOK_WORKERS = int(os.environ.get('WEBHOOK_WORKERS', '4'))
+    WEBHOOK_MAX_INTENTOS = int(os.environ.get('WEBHOOK_MAX_INTENTOS', '3'))
+    WEBHOOK_INTERVALO_SONDEO = float(os.environ.get('WEBHOOK_INTERVALO_SONDEO', '2'))
+
+    # Bandeja de salida: las respuestas del chatbot se guardan con el estado de la
+    # conversación y un hilo las envía por lotes, reintentando con backoff
+    # (false = enviar directo después de procesar, sin reintentos diferidos)
+    BANDEJA_SALIDA = os.environ.get('BANDEJA_SALIDA', 'true').lower() == 'true'
+    BANDEJA_INTERVALO_SONDEO = float(os.environ.get('BANDEJA_INTERVALO_SONDEO', '2'))
+    BANDEJA_LOTE = int(os.environ.get('BANDEJA_LOTE', '50'))
+    BANDEJA_MAX_INTENTOS = int(os.environ.get('BANDEJA_MAX_INTENTOS', '8'))
+    BANDEJA_BACKOFF_BASE = float(os.environ.get('BANDEJA_BACKOFF_BASE', '5'))
+    BANDEJA_BACKOFF_MAXIMO = float(os.environ.get('BANDEJA_BACKOFF_MAXIMO', '600'))
     
     # Estados de tickets definidos
     TICKET_STATES = [
@@ -1,5 +1,6 @@
 from app import create_app
 from models import db, Usuario, BaseConocimiento
+from utils.search import inicializar_indice_busqueda
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 
@@ -169,6 +170,9 @@ def init_database():
         
         # Guardar todos los cambios
         db.session.commit()
+        
+        # Índice de texto completo de la base de conocimiento
+        inicializar_indice_busqueda(db.engine)
         print("✅ Base de datos inicializada correctamente")
         print("📧 Usuario admin: admin@focusit.com")
         print("👨‍💻 Técnico: tecnico1@focusit.com (Juan Pérez)")
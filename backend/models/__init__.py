@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.ext.mutable import MutableDict
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -37,6 +38,16 @@ class Usuario(UserMixin, db.Model):
 
 class Ticket(db.Model):
     __tablename__ = 'tickets'
+    __table_args__ = (
+        # Índices compuestos para los filtros más usados (listas, dashboard, notificaciones)
+        db.Index('ix_tickets_usuario_fecha', 'usuario_id', 'fecha_creacion'),
+        db.Index('ix_tickets_tecnico_estado', 'tecnico_id', 'estado'),
+        # Incluye usuario_id para que los contadores del dashboard (utils/resumen_dashboard.py) se
+        # respondan solo con el índice; reemplaza a ix_tickets_estado_prioridad_tecnico
+        db.Index('ix_tickets_estado_prioridad_tecnico_usuario', 'estado', 'prioridad', 'tecnico_id', 'usuario_id'),
+        db.Index('ix_tickets_estado_fecha', 'estado', 'fecha_creacion'),
+        db.Index('ix_tickets_categoria_fecha', 'categoria', 'fecha_creacion'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
@@ -47,7 +58,8 @@ class Ticket(db.Model):
     descripcion = db.Column(db.Text, nullable=False)
     estado = db.Column(db.String(30), default='nuevo')
     prioridad = db.Column(db.String(20), default='media')
-    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    # NOT NULL: columna de la paginación por cursor (migrate_indices.py rellena las antiguas)
+    fecha_creacion = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     fecha_actualizacion = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     fecha_cierre = db.Column(db.DateTime, nullable=True)
     
@@ -97,6 +109,10 @@ class ComentarioTicket(db.Model):
 
 class BaseConocimiento(db.Model):
     __tablename__ = 'base_conocimiento'
+    __table_args__ = (
+        # Orden de listados y paginación por cursor (vistas, fecha_creacion, id)
+        db.Index('ix_base_conocimiento_activo_vistas_fecha', 'activo', 'vistas', 'fecha_creacion', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     titulo = db.Column(db.String(200), nullable=False)
@@ -105,8 +121,9 @@ class BaseConocimiento(db.Model):
     categoria = db.Column(db.String(50), nullable=True)
     subcategoria = db.Column(db.String(50), nullable=True)
     activo = db.Column(db.Boolean, default=True)
-    vistas = db.Column(db.Integer, default=0)
-    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    # NOT NULL: columnas de la paginación por cursor (migrate_indices.py rellena las antiguas)
+    vistas = db.Column(db.Integer, nullable=False, default=0)
+    fecha_creacion = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     fecha_actualizacion = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     autor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
     
@@ -116,10 +133,6 @@ class BaseConocimiento(db.Model):
     
     def __repr__(self):
         return f'<Artículo {self.titulo}>'
-    
-    def incrementar_vistas(self):
-        self.vistas += 1
-        db.session.commit()
 
 class PasoGuia(db.Model):
     __tablename__ = 'pasos_guia'
@@ -137,6 +150,13 @@ class PasoGuia(db.Model):
 
 
 class HistorialChat(db.Model):
+    """Transcripción del chatbot (se escribe por lotes, ver utils/transcripciones.py)"""
+    __tablename__ = 'historial_chat'
+    __table_args__ = (
+        # Exportar la transcripción de una sesión en orden
+        db.Index('ix_historial_chat_sesion_fecha', 'sesion_id', 'fecha'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     sesion_id = db.Column(db.Integer, db.ForeignKey('sesiones_chatbot.id'))
     emisor = db.Column(db.String(10)) # 'usuario' o 'bot'
@@ -145,12 +165,20 @@ class HistorialChat(db.Model):
 
 class SesionChatbot(db.Model):
     __tablename__ = 'sesiones_chatbot'
+    __table_args__ = (
+        # Sesión activa de un teléfono (cada mensaje del chatbot)
+        db.Index('ix_sesiones_chatbot_telefono_activa', 'usuario_telefono', 'activa'),
+        # Barrido de sesiones inactivas y archivado (utils/barrido_sesiones.py)
+        db.Index('ix_sesiones_chatbot_ultima_actividad', 'fecha_ultima_actividad'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     usuario_telefono = db.Column(db.String(20), nullable=False)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True)
     estado_conversacion = db.Column(db.String(50), default='inicio')
-    datos_temporales = db.Column(db.JSON, nullable=True)  # Para almacenar datos durante el flujo
+    # MutableDict: los cambios dentro del diccionario (sesion.datos_temporales['x'] = ...)
+    # también se guardan; con db.JSON solo se detectaba reasignar el atributo completo
+    datos_temporales = db.Column(MutableDict.as_mutable(db.JSON), nullable=True)  # Para almacenar datos durante el flujo
     fecha_inicio = db.Column(db.DateTime, default=datetime.utcnow)
     fecha_ultima_actividad = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     activa = db.Column(db.Boolean, default=True)
@@ -159,4 +187,101 @@ class SesionChatbot(db.Model):
         return f'<Sesión Chatbot {self.usuario_telefono}>'
 
 
+class SesionChatbotArchivada(db.Model):
+    """Sesión del chatbot archivada con su transcripción (ver utils/barrido_sesiones.py)"""
+    __tablename__ = 'sesiones_chatbot_archivo'
+    
+    # Mismo id que tenía en sesiones_chatbot (tickets.datos_adicionales.chatbot_session)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    usuario_telefono = db.Column(db.String(20), nullable=False, index=True)
+    usuario_id = db.Column(db.Integer, nullable=True)
+    estado_conversacion = db.Column(db.String(50))
+    datos_temporales = db.Column(db.JSON, nullable=True)
+    fecha_inicio = db.Column(db.DateTime)
+    fecha_ultima_actividad = db.Column(db.DateTime)
+    # Lista de {fecha, emisor, mensaje} en orden (lo que había en historial_chat)
+    historial = db.Column(db.JSON, nullable=False)
+    fecha_archivado = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SesionChatbotArchivada {self.id} {self.usuario_telefono}>'
+
+
+class EstadisticaTicket(db.Model):
+    """
+    Conteo de tickets por grupo y día de creación (ver utils/estadisticas_tickets.py)
+    Se actualiza en la misma transacción que crea o cambia cada ticket
+    """
+    __tablename__ = 'ticket_stats'
+    __table_args__ = (
+        db.UniqueConstraint('dia', 'estado', 'categoria', 'subcategoria', 'prioridad', 'tecnico_id',
+                            name='uq_ticket_stats_grupo'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False)  # Día de fecha_creacion del ticket
+    estado = db.Column(db.String(30), nullable=False)
+    categoria = db.Column(db.String(50), nullable=False)
+    subcategoria = db.Column(db.String(50), nullable=False, default='')  # '' = sin subcategoría
+    prioridad = db.Column(db.String(20), nullable=False)
+    tecnico_id = db.Column(db.Integer, nullable=False, default=0)  # 0 = sin técnico asignado
+    total = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<EstadisticaTicket {self.dia} {self.estado} {self.categoria}: {self.total}>'
+
+
+class MensajeWebhook(db.Model):
+    """Cola persistente de mensajes entrantes de WhatsApp (ver utils/cola_webhook.py)"""
+    __tablename__ = 'cola_webhook'
+    __table_args__ = (
+        # El despachador busca los pendientes en orden de llegada
+        db.Index('ix_cola_webhook_estado_id', 'estado', 'id'),
+        # Orden por teléfono: un mensaje espera a los anteriores de su conversación
+        db.Index('ix_cola_webhook_telefono_id', 'telefono', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Id del mensaje en WhatsApp (wamid): Meta reintenta los webhooks y así no se procesan dos veces
+    mensaje_id = db.Column(db.String(128), unique=True, nullable=True)
+    telefono = db.Column(db.String(20), nullable=False)
+    texto = db.Column(db.Text, nullable=False)
+    estado = db.Column(db.String(20), default='pendiente', nullable=False)  # pendiente, procesando, procesado, error
+    intentos = db.Column(db.Integer, default=0, nullable=False)
+    error = db.Column(db.Text, nullable=True)
+    fecha_recibido = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_reclamado = db.Column(db.DateTime, nullable=True)  # Cuándo lo tomó un worker
+    fecha_procesado = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<MensajeWebhook {self.id} {self.telefono} {self.estado}>'
+
+
+class MensajeSaliente(db.Model):
+    """Bandeja de salida de respuestas del chatbot a WhatsApp (ver utils/bandeja_salida.py)"""
+    __tablename__ = 'bandeja_salida'
+    __table_args__ = (
+        # El despachador busca los pendientes cuyo próximo intento ya venció
+        db.Index('ix_bandeja_salida_estado_proximo', 'estado', 'proximo_intento'),
+        # Orden de entrega por teléfono (el más antiguo sin enviar va primero)
+        db.Index('ix_bandeja_salida_telefono_id', 'telefono', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    telefono = db.Column(db.String(20), nullable=False)
+    respuesta = db.Column(db.JSON, nullable=False)  # Respuesta del bot: mensaje, opciones, tipo
+    estado = db.Column(db.String(20), default='pendiente', nullable=False)  # pendiente, enviando, enviado, error
+    intentos = db.Column(db.Integer, default=0, nullable=False)
+    proximo_intento = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    codigo_respuesta = db.Column(db.Integer, nullable=True)  # Último código HTTP de la Graph API
+    wamid = db.Column(db.String(128), nullable=True)  # Id del mensaje en WhatsApp una vez aceptado
+    error = db.Column(db.Text, nullable=True)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_reclamado = db.Column(db.DateTime, nullable=True)
+    fecha_enviado = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<MensajeSaliente {self.id} {self.telefono} {self.estado}>'
+
+
         
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
 from models import db, Usuario
 from utils.security import generate_magic_token, verify_magic_token
+from utils.cache_sesiones import invalidar_sesion
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -123,6 +124,9 @@ def register():
         
         db.session.add(nuevo_usuario)
         db.session.commit()
+        if telefono:
+            # El chatbot pudo haber guardado en caché este teléfono sin usuario
+            invalidar_sesion(telefono)
         
         flash('Usuario registrado correctamente. Ya puedes iniciar sesión.', 'success')
         return redirect(url_for('auth.login'))
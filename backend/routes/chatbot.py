@@ -3,173 +3,77 @@ from flask_login import login_required, current_user
 from models import db, SesionChatbot, Usuario, Ticket, BaseConocimiento
 from config import Config
 import json
-import re
-from sqlalchemy import or_
-import spacy # <-- PASO 4: IMPORTAR SPACY
-
-# --- INICIO PASO 4: Cargar modelo de NLP ---
-# Carga el modelo de español de spaCy una vez al iniciar.
-try:
-    nlp = spacy.load("es_core_news_sm")
-except IOError:
-    print("="*50)
-    print("ERROR: Modelo 'es_core_news_sm' de spaCy no encontrado.")
-    print("Por favor, ejecuta:")
-    print("python -m spacy download es_core_news_sm")
-    print("="*50)
-    nlp = None
-# --- FIN PASO 4 ---
+from types import MappingProxyType
+from utils.contador_vistas import registrar_vista
+from utils.search import articulos_para_descripcion
+from utils.whatsapp_client import WhatsAppClient, extraer_mensajes
+from utils.cola_webhook import obtener_cola
+from utils.bandeja_salida import obtener_bandeja, agregar_respuesta
+from utils.transcripciones import registrar_transcripcion
+from utils.cache_sesiones import obtener_cache_sesiones, UsuarioChat
+from utils.bloqueos import bloqueos_conversacion, bloquear_en_bd
+from utils.eventos import registrar_evento, ticket_creado
+from utils.flujo_chatbot import (
+    compilar_flujo, copiar_respuesta, PALABRAS_REINICIO, PALABRAS_CANCELAR, SIN_ARTICULOS
+)
+# Intención y entidades con spaCy (cargado bajo demanda, ver utils/nlp.py)
+from utils.intenciones import entender_mensaje_nlp, entender_mensajes_nlp
 
 
 chatbot_bp = Blueprint('chatbot', __name__)
 
-# --- INICIO PASO 4: Función de NLP ---
-def entender_mensaje_nlp(mensaje):
-    """
-    Intenta entender la intención y las entidades de un mensaje usando NLP simple.
-    """
-    if not nlp:
-        return None # spaCy no está cargado
-
-    doc = nlp(mensaje.lower())
-    
-    intencion = None
-    entidades = {}
-
-    # 1. Detectar Intención (simple)
-    palabras_problema = ['problema', 'error', 'no funciona', 'roto', 'atasco', 'lento', 'caído', 'falla']
-    if any(token.lemma_ in palabras_problema for token in doc):
-        intencion = 'reportar_problema'
-
-    # 2. Extraer Entidades (basado en tu config.py)
-    # En un sistema más avanzado, esto vendría de la Base de Datos
-    mapa_entidades = {
-        'computador_celular': ['computador', 'pc', 'laptop', 'celular', 'pantalla', 'teclado', 'ratón', 'monitor'],
-        'impresoras': ['impresora', 'imprimir', 'factura', 'atasco', 'tinta', 'toner'],
-        'software_optica': ['agilmed', 'software', 'aplicativo', 'citas', 'historia'],
-        'reset_password': ['contraseña', 'password', 'acceso', 'clave', 'sesión'],
-        'carpetas_compartidas': ['carpeta', 'red', 'servidor', 'archivos', 'compartido']
-    }
-
-    for token in doc:
-        lemma = token.lemma_ # Usamos el lema (ej: "impresoras" -> "impresora")
-        for subcategoria, keywords in mapa_entidades.items():
-            if lemma in keywords:
-                entidades['subcategoria'] = subcategoria
-                # Inferir la categoría principal desde la subcategoría
-                for cat, data in Config.MAIN_CATEGORIES.items():
-                    if subcategoria in data.get('subcategories', {}):
-                        entidades['categoria'] = cat
-                        break
-                break
-        if 'categoria' in entidades:
-            break # Encontramos lo que necesitábamos
-
-    if intencion and 'categoria' in entidades:
-        return {'intencion': intencion, 'entidades': entidades}
-    
-    return None
-# --- FIN PASO 4 ---
-
 
 class ChatbotFlowManager:
-    """Gestor del flujo de conversación del chatbot"""
+    """
+    Gestor del flujo de conversación del chatbot
+
+    Los menús, textos fijos y la tabla de estados vienen compilados de
+    utils/flujo_chatbot.py; aquí solo queda la lógica que depende de la
+    conversación o de la base de datos.
+    """
     
-    def __init__(self):
-        self.estados = {
-            'inicio': self.estado_inicio,
-            'seleccionar_tipo': self.estado_seleccionar_tipo,
-            'seleccionar_categoria': self.estado_seleccionar_categoria,
-            'buscar_solucion': self.estado_buscar_solucion,
-            'crear_ticket': self.estado_crear_ticket,
-            'recopilar_descripcion': self.estado_recopilar_descripcion,
-            'buscar_con_descripcion': self.estado_buscar_con_descripcion,
-            'confirmar_ticket': self.estado_confirmar_ticket,
-            'finalizado': self.estado_finalizado
-        }
+    def __init__(self, categorias=None):
+        self.flujo = compilar_flujo(Config.MAIN_CATEGORIES if categorias is None else categorias)
+        self.estados = MappingProxyType({
+            estado: getattr(self, metodo) for estado, metodo in self.flujo.estados.items()
+        })
     
     def procesar_mensaje(self, sesion, mensaje):
         """Procesa un mensaje y devuelve la respuesta del bot"""
-        estado_actual = sesion.estado_conversacion
-        
-        if estado_actual in self.estados:
-            return self.estados[estado_actual](sesion, mensaje)
-        else:
-            return self.estado_inicio(sesion, mensaje)
+        manejador = self.estados.get(sesion.estado_conversacion, self.estado_inicio)
+        return manejador(sesion, mensaje)
 
     def estado_inicio(self, sesion, mensaje):
         """Estado inicial del chatbot (con Propuesta 1)"""
-        nombre_usuario = sesion.datos_temporales.get('nombre_usuario', "")
-        sesion.datos_temporales = {'nombre_usuario': nombre_usuario}
-        
         nombre = sesion.datos_temporales.get('nombre_usuario', "")
-        saludo = f'¡Hola, {nombre}! Soy VisioBot' if nombre else '¡Hola! Soy VisioBot'
-        
+        sesion.datos_temporales = {'nombre_usuario': nombre}
         sesion.estado_conversacion = 'seleccionar_tipo'
         
-        return {
-            'mensaje': f'{saludo}, tu asistente de TI de FocusIT 🤖\n\n'
-                      'Estoy aquí para ayudarte. ¿Qué necesitas hoy?',
-            'opciones': [
-                {'texto': '🔧 Solucionar un problema', 'valor': 'problema'},
-                {'texto': '📝 Hacer una solicitud', 'valor': 'solicitud'},
-                {'texto': '❓ Consulta general', 'valor': 'consulta'},
-                {'texto': '🔍 Buscar en la base de conocimiento', 'valor': 'buscar'}
-            ],
-            'tipo': 'opciones'
-        }
+        if nombre:
+            texto = self.flujo.saludos['con_nombre'].format(nombre=nombre)
+        else:
+            texto = self.flujo.saludos['sin_nombre']
+        return {'mensaje': texto, 'opciones': self.flujo.menu_principal, 'tipo': 'opciones'}
     
     def estado_seleccionar_tipo(self, sesion, mensaje):
         """Usuario selecciona el tipo de ayuda que necesita"""
-        tipo_seleccionado = mensaje.lower().strip()
+        tipo = self.flujo.tipos.get(mensaje.lower().strip())
+        if tipo is None:
+            return copiar_respuesta(self.flujo.respuestas['menu_no_entendido'])
         
-        mapeo_tipos = {
-            'problema': 'problemas_tecnicos',
-            'solicitud': 'solicitudes_software',
-            'consulta': 'consultas_generales',
-            'buscar': 'buscar_conocimiento'
-        }
+        sesion.datos_temporales['tipo'] = tipo
+        if tipo == 'buscar_conocimiento':
+            sesion.estado_conversacion = 'buscar_solucion'
+            return copiar_respuesta(self.flujo.respuestas['pedir_busqueda'])
         
-        if tipo_seleccionado in mapeo_tipos:
-            sesion.datos_temporales['tipo'] = mapeo_tipos[tipo_seleccionado]
-
-            if tipo_seleccionado == 'buscar':
-                sesion.estado_conversacion = 'buscar_solucion'
-                return {
-                    'mensaje': 'Perfecto, ¿Qué te gustaría buscar en nuestra base de conocimiento?',
-                    'tipo': 'texto_libre'
-                }
-            
-            sesion.estado_conversacion = 'seleccionar_categoria'
-            categoria_info = Config.MAIN_CATEGORIES.get(mapeo_tipos[tipo_seleccionado], {})
-            
-            subcategorias = categoria_info.get('subcategories', {})
-            if not subcategorias:
-                sesion.datos_temporales['categoria'] = mapeo_tipos[tipo_seleccionado]
-                sesion.datos_temporales['subcategoria'] = 'general'
-                sesion.estado_conversacion = 'crear_ticket'
-                return self.estado_crear_ticket(sesion, 'si_crear') 
-
-            return {
-                'mensaje': f'Perfecto, me dices que necesitas ayuda con: **{categoria_info.get("name", "Ayuda general")}**\n\n'
-                          'Para ayudarte mejor, ¿podrías ser más específico?',
-                'opciones': [
-                    {'texto': subcat_name, 'valor': subcat_key}
-                    for subcat_key, subcat_name in subcategorias.items()
-                ],
-                'tipo': 'opciones'
-            }
-        else:
-            return {
-                'mensaje': 'No entendí tu selección. Por favor elige una de las opciones:',
-                'opciones': [
-                    {'texto': '🔧 Solucionar un problema', 'valor': 'problema'},
-                    {'texto': '📝 Hacer una solicitud', 'valor': 'solicitud'},
-                    {'texto': '❓ Consulta general', 'valor': 'consulta'},
-                    {'texto': '🔍 Buscar en la base de conocimiento', 'valor': 'buscar'}
-                ],
-                'tipo': 'opciones'
-            }
+        if not self.flujo.subcategorias.get(tipo):
+            sesion.datos_temporales['categoria'] = tipo
+            sesion.datos_temporales['subcategoria'] = 'general'
+            sesion.estado_conversacion = 'crear_ticket'
+            return self.estado_crear_ticket(sesion, 'si_crear')
+        
+        sesion.estado_conversacion = 'seleccionar_categoria'
+        return copiar_respuesta(self.flujo.categoria_elegida[tipo])
     
     def estado_seleccionar_categoria(self, sesion, mensaje):
         """Usuario selecciona la categoría específica"""
@@ -178,25 +82,16 @@ class ChatbotFlowManager:
         
         if not categoria:
             return self.estado_inicio(sesion, mensaje)
-            
-        categoria_info = Config.MAIN_CATEGORIES.get(categoria, {})
-        subcategorias_validas = categoria_info.get('subcategories', {})
         
+        subcategorias_validas = self.flujo.subcategorias.get(categoria, {})
         if subcategoria in subcategorias_validas:
             sesion.datos_temporales['categoria'] = categoria
             sesion.datos_temporales['subcategoria'] = subcategoria
             sesion.estado_conversacion = 'buscar_solucion'
             
             return self.buscar_articulos_relacionados(sesion, subcategorias_validas[subcategoria])
-        else:
-            return {
-                'mensaje': 'Por favor selecciona una de las opciones disponibles:',
-                'opciones': [
-                    {'texto': subcat_name, 'valor': subcat_key}
-                    for subcat_key, subcat_name in subcategorias_validas.items()
-                ],
-                'tipo': 'opciones'
-            }
+        
+        return copiar_respuesta(self.flujo.elegir_subcategoria.get(categoria, self.flujo.respuestas['elegir_subcategoria']))
     
     def buscar_articulos_relacionados(self, sesion, nombre_subcategoria):
         """Busca artículos relacionados con la categoría/subcategoría"""
@@ -209,37 +104,31 @@ class ChatbotFlowManager:
             activo=True
         ).order_by(BaseConocimiento.vistas.desc()).limit(3).all()
         
-        if articulos:
-            mensaje = f'Entiendo que necesitas ayuda con: **{nombre_subcategoria}**\n\n'
-            mensaje += '🔍 Encontré algunos artículos que podrían ayudarte:\n\n'
-            
-            opciones = []
-            for i, articulo in enumerate(articulos, 1):
-                mensaje += f'{i}. **{articulo.titulo}**\n'
-                mensaje += f'   _{articulo.contenido[:100]}..._\n\n'
-                opciones.append({'texto': f'📖 Ver artículo {i}', 'valor': f'ver_articulo_{articulo.id}'})
-            
-            mensaje += '¿Alguno de estos artículos resuelve tu problema?'
-            opciones.append({'texto': '❌ Ninguno me ayuda', 'valor': 'crear_ticket'})
-            opciones.append({'texto': '🔄 Buscar otra cosa', 'valor': 'reiniciar'})
-            
-            return {
-                'mensaje': mensaje,
-                'opciones': opciones,
-                'tipo': 'opciones'
-            }
-        else:
+        if not articulos:
             sesion.estado_conversacion = 'crear_ticket'
-            return {
-                'mensaje': f'Entiendo que necesitas ayuda con: **{nombre_subcategoria}**\n\n'
-                          'No encontré artículos específicos para este tema, pero puedo ayudarte creando un ticket para que un técnico te asista.\n\n'
-                          '¿Te parece bien que creemos un ticket de soporte?',
-                'opciones': [
-                    {'texto': '✅ Sí, crear ticket', 'valor': 'si_crear'},
-                    {'texto': '🔄 Buscar otra cosa', 'valor': 'reiniciar'}
-                ],
-                'tipo': 'opciones'
-            }
+            plantilla = self.flujo.sin_articulos.get(nombre_subcategoria)
+            if plantilla is None:
+                plantilla = {
+                    'mensaje': SIN_ARTICULOS.format(subcategoria=nombre_subcategoria),
+                    'opciones': self.flujo.opciones['crear_o_reiniciar'],
+                    'tipo': 'opciones'
+                }
+            return copiar_respuesta(plantilla)
+        
+        partes = [f'Entiendo que necesitas ayuda con: **{nombre_subcategoria}**\n\n'
+                  '🔍 Encontré algunos artículos que podrían ayudarte:\n\n']
+        opciones = []
+        for i, articulo in enumerate(articulos, 1):
+            partes.append(f'{i}. **{articulo.titulo}**\n   _{articulo.contenido[:100]}..._\n\n')
+            opciones.append({'texto': f'📖 Ver artículo {i}', 'valor': f'ver_articulo_{articulo.id}'})
+        partes.append('¿Alguno de estos artículos resuelve tu problema?')
+        opciones.extend(self.flujo.opciones['ninguno_me_ayuda'])
+        
+        return {
+            'mensaje': ''.join(partes),
+            'opciones': opciones,
+            'tipo': 'opciones'
+        }
     
     def estado_buscar_solucion(self, sesion, mensaje):
         """Maneja las respuestas cuando se muestran artículos"""
@@ -254,15 +143,11 @@ class ChatbotFlowManager:
             articulo = BaseConocimiento.query.get(articulo_id)
             
             if articulo:
-                articulo.incrementar_vistas()
+                registrar_vista(articulo.id)
                 return {
                     'mensaje': f'📖 **{articulo.titulo}**\n\n{articulo.contenido}\n\n'
                               '¿Te ayudó esta información?',
-                    'opciones': [
-                        {'texto': '✅ Sí, problema resuelto', 'valor': 'resuelto'},
-                        {'texto': '❌ No, necesito más ayuda', 'valor': 'crear_ticket'},
-                        {'texto': '🔄 Buscar otra cosa', 'valor': 'reiniciar'}
-                    ],
+                    'opciones': self.flujo.opciones['articulo_leido'],
                     'tipo': 'opciones'
                 }
         
@@ -279,113 +164,58 @@ class ChatbotFlowManager:
         
         elif mensaje == 'resuelto':
             sesion.estado_conversacion = 'finalizado'
-            return {
-                'mensaje': '¡Excelente! Me alegra haber podido ayudarte 😊\n\n'
-                          'Si necesitas ayuda en el futuro, no dudes en contactarme.\n\n'
-                          '¡Que tengas un buen día!',
-                'tipo': 'final'
-            }
+            return copiar_respuesta(self.flujo.respuestas['resuelto'])
         
-        return {
-            'mensaje': 'No entendí tu respuesta. Por favor selecciona una de las opciones.',
-            'tipo': 'error'
-        }
+        return copiar_respuesta(self.flujo.respuestas['no_entendido'])
     
     def estado_crear_ticket(self, sesion, mensaje):
         """Inicia el proceso de creación de ticket"""
         if mensaje == 'si_crear':
             sesion.estado_conversacion = 'recopilar_descripcion'
-            
-            categoria = sesion.datos_temporales.get('categoria', '')
-            subcategoria = sesion.datos_temporales.get('subcategoria', '')
-            
-            categoria_info = Config.MAIN_CATEGORIES.get(categoria, {})
-            subcategoria_nombre = categoria_info.get('subcategories', {}).get(subcategoria, "problema")
-            
-            return {
-                'mensaje': f'Perfecto, voy a crear un ticket de soporte para: **{subcategoria_nombre}**\n\n'
-                          'Para que el técnico pueda ayudarte mejor, por favor describe tu problema con el mayor detalle posible:\n\n'
-                          '• ¿Qué estabas haciendo cuando ocurrió?\n'
-                          '• ¿Qué mensaje de error aparece (si hay alguno)?\n'
-                          '• ¿Desde cuándo ocurre este problema?\n\n'
-                          'Escribe tu descripción completa:',
-                'tipo': 'texto_libre'
-            }
+            clave = (sesion.datos_temporales.get('categoria', ''), sesion.datos_temporales.get('subcategoria', ''))
+            return copiar_respuesta(self.flujo.pedir_descripcion.get(clave, self.flujo.respuestas['pedir_descripcion']))
         
         elif mensaje == 'reiniciar':
-             return self.estado_inicio(sesion, '')
-        else:
-            return {
-                'mensaje': 'No entendí tu respuesta. ¿Creamos un ticket de soporte?',
-                'opciones': [
-                    {'texto': '✅ Sí, crear ticket', 'valor': 'si_crear'},
-                    {'texto': '🔄 Buscar otra cosa', 'valor': 'reiniciar'}
-                ],
-                'tipo': 'opciones'
-            }
+            return self.estado_inicio(sesion, '')
+        
+        return copiar_respuesta(self.flujo.respuestas['crear_no_entendido'])
     
     def estado_recopilar_descripcion(self, sesion, mensaje):
         """Recopila la descripción detallada del problema"""
         if len(mensaje.strip()) < 10:
-            return {
-                'mensaje': 'Por favor proporciona una descripción más detallada (mínimo 10 caracteres). '
-                          'Esto ayudará al técnico a entender mejor tu problema.',
-                'tipo': 'texto_libre'
-            }
+            return copiar_respuesta(self.flujo.respuestas['descripcion_corta'])
         
         sesion.datos_temporales['descripcion'] = mensaje.strip()
         sesion.estado_conversacion = 'buscar_con_descripcion'
         
-        categoria = sesion.datos_temporales.get('categoria', '')
         subcategoria = sesion.datos_temporales.get('subcategoria', '')
-        
-        categoria_info = Config.MAIN_CATEGORIES.get(categoria, {})
-        subcategoria_nombre = categoria_info.get('subcategories', {}).get(subcategoria, subcategoria)
-        
-        titulo_sugerido = f"Problema con {subcategoria_nombre}"
-        sesion.datos_temporales['titulo'] = titulo_sugerido
+        subcategoria_nombre = self.flujo.subcategorias.get(
+            sesion.datos_temporales.get('categoria', ''), {}
+        ).get(subcategoria, subcategoria)
+        sesion.datos_temporales['titulo'] = f"Problema con {subcategoria_nombre}"
         
         return self.estado_buscar_con_descripcion(sesion, "")
 
     def estado_buscar_con_descripcion(self, sesion, mensaje):
         """Busca artículos usando la descripción del usuario"""
         descripcion = sesion.datos_temporales.get('descripcion', '')
-        palabras_clave = [p for p in re.split(r'\s+|,|\.', descripcion) if len(p) > 3]
-
-        articulos = []
-        if palabras_clave:
-            query_filters = [
-                or_(
-                    BaseConocimiento.titulo.contains(palabra),
-                    BaseConocimiento.contenido.contains(palabra),
-                    BaseConocimiento.palabras_clave.contains(palabra)
-                ) for palabra in palabras_clave
-            ]
-            
-            articulos = BaseConocimiento.query.filter(
-                BaseConocimiento.activo == True
-            ).filter(
-                or_(*query_filters)
-            ).order_by(BaseConocimiento.vistas.desc()).limit(2).all()
-        
+        articulos = articulos_para_descripcion(descripcion, limite=2)
+
         if articulos:
-            mensaje_respuesta = "¡Un momento! 🔍\n\nBasado en tu descripción, encontré estos artículos que podrían ayudarte:\n\n"
-            
+            partes = ['¡Un momento! 🔍\n\nBasado en tu descripción, encontré estos artículos que podrían ayudarte:\n\n']
             opciones_respuesta = []
             for i, articulo in enumerate(articulos, 1):
-                mensaje_respuesta += f'{i}. **{articulo.titulo}**\n'
-                mensaje_respuesta += f'   _{articulo.contenido[:100]}..._\n\n'
+                partes.append(f'{i}. **{articulo.titulo}**\n   _{articulo.contenido[:100]}..._\n\n')
                 opciones_respuesta.append(
                     {'texto': f'📖 Ver Artículo {i}', 'valor': f'ver_articulo_{articulo.id}'}
                 )
-            
-            mensaje_respuesta += '¿Quieres revisarlos o prefieres crear el ticket directamente?'
-            opciones_respuesta.append({'texto': '❌ No, crear el ticket', 'valor': 'crear_ticket_directo'})
+            partes.append('¿Quieres revisarlos o prefieres crear el ticket directamente?')
+            opciones_respuesta.extend(self.flujo.opciones['crear_directo'])
             
             sesion.estado_conversacion = 'buscar_solucion'
             
             return {
-                'mensaje': mensaje_respuesta,
+                'mensaje': ''.join(partes),
                 'opciones': opciones_respuesta,
                 'tipo': 'opciones'
             }
@@ -408,9 +238,8 @@ class ChatbotFlowManager:
                 titulo_sugerido = f"Consulta: {descripcion[:30]}..."
                 sesion.datos_temporales['titulo'] = titulo_sugerido
             else:
-                categoria_info = Config.MAIN_CATEGORIES.get(categoria, {})
-                categoria_nombre = categoria_info.get("name", categoria)
-                subcategoria_nombre = categoria_info.get('subcategories', {}).get(subcategoria, subcategoria)
+                categoria_nombre = self.flujo.categorias.get(categoria, categoria)
+                subcategoria_nombre = self.flujo.subcategorias.get(categoria, {}).get(subcategoria, subcategoria)
 
             return {
                 'mensaje': f'Perfecto, aquí está el resumen de tu ticket:\n\n'
@@ -419,11 +248,7 @@ class ChatbotFlowManager:
                           f'**Título:** {titulo_sugerido}\n'
                           f'**Descripción:** {descripcion[:100]}{"..." if len(descripcion) > 100 else ""}\n\n'
                           '¿Confirmas que quieres crear este ticket?',
-                'opciones': [
-                    {'texto': '✅ Sí, crear ticket', 'valor': 'confirmar'},
-                    {'texto': '✏️ Modificar descripción', 'valor': 'modificar'},
-                    {'texto': '❌ Cancelar', 'valor': 'cancelar'}
-                ],
+                'opciones': self.flujo.opciones['confirmar_ticket'],
                 'tipo': 'opciones'
             }
         
@@ -434,12 +259,7 @@ class ChatbotFlowManager:
             ).first()
             
             if not usuario:
-                return {
-                    'mensaje': 'Para crear el ticket necesito que te registres en nuestro sistema.\n\n'
-                              'Por favor visita: [Portal FocusIT] y regístrate con este número de teléfono.\n\n'
-                              'Una vez registrado, podrás crear tickets desde aquí.',
-                    'tipo': 'final'
-                }
+                return copiar_respuesta(self.flujo.respuestas['registro_requerido'])
             
             categoria = sesion.datos_temporales.get('categoria', 'consultas_generales')
             subcategoria = sesion.datos_temporales.get('subcategoria', 'soporte_general')
@@ -457,7 +277,10 @@ class ChatbotFlowManager:
             )
             
             db.session.add(nuevo_ticket)
-            db.session.commit()
+            # flush y no commit: el ticket se confirma junto con el estado de la
+            # sesión y la respuesta (ver procesar_mensaje_whatsapp)
+            db.session.flush()
+            registrar_evento(ticket_creado(nuevo_ticket, 'chatbot', usuario.nombre))
             
             sesion.estado_conversacion = 'finalizado'
             
@@ -473,18 +296,11 @@ class ChatbotFlowManager:
         
         elif mensaje == 'modificar':
             sesion.estado_conversacion = 'recopilar_descripcion'
-            return {
-                'mensaje': 'Perfecto, escribe nuevamente la descripción de tu problema:',
-                'tipo': 'texto_libre'
-            }
+            return copiar_respuesta(self.flujo.respuestas['modificar_descripcion'])
         
         else:  # cancelar (o cualquier otra cosa no reconocida)
             sesion.estado_conversacion = 'finalizado'
-            return {
-                'mensaje': 'Ticket cancelado. Si necesitas ayuda en el futuro, no dudes en contactarme.\n\n'
-                          '¡Que tengas un buen día!',
-                'tipo': 'final'
-            }
+            return copiar_respuesta(self.flujo.respuestas['ticket_cancelado'])
     
     def estado_finalizado(self, sesion, mensaje):
         """Estado final - reiniciar conversación"""
@@ -503,46 +319,161 @@ def webhook():
         return 'Token de verificación inválido', 403
     
     elif request.method == 'POST':
-        data = request.get_json()
+        return recibir_webhook(request.get_json(silent=True))
+
+
+def recibir_webhook(data):
+    """
+    Atiende un POST del webhook de WhatsApp
+
+    En modo asíncrono (Config.WEBHOOK_ASINCRONO) solo guarda los mensajes en
+    la cola y responde 200 de inmediato; si no, los procesa en la petición.
+    """
+    cola = obtener_cola()
+    if cola is None:
+        procesar_webhook(data)
+        return 'OK', 200
+
+    try:
+        cola.encolar(data)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error encolando webhook: {e}")
+        # Sin 200, Meta reintenta la entrega más tarde
+        return 'Error', 500
+    return 'OK', 200
+
+
+def procesar_webhook(data):
+    """
+    Procesa todos los mensajes de un payload del webhook (todas las entradas,
+    cambios y mensajes) y envía las respuestas por WhatsApp
+
+    Returns:
+        int: Número de mensajes procesados sin error
+    """
+    try:
+        mensajes = extraer_mensajes(data)
+    except Exception as e:
+        print(f"Error procesando webhook: {e}")
+        return 0
+
+    errores = responder_mensajes([(m.telefono, m.texto) for m in mensajes])
+    return sum(1 for error in errores if error is None)
+
+
+def responder_mensajes(mensajes):
+    """
+    Procesa una lista de mensajes (telefono, texto) en orden y envía las respuestas
+
+    El NLP de todos los mensajes se calcula en lotes con nlp.pipe antes de
+    recorrerlos. Un mensaje que falla se revierte sin afectar a los demás.
+    Con la bandeja de salida activa las respuestas se guardan con el estado
+    de la conversación y las envía su despachador (con reintentos).
+
+    Returns:
+        list: None por cada mensaje procesado, o el texto del error
+    """
+    if not mensajes:
+        return []
+
+    analisis = entender_mensajes_nlp([texto for _, texto in mensajes])
+    bandeja = obtener_bandeja()
+
+    errores = []
+    for (telefono, texto), resultado_nlp in zip(mensajes, analisis):
         try:
-            entry = data['entry'][0]
-            changes = entry['changes'][0]
-            value = changes['value']
+            response = procesar_mensaje_whatsapp(
+                telefono, texto, resultado_nlp=resultado_nlp, responder=bandeja is not None
+            )
             
-            if 'messages' in value:
-                message = value['messages'][0]
-                from_number = message['from']
-                message_text = message['text']['body']
-                response = procesar_mensaje_whatsapp(from_number, message_text)
-                
-                # Enviar respuesta usando WhatsApp Business API
-                WhatsAppClient.enviar_mensaje(from_number, response)
-                
+            if bandeja is None:
+                # Sin bandeja de salida: envío directo (si falla, la respuesta se pierde)
+                WhatsAppClient.enviar_mensaje(telefono, response)
+            errores.append(None)
         except Exception as e:
-            print(f"Error procesando webhook: {e}")
-        return 'OK', 200
+            db.session.rollback()
+            print(f"Error procesando mensaje de {telefono}: {e}")
+            errores.append(str(e))
+
+    if bandeja is not None:
+        bandeja.avisar()
+    return errores
+
+
+# Valor por defecto de resultado_nlp: el análisis aún no se ha hecho
+_SIN_ANALIZAR = object()
 
 
 # --- INICIO PASO 4: Refactorización de procesar_mensaje_whatsapp ---
-def procesar_mensaje_whatsapp(telefono, mensaje):
-    """Procesa un mensaje de WhatsApp y devuelve la respuesta"""
-    print(f"Debug - procesar_mensaje_whatsapp - Teléfono: {telefono}, Mensaje: '{mensaje}'")
+def procesar_mensaje_whatsapp(telefono, mensaje, resultado_nlp=_SIN_ANALIZAR, responder=False):
+    """
+    Procesa un mensaje de WhatsApp y devuelve la respuesta
+    
+    resultado_nlp permite pasar el análisis ya calculado en lote
+    (ver procesar_webhook); si no se pasa se calcula aquí.
     
-    usuario = Usuario.query.filter_by(telefono=telefono, activo=True).first()
-    sesion = SesionChatbot.query.filter_by(
-        usuario_telefono=telefono,
-        activa=True
-    ).first()
+    Con responder=True la respuesta se agrega a la bandeja de salida en la
+    misma transacción que el nuevo estado de la conversación.
+    
+    Los mensajes de un mismo teléfono se procesan de a uno (webhook, API y
+    pruebas web comparten el bloqueo); teléfonos distintos van en paralelo.
+    Entre procesos el bloqueo lo da la base de datos (PostgreSQL).
+    """
+    with bloqueos_conversacion.bloquear(telefono):
+        # Cerrar la transacción actual: la sesión del chatbot se lee con lo
+        # último que confirmó otro hilo o proceso para este teléfono
+        db.session.commit()
+        # Hasta el commit del final: otro proceso con el mismo teléfono espera aquí
+        bloquear_en_bd(telefono)
+        cache = obtener_cache_sesiones()
+        en_cache = cache.obtener(telefono) if cache is not None else None
+        if en_cache is not None:
+            # Sesión servida desde la caché: no está en db.session, sus
+            # cambios se escriben después por lotes (escritura diferida)
+            usuario, sesion_inicial = en_cache
+        else:
+            usuario = Usuario.query.filter_by(telefono=telefono, activo=True).first()
+            sesion_inicial = SesionChatbot.query.filter_by(
+                usuario_telefono=telefono,
+                activa=True
+            ).first()
+
+        sesion, respuesta = _procesar_mensaje_whatsapp(telefono, mensaje, resultado_nlp, usuario, sesion_inicial)
+        if responder:
+            agregar_respuesta(telefono, respuesta)
+        # flush antes del commit: el id de una sesión nueva sin recargarla después
+        db.session.flush()
+        sesion_id = sesion.id
+        if cache is not None:
+            if en_cache is None and usuario is not None:
+                usuario = UsuarioChat(usuario.id, usuario.nombre)
+            cache.guardar(telefono, usuario, [sesion_inicial, sesion])
+        db.session.commit()
+        # La transcripción se escribe por lotes, fuera de esta transacción
+        registrar_transcripcion(sesion_id, mensaje, respuesta)
+        return respuesta
+
+
+def _procesar_mensaje_whatsapp(telefono, mensaje, resultado_nlp, usuario, sesion):
+    """
+    Aplica el mensaje a la sesión (sin confirmar) y devuelve (sesion, respuesta)
+
+    usuario y sesion son los ya cargados para el teléfono (None si no hay);
+    pueden venir de la base de datos o de la caché de sesiones.
+    """
+    print(f"Debug - procesar_mensaje_whatsapp - Teléfono: {telefono}, Mensaje: '{mensaje}'")
     
     mensaje_limpio = mensaje.lower().strip()
 
     # --- Lógica de Sesión y Globales (Propuesta 3) ---
 
     # 1. Manejar reinicios de sesión
-    if mensaje_limpio in ['hola', 'hello', 'hi', 'reiniciar', 'menú', 'menu', 'inicio']:
+    if mensaje_limpio in PALABRAS_REINICIO:
         if sesion:
             sesion.activa = False
-            db.session.commit()
+            # Sin efecto si la sesión vino de la caché (se escribe después)
+            db.session.flush()
             print("Debug - Sesión existente desactivada por saludo o reinicio.")
         
         sesion = SesionChatbot(
@@ -578,26 +509,22 @@ def procesar_mensaje_whatsapp(telefono, mensaje):
         sesion.usuario_id = usuario.id
 
     # 4. Filtro de Intenciones Globales (Propuesta 3)
-    if mensaje_limpio in ['cancelar', 'salir', 'adiós', 'chao', 'cancel']:
+    if mensaje_limpio in PALABRAS_CANCELAR:
         sesion.activa = False
         sesion.estado_conversacion = 'finalizado'
-        db.session.commit()
-        return {
-            'mensaje': 'Entendido. He cancelado el proceso. Si necesitas algo más, solo di "hola". ¡Que tengas un buen día!',
-            'tipo': 'final'
-        }
+        return sesion, copiar_respuesta(flow_manager.flujo.respuestas['conversacion_cancelada'])
     
     # 5. Si fue un reinicio o "hola", llamar a 'estado_inicio'
-    if mensaje_limpio in ['hola', 'hello', 'hi', 'reiniciar', 'menú', 'menu', 'inicio']:
-        respuesta = flow_manager.estado_inicio(sesion, mensaje)
-        db.session.commit()
-        print(f"Debug - Respuesta generada (Inicio): {respuesta}")
-        return respuesta
+    if mensaje_limpio in PALABRAS_REINICIO:
+        respuesta_bot = flow_manager.estado_inicio(sesion, mensaje)
+        print(f"Debug - Respuesta generada (Inicio): {respuesta_bot}")
+        return sesion, respuesta_bot
     
     # --- INICIO LÓGICA NLP (Propuesta 4) ---
     # Si estamos al inicio del flujo, intentar entender el mensaje.
-    if (sesion.estado_conversacion == 'inicio' or sesion.estado_conversacion == 'seleccionar_tipo') and nlp:
-        resultado_nlp = entender_mensaje_nlp(mensaje)
+    if sesion.estado_conversacion == 'inicio' or sesion.estado_conversacion == 'seleccionar_tipo':
+        if resultado_nlp is _SIN_ANALIZAR:
+            resultado_nlp = entender_mensaje_nlp(mensaje)
         
         if resultado_nlp and resultado_nlp['intencion'] == 'reportar_problema':
             print(f"Debug - NLP detectó: {resultado_nlp}")
@@ -617,19 +544,16 @@ def procesar_mensaje_whatsapp(telefono, mensaje):
 
             # Saltamos directo a la búsqueda de artículos
             respuesta = flow_manager.estado_buscar_con_descripcion(sesion, mensaje)
-            db.session.commit()
             print(f"Debug - Respuesta generada (NLP Bypass): {respuesta}")
-            return respuesta
+            return sesion, respuesta
     # --- FIN LÓGICA NLP ---
 
     # Si NLP no detectó nada, o no estábamos al inicio,
     # continuar con la máquina de estados normal.
     respuesta = flow_manager.procesar_mensaje(sesion, mensaje)
     
-    db.session.commit()
-    
     print(f"Debug - Respuesta generada (Flujo): {respuesta}")
-    return respuesta
+    return sesion, respuesta
 # --- FIN Refactorización ---
 
 
@@ -3,6 +3,10 @@ from flask_login import login_required, current_user
 from sqlalchemy import desc, or_
 from models import db, BaseConocimiento, PasoGuia
 from config import Config
+from utils.search import buscar_articulos
+from utils.autocompletado import autocompletar
+from utils.contador_vistas import registrar_vista, vistas_actuales
+from utils.eventos import registrar_evento, articulo_cambiado
 
 knowledge_bp = Blueprint('knowledge', __name__)
 
@@ -21,18 +25,12 @@ def index():
     
     # Aplicar filtros
     if query:
-        articulos_query = articulos_query.filter(
-            or_(
-                BaseConocimiento.titulo.contains(query),
-                BaseConocimiento.contenido.contains(query),
-                BaseConocimiento.palabras_clave.contains(query)
-            )
-        )
+        articulos_query = buscar_articulos(articulos_query, query)
     
     if categoria_filtro:
         articulos_query = articulos_query.filter_by(categoria=categoria_filtro)
     
-    # Ordenar por relevancia (vistas) y fecha
+    # Ordenar por relevancia de la búsqueda (si hay), vistas y fecha
     articulos = articulos_query.order_by(
         desc(BaseConocimiento.vistas),
         desc(BaseConocimiento.fecha_creacion)
@@ -58,8 +56,8 @@ def articulo(id):
         flash('Este artículo no está disponible', 'error')
         return redirect(url_for('knowledge.index'))
     
-    # Incrementar contador de vistas
-    articulo.incrementar_vistas()
+    # Registrar la vista (se escribe por lotes, la lectura no hace commit)
+    registrar_vista(articulo.id)
     
     # Artículos relacionados (misma categoría/subcategoría)
     articulos_relacionados = BaseConocimiento.query.filter(
@@ -74,6 +72,7 @@ def articulo(id):
     
     return render_template('knowledge/articulo.html',
                          articulo=articulo,
+                         vistas=vistas_actuales(articulo),
                          articulos_relacionados=articulos_relacionados)
 
 @knowledge_bp.route('/crear', methods=['GET', 'POST'])
@@ -128,6 +127,7 @@ def crear():
                 )
                 db.session.add(nuevo_paso)
         
+        registrar_evento(articulo_cambiado(nuevo_articulo))
         db.session.commit()
         
         flash('Artículo creado exitosamente', 'success')
@@ -159,6 +159,7 @@ def editar(id):
             flash('Por favor completa todos los campos obligatorios', 'error')
             return render_template('knowledge/editar.html', articulo=articulo)
         
+        registrar_evento(articulo_cambiado(articulo))
         db.session.commit()
         flash('Artículo actualizado exitosamente', 'success')
         return redirect(url_for('knowledge.articulo', id=id))
@@ -177,6 +178,7 @@ def eliminar(id):
     
     # Marcar como inactivo en lugar de eliminar
     articulo.activo = False
+    registrar_evento(articulo_cambiado(articulo))
     db.session.commit()
     
     flash('Artículo eliminado exitosamente', 'success')
@@ -191,11 +193,8 @@ def buscar_sugerencias():
     if len(query) < 2:
         return jsonify([])
     
-    # Buscar títulos que coincidan
-    sugerencias = BaseConocimiento.query.filter(
-        BaseConocimiento.activo == True,
-        BaseConocimiento.titulo.contains(query)
-    ).order_by(desc(BaseConocimiento.vistas)).limit(5).all()
+    # Prefijos de palabras del título o palabras clave, más vistos primero
+    sugerencias = autocompletar(query, limite=5)
     
     return jsonify([{
         'titulo': art.titulo,
@@ -1,8 +1,12 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from sqlalchemy import desc, or_
+from sqlalchemy.orm import joinedload
 from models import db, Ticket, Usuario, ComentarioTicket, BaseConocimiento
 from config import Config
+from utils.search import sugerir_articulos
+from utils.estadisticas_tickets import totales_por_categoria
+from utils.eventos import registrar_evento, ticket_creado, ticket_estado_cambiado, comentario_agregado
 from datetime import datetime
 
 tickets_bp = Blueprint('tickets', __name__)
@@ -14,8 +18,8 @@ def lista():
     estado_filtro = request.args.get('estado', '')
     categoria_filtro = request.args.get('categoria', '')
     
-    # Construir query base
-    query = Ticket.query
+    # Construir query base (usuario y técnico se cargan en la misma consulta)
+    query = Ticket.query.options(joinedload(Ticket.usuario), joinedload(Ticket.tecnico))
     
     # Si no es técnico, solo ver sus propios tickets
     if not current_user.es_tecnico:
@@ -104,6 +108,8 @@ def crear():
     )
     
     db.session.add(nuevo_ticket)
+    db.session.flush()
+    registrar_evento(ticket_creado(nuevo_ticket, 'portal', current_user.nombre))
     db.session.commit()
     
     # Crear comentario inicial del sistema
@@ -122,15 +128,19 @@ def crear():
 @tickets_bp.route('/<int:id>')
 @login_required
 def detalle(id):
-    ticket = Ticket.query.get_or_404(id)
+    ticket = Ticket.query.options(
+        joinedload(Ticket.usuario), joinedload(Ticket.tecnico)
+    ).get_or_404(id)
     
     # Verificar permisos: solo el usuario creador o técnicos pueden ver el ticket
     if not current_user.es_tecnico and ticket.usuario_id != current_user.id:
         flash('No tienes permisos para ver este ticket', 'error')
         return redirect(url_for('tickets.lista'))
     
-    # Obtener comentarios del ticket
-    comentarios = ComentarioTicket.query.filter_by(
+    # Obtener comentarios del ticket con su autor
+    comentarios = ComentarioTicket.query.options(
+        joinedload(ComentarioTicket.autor)
+    ).filter_by(
         ticket_id=id
     ).order_by(ComentarioTicket.fecha_creacion).all()
     
@@ -177,6 +187,8 @@ def comentar(id):
     
     # Actualizar fecha de última modificación del ticket
     ticket.fecha_actualizacion = datetime.utcnow()
+    db.session.flush()
+    registrar_evento(comentario_agregado(comentario))
     db.session.commit()
     
     flash('Comentario agregado correctamente', 'success')
@@ -220,6 +232,7 @@ def actualizar_estado(id):
     )
     
     db.session.add(comentario_sistema)
+    registrar_evento(ticket_estado_cambiado(ticket))
     db.session.commit()
     
     flash(f'Estado del ticket actualizado a: {ticket.get_estado_display()}', 'success')
@@ -236,25 +249,9 @@ def buscar_articulos():
     if len(query) < 3:
         return jsonify([])
     
-    # Construir query de búsqueda
-    busqueda = BaseConocimiento.query.filter_by(activo=True)
-    
-    # Filtrar por categoría si se especifica
-    if categoria:
-        busqueda = busqueda.filter_by(categoria=categoria)
-    if subcategoria:
-        busqueda = busqueda.filter_by(subcategoria=subcategoria)
-    
-    # Buscar en título, contenido y palabras clave
-    busqueda = busqueda.filter(
-        or_(
-            BaseConocimiento.titulo.contains(query),
-            BaseConocimiento.contenido.contains(query),
-            BaseConocimiento.palabras_clave.contains(query)
-        )
-    ).order_by(desc(BaseConocimiento.vistas)).limit(5)
-    
-    articulos = busqueda.all()
+    # Buscar en título, contenido y palabras clave (ordenado por relevancia),
+    # filtrando por categoría/subcategoría si se especifican
+    articulos = sugerir_articulos(query, categoria, subcategoria, limite=5)
     
     return jsonify([{
         'id': art.id,
@@ -274,15 +271,5 @@ def estadisticas_categoria():
     if not categoria:
         return jsonify({'error': 'Categoría requerida'}), 400
     
-    # Contar tickets por subcategoría en esta categoría
-    stats = db.session.query(
-        Ticket.subcategoria,
-        db.func.count(Ticket.id).label('total'),
-        db.func.sum(db.case([(Ticket.estado.in_(['resuelto', 'cerrado']), 0)], else_=1)).label('abiertos')
-    ).filter_by(categoria=categoria).group_by(Ticket.subcategoria).all()
-    
-    return jsonify([{
-        'subcategoria': stat.subcategoria,
-        'total': stat.total,
-        'abiertos': stat.abiertos or 0
-    } for stat in stats])
+    # Tickets por subcategoría en esta categoría
+    return jsonify(totales_por_categoria(categoria))
@@ -12,7 +12,7 @@ class APIResponse:
     """Clase para manejar respuestas API consistentes"""
     
     @staticmethod
-    def success(data=None, message=None, meta=None):
+    def success(data=None, message=None, meta=None, status=200):
         """
         Respuesta exitosa
         
@@ -20,6 +20,7 @@ class APIResponse:
             data: Datos a devolver (dict, list, o None)
             message: Mensaje opcional para el usuario
             meta: Metadatos adicionales (paginación, timestamps, etc.)
+            status: Código HTTP (200, o 202 si el trabajo queda encolado)
         """
         response = {
             'success': True,
@@ -36,7 +37,7 @@ class APIResponse:
         if message:
             response['meta']['message'] = message
             
-        return jsonify(response), 200
+        return jsonify(response), status
     
     @staticmethod
     def error(code, message, status=400, details=None):
@@ -67,31 +68,39 @@ class APIResponse:
         return jsonify(response), status
     
     @staticmethod
-    def paginated(items, page, per_page, total, data_key='items'):
+    def paginated(items, page, per_page, total, data_key='items', has_next=None, next_cursor=None):
         """
         Respuesta con paginación
-        
+
         Args:
             items: Lista de items de la página actual
-            page: Número de página actual
+            page: Número de página actual (None en paginación por cursor)
             per_page: Items por página
-            total: Total de items
+            total: Total de items (None si no se calculó)
             data_key: Nombre de la clave para los items
+            has_next: Si hay más páginas (se calcula desde total si no se indica)
+            next_cursor: Cursor opaco de la siguiente página (paginación por cursor)
         """
-        total_pages = (total + per_page - 1) // per_page
-        
+        total_pages = (total + per_page - 1) // per_page if total is not None else None
+
+        if has_next is None:
+            has_next = total_pages is not None and page is not None and page < total_pages
+
+        pagination = {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'total_pages': total_pages,
+            'has_next': has_next,
+            'has_prev': page is not None and page > 1
+        }
+
+        if page is None:
+            pagination['next_cursor'] = next_cursor
+
         return APIResponse.success(
             data={data_key: items},
-            meta={
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': total,
-                    'total_pages': total_pages,
-                    'has_next': page < total_pages,
-                    'has_prev': page > 1
-                }
-            }
+            meta={'pagination': pagination}
         )
 
 
@@ -123,6 +132,7 @@ class APIError:
     # Errores del servidor (500)
     INTERNAL_ERROR = 'INTERNAL_ERROR'
     DATABASE_ERROR = 'DATABASE_ERROR'
+    SERVICE_UNAVAILABLE = 'SERVICE_UNAVAILABLE'
 
 
 def api_login_required(f):
@@ -230,3 +240,13 @@ def serialize_list(models, fields=None, exclude=None):
         list: Lista de modelos serializados
     """
     return [serialize_model(model, fields, exclude) for model in models]
+
+
+def serialize_json_default(value):
+    """
+    Función default= de json.dumps para filas fuera de la API (caché de
+    sesiones en Redis, archivo JSONL del barrido): fechas en formato ISO
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'No serializable: {type(value).__name__}')
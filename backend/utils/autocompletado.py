@@ -0,0 +1,327 @@
+"""
+Autocompletado de la Base de Conocimiento
+Trie de prefijos sobre las palabras (sin tildes) de títulos y palabras clave.
+Cada nodo guarda los K artículos más vistos que contienen una palabra con ese
+prefijo, así una consulta recorre como máximo LARGO_MAXIMO_PREFIJO nodos y
+lee una lista de K elementos, sin importar el tamaño de la base.
+
+El trie se construye desde la BD en la primera consulta. Después, crear,
+editar o eliminar un artículo (evento ArticuloCambiado) lo actualiza sin
+reconstruirlo: se agregan o quitan sus palabras y solo se recalcula el top-K
+de los nodos de esos prefijos, a partir de los top-K de sus hijos. Lo mismo
+al escribir un lote del contador de vistas (evento VistasActualizadas): se
+recalculan los nodos de las palabras de los artículos cuyas vistas cambiaron.
+Tras cargas masivas con SQL se reconstruye con invalidar_autocompletado.
+
+Consultas de varias palabras: se parte de los top-K de los nodos de cada
+término y se filtran por todos los términos. El resultado es exacto si algún
+término tiene menos de K artículos; si todos tienen más, pueden faltar
+artículos que no están entre los K más vistos de ningún término.
+"""
+import sys
+import heapq
+import threading
+from collections import namedtuple
+from sqlalchemy import desc
+from models import db, BaseConocimiento
+from config import Config
+from utils.texto import tokenizar
+
+Sugerencia = namedtuple('Sugerencia', 'id titulo categoria vistas')
+
+# Prefijos más largos se resuelven filtrando las palabras del artículo
+LARGO_MAXIMO_PREFIJO = 20
+
+
+class _Nodo:
+    __slots__ = ('hijos', 'top', 'terminales')
+
+    def __init__(self):
+        self.hijos = {}
+        self.top = []
+        # Ids de los artículos con una palabra que termina (o se trunca) en este nodo
+        self.terminales = None
+
+
+def _orden(sugerencia):
+    return -sugerencia.vistas, sugerencia.id
+
+
+class TriePrefijos:
+    """Trie con top-K por vistas precalculado en cada nodo"""
+
+    def __init__(self, top_k=10):
+        self.top_k = top_k
+        self.construido = False
+        self._raiz = _Nodo()
+        self._palabras = {}      # id -> palabras del artículo (para consultas de varias palabras)
+        self._sugerencias = {}   # id -> Sugerencia (para recalcular los top-K)
+        self._nodos = 1
+
+    def construir(self, articulos):
+        """
+        Reconstruye el trie desde un iterable de artículos (o filas con id,
+        titulo, palabras_clave, categoria y vistas)
+        """
+        articulos = sorted(articulos, key=lambda a: (-(a.vistas or 0), a.id))
+        raiz, palabras_por_id, sugerencias, nodos = _Nodo(), {}, {}, 1
+
+        # Se insertan de más a menos vistos: cada nodo se llena en orden y al
+        # completar K ya no acepta más, sin necesidad de ordenar después
+        for articulo in articulos:
+            sugerencia = Sugerencia(articulo.id, articulo.titulo, articulo.categoria, articulo.vistas or 0)
+            # Tupla de palabras internadas: las repetidas entre artículos comparten memoria
+            palabras = tuple(set(map(sys.intern, tokenizar(articulo.titulo) + tokenizar(articulo.palabras_clave))))
+            palabras_por_id[articulo.id] = palabras
+            sugerencias[articulo.id] = sugerencia
+
+            for palabra in palabras:
+                nodo = raiz
+                for letra in palabra[:LARGO_MAXIMO_PREFIJO]:
+                    hijo = nodo.hijos.get(letra)
+                    if hijo is None:
+                        hijo = nodo.hijos[letra] = _Nodo()
+                        nodos += 1
+                    nodo = hijo
+                    # Varias palabras del mismo artículo comparten prefijos
+                    if len(nodo.top) < self.top_k and (not nodo.top or nodo.top[-1] is not sugerencia):
+                        nodo.top.append(sugerencia)
+                if nodo is not raiz:
+                    if nodo.terminales is None:
+                        nodo.terminales = set()
+                    nodo.terminales.add(articulo.id)
+
+        # Intercambio de referencias: las consultas en curso siguen usando el trie anterior
+        self._raiz, self._palabras, self._sugerencias, self._nodos = raiz, palabras_por_id, sugerencias, nodos
+        self.construido = True
+
+    def actualizar(self, articulo):
+        """
+        Agrega, reemplaza o quita (si está inactivo) un artículo sin reconstruir
+
+        Solo se recalculan los nodos de los prefijos de sus palabras anteriores
+        y nuevas, del más profundo a la raíz: cada uno toma los K mejores entre
+        los top-K de sus hijos y los artículos cuyas palabras terminan en él.
+        Las consultas en curso ven cada lista antes o después del cambio.
+        """
+        anteriores = self._palabras.get(articulo.id, ())
+        nuevas = ()
+        if articulo.activo:
+            nuevas = tuple(set(map(sys.intern, tokenizar(articulo.titulo) + tokenizar(articulo.palabras_clave))))
+
+        for palabra in anteriores:
+            nodo = self._buscar(palabra)
+            if nodo is not None and nodo.terminales:
+                nodo.terminales.discard(articulo.id)
+
+        if articulo.activo:
+            self._sugerencias[articulo.id] = Sugerencia(
+                articulo.id, articulo.titulo, articulo.categoria, articulo.vistas or 0
+            )
+            for palabra in nuevas:
+                nodo = self._raiz
+                for letra in palabra[:LARGO_MAXIMO_PREFIJO]:
+                    hijo = nodo.hijos.get(letra)
+                    if hijo is None:
+                        hijo = nodo.hijos[letra] = _Nodo()
+                        self._nodos += 1
+                    nodo = hijo
+                if nodo is not self._raiz:
+                    if nodo.terminales is None:
+                        nodo.terminales = set()
+                    nodo.terminales.add(articulo.id)
+            self._palabras[articulo.id] = nuevas
+        else:
+            self._sugerencias.pop(articulo.id, None)
+            self._palabras.pop(articulo.id, None)
+
+        prefijos = {palabra[:largo] for palabra in (*anteriores, *nuevas)
+                    for largo in range(1, min(len(palabra), LARGO_MAXIMO_PREFIJO) + 1)}
+        for prefijo in sorted(prefijos, key=len, reverse=True):
+            self._recalcular(prefijo)
+
+    def actualizar_vistas(self, vistas):
+        """Reordena los top-K por las vistas {id: vistas} de los artículos que cambiaron"""
+        prefijos = set()
+        for articulo_id, total in vistas.items():
+            sugerencia = self._sugerencias.get(articulo_id)
+            if sugerencia is None or sugerencia.vistas == total:
+                continue
+            self._sugerencias[articulo_id] = sugerencia._replace(vistas=total)
+            prefijos.update(palabra[:largo] for palabra in self._palabras[articulo_id]
+                            for largo in range(1, min(len(palabra), LARGO_MAXIMO_PREFIJO) + 1))
+        for prefijo in sorted(prefijos, key=len, reverse=True):
+            self._recalcular(prefijo)
+
+    def _buscar(self, prefijo):
+        nodo = self._raiz
+        for letra in prefijo[:LARGO_MAXIMO_PREFIJO]:
+            nodo = nodo.hijos.get(letra)
+            if nodo is None:
+                return None
+        return nodo
+
+    def _recalcular(self, prefijo):
+        """Top-K del nodo del prefijo desde sus hijos (ya recalculados); quita el nodo si quedó vacío"""
+        padre = self._buscar(prefijo[:-1])
+        nodo = padre.hijos.get(prefijo[-1]) if padre is not None else None
+        if nodo is None:
+            return
+        if not nodo.hijos and not nodo.terminales:
+            del padre.hijos[prefijo[-1]]
+            self._nodos -= 1
+            return
+
+        candidatos = {}
+        for articulo_id in nodo.terminales or ():
+            candidatos[articulo_id] = self._sugerencias[articulo_id]
+        for hijo in nodo.hijos.values():
+            for sugerencia in hijo.top:
+                actual = self._sugerencias.get(sugerencia.id)
+                if actual is not None:
+                    candidatos[actual.id] = actual
+        nodo.top = heapq.nsmallest(self.top_k, candidatos.values(), key=_orden)
+
+    def sugerir(self, texto, limite=5):
+        """
+        Artículos cuyo título o palabras clave tienen palabras que empiezan por
+        cada término de la consulta, ordenados por vistas
+
+        Returns:
+            list[Sugerencia]: Como máximo min(limite, top_k) elementos
+        """
+        consulta = tokenizar(texto)
+        if not consulta:
+            return []
+
+        raiz, palabras_por_id = self._raiz, self._palabras
+
+        nodos = []
+        for termino in consulta:
+            nodo = raiz
+            for letra in termino[:LARGO_MAXIMO_PREFIJO]:
+                nodo = nodo.hijos.get(letra)
+                if nodo is None:
+                    return []
+            nodos.append(nodo)
+
+        if len(consulta) == 1 and len(consulta[0]) <= LARGO_MAXIMO_PREFIJO:
+            return nodos[0].top[:limite]
+
+        # Un término con menos de K artículos tiene en su nodo todos sus
+        # candidatos; si no, se unen los top-K de todos los términos
+        completos = [nodo.top for nodo in nodos if len(nodo.top) < self.top_k]
+        if completos:
+            candidatos = min(completos, key=len)
+        else:
+            unicos = {sugerencia.id: sugerencia for nodo in nodos for sugerencia in nodo.top}
+            candidatos = sorted(unicos.values(), key=_orden)
+
+        resultado = []
+        for sugerencia in candidatos:
+            palabras = palabras_por_id.get(sugerencia.id, ())
+            if all(any(palabra.startswith(termino) for palabra in palabras) for termino in consulta):
+                resultado.append(sugerencia)
+                if len(resultado) == limite:
+                    break
+        return resultado
+
+    def estadisticas(self):
+        """
+        Tamaño del trie y memoria aproximada que ocupa (en bytes)
+
+        Recorre los nodos: quien lo llame no puede actualizar el trie a la vez
+        (estadisticas_autocompletado toma el lock del trie global).
+        """
+        raiz, palabras_por_id = self._raiz, self._palabras
+
+        bytes_nodos = 0
+        pendientes = [raiz]
+        while pendientes:
+            nodo = pendientes.pop()
+            bytes_nodos += sys.getsizeof(nodo) + sys.getsizeof(nodo.hijos) + sys.getsizeof(nodo.top)
+            if nodo.terminales is not None:
+                bytes_nodos += sys.getsizeof(nodo.terminales)
+            pendientes.extend(nodo.hijos.values())
+
+        distintas = set()
+        bytes_palabras = 0
+        for palabras in palabras_por_id.values():
+            bytes_palabras += sys.getsizeof(palabras)
+            distintas.update(palabras)
+        bytes_palabras += sum(sys.getsizeof(palabra) for palabra in distintas)
+
+        return {
+            'construido': self.construido,
+            'articulos': len(palabras_por_id),
+            'nodos': self._nodos,
+            'top_k': self.top_k,
+            'bytes_nodos': bytes_nodos,
+            'bytes_palabras': bytes_palabras,
+            'bytes_total': bytes_nodos + bytes_palabras,
+        }
+
+
+_trie = TriePrefijos(top_k=Config.AUTOCOMPLETE_TOP_K)
+_lock_trie = threading.Lock()
+_trie_invalido = True
+
+
+def obtener_trie():
+    """Devuelve el trie, reconstruyéndolo desde la BD si fue invalidado"""
+    global _trie_invalido
+    if _trie_invalido:
+        with _lock_trie:
+            if _trie_invalido:
+                # Se marca antes de leer: una escritura durante la construcción
+                # vuelve a invalidarlo y se recoge en la siguiente consulta
+                _trie_invalido = False
+                try:
+                    _trie.construir(
+                        db.session.query(
+                            BaseConocimiento.id,
+                            BaseConocimiento.titulo,
+                            BaseConocimiento.palabras_clave,
+                            BaseConocimiento.categoria,
+                            BaseConocimiento.vistas
+                        ).filter(BaseConocimiento.activo == True).order_by(
+                            desc(BaseConocimiento.vistas)
+                        ).all()
+                    )
+                except Exception:
+                    _trie_invalido = True
+                    raise
+    return _trie
+
+
+def invalidar_autocompletado():
+    """Marca el trie para reconstruirlo en la próxima consulta (p. ej. tras cargas masivas con SQL)"""
+    global _trie_invalido
+    _trie_invalido = True
+
+
+def actualizar_autocompletado(articulo):
+    """Lleva al trie un artículo creado, editado o desactivado, sin reconstruirlo"""
+    with _lock_trie:
+        # Si aún no se construyó (o se reconstruirá), la construcción ya lo incluye
+        if _trie.construido and not _trie_invalido:
+            _trie.actualizar(articulo)
+
+
+def actualizar_vistas_autocompletado(vistas):
+    """Lleva al trie las vistas {id: vistas} escritas por el contador de vistas"""
+    with _lock_trie:
+        if _trie.construido and not _trie_invalido:
+            _trie.actualizar_vistas(vistas)
+
+
+def estadisticas_autocompletado():
+    """Estadísticas del trie (construyéndolo si hace falta), sin actualizaciones en paralelo"""
+    trie = obtener_trie()
+    with _lock_trie:
+        return trie.estadisticas()
+
+
+def autocompletar(texto, limite=5):
+    """Sugerencias de títulos para el texto escrito por el usuario"""
+    return obtener_trie().sugerir(texto, limite=limite)
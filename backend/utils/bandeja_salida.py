@@ -0,0 +1,243 @@
+"""
+Bandeja de salida (outbox) de las respuestas del chatbot a WhatsApp
+La respuesta se guarda en la tabla bandeja_salida en la misma transacción
+que el cambio de estado de la conversación (ver procesar_mensaje_whatsapp):
+o se confirman las dos cosas o ninguna. Un hilo despachador la vacía por
+lotes con el envío asíncrono (utils/envio_masivo.py) y reintenta los
+fallos con backoff exponencial, así una caída de la Graph API no pierde
+respuestas ni frena el procesamiento de mensajes.
+
+La entrega es "al menos una vez": si el proceso se cae después de enviar y
+antes de marcar 'enviado', el mensaje se envía de nuevo al liberar su
+reclamo (TIMEOUT_RECLAMO).
+
+Cada lote lleva como mucho un mensaje por teléfono (el más antiguo sin
+enviar), así las respuestas de una conversación llegan en orden aunque el
+lote se envíe en paralelo.
+"""
+import asyncio
+import atexit
+import logging
+import random
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.orm import aliased
+from models import db, MensajeSaliente
+from utils.envio_masivo import EnviadorMasivo
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT_RECLAMO = timedelta(minutes=5)
+
+
+def agregar_respuesta(telefono, respuesta_bot):
+    """
+    Agrega la respuesta a la sesión de base de datos actual sin confirmar:
+    se guarda con el commit de quien llama (junto al estado del chatbot)
+    """
+    mensaje = MensajeSaliente(telefono=telefono, respuesta=respuesta_bot)
+    db.session.add(mensaje)
+    return mensaje
+
+
+class BandejaSalida:
+    """Despachador de la bandeja de salida con reintentos y backoff"""
+
+    def __init__(self, app, intervalo=2.0, lote=50, max_intentos=8, backoff_base=5.0, backoff_maximo=600.0):
+        """
+        Args:
+            app: Aplicación Flask (el hilo abre su propio app_context)
+            intervalo: Segundos entre sondeos de la tabla si nadie avisa
+            lote: Mensajes (teléfonos distintos) que se envían por ronda
+            max_intentos: Intentos antes de marcar un mensaje como 'error'
+            backoff_base: Segundos de espera tras el primer fallo (se duplica en cada intento)
+            backoff_maximo: Tope de la espera entre intentos
+        """
+        self.app = app
+        self.intervalo = intervalo
+        self.lote = lote
+        self.max_intentos = max_intentos
+        self.backoff_base = backoff_base
+        self.backoff_maximo = backoff_maximo
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def avisar(self):
+        """Despierta al despachador (llamar después del commit)"""
+        self._despertar.set()
+
+    def iniciar(self):
+        if self._hilo:
+            return
+        self._hilo = threading.Thread(target=self._despachar, name='bandeja-salida', daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout=10):
+        """Termina el lote en curso; lo no enviado queda en la tabla"""
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo:
+            self._hilo.join(timeout=timeout)
+        self._hilo = None
+
+    def _despachar(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            if self._detener.is_set():
+                break
+            with self.app.app_context():
+                try:
+                    self._liberar_vencidos()
+                    while not self._detener.is_set() and self.vaciar_lote():
+                        pass
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Error despachando la bandeja de salida')
+                finally:
+                    db.session.remove()
+
+    def _liberar_vencidos(self):
+        """Devuelve a 'pendiente' los mensajes de un despachador que murió a mitad"""
+        MensajeSaliente.query.filter(
+            MensajeSaliente.estado == 'enviando',
+            MensajeSaliente.fecha_reclamado < datetime.utcnow() - TIMEOUT_RECLAMO
+        ).update({MensajeSaliente.estado: 'pendiente'}, synchronize_session=False)
+        db.session.commit()
+
+    def _reclamar(self):
+        """Reclama el mensaje más antiguo sin enviar de cada teléfono, si ya le toca"""
+        ahora = datetime.utcnow()
+        anterior = aliased(MensajeSaliente)
+        hay_anterior = db.session.query(anterior.id).filter(
+            anterior.telefono == MensajeSaliente.telefono,
+            anterior.id < MensajeSaliente.id,
+            anterior.estado.in_(['pendiente', 'enviando'])
+        ).exists()
+
+        filas = db.session.query(
+            MensajeSaliente.id, MensajeSaliente.telefono, MensajeSaliente.respuesta, MensajeSaliente.intentos
+        ).filter(
+            MensajeSaliente.estado == 'pendiente',
+            MensajeSaliente.proximo_intento <= ahora,
+            ~hay_anterior
+        ).order_by(MensajeSaliente.id).limit(self.lote).all()
+
+        reclamadas = []
+        for fila in filas:
+            # Condición sobre el estado: si otro proceso lo reclamó primero, no se toca
+            actualizadas = MensajeSaliente.query.filter_by(id=fila.id, estado='pendiente').update({
+                MensajeSaliente.estado: 'enviando',
+                MensajeSaliente.intentos: MensajeSaliente.intentos + 1,
+                MensajeSaliente.fecha_reclamado: ahora
+            }, synchronize_session=False)
+            if actualizadas:
+                reclamadas.append(fila)
+        db.session.commit()
+        return reclamadas
+
+    def vaciar_lote(self):
+        """
+        Envía un lote de la bandeja y guarda el resultado de cada mensaje
+
+        Returns:
+            int: Mensajes enviados o reprogramados en esta ronda (0 = nada que hacer)
+        """
+        filas = self._reclamar()
+        if not filas:
+            return 0
+
+        # Un mensaje por teléfono en el lote: el resultado se asocia por teléfono.
+        # Los reintentos los maneja la bandeja (con backoff largo), no el envío.
+        resultados = {}
+        enviador = EnviadorMasivo(
+            concurrencia=min(len(filas), current_app.config.get('WHATSAPP_MASIVO_CONCURRENCIA', 20)),
+            max_reintentos=0,
+            al_lote=lambda lote: resultados.update((r.telefono, r) for r in lote)
+        )
+        resumen = asyncio.run(enviador.enviar([(fila.telefono, fila.respuesta) for fila in filas]))
+
+        ahora = datetime.utcnow()
+        for fila in filas:
+            resultado = resultados.get(fila.telefono)
+            intentos = fila.intentos + 1
+            if resultado is not None and resultado.ok:
+                cambios = {
+                    MensajeSaliente.estado: 'enviado',
+                    MensajeSaliente.fecha_enviado: ahora,
+                    MensajeSaliente.codigo_respuesta: resultado.codigo,
+                    MensajeSaliente.wamid: resultado.wamid,
+                    MensajeSaliente.error: None
+                }
+            else:
+                codigo = resultado.codigo if resultado is not None else None
+                error = resultado.error if resultado is not None else 'sin resultado'
+                cambios = {
+                    MensajeSaliente.codigo_respuesta: codigo,
+                    MensajeSaliente.error: (error or '')[:1000]
+                }
+                if intentos >= self.max_intentos or self._es_definitivo(codigo):
+                    cambios[MensajeSaliente.estado] = 'error'
+                else:
+                    cambios[MensajeSaliente.estado] = 'pendiente'
+                    cambios[MensajeSaliente.proximo_intento] = ahora + timedelta(seconds=self._espera(intentos))
+            MensajeSaliente.query.filter_by(id=fila.id).update(cambios, synchronize_session=False)
+        db.session.commit()
+
+        if resumen['fallidos']:
+            logger.warning('Bandeja de salida: %s de %s envíos fallaron (%s)',
+                           resumen['fallidos'], resumen['total'], resumen['por_codigo'])
+        return len(filas)
+
+    @staticmethod
+    def _es_definitivo(codigo):
+        """Errores 4xx (salvo 429): reintentar no cambia el resultado"""
+        return codigo is not None and 400 <= codigo < 500 and codigo != 429
+
+    def _espera(self, intentos):
+        espera = min(self.backoff_base * (2 ** (intentos - 1)), self.backoff_maximo)
+        return espera + random.uniform(0, espera / 4)
+
+    def estadisticas(self):
+        """Mensajes por estado y antigüedad del pendiente más viejo"""
+        por_estado = dict(
+            db.session.query(MensajeSaliente.estado, db.func.count(MensajeSaliente.id))
+            .group_by(MensajeSaliente.estado).all()
+        )
+        mas_antiguo = db.session.query(db.func.min(MensajeSaliente.fecha_creacion)).filter(
+            MensajeSaliente.estado.in_(['pendiente', 'enviando'])
+        ).scalar()
+        return {
+            'por_estado': por_estado,
+            'pendiente_mas_antiguo': mas_antiguo.isoformat() if mas_antiguo else None,
+        }
+
+
+def init_bandeja_salida(app):
+    """
+    Crea la bandeja de salida y arranca su despachador si BANDEJA_SALIDA está activa
+
+    Sin INICIAR_TRABAJADORES no hay bandeja: un script no reclama ni envía
+    los mensajes pendientes del servidor.
+    """
+    if not app.config.get('BANDEJA_SALIDA') or not app.config.get('INICIAR_TRABAJADORES'):
+        return None
+    bandeja = BandejaSalida(
+        app,
+        intervalo=app.config.get('BANDEJA_INTERVALO_SONDEO', 2.0),
+        lote=app.config.get('BANDEJA_LOTE', 50),
+        max_intentos=app.config.get('BANDEJA_MAX_INTENTOS', 8),
+        backoff_base=app.config.get('BANDEJA_BACKOFF_BASE', 5.0),
+        backoff_maximo=app.config.get('BANDEJA_BACKOFF_MAXIMO', 600.0)
+    )
+    bandeja.iniciar()
+    atexit.register(bandeja.detener)
+    app.extensions['bandeja_salida'] = bandeja
+    return bandeja
+
+
+def obtener_bandeja():
+    """Bandeja de salida de la app actual, o None si está desactivada (envío directo)"""
+    return current_app.extensions.get('bandeja_salida')
@@ -0,0 +1,263 @@
+"""
+Barrido periódico de sesiones del chatbot
+Las conversaciones abandonadas a mitad del flujo quedaban activa=True para
+siempre y las inactivas se acumulaban en sesiones_chatbot e historial_chat.
+Un hilo, cada SESIONES_BARRIDO_INTERVALO segundos:
+
+1. Desactiva las sesiones sin actividad en SESIONES_TTL_MINUTOS, con UPDATE
+   por bloques de ids (SESIONES_BARRIDO_LOTE) para no bloquear la tabla.
+2. Archiva las sesiones inactivas con más de SESIONES_RETENCION_DIAS días:
+   cada sesión pasa con su transcripción a una sola fila de
+   sesiones_chatbot_archivo (SESIONES_ARCHIVO='tabla') o a una línea de un
+   archivo JSONL (SESIONES_ARCHIVO='jsonl', en SESIONES_ARCHIVO_RUTA), y se
+   borra de las tablas vivas. Cada bloque va en su propia transacción.
+
+Con el destino 'jsonl' el archivo se escribe antes de borrar: si el borrado
+falla, la sesión puede quedar repetida en el archivo (nunca se pierde).
+
+Cada proceso de la app (gunicorn -w 4) tiene su hilo de barrido. En
+PostgreSQL cada bloque a archivar se reclama con FOR UPDATE SKIP LOCKED: los
+barridos simultáneos toman bloques distintos y ninguna sesión se archiva dos
+veces. SQLite no tiene bloqueo por filas (un solo proceso, ver QUICK_START).
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, SesionChatbot, SesionChatbotArchivada, HistorialChat
+from utils.api_response import serialize_json_default
+from utils.cache_sesiones import obtener_cache_sesiones
+from utils.transcripciones import escribir_transcripciones
+
+logger = logging.getLogger(__name__)
+
+
+class BarredorSesiones:
+    """Desactiva sesiones inactivas y archiva las antiguas por bloques"""
+
+    def __init__(self, app, intervalo=300, ttl_minutos=1440, retencion_dias=90, lote=500,
+                 destino='tabla', ruta='archivo_sesiones'):
+        """
+        Args:
+            app: Aplicación Flask (el hilo abre su propio app_context)
+            intervalo: Segundos entre barridos
+            ttl_minutos: Minutos sin actividad para desactivar una sesión
+            retencion_dias: Días que una sesión inactiva sigue en las tablas vivas (0 = no archivar)
+            lote: Sesiones por UPDATE / por transacción de archivado
+            destino: 'tabla' (sesiones_chatbot_archivo) o 'jsonl'
+            ruta: Directorio de los archivos JSONL
+        """
+        self.app = app
+        self.intervalo = intervalo
+        self.ttl_minutos = ttl_minutos
+        self.retencion_dias = retencion_dias
+        self.lote = lote
+        self.destino = destino
+        self.ruta = ruta
+        self.ultimo_barrido = None
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        if self.intervalo > 0 and self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name='barrido-sesiones', daemon=True)
+            self._hilo.start()
+
+    def detener(self, timeout=10):
+        """Termina el bloque en curso; lo que falte se barre en el próximo arranque"""
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=timeout)
+            self._hilo = None
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            if self._detener.is_set():
+                break
+            with self.app.app_context():
+                try:
+                    self.barrer()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Error en el barrido de sesiones del chatbot')
+                finally:
+                    db.session.remove()
+
+    def barrer(self, ahora=None):
+        """
+        Ejecuta un barrido completo (requiere app_context)
+
+        Returns:
+            dict: Sesiones desactivadas y archivadas
+        """
+        ahora = ahora or datetime.utcnow()
+        resultado = {
+            'desactivadas': self.desactivar_inactivas(ahora - timedelta(minutes=self.ttl_minutos)),
+            'archivadas': 0,
+        }
+        if self.retencion_dias > 0:
+            resultado['archivadas'] = self.archivar(ahora - timedelta(days=self.retencion_dias))
+        self.ultimo_barrido = {'fecha': ahora.isoformat(), **resultado}
+        if resultado['desactivadas'] or resultado['archivadas']:
+            logger.info('Barrido de sesiones: %(desactivadas)s desactivadas, %(archivadas)s archivadas', resultado)
+        return resultado
+
+    def desactivar_inactivas(self, corte):
+        """Desactiva las sesiones activas sin actividad desde `corte`"""
+        # La caché tiene la actividad más reciente: escribirla antes de comparar fechas
+        cache = obtener_cache_sesiones()
+        if cache is not None:
+            cache.escribir()
+
+        total = 0
+        while not self._detener.is_set():
+            filas = db.session.query(SesionChatbot.id, SesionChatbot.usuario_telefono).filter(
+                SesionChatbot.activa == True,
+                SesionChatbot.fecha_ultima_actividad < corte
+            ).order_by(SesionChatbot.fecha_ultima_actividad).limit(self.lote).all()
+            if not filas:
+                break
+
+            # Se repite la condición: un mensaje pudo reactivar la sesión entre las dos sentencias
+            total += SesionChatbot.query.filter(
+                SesionChatbot.id.in_([fila.id for fila in filas]),
+                SesionChatbot.activa == True,
+                SesionChatbot.fecha_ultima_actividad < corte
+            ).update({
+                SesionChatbot.activa: False,
+                # Sin esto el onupdate de la columna contaría el barrido como actividad
+                SesionChatbot.fecha_ultima_actividad: SesionChatbot.fecha_ultima_actividad
+            }, synchronize_session=False)
+            db.session.commit()
+
+            if cache is not None:
+                cache.descartar({fila.usuario_telefono for fila in filas})
+            if len(filas) < self.lote:
+                break
+        return total
+
+    def archivar(self, corte):
+        """Mueve al archivo las sesiones inactivas sin actividad desde `corte`"""
+        total = 0
+        while not self._detener.is_set():
+            # Las transcripciones aún en memoria también se archivan: se escriben
+            # al empezar cada bloque, antes de leer su historial y borrarlo (las
+            # que lleguen después de borrar la sesión las descarta el escritor)
+            escribir_transcripciones()
+            sesiones = self._bloque_para_archivar(corte).all()
+            if not sesiones:
+                break
+
+            ids = [sesion.id for sesion in sesiones]
+            historial = {sesion_id: [] for sesion_id in ids}
+            for sesion_id, fecha, emisor, mensaje in db.session.query(
+                HistorialChat.sesion_id, HistorialChat.fecha, HistorialChat.emisor, HistorialChat.mensaje
+            ).filter(
+                HistorialChat.sesion_id.in_(ids)
+            ).order_by(HistorialChat.sesion_id, HistorialChat.fecha, HistorialChat.id):
+                historial[sesion_id].append({
+                    'fecha': fecha.isoformat() if fecha else None,
+                    'emisor': emisor,
+                    'mensaje': mensaje
+                })
+
+            filas = [{
+                'id': sesion.id,
+                'usuario_telefono': sesion.usuario_telefono,
+                'usuario_id': sesion.usuario_id,
+                'estado_conversacion': sesion.estado_conversacion,
+                'datos_temporales': dict(sesion.datos_temporales or {}),
+                'fecha_inicio': sesion.fecha_inicio,
+                'fecha_ultima_actividad': sesion.fecha_ultima_actividad,
+                'historial': historial[sesion.id],
+            } for sesion in sesiones]
+
+            if self.destino == 'jsonl':
+                self._escribir_jsonl(filas)
+            else:
+                ahora = datetime.utcnow()
+                db.session.execute(
+                    SesionChatbotArchivada.__table__.insert(),
+                    [{**fila, 'fecha_archivado': ahora} for fila in filas]
+                )
+
+            HistorialChat.query.filter(HistorialChat.sesion_id.in_(ids)).delete(synchronize_session=False)
+            SesionChatbot.query.filter(SesionChatbot.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            total += len(ids)
+            if len(ids) < self.lote:
+                break
+        return total
+
+    def _bloque_para_archivar(self, corte):
+        """
+        Siguiente bloque de sesiones a archivar, bloqueado hasta el commit
+
+        Las filas que otro barrido ya tiene bloqueadas se saltan (SKIP LOCKED);
+        en motores sin FOR UPDATE (SQLite) la cláusula no se emite.
+        """
+        return SesionChatbot.query.filter(
+            SesionChatbot.activa == False,
+            SesionChatbot.fecha_ultima_actividad < corte
+        ).order_by(
+            SesionChatbot.fecha_ultima_actividad, SesionChatbot.id
+        ).limit(self.lote).with_for_update(skip_locked=True)
+
+    def _escribir_jsonl(self, filas):
+        """Agrega las sesiones al archivo del mes y lo sincroniza a disco antes de borrar"""
+        os.makedirs(self.ruta, exist_ok=True)
+        archivo = os.path.join(self.ruta, f'sesiones_chatbot_{datetime.utcnow():%Y%m}.jsonl')
+        with open(archivo, 'a', encoding='utf-8') as f:
+            for fila in filas:
+                f.write(json.dumps(fila, ensure_ascii=False, default=serialize_json_default) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def estadisticas(self):
+        """Sesiones por estado de actividad y resultado del último barrido"""
+        por_activa = dict(
+            db.session.query(SesionChatbot.activa, db.func.count(SesionChatbot.id))
+            .group_by(SesionChatbot.activa).all()
+        )
+        datos = {
+            'activas': por_activa.get(True, 0),
+            'inactivas': por_activa.get(False, 0),
+            'ultimo_barrido': self.ultimo_barrido,
+        }
+        if self.destino == 'tabla':
+            datos['archivadas'] = db.session.query(db.func.count(SesionChatbotArchivada.id)).scalar()
+        return datos
+
+
+def init_barrido_sesiones(app):
+    """
+    Crea el barredor de sesiones y arranca su hilo si SESIONES_BARRIDO_INTERVALO > 0
+
+    Sin INICIAR_TRABAJADORES no hay hilo; barrer() se puede llamar a mano.
+    """
+    barredor = BarredorSesiones(
+        app,
+        intervalo=app.config.get('SESIONES_BARRIDO_INTERVALO', 300),
+        ttl_minutos=app.config.get('SESIONES_TTL_MINUTOS', 1440),
+        retencion_dias=app.config.get('SESIONES_RETENCION_DIAS', 90),
+        lote=app.config.get('SESIONES_BARRIDO_LOTE', 500),
+        destino=app.config.get('SESIONES_ARCHIVO', 'tabla'),
+        ruta=app.config.get('SESIONES_ARCHIVO_RUTA', 'archivo_sesiones')
+    )
+    if app.config.get('INICIAR_TRABAJADORES'):
+        barredor.iniciar()
+        atexit.register(barredor.detener)
+    app.extensions['barrido_sesiones'] = barredor
+    return barredor
+
+
+def obtener_barredor():
+    """Barredor de sesiones de la app actual"""
+    return current_app.extensions.get('barrido_sesiones')
@@ -0,0 +1,88 @@
+"""
+Bloqueos por clave (p. ej. por teléfono) dentro del proceso
+Serializa el trabajo sobre una misma clave mientras claves distintas avanzan
+en paralelo: cada clave tiene su propio lock, que se crea al primer uso y se
+descarta cuando nadie lo usa (la memoria no crece con el número de claves).
+
+Con varios procesos (gunicorn -w N) el lock del proceso no basta:
+bloquear_en_bd toma además un advisory lock de PostgreSQL por clave que dura
+hasta el fin de la transacción. En SQLite no hace nada (un solo proceso).
+"""
+import hashlib
+import threading
+from contextlib import contextmanager
+from sqlalchemy import text
+from models import db
+
+
+class BloqueoTimeout(Exception):
+    """No se obtuvo el bloqueo de la clave dentro del tiempo indicado"""
+
+
+class BloqueosPorClave:
+    """Gestor de locks reentrantes por clave con conteo de referencias"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloqueos = {}  # clave -> [RLock, número de hilos que lo usan o esperan]
+        self.esperas = 0     # veces que un hilo tuvo que esperar (contención)
+
+    @contextmanager
+    def bloquear(self, clave, timeout=None):
+        """
+        Uso:
+            with bloqueos.bloquear(telefono):
+                ...  # solo un hilo a la vez por teléfono
+
+        Raises:
+            BloqueoTimeout: Si se indicó timeout (segundos) y venció
+        """
+        with self._lock:
+            entrada = self._bloqueos.get(clave)
+            if entrada is None:
+                entrada = self._bloqueos[clave] = [threading.RLock(), 0]
+            entrada[1] += 1
+
+        lock = entrada[0]
+        try:
+            if not lock.acquire(blocking=False):
+                with self._lock:
+                    self.esperas += 1
+                if not lock.acquire(timeout=-1 if timeout is None else timeout):
+                    raise BloqueoTimeout(f'No se obtuvo el bloqueo de {clave!r} en {timeout}s')
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            with self._lock:
+                entrada[1] -= 1
+                if entrada[1] == 0:
+                    del self._bloqueos[clave]
+
+    def estadisticas(self):
+        with self._lock:
+            return {'claves_activas': len(self._bloqueos), 'esperas': self.esperas}
+
+
+# Una conversación del chatbot por teléfono a la vez
+bloqueos_conversacion = BloqueosPorClave()
+
+
+def _clave_bd(clave):
+    """Entero de 64 bits con signo estable entre procesos (hash() cambia en cada uno)"""
+    resumen = hashlib.blake2b(str(clave).encode(), digest_size=8).digest()
+    return int.from_bytes(resumen, 'big', signed=True)
+
+
+def bloquear_en_bd(clave):
+    """
+    Bloquea la clave en la base de datos hasta el commit o rollback de la
+    transacción actual de db.session (pg_advisory_xact_lock)
+
+    Se llama dentro de BloqueosPorClave.bloquear: los hilos del mismo proceso
+    esperan en memoria y solo uno por proceso ocupa una conexión esperando.
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    db.session.execute(text('SELECT pg_advisory_xact_lock(:clave)'), {'clave': _clave_bd(clave)})
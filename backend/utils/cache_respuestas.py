@@ -0,0 +1,219 @@
+"""
+Caché con vencimiento (TTL) de las respuestas de los endpoints de estadísticas
+Cada técnico que abre las estadísticas recalculaba los mismos agregados,
+aunque basta con que tengan unos segundos de antigüedad. Con el decorador
+cache_respuesta la respuesta se guarda en memoria por endpoint y parámetros:
+
+- TTL por clave: cada entrada vence a los `ttl` segundos del decorador
+  (CACHE_RESPUESTAS_TTL por defecto; 0 desactiva la caché)
+- Coalescencia: si varias peticiones piden la misma clave vencida a la vez,
+  una sola la recalcula y las demás esperan su resultado
+- Invalidación: cada entrada pertenece a grupos ('tickets', 'articulos');
+  los eventos del bus (utils/eventos.py) de tickets creados o que cambian de
+  estado y de artículos cambiados descartan las entradas de su grupo.
+  invalidar_cache() lo hace a mano (p. ej. tras escrituras con SQL directo)
+- Contadores de aciertos, fallos, esperas coalescidas e invalidaciones por
+  endpoint (GET /api/dashboard/estadisticas-cache)
+
+La caché es del proceso: con varios procesos cada uno invalida la suya y el
+resto ve el cambio como mucho a los `ttl` segundos.
+"""
+import threading
+import time
+from collections import OrderedDict, Counter
+from functools import wraps
+from flask import current_app, request
+from utils.eventos import bus_eventos, TicketCreado, TicketEstadoCambiado, ArticuloCambiado
+
+# Segundos que una petición espera a la que está recalculando su misma clave
+ESPERA_COALESCENCIA = 30
+
+
+class _Calculo:
+    """Recalculo en curso de una clave, con su resultado para quienes esperan"""
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.entrada = None
+
+
+class CacheRespuestas:
+    """Respuestas por clave con TTL propio, LRU acotado, seguro entre hilos"""
+
+    def __init__(self, ttl=10, maximo=256):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> (vence, grupos, respuesta)
+        self._en_curso = {}             # clave -> _Calculo
+        self._generaciones = Counter()  # grupo -> invalidaciones (descarta cálculos ya obsoletos)
+        self._generacion_total = 0      # invalidaciones de todos los grupos
+        self._contadores = {}           # endpoint -> Counter
+
+    def _contar(self, endpoint, evento):
+        contador = self._contadores.get(endpoint)
+        if contador is None:
+            contador = self._contadores.setdefault(endpoint, Counter())
+        contador[evento] += 1
+
+    def _generacion(self, grupos):
+        return self._generacion_total, tuple(self._generaciones[grupo] for grupo in grupos)
+
+    def obtener(self, clave, grupos, calcular, ttl=None, endpoint=None):
+        """
+        Respuesta guardada de `clave` o la que devuelve `calcular()`
+
+        `calcular` devuelve (respuesta, guardar); solo se guarda si guardar es
+        verdadero (p. ej. respuestas exitosas). Si otra petición ya está
+        calculando la misma clave, se espera su resultado.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        endpoint = endpoint or clave[0]
+        while True:
+            with self._lock:
+                item = self._entradas.get(clave)
+                if item is not None:
+                    if item[0] > time.monotonic():
+                        self._entradas.move_to_end(clave)
+                        self._contar(endpoint, 'aciertos')
+                        return item[2]
+                    del self._entradas[clave]
+                calculo = self._en_curso.get(clave)
+                if calculo is None:
+                    calculo = self._en_curso[clave] = _Calculo()
+                    generaciones = self._generacion(grupos)
+                    self._contar(endpoint, 'fallos')
+                    break
+                self._contar(endpoint, 'coalescidas')
+
+            # Otra petición está calculando la clave
+            if calculo.listo.wait(ESPERA_COALESCENCIA) and calculo.entrada is not None:
+                return calculo.entrada
+            if not calculo.listo.is_set():
+                # Demasiado lenta: calcular sin esperar ni guardar
+                return calcular()[0]
+            # Falló o no era guardable: reintentar (otra petición puede tomar el cálculo)
+
+        respuesta = None
+        try:
+            respuesta, guardar = calcular()
+        finally:
+            with self._lock:
+                vigente = generaciones == self._generacion(grupos)
+                if respuesta is not None and guardar and vigente:
+                    self._entradas[clave] = (time.monotonic() + ttl, grupos, respuesta)
+                    self._entradas.move_to_end(clave)
+                    while len(self._entradas) > self.maximo:
+                        self._entradas.popitem(last=False)
+                    calculo.entrada = respuesta
+                del self._en_curso[clave]
+            calculo.listo.set()
+        return respuesta
+
+    def invalidar(self, *grupos):
+        """Descarta las entradas de los grupos indicados (todas si no se indica ninguno)"""
+        grupos = set(grupos)
+        with self._lock:
+            if grupos:
+                for grupo in grupos:
+                    self._generaciones[grupo] += 1
+            else:
+                self._generacion_total += 1
+            descartar = [clave for clave, (_, grupos_entrada, _) in self._entradas.items()
+                         if not grupos or grupos & set(grupos_entrada)]
+            for clave in descartar:
+                del self._entradas[clave]
+            for clave in descartar:
+                self._contar(clave[0], 'invalidaciones')
+
+    def estadisticas(self):
+        with self._lock:
+            contadores = {endpoint: dict(contador) for endpoint, contador in self._contadores.items()}
+            entradas = len(self._entradas)
+        endpoints = {}
+        for endpoint, contador in sorted(contadores.items()):
+            consultas = contador.get('aciertos', 0) + contador.get('fallos', 0) + contador.get('coalescidas', 0)
+            endpoints[endpoint] = {
+                'aciertos': contador.get('aciertos', 0),
+                'fallos': contador.get('fallos', 0),
+                'coalescidas': contador.get('coalescidas', 0),
+                'invalidaciones': contador.get('invalidaciones', 0),
+                'tasa_aciertos': round(contador.get('aciertos', 0) / consultas, 3) if consultas else None,
+            }
+        return {'ttl': self.ttl, 'entradas': entradas, 'maximo': self.maximo, 'endpoints': endpoints}
+
+
+_cache = None
+
+
+def init_cache_respuestas(app):
+    """Crea la caché de respuestas de la aplicación"""
+    global _cache
+    _cache = CacheRespuestas(
+        ttl=app.config.get('CACHE_RESPUESTAS_TTL', 10),
+        maximo=app.config.get('CACHE_RESPUESTAS_MAXIMO', 256)
+    )
+    app.extensions['cache_respuestas'] = _cache
+    return _cache
+
+
+def obtener_cache_respuestas():
+    return _cache
+
+
+def invalidar_cache(*grupos):
+    """Descarta las respuestas guardadas de los grupos (p. ej. 'tickets')"""
+    if _cache is not None:
+        _cache.invalidar(*grupos)
+
+
+def cache_respuesta(*grupos, ttl=None):
+    """
+    Decorador que guarda la respuesta de la vista durante `ttl` segundos
+
+    La clave es el endpoint más los parámetros de la URL, así que solo sirve
+    para vistas cuya respuesta no depende del usuario (va después del
+    decorador de autenticación). Solo se guardan las respuestas 200.
+
+    Uso:
+        @tickets_api_bp.route('/estadisticas', methods=['GET'])
+        @api_tecnico_required
+        @cache_respuesta('tickets')
+        def estadisticas():
+            ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            cache = _cache
+            if cache is None or not (cache.ttl if ttl is None else ttl):
+                return f(*args, **kwargs)
+
+            clave = (request.endpoint, tuple(sorted(request.args.items(multi=True))),
+                     tuple(sorted(kwargs.items())))
+
+            def calcular():
+                respuesta = current_app.make_response(f(*args, **kwargs))
+                if respuesta.status_code != 200 or respuesta.is_streamed:
+                    return respuesta, False
+                return (respuesta.get_data(), respuesta.status_code, respuesta.mimetype), True
+
+            resultado = cache.obtener(clave, grupos, calcular, ttl=ttl, endpoint=request.endpoint)
+            if not isinstance(resultado, tuple):
+                return resultado
+            cuerpo, status, mimetype = resultado
+            return current_app.response_class(cuerpo, status=status, mimetype=mimetype)
+        return decorated_function
+    return decorator
+
+
+# --- Invalidación desde los eventos ---
+
+@bus_eventos.suscriptor(TicketCreado, TicketEstadoCambiado)
+def _invalidar_tickets(evento):
+    invalidar_cache('tickets')
+
+
+@bus_eventos.suscriptor(ArticuloCambiado)
+def _invalidar_articulos(evento):
+    invalidar_cache('articulos')
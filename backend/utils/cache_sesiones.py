@@ -0,0 +1,356 @@
+"""
+Caché de sesiones activas del chatbot con escritura diferida (write-behind)
+Sin caché, cada mensaje hace dos SELECT (Usuario por teléfono y la sesión
+activa) y un commit de la sesión. Con SESION_CACHE activo la sesión activa
+de cada teléfono (y los datos del usuario) se sirven desde memoria, y los
+cambios se escriben en sesiones_chatbot por lotes: varias actualizaciones
+de una misma sesión dentro del intervalo se fusionan en un solo UPDATE.
+
+Backends:
+- 'memoria': LRU con TTL dentro del proceso (un solo proceso de la app)
+- 'redis': servidor Redis compatible compartido entre procesos
+  (SESION_CACHE_REDIS_URL); requiere el paquete redis
+
+Lo que no se escribe a tiempo se pierde si el proceso muere: como máximo el
+último intervalo (SESION_CACHE_FLUSH_INTERVALO) de cambios de estado. Las
+sesiones nuevas sí se insertan al momento (hace falta su id).
+"""
+import atexit
+import copy
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam, or_
+from models import db, SesionChatbot
+from utils.api_response import serialize_json_default
+
+logger = logging.getLogger(__name__)
+
+# Lo mínimo del usuario que necesita el flujo del chatbot
+UsuarioChat = namedtuple('UsuarioChat', ['id', 'nombre'])
+
+COLUMNAS = ('id', 'usuario_telefono', 'usuario_id', 'estado_conversacion', 'datos_temporales',
+            'fecha_inicio', 'fecha_ultima_actividad', 'activa')
+
+
+def estado_sesion(sesion):
+    """Copia de las columnas de la sesión (independiente del objeto)"""
+    estado = {columna: getattr(sesion, columna) for columna in COLUMNAS}
+    estado['datos_temporales'] = copy.deepcopy(dict(estado['datos_temporales'] or {}))
+    return estado
+
+
+def sesion_desde_estado(estado):
+    """SesionChatbot fuera de la sesión de SQLAlchemy, armada desde la caché"""
+    datos = dict(estado)
+    datos['datos_temporales'] = copy.deepcopy(datos['datos_temporales'])
+    return SesionChatbot(**datos)
+
+
+class BackendMemoria:
+    """LRU acotado con vencimiento por entrada, seguro entre hilos"""
+
+    def __init__(self, maximo=10000, ttl=1800):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # telefono -> (vence, entrada)
+        self._lock = threading.Lock()
+
+    def obtener(self, telefono):
+        with self._lock:
+            item = self._entradas.get(telefono)
+            if item is None:
+                return None
+            vence, entrada = item
+            if vence < time.monotonic():
+                del self._entradas[telefono]
+                return None
+            self._entradas.move_to_end(telefono)
+            return entrada
+
+    def guardar(self, telefono, entrada):
+        with self._lock:
+            self._entradas[telefono] = (time.monotonic() + self.ttl, entrada)
+            self._entradas.move_to_end(telefono)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+
+    def eliminar(self, telefono):
+        with self._lock:
+            self._entradas.pop(telefono, None)
+
+    def tamano(self):
+        with self._lock:
+            return len(self._entradas)
+
+
+class BackendRedis:
+    """Entradas serializadas en JSON con vencimiento (SETEX) en un Redis compartido"""
+
+    def __init__(self, url, ttl=1800, prefijo='mesa_ayuda:sesion:'):
+        import redis
+        self.ttl = int(ttl)
+        self.prefijo = prefijo
+        self._redis = redis.Redis.from_url(url)
+
+    def obtener(self, telefono):
+        valor = self._redis.get(self.prefijo + telefono)
+        if valor is None:
+            return None
+        entrada = json.loads(valor)
+        sesion = entrada['sesion']
+        for columna in ('fecha_inicio', 'fecha_ultima_actividad'):
+            if sesion.get(columna):
+                sesion[columna] = datetime.fromisoformat(sesion[columna])
+        return entrada
+
+    def guardar(self, telefono, entrada):
+        self._redis.setex(self.prefijo + telefono, self.ttl, json.dumps(entrada, default=serialize_json_default))
+
+    def eliminar(self, telefono):
+        self._redis.delete(self.prefijo + telefono)
+
+    def tamano(self):
+        return None
+
+
+class CacheSesiones:
+    """Sesión activa por teléfono en caché y escritura diferida de los cambios"""
+
+    def __init__(self, app, backend, intervalo=2, umbral=200):
+        self.app = app
+        self.backend = backend
+        self.intervalo = intervalo
+        self.umbral = umbral
+        self.aciertos = 0
+        self.fallos = 0
+        self.escrituras = 0
+        self._sucias = {}                # sesion_id -> último estado (se fusionan)
+        self._sucias_por_telefono = {}   # telefono -> número de sesiones sucias
+        self._lock = threading.Lock()
+        self._lock_escritura = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    # --- Lectura ---
+
+    def obtener(self, telefono):
+        """
+        Returns:
+            tuple: (usuario, sesion) desde la caché, o None si no está
+                (usuario es UsuarioChat o None; sesion es None si no hay activa)
+        """
+        entrada = self.backend.obtener(telefono)
+        if entrada is None:
+            with self._lock:
+                self.fallos += 1
+                pendiente = telefono in self._sucias_por_telefono
+            if pendiente:
+                # La base de datos aún no tiene lo último de este teléfono
+                self.escribir()
+            return None
+
+        with self._lock:
+            self.aciertos += 1
+        usuario = UsuarioChat(*entrada['usuario']) if entrada['usuario'] else None
+        sesion = sesion_desde_estado(entrada['sesion']) if entrada['sesion'] else None
+        return usuario, sesion
+
+    # --- Escritura ---
+
+    def guardar(self, telefono, usuario, sesiones):
+        """
+        Guarda en caché la sesión activa del teléfono (llamar después del flush)
+
+        Las sesiones que están en db.session se confirman con el commit de
+        quien llama; las que vinieron de la caché quedan pendientes de escritura.
+        """
+        ahora = datetime.utcnow()
+        estados, sucias = [], []
+        for sesion in sesiones:
+            if sesion is None or sesion.id is None:
+                continue
+            if sesion not in db.session:
+                sesion.fecha_ultima_actividad = ahora
+                sucias.append(sesion.id)
+            estados.append(estado_sesion(sesion))
+
+        activa = next((estado for estado in reversed(estados) if estado['activa']), None)
+        self.backend.guardar(telefono, {
+            'usuario': [usuario.id, usuario.nombre] if usuario else None,
+            'sesion': activa,
+        })
+
+        with self._lock:
+            for estado in estados:
+                if estado['id'] not in sucias:
+                    continue
+                if estado['id'] not in self._sucias:
+                    self._sucias_por_telefono[telefono] = self._sucias_por_telefono.get(telefono, 0) + 1
+                self._sucias[estado['id']] = estado
+            lleno = len(self._sucias) >= self.umbral
+
+        if lleno:
+            if self._hilo is not None:
+                self._despertar.set()
+            else:
+                self.escribir()
+
+    def invalidar(self, telefono):
+        """Escribe lo pendiente y quita el teléfono de la caché (cambios hechos por fuera)"""
+        self.escribir()
+        self.backend.eliminar(telefono)
+
+    def descartar(self, telefonos):
+        """Quita teléfonos de la caché sin escribir (llamar después de escribir lo pendiente)"""
+        for telefono in telefonos:
+            self.backend.eliminar(telefono)
+
+    def escribir(self):
+        """
+        Escribe las sesiones pendientes con un UPDATE por lotes (executemany)
+
+        No pisa una fila que otro proceso actualizó después (fecha_ultima_actividad).
+
+        Returns:
+            int: Sesiones escritas
+        """
+        with self._lock_escritura:
+            with self._lock:
+                lote, self._sucias = self._sucias, {}
+                self._sucias_por_telefono = {}
+
+            if not lote:
+                return 0
+
+            tabla = SesionChatbot.__table__
+            sentencia = tabla.update().where(
+                tabla.c.id == bindparam('b_id')
+            ).where(
+                or_(tabla.c.fecha_ultima_actividad.is_(None),
+                    tabla.c.fecha_ultima_actividad <= bindparam('b_fecha'))
+            ).values(
+                estado_conversacion=bindparam('b_estado'),
+                datos_temporales=bindparam('b_datos'),
+                activa=bindparam('b_activa'),
+                usuario_id=bindparam('b_usuario_id'),
+                fecha_ultima_actividad=bindparam('b_fecha')
+            )
+            parametros = [{
+                'b_id': estado['id'],
+                'b_estado': estado['estado_conversacion'],
+                'b_datos': estado['datos_temporales'],
+                'b_activa': estado['activa'],
+                'b_usuario_id': estado['usuario_id'],
+                'b_fecha': estado['fecha_ultima_actividad'],
+            } for _, estado in sorted(lote.items())]
+
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as conn:
+                        conn.execute(sentencia, parametros)
+            except Exception:
+                # Se devuelven los que no tengan una versión más nueva pendiente
+                with self._lock:
+                    for sesion_id, estado in lote.items():
+                        if sesion_id not in self._sucias:
+                            self._sucias[sesion_id] = estado
+                            telefono = estado['usuario_telefono']
+                            self._sucias_por_telefono[telefono] = self._sucias_por_telefono.get(telefono, 0) + 1
+                logger.exception('No se pudieron escribir %d sesiones del chatbot', len(lote))
+                return 0
+
+            with self._lock:
+                self.escrituras += 1
+            return len(lote)
+
+    # --- Hilo de escritura ---
+
+    def iniciar(self):
+        if self.intervalo > 0 and self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name='cache-sesiones', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        """Detiene el hilo y escribe lo pendiente (se llama al cerrar el proceso)"""
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=10)
+            self._hilo = None
+        self.escribir()
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            if self._detener.is_set():
+                break
+            self.escribir()
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'backend': type(self.backend).__name__,
+                'entradas': self.backend.tamano(),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else None,
+                'pendientes_escritura': len(self._sucias),
+                'lotes_escritos': self.escrituras,
+            }
+
+
+def init_cache_sesiones(app):
+    """Crea la caché de sesiones según SESION_CACHE ('off', 'memoria' o 'redis')"""
+    modo = (app.config.get('SESION_CACHE') or 'off').lower()
+    ttl = app.config.get('SESION_CACHE_TTL', 1800)
+    if modo == 'memoria':
+        backend = BackendMemoria(maximo=app.config.get('SESION_CACHE_MAXIMO', 10000), ttl=ttl)
+    elif modo == 'redis':
+        try:
+            backend = BackendRedis(app.config.get('SESION_CACHE_REDIS_URL'), ttl=ttl)
+        except ImportError:
+            print("ERROR: SESION_CACHE=redis requiere el paquete 'redis' (pip install redis). "
+                  "Se continúa sin caché de sesiones.")
+            return None
+    else:
+        return None
+
+    # Sin INICIAR_TRABAJADORES (scripts, tests) no hay hilo: cada cambio se escribe al guardarse
+    trabajadores = app.config.get('INICIAR_TRABAJADORES')
+    cache = CacheSesiones(
+        app,
+        backend,
+        intervalo=app.config.get('SESION_CACHE_FLUSH_INTERVALO', 2),
+        umbral=app.config.get('SESION_CACHE_FLUSH_UMBRAL', 200) if trabajadores else 1
+    )
+    if trabajadores:
+        cache.iniciar()
+        atexit.register(cache.detener)
+    app.extensions['cache_sesiones'] = cache
+    return cache
+
+
+def obtener_cache_sesiones():
+    """Caché de sesiones de la app actual, o None si está desactivada"""
+    return current_app.extensions.get('cache_sesiones')
+
+
+def invalidar_sesion(telefono):
+    """Llamar después de cambiar sesiones de un teléfono directamente en la base de datos"""
+    cache = obtener_cache_sesiones()
+    if cache is not None:
+        cache.invalidar(telefono)
+
+
+def escribir_sesiones_pendientes():
+    """Escribe ya los cambios diferidos (p. ej. antes de leer sesiones de la base de datos)"""
+    cache = obtener_cache_sesiones()
+    return cache.escribir() if cache is not None else 0
@@ -0,0 +1,299 @@
+"""
+Cola asíncrona del webhook de WhatsApp
+El webhook guarda los mensajes en la tabla cola_webhook y responde 200 de
+inmediato; un hilo despachador reclama los pendientes y los reparte entre
+WEBHOOK_WORKERS hilos. Conversaciones distintas avanzan a la vez, pero los
+mensajes de un teléfono se procesan en orden y nunca en paralelo, también
+con varios procesos (gunicorn -w N): solo se reclama el mensaje pendiente
+más antiguo de cada teléfono y solo si no tiene otro 'procesando'. Un
+mensaje que falla vuelve a 'pendiente' y retiene los siguientes de su
+teléfono hasta que se procesa o agota sus intentos ('error').
+
+La tabla hace la cola durable: si el proceso se cae, los mensajes
+pendientes se procesan al volver, y los que quedaron 'procesando' se
+liberan cuando su reclamo vence (TIMEOUT_RECLAMO).
+"""
+import atexit
+import logging
+import queue
+import threading
+import zlib
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from models import db, MensajeWebhook
+from utils.whatsapp_client import extraer_mensajes
+
+logger = logging.getLogger(__name__)
+
+# Mensajes que se reclaman por consulta y que cada hilo toma de una vez
+LOTE_RECLAMO = 200
+LOTE_WORKER = 32
+TIMEOUT_RECLAMO = timedelta(minutes=5)
+
+
+class ColaWebhook:
+    """Cola persistente con workers particionados por teléfono"""
+
+    def __init__(self, app, procesar, workers=4, intervalo=2.0, max_intentos=3):
+        """
+        Args:
+            app: Aplicación Flask (los hilos abren su propio app_context)
+            procesar: Función que recibe [(telefono, texto)] y devuelve una
+                lista con None o el error de cada mensaje
+            workers: Número de hilos que procesan mensajes
+            intervalo: Segundos entre sondeos de la tabla si nadie avisa
+            max_intentos: Intentos antes de marcar un mensaje como 'error'
+        """
+        self.app = app
+        self.procesar = procesar
+        self.intervalo = intervalo
+        self.max_intentos = max_intentos
+        self._colas = [queue.Queue() for _ in range(max(1, workers))]
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilos = []
+
+    # --- Productor (petición del webhook) ---
+
+    def encolar(self, data):
+        """
+        Guarda los mensajes del payload en la cola (ignora reintentos de Meta)
+
+        Returns:
+            int: Mensajes nuevos encolados
+        """
+        mensajes = extraer_mensajes(data)
+        if not mensajes:
+            return 0
+
+        ids = [m.mensaje_id for m in mensajes if m.mensaje_id]
+        vistos = set()
+        if ids:
+            vistos.update(
+                fila.mensaje_id for fila in db.session.query(MensajeWebhook.mensaje_id).filter(
+                    MensajeWebhook.mensaje_id.in_(ids)
+                )
+            )
+
+        nuevos = []
+        for mensaje in mensajes:
+            if mensaje.mensaje_id and mensaje.mensaje_id in vistos:
+                continue
+            vistos.add(mensaje.mensaje_id)
+            nuevos.append(MensajeWebhook(
+                mensaje_id=mensaje.mensaje_id,
+                telefono=mensaje.telefono,
+                texto=mensaje.texto
+            ))
+
+        if nuevos:
+            try:
+                db.session.add_all(nuevos)
+                db.session.commit()
+            except IntegrityError:
+                # El mismo reintento llegó por otra petición en paralelo: uno a uno
+                db.session.rollback()
+                guardados = []
+                for fila in nuevos:
+                    try:
+                        db.session.add(MensajeWebhook(
+                            mensaje_id=fila.mensaje_id, telefono=fila.telefono, texto=fila.texto
+                        ))
+                        db.session.commit()
+                        guardados.append(fila)
+                    except IntegrityError:
+                        db.session.rollback()
+                nuevos = guardados
+            self._despertar.set()
+
+        return len(nuevos)
+
+    # --- Despachador y workers ---
+
+    def iniciar(self):
+        """Arranca el despachador y los workers"""
+        if self._hilos:
+            return
+        self._hilos.append(threading.Thread(target=self._despachar, name='cola-webhook', daemon=True))
+        for i, cola in enumerate(self._colas):
+            self._hilos.append(threading.Thread(
+                target=self._trabajar, args=(cola,), name=f'cola-webhook-{i}', daemon=True
+            ))
+        for hilo in self._hilos:
+            hilo.start()
+
+    def detener(self, timeout=10):
+        """Termina los lotes en curso; lo no procesado queda en la tabla"""
+        self._detener.set()
+        self._despertar.set()
+        for cola in self._colas:
+            cola.put(None)
+        for hilo in self._hilos:
+            hilo.join(timeout=timeout)
+        self._hilos = []
+
+    def _particion(self, telefono):
+        return self._colas[zlib.crc32(telefono.encode()) % len(self._colas)]
+
+    def _despachar(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            if self._detener.is_set():
+                break
+            with self.app.app_context():
+                try:
+                    self._liberar_vencidos()
+                    while self._reclamar():
+                        pass
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Error reclamando mensajes de la cola del webhook')
+                finally:
+                    db.session.remove()
+
+    def _liberar_vencidos(self):
+        """Devuelve a 'pendiente' los mensajes de workers que murieron a mitad"""
+        MensajeWebhook.query.filter(
+            MensajeWebhook.estado == 'procesando',
+            MensajeWebhook.fecha_reclamado < datetime.utcnow() - TIMEOUT_RECLAMO
+        ).update({MensajeWebhook.estado: 'pendiente'}, synchronize_session=False)
+        db.session.commit()
+
+    def _reclamar(self):
+        """
+        Reclama el pendiente más antiguo de cada teléfono libre (en orden de
+        llegada) y lo reparte
+
+        Returns:
+            bool: Si se reclamó algo (puede haber más)
+        """
+        # Contrapresión: no se reclama más si los workers tienen trabajo de sobra
+        if sum(cola.qsize() for cola in self._colas) >= LOTE_RECLAMO * 2:
+            return False
+
+        # Un mensaje anterior del mismo teléfono sin terminar (en este u otro
+        # proceso, o esperando reintento) lo retiene
+        anterior = aliased(MensajeWebhook)
+        hay_anterior = db.session.query(anterior.id).filter(
+            anterior.telefono == MensajeWebhook.telefono,
+            anterior.id < MensajeWebhook.id,
+            anterior.estado.in_(['pendiente', 'procesando'])
+        ).exists()
+        procesando = db.session.query(anterior.id).filter(
+            anterior.telefono == MensajeWebhook.telefono,
+            anterior.estado == 'procesando'
+        ).exists()
+
+        filas = db.session.query(
+            MensajeWebhook.id, MensajeWebhook.telefono, MensajeWebhook.texto, MensajeWebhook.intentos
+        ).filter(
+            MensajeWebhook.estado == 'pendiente',
+            ~hay_anterior,
+            ~procesando
+        ).order_by(MensajeWebhook.id).limit(LOTE_RECLAMO).all()
+        if not filas:
+            return False
+
+        ahora = datetime.utcnow()
+        reclamadas = []
+        for fila in filas:
+            # Condición sobre el estado: si otro proceso lo reclamó primero, no se toca
+            actualizadas = MensajeWebhook.query.filter_by(id=fila.id, estado='pendiente').update({
+                MensajeWebhook.estado: 'procesando',
+                MensajeWebhook.intentos: MensajeWebhook.intentos + 1,
+                MensajeWebhook.fecha_reclamado: ahora
+            }, synchronize_session=False)
+            if actualizadas:
+                reclamadas.append(fila)
+        db.session.commit()
+
+        for fila in reclamadas:
+            self._particion(fila.telefono).put((fila.id, fila.telefono, fila.texto, fila.intentos + 1))
+        return True
+
+    def _trabajar(self, cola):
+        while True:
+            item = cola.get()
+            if item is None:
+                return
+            lote = [item]
+            fin = False
+            while len(lote) < LOTE_WORKER:
+                try:
+                    item = cola.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    fin = True
+                    break
+                lote.append(item)
+
+            with self.app.app_context():
+                try:
+                    self._procesar_lote(lote)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Error procesando un lote de la cola del webhook')
+                finally:
+                    db.session.remove()
+            if fin:
+                return
+
+    def _procesar_lote(self, lote):
+        errores = self.procesar([(telefono, texto) for _, telefono, texto, _ in lote])
+
+        ahora = datetime.utcnow()
+        for (mensaje_id, _, _, intentos), error in zip(lote, errores):
+            if error is None:
+                cambios = {MensajeWebhook.estado: 'procesado', MensajeWebhook.fecha_procesado: ahora}
+            else:
+                # De vuelta a 'pendiente' conserva su id: sigue antes que los
+                # mensajes posteriores de su teléfono, que esperan a que termine
+                estado = 'error' if intentos >= self.max_intentos else 'pendiente'
+                cambios = {MensajeWebhook.estado: estado, MensajeWebhook.error: error[:1000]}
+            MensajeWebhook.query.filter_by(id=mensaje_id).update(cambios, synchronize_session=False)
+        db.session.commit()
+
+        # Avisar al despachador: hay reintentos pendientes o hueco para otro lote
+        self._despertar.set()
+
+    def estadisticas(self):
+        """Mensajes por estado y tamaño de la cola en memoria de cada worker"""
+        por_estado = dict(
+            db.session.query(MensajeWebhook.estado, db.func.count(MensajeWebhook.id))
+            .group_by(MensajeWebhook.estado).all()
+        )
+        return {
+            'por_estado': por_estado,
+            'en_memoria': [cola.qsize() for cola in self._colas],
+        }
+
+
+def init_cola_webhook(app, procesar):
+    """
+    Crea la cola del webhook y arranca sus hilos si WEBHOOK_ASINCRONO está activo
+
+    Sin INICIAR_TRABAJADORES no hay cola: un script no reclama los mensajes
+    pendientes del servidor, y el webhook (tests) procesa en línea.
+    """
+    if not app.config.get('WEBHOOK_ASINCRONO') or not app.config.get('INICIAR_TRABAJADORES'):
+        return None
+    cola = ColaWebhook(
+        app,
+        procesar,
+        workers=app.config.get('WEBHOOK_WORKERS', 4),
+        intervalo=app.config.get('WEBHOOK_INTERVALO_SONDEO', 2.0),
+        max_intentos=app.config.get('WEBHOOK_MAX_INTENTOS', 3)
+    )
+    cola.iniciar()
+    atexit.register(cola.detener)
+    app.extensions['cola_webhook'] = cola
+    return cola
+
+
+def obtener_cola():
+    """Cola del webhook de la app actual, o None si el modo asíncrono está desactivado"""
+    return current_app.extensions.get('cola_webhook')
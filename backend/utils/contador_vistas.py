@@ -0,0 +1,164 @@
+"""
+Contador de vistas de artículos en memoria
+Las vistas se acumulan por artículo y se escriben por lotes con
+UPDATE ... SET vistas = vistas + :n (un UPDATE por artículo, en una sola
+transacción), así leer un artículo no escribe en la base de datos.
+
+El lote se escribe cada VISTAS_FLUSH_INTERVALO segundos, al acumular
+VISTAS_FLUSH_UMBRAL vistas pendientes y al cerrar el proceso. Cada proceso
+tiene su propio acumulador; si el proceso muere sin cerrarse se pierden como
+máximo las vistas del último intervalo.
+
+Tras cada lote se publica VistasActualizadas con los totales leídos de la BD
+(incluyen las vistas escritas por otros procesos), para que los índices en
+memoria reordenen por popularidad. Sumar vistas no cambia
+fecha_actualizacion: no es una edición del artículo.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+from sqlalchemy import bindparam, func, select
+from models import db, BaseConocimiento
+from utils.eventos import bus_eventos, VistasActualizadas
+
+logger = logging.getLogger(__name__)
+
+
+class ContadorVistas:
+    """Acumula vistas por artículo y las escribe por lotes"""
+
+    def __init__(self, app=None, intervalo=30, umbral=100):
+        self.app = app
+        self.intervalo = intervalo
+        self.umbral = umbral
+        self._pendientes = Counter()
+        self._total_pendiente = 0
+        self._lock = threading.Lock()
+        self._lock_escritura = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        """Arranca el hilo que escribe los lotes periódicamente"""
+        if self.intervalo > 0 and self._hilo is None:
+            self._hilo = threading.Thread(
+                target=self._bucle, name='contador-vistas', daemon=True
+            )
+            self._hilo.start()
+
+    def detener(self):
+        """Detiene el hilo y escribe lo pendiente (se llama al cerrar el proceso)"""
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=10)
+            self._hilo = None
+        self.escribir()
+
+    def registrar(self, articulo_id, cantidad=1):
+        """Suma vistas pendientes a un artículo (no toca la base de datos)"""
+        with self._lock:
+            self._pendientes[articulo_id] += cantidad
+            self._total_pendiente += cantidad
+            lleno = self._total_pendiente >= self.umbral
+
+        if lleno:
+            if self._hilo is not None:
+                self._despertar.set()
+            else:
+                self.escribir()
+
+    def pendientes(self, articulo_id):
+        """Vistas registradas que aún no se escribieron en la base de datos"""
+        with self._lock:
+            return self._pendientes.get(articulo_id, 0)
+
+    def escribir(self):
+        """
+        Escribe las vistas acumuladas en una transacción
+
+        Returns:
+            int: Número de artículos actualizados
+        """
+        with self._lock_escritura:
+            with self._lock:
+                lote, self._pendientes = self._pendientes, Counter()
+                self._total_pendiente = 0
+
+            if not lote:
+                return 0
+
+            tabla = BaseConocimiento.__table__
+            sentencia = tabla.update().where(
+                tabla.c.id == bindparam('articulo_id')
+            ).values(
+                vistas=func.coalesce(tabla.c.vistas, 0) + bindparam('incremento'),
+                # Sin esto se aplicaría el onupdate de la columna
+                fecha_actualizacion=tabla.c.fecha_actualizacion
+            )
+            parametros = [
+                {'articulo_id': articulo_id, 'incremento': incremento}
+                for articulo_id, incremento in sorted(lote.items())
+            ]
+
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as conn:
+                        conn.execute(sentencia, parametros)
+                        totales = dict(conn.execute(
+                            select(tabla.c.id, func.coalesce(tabla.c.vistas, 0)).where(tabla.c.id.in_(list(lote)))
+                        ).all())
+            except Exception:
+                # Se devuelven al acumulador para el siguiente intento
+                with self._lock:
+                    self._pendientes.update(lote)
+                    self._total_pendiente += sum(lote.values())
+                logger.exception('No se pudieron escribir %d vistas pendientes', sum(lote.values()))
+                return 0
+
+            bus_eventos.publicar(VistasActualizadas(totales))
+            return len(lote)
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            if self._detener.is_set():
+                break
+            self.escribir()
+
+
+_contador = None
+
+
+def init_contador_vistas(app):
+    """
+    Crea el contador de vistas de la aplicación
+
+    Con INICIAR_TRABAJADORES arranca el hilo y registra la escritura al
+    cerrar; sin él (scripts, tests) cada vista se escribe al registrarse.
+    """
+    global _contador
+    trabajadores = app.config.get('INICIAR_TRABAJADORES')
+    _contador = ContadorVistas(
+        app,
+        intervalo=app.config.get('VISTAS_FLUSH_INTERVALO', 30),
+        umbral=app.config.get('VISTAS_FLUSH_UMBRAL', 100) if trabajadores else 1
+    )
+    if trabajadores:
+        _contador.iniciar()
+        atexit.register(_contador.detener)
+    app.extensions['contador_vistas'] = _contador
+    return _contador
+
+
+def registrar_vista(articulo_id):
+    """Registra una vista del artículo para escribirla en el próximo lote"""
+    _contador.registrar(articulo_id)
+
+
+def vistas_actuales(articulo):
+    """Vistas guardadas más las pendientes de escribir"""
+    return (articulo.vistas or 0) + _contador.pendientes(articulo.id)
@@ -0,0 +1,242 @@
+"""
+Envío masivo asíncrono a WhatsApp (difusiones, avisos de estado de tickets)
+
+WhatsAppClient.enviar_mensaje hace un POST bloqueante a la vez; aquí los
+envíos corren en un event loop de asyncio con httpx:
+
+- un semáforo limita las peticiones en vuelo (WHATSAPP_MASIVO_CONCURRENCIA)
+- un token bucket ajusta el ritmo al límite del número en la Graph API
+  (WHATSAPP_MASIVO_TASA mensajes/s); un 429 pausa a todos los envíos
+- los resultados se entregan por lotes (al_lote) y al final un resumen
+
+Uso desde Flask (fachada síncrona):
+    resumen = enviar_masivo([(telefono, {'mensaje': '...'}), ...])
+"""
+import asyncio
+import contextlib
+import time
+from collections import Counter, namedtuple
+
+import httpx
+
+from config import Config
+from utils.whatsapp_client import WhatsAppClient, CODIGOS_REINTENTABLES, espera_reintento, latencias_envio
+
+# wamid: id del mensaje que devuelve la Graph API cuando lo acepta
+ResultadoEnvio = namedtuple('ResultadoEnvio', ['telefono', 'ok', 'codigo', 'intentos', 'error', 'wamid'],
+                            defaults=[None])
+
+# Errores que se devuelven en el resumen (el detalle completo llega por al_lote)
+MAX_ERRORES_RESUMEN = 100
+
+# El pool de httpcore recorre todas sus conexiones en cada petición (costo
+# cuadrático): con concurrencias altas se reparten entre varios clientes
+CONEXIONES_POR_CLIENTE = 16
+
+
+class CuboTokens:
+    """Token bucket para asyncio: `tasa` mensajes/s con ráfagas de hasta `capacidad`"""
+
+    def __init__(self, tasa, capacidad=None):
+        self.tasa = float(tasa)
+        self.capacidad = float(capacidad or tasa)
+        self._tokens = self.capacidad
+        self._ultimo = time.monotonic()
+        self._pausa_hasta = 0.0
+
+    def pausar(self, segundos):
+        """Detiene todos los envíos (p. ej. tras un 429 con Retry-After)"""
+        self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + segundos)
+        self._ultimo = self._pausa_hasta
+        self._tokens = 0.0
+
+    async def adquirir(self):
+        while True:
+            ahora = time.monotonic()
+            if ahora < self._pausa_hasta:
+                await asyncio.sleep(self._pausa_hasta - ahora)
+                continue
+
+            self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.tasa)
+
+
+class EnviadorMasivo:
+    """
+    Envía muchos mensajes con concurrencia y ritmo acotados
+
+    Args:
+        concurrencia (int): Peticiones simultáneas como máximo
+        tasa (float): Mensajes por segundo (token bucket)
+        tamano_lote (int): Cada cuántos resultados se llama a al_lote
+        al_lote (callable): Recibe una lista de ResultadoEnvio (p. ej. para guardar el estado)
+        max_reintentos (int): Reintentos inmediatos por mensaje (WHATSAPP_MAX_REINTENTOS)
+    """
+
+    def __init__(self, concurrencia=None, tasa=None, tamano_lote=None, al_lote=None, max_reintentos=None):
+        self.concurrencia = concurrencia or Config.WHATSAPP_MASIVO_CONCURRENCIA
+        self.tasa = tasa or Config.WHATSAPP_MASIVO_TASA
+        self.tamano_lote = tamano_lote or Config.WHATSAPP_MASIVO_LOTE
+        self.al_lote = al_lote
+        self.max_reintentos = Config.WHATSAPP_MAX_REINTENTOS if max_reintentos is None else max_reintentos
+
+    async def enviar(self, mensajes):
+        """
+        Args:
+            mensajes: Iterable de (telefono, respuesta_bot); puede ser un generador
+
+        Returns:
+            dict: Resumen con totales, códigos de respuesta y los primeros errores
+        """
+        resumen = {'total': 0, 'enviados': 0, 'fallidos': 0, 'reintentos': 0,
+                   'por_codigo': Counter(), 'errores': []}
+        lote = []
+        inicio = time.perf_counter()
+
+        def registrar(resultado):
+            resumen['total'] += 1
+            resumen['enviados' if resultado.ok else 'fallidos'] += 1
+            resumen['reintentos'] += max(resultado.intentos - 1, 0)
+            resumen['por_codigo'][str(resultado.codigo or resultado.error)] += 1
+            if not resultado.ok and len(resumen['errores']) < MAX_ERRORES_RESUMEN:
+                resumen['errores'].append({'telefono': resultado.telefono,
+                                           'codigo': resultado.codigo, 'error': resultado.error})
+            lote.append(resultado)
+            if len(lote) >= self.tamano_lote:
+                self._reportar(lote[:])
+                lote.clear()
+
+        if not Config.WHATSAPP_TOKEN or not Config.WHATSAPP_PHONE_NUMBER_ID:
+            print("Error: Faltan credenciales de WhatsApp (TOKEN o PHONE_NUMBER_ID)")
+            for telefono, _ in mensajes:
+                registrar(ResultadoEnvio(telefono, False, None, 0, 'sin_credenciales'))
+        else:
+            await self._enviar_todos(mensajes, registrar)
+
+        if lote:
+            self._reportar(lote)
+
+        duracion = time.perf_counter() - inicio
+        resumen['por_codigo'] = dict(resumen['por_codigo'])
+        resumen['duracion_s'] = round(duracion, 3)
+        resumen['mensajes_por_segundo'] = round(resumen['total'] / duracion, 1) if duracion else None
+        return resumen
+
+    async def _enviar_todos(self, mensajes, registrar):
+        url = f"{WhatsAppClient.BASE_URL}/{Config.WHATSAPP_PHONE_NUMBER_ID}/messages"
+        cubo = CuboTokens(self.tasa)
+        semaforo = asyncio.Semaphore(self.concurrencia)
+        pendientes = set()
+
+        encabezados = {
+            "Authorization": f"Bearer {Config.WHATSAPP_TOKEN}",
+            "Content-Type": "application/json"
+        }
+        timeout = httpx.Timeout(Config.WHATSAPP_TIMEOUT_LECTURA, connect=Config.WHATSAPP_TIMEOUT_CONEXION)
+        # Cada tarea toma un "cupo" de un cliente y lo devuelve al terminar
+        clientes, libres = [], []
+        restantes = self.concurrencia
+        while restantes > 0:
+            conexiones = min(restantes, CONEXIONES_POR_CLIENTE)
+            cliente = httpx.AsyncClient(
+                headers=encabezados,
+                limits=httpx.Limits(max_connections=conexiones, max_keepalive_connections=conexiones),
+                timeout=timeout
+            )
+            clientes.append(cliente)
+            libres.extend([cliente] * conexiones)
+            restantes -= conexiones
+
+        async def enviar_y_liberar(telefono, respuesta_bot, cliente):
+            try:
+                registrar(await self._enviar_uno(cliente, cubo, url, telefono, respuesta_bot))
+            finally:
+                libres.append(cliente)
+                semaforo.release()
+
+        async with contextlib.AsyncExitStack() as pila:
+            for cliente in clientes:
+                await pila.enter_async_context(cliente)
+
+            # Se adquiere antes de crear la tarea: con miles de mensajes no se
+            # crean miles de tareas a la vez, solo `concurrencia`
+            for telefono, respuesta_bot in mensajes:
+                await semaforo.acquire()
+                tarea = asyncio.ensure_future(enviar_y_liberar(telefono, respuesta_bot, libres.pop()))
+                pendientes.add(tarea)
+                tarea.add_done_callback(pendientes.discard)
+            if pendientes:
+                await asyncio.gather(*pendientes)
+
+    async def _enviar_uno(self, cliente, cubo, url, telefono, respuesta_bot):
+        """Un mensaje con los mismos reintentos que WhatsAppClient._post"""
+        try:
+            tipo, data = WhatsAppClient.construir_payload(telefono, respuesta_bot)
+        except (KeyError, TypeError, AttributeError) as e:
+            return ResultadoEnvio(telefono, False, None, 0, f'payload_invalido: {e}')
+
+        ultimo = self.max_reintentos
+        for intento in range(ultimo + 1):
+            await cubo.adquirir()
+            inicio = time.perf_counter()
+            response = None
+            resultado = 'excepcion'
+            try:
+                response = await cliente.post(url, json=data)
+                resultado = str(response.status_code)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                # La petición no llegó a enviarse: se puede reintentar
+                resultado = 'error_conexion'
+            except httpx.TimeoutException:
+                # Pudo haberse entregado: no se reintenta para no duplicar
+                resultado = 'timeout_lectura'
+            except httpx.HTTPError as e:
+                resultado = 'excepcion'
+                print(f"Error enviando mensaje a WhatsApp ({telefono}): {e!r}")
+            finally:
+                latencias_envio.observar(f'masivo_{tipo}:{resultado}', (time.perf_counter() - inicio) * 1000)
+
+            if response is not None and response.status_code in (200, 201):
+                return ResultadoEnvio(telefono, True, response.status_code, intento + 1, None, _wamid(response))
+
+            reintentable = (resultado == 'error_conexion' or
+                            (response is not None and response.status_code in CODIGOS_REINTENTABLES))
+            if not reintentable or intento == ultimo:
+                if response is not None:
+                    return ResultadoEnvio(telefono, False, response.status_code, intento + 1, response.text[:500])
+                return ResultadoEnvio(telefono, False, None, intento + 1, resultado)
+
+            espera = espera_reintento(response, intento)
+            if response is not None and response.status_code == 429:
+                # El límite es del número emisor: frenar a todos, no solo a este envío
+                cubo.pausar(espera)
+            await asyncio.sleep(espera)
+
+    def _reportar(self, resultados):
+        if self.al_lote is None:
+            return
+        try:
+            self.al_lote(resultados)
+        except Exception as e:
+            print(f"Error reportando lote de envíos: {e}")
+
+
+def _wamid(response):
+    try:
+        return response.json()['messages'][0]['id']
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def enviar_masivo(mensajes, **opciones):
+    """
+    Fachada síncrona para el código Flask: bloquea hasta terminar todos los
+    envíos y devuelve el resumen de EnviadorMasivo.enviar
+
+    No se puede llamar desde un hilo que ya tenga un event loop corriendo.
+    """
+    return asyncio.run(EnviadorMasivo(**opciones).enviar(mensajes))
@@ -0,0 +1,359 @@
+"""
+Estadísticas de tickets desde la tabla resumen ticket_stats
+Las páginas y endpoints de estadísticas hacían GROUP BY sobre toda la tabla
+tickets en cada petición. Con TICKET_STATS_ROLLUP activo leen ticket_stats:
+un contador por (día de creación, estado, categoría, subcategoría,
+prioridad, técnico), del orden de los grupos y no de los tickets.
+
+El resumen se mantiene en la misma transacción que el ticket: un listener
+de la sesión de SQLAlchemy suma 1 al grupo de cada ticket nuevo y, cuando
+cambia el estado, el técnico, la prioridad o la categoría de un ticket,
+resta 1 al grupo anterior y suma 1 al nuevo. Cubre todos los lugares que
+crean o modifican tickets con el ORM (portal, API y chatbot); las escrituras
+con SQL directo (UPDATE/INSERT masivos) no pasan por aquí y requieren
+reconstruir.
+
+El resumen se mantiene siempre que la tabla ticket_stats exista, con o sin
+TICKET_STATS_ROLLUP: el flag solo decide si las lecturas la usan. Así no se
+pierden los cambios hechos entre la carga y la activación, y el flag puede
+apagarse y volver a encenderse sin que el resumen se desvíe.
+
+Para activarlo en una base existente: crear la tabla y cargarla con
+`python estadisticas_tickets.py reconstruir` (desde entonces la aplicación la
+mantiene), y luego TICKET_STATS_ROLLUP=true.
+`python estadisticas_tickets.py verificar` compara el resumen con los tickets.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, desc, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Ticket, Usuario, EstadisticaTicket
+from utils.resumen_dashboard import ESTADOS_CERRADOS
+from utils.cache_respuestas import invalidar_cache
+
+# Columnas de Ticket que definen el grupo (además del día de fecha_creacion)
+DIMENSIONES = ('estado', 'categoria', 'subcategoria', 'prioridad', 'tecnico_id')
+
+INSERT_CON_CONFLICTO = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def rollup_activo():
+    """Si las lecturas de estadísticas usan ticket_stats (el mantenimiento no depende de esto)"""
+    return has_app_context() and bool(current_app.config.get('TICKET_STATS_ROLLUP'))
+
+
+# Motores en los que ya se vio la tabla ticket_stats (no se vuelve a consultar el catálogo)
+_motores_con_resumen = set()
+
+
+def _resumen_existe(conn):
+    """
+    Si la base tiene la tabla ticket_stats; mientras falte (base sin migrar)
+    se vuelve a comprobar en cada flush con cambios de tickets
+    """
+    if conn.engine in _motores_con_resumen:
+        return True
+    if inspect(conn).has_table(EstadisticaTicket.__tablename__):
+        _motores_con_resumen.add(conn.engine)
+        return True
+    return False
+
+
+# --- Mantenimiento incremental ---
+
+def _grupo(fecha_creacion, estado, categoria, subcategoria, prioridad, tecnico_id):
+    """Clave del grupo en ticket_stats (sin NULL, para que la restricción única aplique)"""
+    return (
+        (fecha_creacion or datetime.utcnow()).date(),
+        estado or '',
+        categoria or '',
+        subcategoria or '',
+        prioridad or '',
+        tecnico_id or 0,
+    )
+
+
+def _grupo_actual(ticket):
+    return _grupo(ticket.fecha_creacion, *(getattr(ticket, columna) for columna in DIMENSIONES))
+
+
+def _grupo_anterior(ticket):
+    """Grupo del ticket antes de los cambios pendientes (según el historial de atributos)"""
+    atributos = inspect(ticket).attrs
+    valores = []
+    for columna in ('fecha_creacion',) + DIMENSIONES:
+        historial = atributos[columna].history
+        if historial.deleted:
+            valores.append(historial.deleted[0])
+        else:
+            valores.append(getattr(ticket, columna))
+    return _grupo(*valores)
+
+
+def _valor_anterior(ticket, valor, anterior, iniciador):
+    """Sin efecto: solo obliga a conservar el valor anterior aunque el atributo no estuviera cargado"""
+
+
+for _columna in ('fecha_creacion',) + DIMENSIONES:
+    event.listen(getattr(Ticket, _columna), 'set', _valor_anterior, active_history=True)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _eliminados_antes_del_flush(session, contexto, instancias):
+    """Tickets eliminados: su grupo se lee antes de que la fila desaparezca"""
+    for ticket in session.deleted:
+        if isinstance(ticket, Ticket):
+            session.info.setdefault('estadisticas_tickets', Counter())[_grupo_anterior(ticket)] -= 1
+
+
+@event.listens_for(db.session, 'after_flush')
+def _aplicar_despues_del_flush(session, contexto):
+    """
+    Tickets nuevos (ya con los valores por defecto) y modificados; new, dirty
+    y el historial de atributos todavía reflejan el estado previo al flush
+    """
+    cambios = session.info.pop('estadisticas_tickets', Counter())
+    for ticket in session.new:
+        if isinstance(ticket, Ticket):
+            cambios[_grupo_actual(ticket)] += 1
+    for ticket in session.dirty:
+        if isinstance(ticket, Ticket) and session.is_modified(ticket):
+            anterior, actual = _grupo_anterior(ticket), _grupo_actual(ticket)
+            if anterior != actual:
+                cambios[anterior] -= 1
+                cambios[actual] += 1
+    if not any(cambios.values()):
+        return
+    conn = session.connection()
+    if _resumen_existe(conn):
+        aplicar_cambios(conn, cambios)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_tras_rollback(session):
+    session.info.pop('estadisticas_tickets', None)
+
+
+def aplicar_cambios(conn, cambios):
+    """
+    Suma los cambios a ticket_stats con un upsert por lote
+
+    Args:
+        conn: Conexión de la transacción del ticket
+        cambios: {grupo: +n / -n}
+    """
+    filas = [
+        dict(zip(('dia',) + DIMENSIONES, grupo), total=delta)
+        for grupo, delta in cambios.items() if delta
+    ]
+    if not filas:
+        return
+
+    tabla = EstadisticaTicket.__table__
+    insert = INSERT_CON_CONFLICTO.get(conn.dialect.name)
+    if insert is not None:
+        sentencia = insert(tabla)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=['dia', *DIMENSIONES],
+            set_={'total': tabla.c.total + sentencia.excluded.total}
+        )
+        conn.execute(sentencia, filas)
+        return
+
+    # Otros motores: UPDATE y, si el grupo no existía, INSERT
+    for fila in filas:
+        condicion = [tabla.c[columna] == fila[columna] for columna in ('dia',) + DIMENSIONES]
+        resultado = conn.execute(tabla.update().where(*condicion).values(total=tabla.c.total + fila['total']))
+        if resultado.rowcount == 0:
+            conn.execute(tabla.insert(), fila)
+
+
+# --- Reconstrucción y verificación ---
+
+def _conteo_desde_tickets():
+    """Los grupos de ticket_stats calculados con GROUP BY sobre tickets"""
+    dia = func.date(Ticket.fecha_creacion)
+    columnas = [
+        dia.label('dia'),
+        func.coalesce(Ticket.estado, '').label('estado'),
+        func.coalesce(Ticket.categoria, '').label('categoria'),
+        func.coalesce(Ticket.subcategoria, '').label('subcategoria'),
+        func.coalesce(Ticket.prioridad, '').label('prioridad'),
+        func.coalesce(Ticket.tecnico_id, 0).label('tecnico_id'),
+        func.count(Ticket.id).label('total'),
+    ]
+    return db.session.query(*columnas).group_by(*columnas[:-1])
+
+
+def reconstruir():
+    """
+    Vacía ticket_stats y la vuelve a cargar desde tickets en una transacción
+
+    Returns:
+        int: Grupos cargados
+    """
+    tabla = EstadisticaTicket.__table__
+    consulta = _conteo_desde_tickets().subquery()
+    db.session.execute(tabla.delete())
+    db.session.execute(tabla.insert().from_select(
+        ['dia', *DIMENSIONES, 'total'],
+        db.select(consulta.c.dia, *(consulta.c[columna] for columna in DIMENSIONES), consulta.c.total)
+    ))
+    db.session.commit()
+    invalidar_cache('tickets')
+    return db.session.query(func.count(EstadisticaTicket.id)).scalar()
+
+
+def verificar():
+    """
+    Compara ticket_stats con el conteo sobre tickets
+
+    Returns:
+        list[dict]: Grupos con diferencias (grupo, esperado, resumen); vacía si coinciden
+    """
+    esperado = Counter()
+    for fila in _conteo_desde_tickets():
+        dia = fila.dia if not isinstance(fila.dia, str) else datetime.strptime(fila.dia, '%Y-%m-%d').date()
+        esperado[(dia,) + tuple(fila[1:-1])] = fila.total
+
+    resumen = Counter()
+    for fila in db.session.query(EstadisticaTicket.dia, *(getattr(EstadisticaTicket, c) for c in DIMENSIONES),
+                                 EstadisticaTicket.total):
+        resumen[tuple(fila[:-1])] += fila.total
+
+    return [
+        {'grupo': grupo, 'esperado': esperado.get(grupo, 0), 'resumen': resumen.get(grupo, 0)}
+        for grupo in sorted(esperado.keys() | resumen.keys(), key=str)
+        if esperado.get(grupo, 0) != resumen.get(grupo, 0)
+    ]
+
+
+# --- Lectura (endpoints de estadísticas) ---
+
+def resumen_general(dias=30):
+    """
+    Datos de /dashboard/estadisticas y /api/dashboard/estadisticas
+
+    Con el resumen, "últimos `dias` días" se cuenta por día de creación
+    (incluye el día completo de la fecha límite).
+
+    Returns:
+        dict: total_tickets, tickets_abiertos, tickets_por_estado [(estado, count)],
+            tickets_por_categoria [(categoria, count)] y tecnicos_activos
+            [(nombre, tickets_asignados)] de los últimos `dias` días
+    """
+    fecha_limite = datetime.utcnow() - timedelta(days=dias)
+
+    if not rollup_activo():
+        return _resumen_general_tickets(fecha_limite)
+
+    total = func.sum(EstadisticaTicket.total)
+    tickets_por_estado = db.session.query(
+        EstadisticaTicket.estado, total.label('count')
+    ).group_by(EstadisticaTicket.estado).having(total != 0).all()
+
+    tickets_por_categoria = db.session.query(
+        EstadisticaTicket.categoria, total.label('count')
+    ).filter(
+        EstadisticaTicket.dia >= fecha_limite.date()
+    ).group_by(EstadisticaTicket.categoria).having(total != 0).all()
+
+    tecnicos_activos = db.session.query(
+        Usuario.nombre, total.label('tickets_asignados')
+    ).join(
+        Usuario, Usuario.id == EstadisticaTicket.tecnico_id
+    ).filter(
+        Usuario.es_tecnico == True,
+        EstadisticaTicket.dia >= fecha_limite.date()
+    ).group_by(Usuario.id, Usuario.nombre).having(total != 0).order_by(
+        desc('tickets_asignados')
+    ).limit(5).all()
+
+    return {
+        'total_tickets': sum(cantidad for _, cantidad in tickets_por_estado),
+        'tickets_abiertos': sum(cantidad for estado, cantidad in tickets_por_estado
+                                if estado not in ESTADOS_CERRADOS),
+        'tickets_por_estado': tickets_por_estado,
+        'tickets_por_categoria': tickets_por_categoria,
+        'tecnicos_activos': tecnicos_activos,
+    }
+
+
+def _resumen_general_tickets(fecha_limite):
+    """Las mismas estadísticas con GROUP BY sobre tickets (sin el resumen)"""
+    total_tickets = Ticket.query.count()
+    tickets_abiertos = Ticket.query.filter(
+        Ticket.estado.notin_(ESTADOS_CERRADOS)
+    ).count()
+
+    tickets_por_estado = db.session.query(
+        Ticket.estado,
+        func.count(Ticket.id).label('count')
+    ).group_by(Ticket.estado).all()
+
+    tickets_por_categoria = db.session.query(
+        Ticket.categoria,
+        func.count(Ticket.id).label('count')
+    ).filter(
+        Ticket.fecha_creacion >= fecha_limite
+    ).group_by(Ticket.categoria).all()
+
+    tecnicos_activos = db.session.query(
+        Usuario.nombre,
+        func.count(Ticket.id).label('tickets_asignados')
+    ).join(
+        Ticket, Usuario.id == Ticket.tecnico_id
+    ).filter(
+        Usuario.es_tecnico == True,
+        Ticket.fecha_creacion >= fecha_limite
+    ).group_by(Usuario.id, Usuario.nombre).order_by(
+        desc('tickets_asignados')
+    ).limit(5).all()
+
+    return {
+        'total_tickets': total_tickets,
+        'tickets_abiertos': tickets_abiertos,
+        'tickets_por_estado': tickets_por_estado,
+        'tickets_por_categoria': tickets_por_categoria,
+        'tecnicos_activos': tecnicos_activos,
+    }
+
+
+def totales_por_categoria(categoria=None):
+    """
+    Tickets totales y abiertos por categoría, o por subcategoría de `categoria`
+
+    Returns:
+        list[dict]: {'categoria' o 'subcategoria', 'total', 'abiertos'}
+    """
+    if rollup_activo():
+        modelo, columna_categoria = EstadisticaTicket, EstadisticaTicket.categoria
+        total = func.sum(EstadisticaTicket.total)
+        abiertos = func.sum(db.case([(EstadisticaTicket.estado.in_(ESTADOS_CERRADOS), 0)],
+                                    else_=EstadisticaTicket.total))
+    else:
+        modelo, columna_categoria = Ticket, Ticket.categoria
+        total = func.count(Ticket.id)
+        abiertos = func.sum(db.case([(Ticket.estado.in_(ESTADOS_CERRADOS), 0)], else_=1))
+
+    campo = 'subcategoria' if categoria else 'categoria'
+    grupo = getattr(modelo, campo)
+    consulta = db.session.query(grupo, total.label('total'), abiertos.label('abiertos'))
+    if categoria:
+        consulta = consulta.filter(columna_categoria == categoria)
+    resultado = []
+    for fila in consulta.group_by(grupo).all():
+        if not fila.total:
+            continue
+        valor = getattr(fila, campo)
+        resultado.append({
+            # En el resumen '' es "sin subcategoría"
+            campo: None if valor == '' and modelo is EstadisticaTicket else valor,
+            'total': fila.total,
+            'abiertos': fila.abiertos or 0
+        })
+    return resultado
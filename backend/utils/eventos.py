@@ -0,0 +1,426 @@
+"""
+Bus de eventos del proceso para el ciclo de vida de tickets y artículos
+Los tickets se crean en tres lugares (portal, API y chatbot) y cambian de
+estado en dos; lo que reacciona a esos cambios (caché de estadísticas,
+notificaciones en tiempo real, índice de búsqueda) se suscribe aquí a
+eventos tipados en lugar de volver a consultar la base de datos:
+
+- TicketCreado(ticket, origen)
+- TicketEstadoCambiado(ticket, anterior)
+- ComentarioAgregado(ticket_id, comentario_id, autor_id, es_interno)
+- ArticuloCambiado(articulo_id, activo, articulo)
+- VistasActualizadas(vistas)
+
+`ticket` y `anterior` son instantanea_ticket (copias, fuera de la sesión de
+SQLAlchemy); `articulo` es DatosArticulo; `vistas` es {articulo_id: vistas}
+con los totales leídos de la BD al escribir un lote de utils/contador_vistas.py.
+
+Quien escribe llama registrar_evento(...) dentro de la transacción; los
+eventos se publican al confirmarse (commit) y se descartan con rollback.
+Lo que escribe fuera de db.session (el contador de vistas) publica con
+bus_eventos.publicar(...) después de su propia transacción.
+
+Suscriptores:
+- síncronos (hilos=0): se ejecutan en el hilo que hizo commit, justo
+  después; deben ser rápidos y no usar db.session (la transacción ya terminó)
+- en hilos (hilos>0): cola acotada propia atendida por `hilos` hilos dentro
+  de un contexto de la aplicación. Si la cola está llena, quien publica
+  espera hasta EVENTOS_ESPERA segundos y luego descarta el evento para ese
+  suscriptor (contrapresión: se cuentan esperas y descartes). Sin
+  INICIAR_TRABAJADORES (scripts, tests) no hay hilos y se ejecutan en línea
+
+GET /api/dashboard/estadisticas-eventos muestra publicados, entregas,
+errores, profundidad de las colas y latencias por suscriptor.
+
+La tabla resumen ticket_stats (utils/estadisticas_tickets.py) no se
+suscribe: se actualiza en la misma transacción que el ticket, y los eventos
+se publican después del commit.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple, Counter
+from sqlalchemy import event, inspect
+from models import db
+from utils.metricas import Histograma
+
+logger = logging.getLogger(__name__)
+
+# --- Eventos ---
+
+TicketCreado = namedtuple('TicketCreado', 'ticket origen')
+TicketEstadoCambiado = namedtuple('TicketEstadoCambiado', 'ticket anterior')
+ComentarioAgregado = namedtuple('ComentarioAgregado', 'ticket_id comentario_id autor_id es_interno')
+ArticuloCambiado = namedtuple('ArticuloCambiado', 'articulo_id activo articulo')
+VistasActualizadas = namedtuple('VistasActualizadas', 'vistas')
+
+# Lo que necesitan los índices en memoria de un artículo
+DatosArticulo = namedtuple('DatosArticulo', 'id titulo contenido palabras_clave categoria subcategoria vistas activo')
+
+# Campos del ticket que viajan en los eventos
+CAMPOS_TICKET = ('id', 'titulo', 'estado', 'prioridad', 'tecnico_id', 'fecha_creacion')
+
+
+def instantanea_ticket(ticket, usuario_nombre=None):
+    """
+    Campos del ticket que viajan en los eventos (copia, fuera de la sesión)
+
+    El nombre del usuario solo se incluye si el ticket está 'nuevo' (lo
+    muestran las notificaciones); sin usuario_nombre se toma de ticket.usuario.
+    """
+    datos = {campo: getattr(ticket, campo) for campo in CAMPOS_TICKET}
+    if ticket.estado == 'nuevo':
+        datos['usuario'] = usuario_nombre or ticket.usuario.nombre
+    return datos
+
+
+def _instantanea_anterior(ticket):
+    """instantanea_ticket antes de los cambios pendientes (historial de atributos, sin usuario)"""
+    atributos = inspect(ticket).attrs
+    datos = {}
+    for campo in CAMPOS_TICKET:
+        historial = atributos[campo].history
+        datos[campo] = historial.deleted[0] if historial.deleted else getattr(ticket, campo)
+    return datos
+
+
+def ticket_creado(ticket, origen, usuario_nombre=None):
+    """TicketCreado de un ticket ya insertado (después del flush, con id)"""
+    return TicketCreado(instantanea_ticket(ticket, usuario_nombre), origen)
+
+
+def ticket_estado_cambiado(ticket):
+    """
+    TicketEstadoCambiado de un cambio de estado o de técnico
+
+    Se llama después de modificar el ticket y antes del flush: los valores
+    anteriores salen del historial de atributos. Cargar ticket.usuario (estado
+    'nuevo') haría autoflush y vaciaría ese historial, por eso `anterior` va
+    primero y sin autoflush.
+    """
+    with db.session.no_autoflush:
+        anterior = _instantanea_anterior(ticket)
+        return TicketEstadoCambiado(instantanea_ticket(ticket), anterior)
+
+
+def comentario_agregado(comentario):
+    """ComentarioAgregado de un comentario ya insertado"""
+    return ComentarioAgregado(comentario.ticket_id, comentario.id, comentario.autor_id, bool(comentario.es_interno))
+
+
+def articulo_cambiado(articulo):
+    """ArticuloCambiado de un artículo creado, editado o desactivado (con id)"""
+    return ArticuloCambiado(articulo.id, bool(articulo.activo), DatosArticulo(
+        id=articulo.id,
+        titulo=articulo.titulo,
+        contenido=articulo.contenido,
+        palabras_clave=articulo.palabras_clave,
+        categoria=articulo.categoria,
+        subcategoria=articulo.subcategoria,
+        vistas=articulo.vistas or 0,
+        activo=bool(articulo.activo)
+    ))
+
+
+# --- Suscriptores ---
+
+class Suscriptor:
+    """Suscriptor síncrono: se ejecuta en el hilo que publica"""
+
+    def __init__(self, nombre, funcion):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.latencia = Histograma()
+        self._contadores = Counter()
+
+    def entregar(self, evento):
+        inicio = time.perf_counter()
+        try:
+            self.funcion(evento)
+            self._contadores['procesados'] += 1
+        except Exception:
+            self._contadores['errores'] += 1
+            logger.exception('Error en el suscriptor %s con %s', self.nombre, type(evento).__name__)
+        finally:
+            self.latencia.observar((time.perf_counter() - inicio) * 1000)
+
+    def iniciar(self, app):
+        pass
+
+    def detener(self, timeout=None):
+        pass
+
+    def estadisticas(self):
+        return {
+            'modo': 'sincrono',
+            'procesados': self._contadores['procesados'],
+            'errores': self._contadores['errores'],
+            'latencia': self.latencia.a_dict(),
+        }
+
+
+class SuscriptorEnHilos(Suscriptor):
+    """Suscriptor con cola acotada propia atendida por un grupo de hilos"""
+
+    def __init__(self, nombre, funcion, hilos=1, maximo_cola=1000, espera=0.0):
+        super().__init__(nombre, funcion)
+        self.hilos = hilos
+        self.espera = espera
+        self.cola = queue.Queue(maxsize=maximo_cola)
+        self.espera_cola = Histograma()
+        self.profundidad_maxima = 0
+        self._descartando = False
+        self._lock = threading.Lock()
+        self._app = None
+        self._hilos = []
+
+    def entregar(self, evento):
+        """Encola el evento; con la cola llena espera `espera` segundos y luego lo descarta"""
+        if not self._hilos:
+            # Sin hilos arrancados: en línea, como un suscriptor síncrono
+            return super().entregar(evento)
+        elemento = (time.perf_counter(), evento)
+        try:
+            self.cola.put_nowait(elemento)
+        except queue.Full:
+            with self._lock:
+                self._contadores['esperas'] += 1
+            try:
+                if not self.espera:
+                    raise queue.Full
+                self.cola.put(elemento, timeout=self.espera)
+            except queue.Full:
+                with self._lock:
+                    self._contadores['descartados'] += 1
+                    avisar, self._descartando = not self._descartando, True
+                if avisar:
+                    # Un aviso por racha de descartes, no uno por evento
+                    logger.warning('Cola del suscriptor %s llena: se descartan eventos', self.nombre)
+                return
+        with self._lock:
+            self._descartando = False
+            self._contadores['encolados'] += 1
+            self.profundidad_maxima = max(self.profundidad_maxima, self.cola.qsize())
+
+    def iniciar(self, app):
+        self._app = app
+        while len(self._hilos) < self.hilos:
+            hilo = threading.Thread(
+                target=self._bucle, name=f'eventos-{self.nombre}-{len(self._hilos)}', daemon=True
+            )
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def detener(self, timeout=10):
+        """Procesa lo encolado y detiene los hilos"""
+        for _ in self._hilos:
+            self.cola.put(None)
+        for hilo in self._hilos:
+            hilo.join(timeout=timeout)
+        self._hilos = []
+
+    def _bucle(self):
+        while True:
+            elemento = self.cola.get()
+            if elemento is None:
+                self.cola.task_done()
+                break
+            encolado, evento = elemento
+            self.espera_cola.observar((time.perf_counter() - encolado) * 1000)
+            with self._app.app_context():
+                inicio = time.perf_counter()
+                try:
+                    self.funcion(evento)
+                    with self._lock:
+                        self._contadores['procesados'] += 1
+                except Exception:
+                    with self._lock:
+                        self._contadores['errores'] += 1
+                    logger.exception('Error en el suscriptor %s con %s', self.nombre, type(evento).__name__)
+                finally:
+                    self.latencia.observar((time.perf_counter() - inicio) * 1000)
+                    self.cola.task_done()
+
+    def esperar(self):
+        """Bloquea hasta procesar todo lo encolado"""
+        self.cola.join()
+
+    def estadisticas(self):
+        with self._lock:
+            contadores = dict(self._contadores)
+            profundidad_maxima = self.profundidad_maxima
+        return {
+            'modo': 'hilos' if self._hilos else 'en_linea',
+            'hilos': self.hilos,
+            'encolados': contadores.get('encolados', 0),
+            'procesados': contadores.get('procesados', 0),
+            'errores': contadores.get('errores', 0),
+            'esperas': contadores.get('esperas', 0),
+            'descartados': contadores.get('descartados', 0),
+            'profundidad': self.cola.qsize(),
+            'profundidad_maxima': profundidad_maxima,
+            'capacidad': self.cola.maxsize,
+            'espera_en_cola': self.espera_cola.a_dict(),
+            'latencia': self.latencia.a_dict(),
+        }
+
+
+class BusEventos:
+    """Reparte cada evento a los suscriptores de su tipo"""
+
+    def __init__(self, maximo_cola=1000, espera=0.0):
+        self.maximo_cola = maximo_cola
+        self.espera = espera
+        self._lock = threading.Lock()
+        self._suscriptores = {}  # tipo -> [Suscriptor]
+        self._publicados = Counter()
+        self._app = None
+        self._con_hilos = False
+
+    def suscribir(self, tipos, funcion, hilos=0, maximo_cola=None, nombre=None):
+        """
+        Suscribe `funcion(evento)` a uno o varios tipos de evento
+
+        Args:
+            tipos: Clase de evento o tupla de clases
+            hilos: 0 para ejecutarla al publicar; >0 para atenderla en
+                ese número de hilos con una cola acotada
+            maximo_cola: Capacidad de la cola (por defecto EVENTOS_COLA_MAXIMA)
+        """
+        tipos = tipos if isinstance(tipos, tuple) else (tipos,)
+        nombre = nombre or f'{funcion.__module__}.{funcion.__name__}'
+        if hilos:
+            suscriptor = SuscriptorEnHilos(nombre, funcion, hilos=hilos,
+                                           maximo_cola=maximo_cola or self.maximo_cola, espera=self.espera)
+        else:
+            suscriptor = Suscriptor(nombre, funcion)
+        with self._lock:
+            for tipo in tipos:
+                self._suscriptores.setdefault(tipo, []).append(suscriptor)
+            app = self._app if self._con_hilos else None
+        if app is not None:
+            suscriptor.iniciar(app)
+        return suscriptor
+
+    def cancelar(self, suscriptor):
+        """Quita un suscriptor devuelto por suscribir() y detiene sus hilos"""
+        with self._lock:
+            for suscriptores in self._suscriptores.values():
+                if suscriptor in suscriptores:
+                    suscriptores.remove(suscriptor)
+        suscriptor.detener()
+
+    def suscriptor(self, *tipos, hilos=0, maximo_cola=None):
+        """
+        Decorador de suscripción
+
+        Uso:
+            @bus_eventos.suscriptor(TicketCreado, TicketEstadoCambiado)
+            def _invalidar_estadisticas(evento):
+                ...
+        """
+        def decorator(f):
+            self.suscribir(tipos, f, hilos=hilos, maximo_cola=maximo_cola)
+            return f
+        return decorator
+
+    def publicar(self, evento):
+        """Entrega el evento a sus suscriptores (los que usan hilos solo lo encolan)"""
+        with self._lock:
+            suscriptores = list(self._suscriptores.get(type(evento), ()))
+            self._publicados[type(evento).__name__] += 1
+        for suscriptor in suscriptores:
+            suscriptor.entregar(evento)
+
+    def _todos(self):
+        with self._lock:
+            unicos = {}
+            for suscriptores in self._suscriptores.values():
+                for suscriptor in suscriptores:
+                    unicos[id(suscriptor)] = suscriptor
+        return list(unicos.values())
+
+    def iniciar(self, app, maximo_cola=None, espera=None, hilos=True):
+        """Arranca los hilos de los suscriptores con la aplicación (con hilos=False quedan en línea)"""
+        if maximo_cola is not None:
+            self.maximo_cola = maximo_cola
+        if espera is not None:
+            self.espera = espera
+        with self._lock:
+            self._app = app
+            self._con_hilos = hilos
+        if not hilos:
+            return
+        for suscriptor in self._todos():
+            if isinstance(suscriptor, SuscriptorEnHilos):
+                suscriptor.espera = self.espera
+            suscriptor.iniciar(app)
+
+    def esperar(self):
+        """Bloquea hasta que los suscriptores en hilos procesen lo encolado (scripts y benchmarks)"""
+        for suscriptor in self._todos():
+            if isinstance(suscriptor, SuscriptorEnHilos):
+                suscriptor.esperar()
+
+    def detener(self):
+        """Procesa lo encolado y detiene los hilos (se llama al cerrar el proceso)"""
+        for suscriptor in self._todos():
+            suscriptor.detener()
+
+    def estadisticas(self):
+        with self._lock:
+            publicados = dict(self._publicados)
+            tipos = {suscriptor.nombre: sorted(tipo.__name__ for tipo, lista in self._suscriptores.items()
+                                               if suscriptor in lista)
+                     for lista in self._suscriptores.values() for suscriptor in lista}
+        return {
+            'publicados': publicados,
+            'suscriptores': {
+                suscriptor.nombre: {'eventos': tipos[suscriptor.nombre], **suscriptor.estadisticas()}
+                for suscriptor in sorted(self._todos(), key=lambda s: s.nombre)
+            },
+        }
+
+
+# Bus del proceso: los módulos se suscriben al importarse
+bus_eventos = BusEventos()
+
+
+def init_eventos(app):
+    """Con INICIAR_TRABAJADORES arranca los suscriptores en hilos del bus y los detiene al cerrar"""
+    trabajadores = bool(app.config.get('INICIAR_TRABAJADORES'))
+    bus_eventos.iniciar(
+        app,
+        maximo_cola=app.config.get('EVENTOS_COLA_MAXIMA', 1000),
+        espera=app.config.get('EVENTOS_ESPERA', 0.05),
+        hilos=trabajadores
+    )
+    if trabajadores:
+        atexit.register(bus_eventos.detener)
+    app.extensions['eventos'] = bus_eventos
+    return bus_eventos
+
+
+def obtener_bus_eventos():
+    return bus_eventos
+
+
+# --- Eventos registrados en la transacción y publicados al confirmarla ---
+
+def registrar_evento(evento):
+    """Publica el evento cuando se confirme la transacción actual de db.session"""
+    db.session.info.setdefault('eventos', []).append(evento)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publicar_tras_commit(session):
+    eventos = session.info.pop('eventos', None)
+    for evento in eventos or ():
+        bus_eventos.publicar(evento)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_tras_rollback(session):
+    session.info.pop('eventos', None)
@@ -0,0 +1,195 @@
+"""
+Definición declarativa del flujo del chatbot y su compilación
+Los menús, textos y transiciones fijas se declaran aquí como datos; al
+arrancar, compilar_flujo() los combina con Config.MAIN_CATEGORIES y produce
+tablas de solo lectura (MappingProxyType y tuplas) con las respuestas ya
+armadas. ChatbotFlowManager (routes/chatbot.py) solo consulta esas tablas:
+ningún mensaje vuelve a construir diccionarios de mapeo, listas de opciones
+ni los textos fijos.
+
+Las respuestas compiladas se comparten entre mensajes: quien las recibe
+puede serializarlas o enviarlas, pero no modificarlas (copiar_respuesta()
+devuelve una copia del diccionario de primer nivel).
+"""
+from collections import namedtuple
+from types import MappingProxyType
+
+# --- Definición ---
+
+# Estados de la conversación y el método de ChatbotFlowManager que los atiende
+ESTADOS = (
+    ('inicio', 'estado_inicio'),
+    ('seleccionar_tipo', 'estado_seleccionar_tipo'),
+    ('seleccionar_categoria', 'estado_seleccionar_categoria'),
+    ('buscar_solucion', 'estado_buscar_solucion'),
+    ('crear_ticket', 'estado_crear_ticket'),
+    ('recopilar_descripcion', 'estado_recopilar_descripcion'),
+    ('buscar_con_descripcion', 'estado_buscar_con_descripcion'),
+    ('confirmar_ticket', 'estado_confirmar_ticket'),
+    ('finalizado', 'estado_finalizado'),
+)
+
+# Menú principal: (valor, texto, tipo de ayuda; las categorías de Config.MAIN_CATEGORIES)
+MENU_PRINCIPAL = (
+    ('problema', '🔧 Solucionar un problema', 'problemas_tecnicos'),
+    ('solicitud', '📝 Hacer una solicitud', 'solicitudes_software'),
+    ('consulta', '❓ Consulta general', 'consultas_generales'),
+    ('buscar', '🔍 Buscar en la base de conocimiento', 'buscar_conocimiento'),
+)
+
+# Mensajes que reinician o cancelan la conversación en cualquier estado
+PALABRAS_REINICIO = frozenset(['hola', 'hello', 'hi', 'reiniciar', 'menú', 'menu', 'inicio'])
+PALABRAS_CANCELAR = frozenset(['cancelar', 'salir', 'adiós', 'chao', 'cancel'])
+
+# Listas de opciones fijas: (texto, valor)
+OPCIONES = {
+    'crear_o_reiniciar': (('✅ Sí, crear ticket', 'si_crear'), ('🔄 Buscar otra cosa', 'reiniciar')),
+    'articulo_leido': (('✅ Sí, problema resuelto', 'resuelto'), ('❌ No, necesito más ayuda', 'crear_ticket'),
+                       ('🔄 Buscar otra cosa', 'reiniciar')),
+    'confirmar_ticket': (('✅ Sí, crear ticket', 'confirmar'), ('✏️ Modificar descripción', 'modificar'),
+                         ('❌ Cancelar', 'cancelar')),
+    # Se agregan al final de la lista de artículos encontrados
+    'ninguno_me_ayuda': (('❌ Ninguno me ayuda', 'crear_ticket'), ('🔄 Buscar otra cosa', 'reiniciar')),
+    'crear_directo': (('❌ No, crear el ticket', 'crear_ticket_directo'),),
+}
+
+# Respuestas fijas: nombre -> (mensaje, tipo, lista de OPCIONES o 'menu_principal' o None)
+RESPUESTAS = {
+    'menu_no_entendido': ('No entendí tu selección. Por favor elige una de las opciones:',
+                          'opciones', 'menu_principal'),
+    'pedir_busqueda': ('Perfecto, ¿Qué te gustaría buscar en nuestra base de conocimiento?',
+                       'texto_libre', None),
+    'no_entendido': ('No entendí tu respuesta. Por favor selecciona una de las opciones.', 'error', None),
+    'resuelto': ('¡Excelente! Me alegra haber podido ayudarte 😊\n\n'
+                 'Si necesitas ayuda en el futuro, no dudes en contactarme.\n\n'
+                 '¡Que tengas un buen día!', 'final', None),
+    'crear_no_entendido': ('No entendí tu respuesta. ¿Creamos un ticket de soporte?',
+                           'opciones', 'crear_o_reiniciar'),
+    'descripcion_corta': ('Por favor proporciona una descripción más detallada (mínimo 10 caracteres). '
+                          'Esto ayudará al técnico a entender mejor tu problema.', 'texto_libre', None),
+    'registro_requerido': ('Para crear el ticket necesito que te registres en nuestro sistema.\n\n'
+                           'Por favor visita: [Portal FocusIT] y regístrate con este número de teléfono.\n\n'
+                           'Una vez registrado, podrás crear tickets desde aquí.', 'final', None),
+    'modificar_descripcion': ('Perfecto, escribe nuevamente la descripción de tu problema:', 'texto_libre', None),
+    'ticket_cancelado': ('Ticket cancelado. Si necesitas ayuda en el futuro, no dudes en contactarme.\n\n'
+                         '¡Que tengas un buen día!', 'final', None),
+    'conversacion_cancelada': ('Entendido. He cancelado el proceso. Si necesitas algo más, solo di "hola". '
+                               '¡Que tengas un buen día!', 'final', None),
+}
+
+# Textos con datos de la conversación (se completan con str.format)
+SALUDO = ('{saludo}, tu asistente de TI de FocusIT 🤖\n\n'
+          'Estoy aquí para ayudarte. ¿Qué necesitas hoy?')
+CATEGORIA_ELEGIDA = ('Perfecto, me dices que necesitas ayuda con: **{categoria}**\n\n'
+                     'Para ayudarte mejor, ¿podrías ser más específico?')
+ELEGIR_SUBCATEGORIA = 'Por favor selecciona una de las opciones disponibles:'
+SIN_ARTICULOS = ('Entiendo que necesitas ayuda con: **{subcategoria}**\n\n'
+                 'No encontré artículos específicos para este tema, pero puedo ayudarte creando un ticket '
+                 'para que un técnico te asista.\n\n'
+                 '¿Te parece bien que creemos un ticket de soporte?')
+PEDIR_DESCRIPCION = ('Perfecto, voy a crear un ticket de soporte para: **{subcategoria}**\n\n'
+                     'Para que el técnico pueda ayudarte mejor, por favor describe tu problema con el mayor '
+                     'detalle posible:\n\n'
+                     '• ¿Qué estabas haciendo cuando ocurrió?\n'
+                     '• ¿Qué mensaje de error aparece (si hay alguno)?\n'
+                     '• ¿Desde cuándo ocurre este problema?\n\n'
+                     'Escribe tu descripción completa:')
+# Subcategoría que se muestra al pedir la descripción si no se eligió ninguna
+SUBCATEGORIA_POR_DEFECTO = 'problema'
+
+
+# --- Compilación ---
+
+FlujoCompilado = namedtuple('FlujoCompilado', [
+    'estados',              # estado -> nombre del método que lo atiende
+    'tipos',                # valor del menú principal -> tipo de ayuda
+    'categorias',           # categoría -> nombre visible
+    'subcategorias',        # categoría -> {subcategoría: nombre visible}
+    'menu_principal',       # tupla de opciones del menú principal
+    'respuestas',           # nombre -> respuesta fija
+    'saludos',              # con_nombre / sin_nombre -> plantilla del saludo
+    'categoria_elegida',    # categoría -> respuesta con su submenú
+    'elegir_subcategoria',  # categoría -> respuesta "selecciona una opción" con el submenú
+    'sin_articulos',        # nombre de subcategoría -> respuesta para crear ticket
+    'pedir_descripcion',    # (categoría, subcategoría) -> respuesta que pide la descripción
+    'opciones',             # nombre -> tupla de opciones fijas
+])
+
+
+def _opciones(pares):
+    return tuple({'texto': texto, 'valor': valor} for texto, valor in pares)
+
+
+def _respuesta(mensaje, tipo, opciones=None):
+    respuesta = {'mensaje': mensaje}
+    if opciones is not None:
+        respuesta['opciones'] = opciones
+    respuesta['tipo'] = tipo
+    return respuesta
+
+
+def compilar_flujo(categorias):
+    """
+    Arma las tablas de consulta del flujo a partir de la definición
+
+    Args:
+        categorias: Config.MAIN_CATEGORIES
+
+    Returns:
+        FlujoCompilado: Tablas de solo lectura
+    """
+    opciones = {nombre: _opciones(pares) for nombre, pares in OPCIONES.items()}
+    menu_principal = _opciones((texto, valor) for valor, texto, _ in MENU_PRINCIPAL)
+
+    respuestas = {}
+    for nombre, (mensaje, tipo, lista) in RESPUESTAS.items():
+        if lista == 'menu_principal':
+            respuestas[nombre] = _respuesta(mensaje, tipo, menu_principal)
+        else:
+            respuestas[nombre] = _respuesta(mensaje, tipo, opciones[lista] if lista else None)
+
+    nombres_categoria, subcategorias = {}, {}
+    categoria_elegida, elegir_subcategoria, sin_articulos, pedir_descripcion = {}, {}, {}, {}
+    for categoria, info in categorias.items():
+        nombres_categoria[categoria] = info.get('name', categoria)
+        subs = info.get('subcategories', {})
+        subcategorias[categoria] = MappingProxyType(dict(subs))
+        submenu = _opciones((nombre, clave) for clave, nombre in subs.items())
+        categoria_elegida[categoria] = _respuesta(
+            CATEGORIA_ELEGIDA.format(categoria=info.get('name', 'Ayuda general')), 'opciones', submenu
+        )
+        elegir_subcategoria[categoria] = _respuesta(ELEGIR_SUBCATEGORIA, 'opciones', submenu)
+        for clave, nombre in subs.items():
+            sin_articulos[nombre] = _respuesta(
+                SIN_ARTICULOS.format(subcategoria=nombre), 'opciones', opciones['crear_o_reiniciar']
+            )
+            pedir_descripcion[(categoria, clave)] = _respuesta(
+                PEDIR_DESCRIPCION.format(subcategoria=nombre), 'texto_libre'
+            )
+    respuestas['elegir_subcategoria'] = _respuesta(ELEGIR_SUBCATEGORIA, 'opciones', ())
+    respuestas['pedir_descripcion'] = _respuesta(
+        PEDIR_DESCRIPCION.format(subcategoria=SUBCATEGORIA_POR_DEFECTO), 'texto_libre'
+    )
+
+    return FlujoCompilado(
+        estados=MappingProxyType(dict(ESTADOS)),
+        tipos=MappingProxyType({valor: tipo for valor, _, tipo in MENU_PRINCIPAL}),
+        categorias=MappingProxyType(nombres_categoria),
+        subcategorias=MappingProxyType(subcategorias),
+        menu_principal=menu_principal,
+        respuestas=MappingProxyType(respuestas),
+        saludos=MappingProxyType({
+            'con_nombre': SALUDO.format(saludo='¡Hola, {nombre}! Soy VisioBot'),
+            'sin_nombre': SALUDO.format(saludo='¡Hola! Soy VisioBot'),
+        }),
+        categoria_elegida=MappingProxyType(categoria_elegida),
+        elegir_subcategoria=MappingProxyType(elegir_subcategoria),
+        sin_articulos=MappingProxyType(sin_articulos),
+        pedir_descripcion=MappingProxyType(pedir_descripcion),
+        opciones=MappingProxyType(opciones),
+    )
+
+
+def copiar_respuesta(plantilla):
+    """Copia de primer nivel de una respuesta compilada (las opciones se comparten)"""
+    return dict(plantilla)
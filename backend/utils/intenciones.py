@@ -0,0 +1,123 @@
+"""
+Detección de intención y entidades en mensajes del chatbot
+Las palabras clave se compilan una vez en un diccionario forma -> subcategoría
+(lema sin tildes y su raíz), así cada token se resuelve con una búsqueda en
+diccionario en vez de recorrer todas las listas.
+"""
+from config import Config
+from utils.nlp import obtener_nlp
+from utils.texto import plegar_acentos, raiz
+
+PALABRAS_PROBLEMA = ['problema', 'error', 'no funciona', 'roto', 'atasco', 'lento', 'caído', 'falla']
+
+# En un sistema más avanzado, esto vendría de la Base de Datos
+MAPA_ENTIDADES = {
+    'computador_celular': ['computador', 'pc', 'laptop', 'celular', 'pantalla', 'teclado', 'ratón', 'monitor'],
+    'impresoras': ['impresora', 'imprimir', 'factura', 'atasco', 'tinta', 'toner'],
+    'software_optica': ['agilmed', 'software', 'aplicativo', 'citas', 'historia'],
+    'reset_password': ['contraseña', 'password', 'acceso', 'clave', 'sesión'],
+    'carpetas_compartidas': ['carpeta', 'red', 'servidor', 'archivos', 'compartido']
+}
+
+
+def _formas(palabra):
+    """Formas con las que se reconoce una palabra clave: sin tildes y su raíz"""
+    palabra = plegar_acentos(palabra)
+    return {palabra, raiz(palabra)}
+
+
+def _compilar():
+    problema, frases_problema = set(), []
+    for palabra in PALABRAS_PROBLEMA:
+        if ' ' in palabra:
+            frases_problema.append(f' {plegar_acentos(palabra)} ')
+        else:
+            problema |= _formas(palabra)
+
+    categoria_de = {
+        subcategoria: categoria
+        for categoria, datos in Config.MAIN_CATEGORIES.items()
+        for subcategoria in datos.get('subcategories', {})
+    }
+
+    entidades = {}
+    for subcategoria, palabras in MAPA_ENTIDADES.items():
+        if subcategoria not in categoria_de:
+            continue
+        for palabra in palabras:
+            for forma in _formas(palabra):
+                # Si una palabra aparece en dos listas gana la primera (como antes)
+                entidades.setdefault(forma, (categoria_de[subcategoria], subcategoria))
+
+    return frozenset(problema), tuple(frases_problema), entidades
+
+
+_PROBLEMA, _FRASES_PROBLEMA, _ENTIDADES = _compilar()
+
+
+def analizar_lemas(lemas):
+    """
+    Intención y entidades a partir de los lemas de un mensaje
+
+    Args:
+        lemas: Lista de lemas (o palabras) del mensaje
+
+    Returns:
+        dict | None: {'intencion', 'entidades': {'categoria', 'subcategoria'}}
+    """
+    formas = [plegar_acentos(lema) for lema in lemas]
+
+    intencion = None
+    texto = f" {' '.join(formas)} "
+    if any(forma in _PROBLEMA or raiz(forma) in _PROBLEMA for forma in formas) or \
+            any(frase in texto for frase in _FRASES_PROBLEMA):
+        intencion = 'reportar_problema'
+
+    if not intencion:
+        return None
+
+    for forma in formas:
+        encontrado = _ENTIDADES.get(forma) or _ENTIDADES.get(raiz(forma))
+        if encontrado:
+            categoria, subcategoria = encontrado
+            return {
+                'intencion': intencion,
+                'entidades': {'categoria': categoria, 'subcategoria': subcategoria}
+            }
+
+    return None
+
+
+def lemas_de(doc):
+    """Lemas de un Doc de spaCy (el texto del token si el pipeline no lematiza)"""
+    return [token.lemma_ or token.lower_ for token in doc]
+
+
+def entender_mensaje_nlp(mensaje):
+    """
+    Intenta entender la intención y las entidades de un mensaje usando NLP simple.
+    """
+    nlp = obtener_nlp()
+    if not nlp:
+        return None # spaCy desactivado, no instalado o aún cargando
+
+    return analizar_lemas(lemas_de(nlp(mensaje.lower())))
+
+
+def entender_mensajes_nlp(mensajes, batch_size=None):
+    """
+    Igual que entender_mensaje_nlp para una lista de mensajes, procesados en
+    lotes con nlp.pipe (una sola pasada del pipeline por lote)
+
+    Returns:
+        list: Un resultado (dict o None) por mensaje, en el mismo orden
+    """
+    nlp = obtener_nlp()
+    if not nlp:
+        return [None] * len(mensajes)
+
+    docs = nlp.pipe(
+        (mensaje.lower() for mensaje in mensajes),
+        batch_size=batch_size or Config.NLP_BATCH_SIZE
+    )
+    return [analizar_lemas(lemas_de(doc)) for doc in docs]
@@ -0,0 +1,344 @@
+"""
+Índice invertido en memoria para la Base de Conocimiento
+Alternativa a FTS cuando la base de datos no lo soporta: tokens sin tildes
+y con stemming en español, postings compactos (array) y actualización
+incremental al crear, editar o eliminar artículos.
+
+Además de la búsqueda AND (buscar), buscar_relevantes() ordena por BM25
+los documentos que comparten cualquier término con un texto libre (la
+descripción de un problema en el chatbot).
+
+Cada proceso mantiene su propio índice. utils/search.py lo mantiene al día
+con los eventos ArticuloCambiado del proceso, con VistasActualizadas al
+escribir el contador de vistas y, para lo que escriben otros workers,
+comparando max(fecha_actualizacion) con la BD cada SEARCH_MEMORIA_SINCRONIZAR
+segundos.
+"""
+import heapq
+import math
+import threading
+from array import array
+from bisect import bisect_left
+from collections import namedtuple, Counter
+from utils.texto import terminos
+
+# Solo se guarda lo necesario para responder sin ir a la base de datos;
+# el contenido se trunca (los listados muestran como máximo 200 caracteres)
+Documento = namedtuple('Documento', 'id titulo contenido categoria subcategoria vistas')
+
+LARGO_CONTENIDO = 201
+PESOS_CAMPOS = (('titulo', 5), ('palabras_clave', 3), ('contenido', 1))
+
+# Parámetros de BM25: saturación de la frecuencia y normalización por largo
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class IndiceInvertido:
+    """Índice término -> (ids ordenados, pesos) con consultas AND y prefijo"""
+
+    def __init__(self, peso_vistas=0.5):
+        self.peso_vistas = peso_vistas
+        self.construido = False
+        self._lock = threading.RLock()
+        self._ids = {}       # termino -> array('I') de ids ordenados
+        self._pesos = {}     # termino -> array('H') paralelo con el peso del término
+        self._docs = {}      # id -> Documento
+        self._terminos_doc = {}   # id -> terminos del documento (para eliminar)
+        self._terminos_titulo = {}  # id -> terminos del título
+        self._largos = {}    # id -> largo ponderado del documento (suma de pesos, para BM25)
+        self._largo_total = 0
+        self._vocabulario = []
+        self._vocabulario_sucio = False
+        self._impacto = {}   # termino -> [(-puntaje, id)] ordenado, se invalida al escribir
+        self._aportes = {}   # (termino, k1, b) -> (cota, {id: aporte BM25}), se invalida al escribir
+
+    # --- Construcción y actualización ---
+
+    def construir(self, articulos):
+        """Reconstruye el índice completo desde un iterable de artículos"""
+        with self._lock:
+            self._ids, self._pesos = {}, {}
+            self._docs, self._terminos_doc, self._terminos_titulo = {}, {}, {}
+            self._largos, self._largo_total = {}, 0
+            for articulo in articulos:
+                self._agregar(articulo)
+            self._vocabulario_sucio = True
+            self._impacto, self._aportes = {}, {}
+            self.construido = True
+
+    def agregar(self, articulo):
+        """Agrega o reemplaza un artículo (los inactivos se eliminan)"""
+        with self._lock:
+            self._eliminar(articulo.id)
+            self._agregar(articulo)
+            self._vocabulario_sucio = True
+            self._impacto, self._aportes = {}, {}
+
+    def eliminar(self, articulo_id):
+        with self._lock:
+            self._eliminar(articulo_id)
+            self._vocabulario_sucio = True
+            self._impacto, self._aportes = {}, {}
+
+    def _agregar(self, articulo):
+        if not articulo.activo:
+            return
+
+        frecuencias = Counter()
+        for campo, peso in PESOS_CAMPOS:
+            for termino in terminos(getattr(articulo, campo)):
+                frecuencias[termino] += peso
+
+        for termino, peso in frecuencias.items():
+            ids = self._ids.get(termino)
+            if ids is None:
+                self._ids[termino] = array('I', [articulo.id])
+                self._pesos[termino] = array('H', [min(peso, 65535)])
+                continue
+            if ids[-1] < articulo.id:
+                # Caso habitual al construir (ids crecientes): agregar al final
+                ids.append(articulo.id)
+                self._pesos[termino].append(min(peso, 65535))
+                continue
+            posicion = bisect_left(ids, articulo.id)
+            ids.insert(posicion, articulo.id)
+            self._pesos[termino].insert(posicion, min(peso, 65535))
+
+        self._docs[articulo.id] = Documento(
+            id=articulo.id,
+            titulo=articulo.titulo,
+            contenido=(articulo.contenido or '')[:LARGO_CONTENIDO],
+            categoria=articulo.categoria,
+            subcategoria=articulo.subcategoria,
+            vistas=articulo.vistas or 0
+        )
+        self._terminos_doc[articulo.id] = tuple(frecuencias)
+        self._terminos_titulo[articulo.id] = frozenset(terminos(articulo.titulo))
+        largo = sum(frecuencias.values())
+        self._largos[articulo.id] = largo
+        self._largo_total += largo
+
+    def _eliminar(self, articulo_id):
+        for termino in self._terminos_doc.pop(articulo_id, ()):
+            ids = self._ids[termino]
+            posicion = bisect_left(ids, articulo_id)
+            if posicion < len(ids) and ids[posicion] == articulo_id:
+                del ids[posicion]
+                del self._pesos[termino][posicion]
+            if not ids:
+                del self._ids[termino]
+                del self._pesos[termino]
+        self._docs.pop(articulo_id, None)
+        self._terminos_titulo.pop(articulo_id, None)
+        self._largo_total -= self._largos.pop(articulo_id, 0)
+
+    def actualizar_vistas(self, vistas):
+        """Cambia las vistas (impulso por popularidad) de los artículos {id: vistas} indexados"""
+        with self._lock:
+            for articulo_id, total in vistas.items():
+                documento = self._docs.get(articulo_id)
+                if documento and documento.vistas != total:
+                    self._docs[articulo_id] = documento._replace(vistas=total)
+                    self._impacto = {}
+
+    # --- Consultas ---
+
+    def _expandir_prefijo(self, prefijo):
+        if self._vocabulario_sucio:
+            self._vocabulario = sorted(self._ids)
+            self._vocabulario_sucio = False
+        inicio = bisect_left(self._vocabulario, prefijo)
+        encontrados = []
+        for termino in self._vocabulario[inicio:]:
+            if not termino.startswith(prefijo):
+                break
+            encontrados.append(termino)
+        return encontrados
+
+    def _idf(self, termino):
+        return math.log(1 + (len(self._docs) or 1) / len(self._ids[termino]))
+
+    def _impulso(self, doc_id):
+        vistas = self._docs[doc_id].vistas
+        return 1 + self.peso_vistas * vistas / (vistas + 100.0)
+
+    def _lista_impacto(self, termino):
+        """Postings del término ordenados por puntaje final (se calcula al primer uso)"""
+        lista = self._impacto.get(termino)
+        if lista is None:
+            idf = self._idf(termino)
+            lista = sorted(
+                (-peso * idf * self._impulso(doc_id), doc_id)
+                for doc_id, peso in zip(self._ids[termino], self._pesos[termino])
+            )
+            self._impacto[termino] = lista
+        return lista
+
+    def _pasa_filtros(self, doc_id, categoria, subcategoria, exigidos, solo_titulo):
+        documento = self._docs[doc_id]
+        if categoria and documento.categoria != categoria:
+            return False
+        if subcategoria and documento.subcategoria != subcategoria:
+            return False
+        if solo_titulo and not all(
+            variantes & self._terminos_titulo[doc_id] for variantes in exigidos
+        ):
+            return False
+        return True
+
+    def buscar(self, texto, categoria=None, subcategoria=None, limite=10, solo_titulo=False):
+        """
+        Busca documentos que contengan todos los términos (el último como prefijo)
+
+        El puntaje es la suma por término de peso * idf (para el prefijo, la
+        mejor variante), multiplicada por la bonificación de vistas.
+
+        Returns:
+            list[Documento]: Ordenados por puntaje descendente
+        """
+        consulta = terminos(texto)
+        if not consulta:
+            return []
+
+        with self._lock:
+            exigidos = []
+            for i, termino in enumerate(consulta):
+                if i == len(consulta) - 1:
+                    variantes = self._expandir_prefijo(termino)
+                else:
+                    variantes = [termino] if termino in self._ids else []
+                if not variantes:
+                    return []
+                exigidos.append(set(variantes))
+
+            # Un solo término (caso típico del autocompletado): se recorren las
+            # listas ya ordenadas por puntaje y se corta al llegar al límite
+            if len(exigidos) == 1 and limite:
+                resultado, vistos = [], set()
+                listas = [self._lista_impacto(variante) for variante in exigidos[0]]
+                for _, doc_id in heapq.merge(*listas):
+                    if doc_id in vistos:
+                        continue
+                    vistos.add(doc_id)
+                    if self._pasa_filtros(doc_id, categoria, subcategoria, exigidos, solo_titulo):
+                        resultado.append(self._docs[doc_id])
+                        if len(resultado) == limite:
+                            break
+                return resultado
+
+            # Varios términos: se parte del más raro y las intersecciones se
+            # hacen con operaciones de conjuntos (en C) en lugar de un bucle por id
+            orden = sorted(exigidos, key=lambda vs: sum(len(self._ids[v]) for v in vs))
+
+            puntajes = {}
+            for variantes in orden:
+                aportes = {}
+                for variante in variantes:
+                    idf = self._idf(variante)
+                    pesos = dict(zip(self._ids[variante], self._pesos[variante]))
+                    comunes = pesos.keys() & puntajes.keys() if puntajes else pesos.keys()
+                    for doc_id in comunes:
+                        aporte = pesos[doc_id] * idf
+                        if aporte > aportes.get(doc_id, 0.0):
+                            aportes[doc_id] = aporte
+                if puntajes:
+                    puntajes = {doc_id: puntajes[doc_id] + aporte for doc_id, aporte in aportes.items()}
+                else:
+                    puntajes = aportes
+                if not puntajes:
+                    return []
+
+            candidatos = [
+                (puntaje * self._impulso(doc_id), doc_id)
+                for doc_id, puntaje in puntajes.items()
+                if self._pasa_filtros(doc_id, categoria, subcategoria, exigidos, solo_titulo)
+            ]
+            mejores = heapq.nlargest(limite, candidatos) if limite else sorted(candidatos, reverse=True)
+            return [self._docs[doc_id] for _, doc_id in mejores]
+
+    def _aportes_bm25(self, termino, k1, b):
+        """
+        Aporte BM25 del término a cada documento que lo contiene y su cota
+        (el máximo posible, idf * (k1 + 1)); se calcula al primer uso
+        """
+        clave = (termino, k1, b)
+        aportes = self._aportes.get(clave)
+        if aportes is None:
+            ids = self._ids[termino]
+            total = len(self._docs)
+            promedio = self._largo_total / total
+            idf = math.log(1 + (total - len(ids) + 0.5) / (len(ids) + 0.5))
+            largos = self._largos
+            aportes = (idf * (k1 + 1), {
+                doc_id: idf * frecuencia * (k1 + 1) / (frecuencia + k1 * (1 - b + b * largos[doc_id] / promedio))
+                for doc_id, frecuencia in zip(ids, self._pesos[termino])
+            })
+            self._aportes[clave] = aportes
+        return aportes
+
+    def buscar_relevantes(self, texto, limite=2, categoria=None, k1=BM25_K1, b=BM25_B):
+        """
+        Documentos más relevantes para un texto libre (cualquier término basta)
+
+        Cada término de la consulta suma su aporte BM25 a los documentos que
+        lo contienen (frecuencia = peso del término por campo, largo = suma
+        de los pesos del documento); el total se multiplica por la
+        bonificación de vistas. Sin ir a la base de datos.
+
+        Los términos se recorren del más raro al más común; cuando lo que
+        pueden sumar los restantes ya no alcanza para entrar entre los
+        `limite` mejores, solo se actualizan los candidatos que ya hay en
+        lugar de recorrer sus postings completos (MaxScore). El resultado es
+        el mismo que puntuando todo.
+
+        Returns:
+            list[Documento]: Los `limite` de mayor puntaje, descendente
+        """
+        with self._lock:
+            consulta = [termino for termino in set(terminos(texto)) if termino in self._ids]
+            if not consulta or not limite:
+                return []
+
+            listas = sorted((self._aportes_bm25(termino, k1, b) for termino in consulta),
+                            key=lambda aportes: -aportes[0])
+            impulso_maximo = 1 + self.peso_vistas
+            restante = sum(cota for cota, _ in listas)
+
+            puntajes, podar = {}, False
+            for cota, aportes in listas:
+                if not podar and len(puntajes) >= limite:
+                    # Cota inferior del último de los mejores (la bonificación es >= 1)
+                    podar = heapq.nlargest(limite, puntajes.values())[-1] > restante * impulso_maximo
+                restante -= cota
+                if podar:
+                    # Un documento nuevo ya no alcanzaría a los actuales
+                    for doc_id in puntajes.keys() & aportes.keys():
+                        puntajes[doc_id] += aportes[doc_id]
+                    continue
+                for doc_id, aporte in aportes.items():
+                    if doc_id in puntajes:
+                        puntajes[doc_id] += aporte
+                    elif not categoria or self._docs[doc_id].categoria == categoria:
+                        puntajes[doc_id] = aporte
+
+            if not puntajes:
+                return []
+            # La bonificación de vistas solo se calcula para quien puede quedar entre los mejores
+            umbral = heapq.nlargest(limite, puntajes.values())[-1] / impulso_maximo
+            mejores = heapq.nlargest(limite, (
+                (puntaje * self._impulso(doc_id), doc_id)
+                for doc_id, puntaje in puntajes.items() if puntaje >= umbral
+            ))
+            return [self._docs[doc_id] for _, doc_id in mejores]
+
+    def estadisticas(self):
+        """Tamaño del índice (para monitoreo)"""
+        with self._lock:
+            postings = sum(len(ids) for ids in self._ids.values())
+            return {
+                'documentos': len(self._docs),
+                'terminos': len(self._ids),
+                'postings': postings,
+                'bytes_postings': postings * (array('I').itemsize + array('H').itemsize),
+            }
@@ -0,0 +1,78 @@
+"""
+Métricas en memoria del proceso (histogramas de latencia)
+"""
+import threading
+from bisect import bisect_left
+
+# Límites superiores de los buckets en milisegundos (el último es +inf)
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histograma:
+    """Histograma de latencias con buckets fijos, seguro entre hilos"""
+
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._conteos = [0] * (len(self.buckets) + 1)
+        self.total = 0
+        self.suma_ms = 0.0
+        self.maximo_ms = 0.0
+
+    def observar(self, ms):
+        with self._lock:
+            self._conteos[bisect_left(self.buckets, ms)] += 1
+            self.total += 1
+            self.suma_ms += ms
+            if ms > self.maximo_ms:
+                self.maximo_ms = ms
+
+    def percentil(self, p):
+        """Límite superior del bucket que contiene el percentil p (0..1)"""
+        with self._lock:
+            if not self.total:
+                return None
+            objetivo = p * self.total
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (None,), self._conteos):
+                acumulado += conteo
+                if acumulado >= objetivo:
+                    return limite if limite is not None else self.maximo_ms
+        return self.maximo_ms
+
+    def a_dict(self):
+        with self._lock:
+            conteos = list(self._conteos)
+            total, suma, maximo = self.total, self.suma_ms, self.maximo_ms
+        return {
+            'total': total,
+            'promedio_ms': round(suma / total, 2) if total else None,
+            'maximo_ms': round(maximo, 2),
+            'p50_ms': self.percentil(0.5),
+            'p95_ms': self.percentil(0.95),
+            'p99_ms': self.percentil(0.99),
+            'buckets': {
+                f'<={limite}' if limite is not None else '+inf': conteo
+                for limite, conteo in zip(self.buckets + (None,), conteos)
+            },
+        }
+
+
+class Histogramas:
+    """Conjunto de histogramas por nombre, creados al primer uso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {}
+
+    def observar(self, nombre, ms):
+        histograma = self._histogramas.get(nombre)
+        if histograma is None:
+            with self._lock:
+                histograma = self._histogramas.setdefault(nombre, Histograma())
+        histograma.observar(ms)
+
+    def a_dict(self):
+        with self._lock:
+            histogramas = dict(self._histogramas)
+        return {nombre: histograma.a_dict() for nombre, histograma in sorted(histogramas.items())}
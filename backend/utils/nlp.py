@@ -0,0 +1,64 @@
+"""
+Carga del modelo de NLP (spaCy) para el chatbot
+El modelo ya no se carga al importar el blueprint: según Config.NLP_MODO se
+carga en el primer mensaje que lo necesite ('lazy'), en un hilo al arrancar
+la aplicación ('background') o nunca ('off'). Así los scripts (init_db.py,
+migrate_db.py) y los tests no pagan el tiempo ni la memoria del modelo.
+"""
+import threading
+from config import Config
+
+_nlp = None
+_cargado = False
+_lock = threading.Lock()
+_hilo_precarga = None
+
+
+def _cargar():
+    """Carga el modelo una sola vez; si no está instalado se recuerda el fallo"""
+    global _nlp, _cargado
+    with _lock:
+        if _cargado:
+            return _nlp
+        try:
+            import spacy
+            # Solo los componentes que necesita el lematizador (sin parser ni NER)
+            _nlp = spacy.load(Config.NLP_MODELO, exclude=Config.NLP_EXCLUIR)
+        except (IOError, ImportError):
+            print("=" * 50)
+            print(f"ERROR: Modelo '{Config.NLP_MODELO}' de spaCy no encontrado.")
+            print("Por favor, ejecuta:")
+            print(f"python -m spacy download {Config.NLP_MODELO}")
+            print("=" * 50)
+            _nlp = None
+        _cargado = True
+        return _nlp
+
+
+def obtener_nlp():
+    """
+    Devuelve el pipeline de spaCy o None si está desactivado o no disponible
+
+    En modo 'background' no bloquea: mientras el hilo de precarga no termine
+    devuelve None y el chatbot sigue con el flujo de menús.
+    """
+    if Config.NLP_MODO == 'off':
+        return None
+    if _cargado:
+        return _nlp
+    if Config.NLP_MODO == 'background' and _hilo_precarga is not None:
+        return None
+    return _cargar()
+
+
+def init_nlp(app):
+    """
+    Inicia la precarga del modelo en segundo plano si NLP_MODO='background'
+
+    Sin INICIAR_TRABAJADORES no hay hilo: el modelo se carga como en 'lazy'.
+    """
+    global _hilo_precarga
+    if Config.NLP_MODO == 'background' and app.config.get('INICIAR_TRABAJADORES') \
+            and _hilo_precarga is None and not _cargado:
+        _hilo_precarga = threading.Thread(target=_cargar, name='precarga-nlp', daemon=True)
+        _hilo_precarga.start()
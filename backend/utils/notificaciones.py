@@ -0,0 +1,280 @@
+"""
+Notificaciones de técnicos en tiempo real (Server-Sent Events)
+Cada técnico con el portal abierto consultaba /dashboard/notificaciones cada
+30 segundos, y cada consulta hacía tres queries (tickets nuevos de los
+últimos 5 minutos, críticos sin asignar y pendientes del técnico). Con
+GET /api/dashboard/notificaciones/stream el técnico calcula ese estado una
+vez al conectarse y luego lo actualiza con los eventos de tickets que se
+publican en este proceso: N técnicos conectados cuestan un reparto del
+evento en memoria, no N×3 queries por intervalo.
+
+Los eventos TicketCreado y TicketEstadoCambiado llegan del bus de eventos
+(utils/eventos.py) una vez confirmada la transacción; un hilo del bus los
+reparte a los streams conectados.
+
+Cada suscriptor tiene una cola acotada (NOTIFICACIONES_SSE_COLA); si se
+llena se descartan sus eventos y el stream vuelve a calcular el estado desde
+la base de datos. Los eventos son del proceso: con varios procesos cada
+stream se recalcula además cada NOTIFICACIONES_SSE_RESINCRONIZAR segundos.
+
+Cada stream abierto ocupa un hilo del servidor. Por proceso se aceptan
+NOTIFICACIONES_SSE_MAXIMO streams (los demás reciben 503 y el navegador
+vuelve a la consulta periódica) y cada uno termina a los
+NOTIFICACIONES_SSE_DURACION segundos: EventSource se reconecta solo y el
+hilo queda libre entre medio.
+"""
+import json
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import desc
+from sqlalchemy.orm import joinedload
+from models import db, Ticket
+from utils.eventos import bus_eventos, TicketCreado, TicketEstadoCambiado, instantanea_ticket
+
+# Ventana de "tickets nuevos" de las notificaciones
+VENTANA_NUEVOS = timedelta(minutes=5)
+ESTADOS_PENDIENTES = ('asignado_a_tecnico', 'en_proceso')
+
+
+# --- Estado de las notificaciones de un técnico ---
+
+def _es_critico(ticket):
+    return bool(ticket) and ticket['prioridad'] == 'critica' and ticket['tecnico_id'] is None \
+        and ticket['estado'] == 'nuevo'
+
+
+def _es_pendiente(ticket, tecnico_id):
+    return bool(ticket) and ticket['tecnico_id'] == tecnico_id and ticket['estado'] in ESTADOS_PENDIENTES
+
+
+class EstadoNotificaciones:
+    """Tickets nuevos, críticos sin asignar y pendientes de un técnico"""
+
+    def __init__(self, tecnico_id, nuevos=None, criticos=0, pendientes=0):
+        self.tecnico_id = tecnico_id
+        self.nuevos = nuevos or {}  # id -> instantanea_ticket
+        self.criticos = criticos
+        self.pendientes = pendientes
+
+    @classmethod
+    def desde_bd(cls, tecnico_id):
+        """Estado actual con tres consultas"""
+        tickets_nuevos = Ticket.query.options(
+            joinedload(Ticket.usuario)
+        ).filter(
+            Ticket.fecha_creacion >= datetime.utcnow() - VENTANA_NUEVOS,
+            Ticket.estado == 'nuevo'
+        ).order_by(desc(Ticket.fecha_creacion)).all()
+
+        tickets_criticos = Ticket.query.filter(
+            Ticket.prioridad == 'critica',
+            Ticket.tecnico_id.is_(None),
+            Ticket.estado == 'nuevo'
+        ).count()
+
+        mis_tickets_pendientes = Ticket.query.filter(
+            Ticket.tecnico_id == tecnico_id,
+            Ticket.estado.in_(ESTADOS_PENDIENTES)
+        ).count()
+
+        return cls(
+            tecnico_id,
+            nuevos={ticket.id: instantanea_ticket(ticket) for ticket in tickets_nuevos},
+            criticos=tickets_criticos,
+            pendientes=mis_tickets_pendientes
+        )
+
+    def aplicar(self, evento):
+        """
+        Actualiza el estado con un evento de ticket (sin consultas)
+
+        Returns:
+            bool: Si cambió lo que se muestra al técnico
+        """
+        anterior, ticket = getattr(evento, 'anterior', None), evento.ticket
+        antes = self.a_dict()
+        self.criticos += _es_critico(ticket) - _es_critico(anterior)
+        self.pendientes += _es_pendiente(ticket, self.tecnico_id) - _es_pendiente(anterior, self.tecnico_id)
+        if ticket['estado'] == 'nuevo' and ticket['fecha_creacion'] >= datetime.utcnow() - VENTANA_NUEVOS:
+            self.nuevos[ticket['id']] = ticket
+        else:
+            self.nuevos.pop(ticket['id'], None)
+        return self.a_dict() != antes
+
+    def vencer(self):
+        """Quita los tickets que salieron de la ventana; True si quitó alguno"""
+        limite = datetime.utcnow() - VENTANA_NUEVOS
+        vencidos = [ticket_id for ticket_id, ticket in self.nuevos.items() if ticket['fecha_creacion'] < limite]
+        for ticket_id in vencidos:
+            del self.nuevos[ticket_id]
+        return bool(vencidos)
+
+    def a_dict(self):
+        """Mismo formato que GET /dashboard/notificaciones"""
+        tickets_nuevos = sorted(self.nuevos.values(), key=lambda ticket: ticket['fecha_creacion'], reverse=True)
+        notificaciones = [{
+            'tipo': 'nuevo_ticket',
+            'titulo': f'Nuevo ticket #{ticket["id"]}',
+            'mensaje': f'{ticket["titulo"]} - {ticket["usuario"]}',
+            'url': f'/tickets/{ticket["id"]}',
+            'tiempo': ticket['fecha_creacion'].strftime('%H:%M'),
+            'prioridad': ticket['prioridad']
+        } for ticket in tickets_nuevos]
+
+        if self.criticos > 0:
+            notificaciones.append({
+                'tipo': 'critico',
+                'titulo': f'{self.criticos} ticket(s) crítico(s)',
+                'mensaje': 'Requieren atención inmediata',
+                'url': '/tickets?prioridad=critica&estado=nuevo',
+                'tiempo': 'Ahora',
+                'prioridad': 'critica'
+            })
+
+        return {
+            'notificaciones': notificaciones,
+            'total_nuevos': len(tickets_nuevos),
+            'total_criticos': self.criticos,
+            'mis_pendientes': self.pendientes
+        }
+
+
+# --- Reparto a los streams conectados ---
+
+class Suscripcion:
+    """Cola acotada de eventos de un stream"""
+
+    def __init__(self, maximo):
+        self.cola = queue.Queue(maxsize=maximo)
+        self.desbordada = False
+
+    def obtener(self, timeout):
+        """Siguiente evento, o None si no llegó ninguno en `timeout` segundos"""
+        try:
+            return self.cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class BusNotificaciones:
+    """Reparte los eventos de tickets a los streams conectados"""
+
+    def __init__(self, maximo_cola=100, maximo_streams=8):
+        self.maximo_cola = maximo_cola
+        self.maximo_streams = maximo_streams
+        self._lock = threading.Lock()
+        self._suscripciones = set()
+        self._contadores = Counter()
+
+    def suscribir(self):
+        """Nueva suscripción, o None si ya hay maximo_streams abiertos"""
+        suscripcion = Suscripcion(self.maximo_cola)
+        with self._lock:
+            if self.maximo_streams and len(self._suscripciones) >= self.maximo_streams:
+                self._contadores['rechazadas'] += 1
+                return None
+            self._suscripciones.add(suscripcion)
+            self._contadores['conexiones'] += 1
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def publicar(self, evento):
+        """Entrega el evento a cada suscripción sin bloquear al que publica"""
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+            self._contadores['publicados'] += 1
+        descartados = 0
+        for suscripcion in suscripciones:
+            try:
+                suscripcion.cola.put_nowait(evento)
+            except queue.Full:
+                # El stream está atrasado: que recalcule desde la base de datos
+                suscripcion.desbordada = True
+                descartados += 1
+        if descartados:
+            with self._lock:
+                self._contadores['descartados'] += descartados
+
+    def estadisticas(self):
+        with self._lock:
+            return {'suscriptores': len(self._suscripciones), **self._contadores}
+
+
+_bus = None
+
+
+def init_notificaciones(app):
+    """Crea el bus de notificaciones de la aplicación"""
+    global _bus
+    _bus = BusNotificaciones(
+        maximo_cola=app.config.get('NOTIFICACIONES_SSE_COLA', 100),
+        maximo_streams=app.config.get('NOTIFICACIONES_SSE_MAXIMO', 8)
+    )
+    app.extensions['notificaciones'] = _bus
+    return _bus
+
+
+def obtener_bus_notificaciones():
+    return _bus
+
+
+@bus_eventos.suscriptor(TicketCreado, TicketEstadoCambiado, hilos=1)
+def _repartir_a_streams(evento):
+    if _bus is not None:
+        _bus.publicar(evento)
+
+
+# --- Stream SSE ---
+
+def _mensaje_sse(evento, datos):
+    return f'event: {evento}\ndata: {json.dumps(datos)}\n\n'
+
+
+def stream_notificaciones(tecnico_id, suscripcion, latido=15, resincronizar=300, duracion=600):
+    """
+    Generador del stream SSE de un técnico
+
+    Envía el evento `notificaciones` (mismo formato que /dashboard/notificaciones)
+    al conectarse y cada vez que cambia; entre eventos, un comentario de
+    latido cada `latido` segundos para mantener viva la conexión. Termina a
+    los `duracion` segundos (0 = nunca) y el navegador se reconecta.
+
+    `suscripcion` es la de BusNotificaciones.suscribir(), tomada antes de
+    responder para poder rechazar con 503 si no hay cupo.
+    """
+    fin = time.monotonic() + duracion if duracion else None
+    try:
+        # Suscrito antes de leer: ningún commit queda entre la lectura y la escucha
+        estado = EstadoNotificaciones.desde_bd(tecnico_id)
+        # No retener una conexión del pool mientras el stream espera
+        db.session.close()
+        proxima_resincronizacion = time.monotonic() + resincronizar
+        yield 'retry: 5000\n' + _mensaje_sse('notificaciones', estado.a_dict())
+
+        while fin is None or time.monotonic() < fin:
+            espera = latido if fin is None else max(0, min(latido, fin - time.monotonic()))
+            evento = suscripcion.obtener(timeout=espera)
+            if suscripcion.desbordada or (resincronizar and time.monotonic() >= proxima_resincronizacion):
+                suscripcion.desbordada = False
+                while suscripcion.obtener(timeout=0) is not None:
+                    pass
+                estado = EstadoNotificaciones.desde_bd(tecnico_id)
+                db.session.close()
+                proxima_resincronizacion = time.monotonic() + resincronizar
+                yield _mensaje_sse('notificaciones', estado.a_dict())
+            elif evento is not None:
+                cambio = estado.aplicar(evento)
+                if estado.vencer() or cambio:
+                    yield _mensaje_sse('notificaciones', estado.a_dict())
+            elif estado.vencer():
+                yield _mensaje_sse('notificaciones', estado.a_dict())
+            else:
+                yield ': latido\n\n'
+    finally:
+        _bus.cancelar(suscripcion)
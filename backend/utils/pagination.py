@@ -0,0 +1,130 @@
+"""
+Utilidades de paginación para la API
+Soporta paginación clásica por offset y paginación por cursor (keyset)
+"""
+import base64
+import json
+import math
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+def codificar_cursor(valores):
+    """
+    Codifica los valores de ordenamiento de la última fila en un cursor opaco
+
+    Args:
+        valores: Lista de valores (int, str, datetime) en el orden de las columnas
+
+    Returns:
+        str: Cursor en base64 seguro para URLs
+    """
+    serializados = [
+        {'$dt': v.isoformat()} if isinstance(v, datetime) else v
+        for v in valores
+    ]
+    crudo = json.dumps(serializados, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+
+def _valor_cursor(valor):
+    """Valor de ordenamiento de un cursor: str, int, float finito o {'$dt': 'iso'}"""
+    if isinstance(valor, dict):
+        if list(valor) != ['$dt'] or not isinstance(valor['$dt'], str):
+            raise ValueError('Cursor inválido')
+        try:
+            return datetime.fromisoformat(valor['$dt'])
+        except ValueError:
+            raise ValueError('Cursor inválido')
+    # bool es subclase de int; NaN e infinito no se comparan en SQL
+    if isinstance(valor, bool) or not isinstance(valor, (str, int, float)):
+        raise ValueError('Cursor inválido')
+    if isinstance(valor, float) and not math.isfinite(valor):
+        raise ValueError('Cursor inválido')
+    return valor
+
+
+def decodificar_cursor(cursor, largo=None):
+    """
+    Decodifica un cursor generado por codificar_cursor
+
+    Args:
+        cursor: Cursor opaco recibido del cliente
+        largo: Número de columnas de ordenamiento esperado
+
+    Raises:
+        ValueError: Si el cursor es inválido (el endpoint responde 400)
+    """
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+    if not isinstance(valores, list) or (largo is not None and len(valores) != largo):
+        raise ValueError('Cursor inválido')
+
+    return [_valor_cursor(valor) for valor in valores]
+
+
+def filtro_despues_de(columnas, valores):
+    """
+    Construye el filtro keyset para columnas ordenadas en forma descendente:
+    (c1 < v1) OR (c1 = v1 AND c2 < v2) OR ...
+    """
+    condiciones = []
+    for i, columna in enumerate(columnas):
+        iguales = [columnas[j] == valores[j] for j in range(i)]
+        condiciones.append(and_(*iguales, columna < valores[i]))
+    return or_(*condiciones)
+
+
+def paginar_consulta(query, columnas, page=1, per_page=10, cursor=None, include_total=True):
+    """
+    Pagina una consulta ordenada de forma descendente por `columnas`
+
+    Si `cursor` es None se usa offset/limit (compatibilidad). Si es una cadena
+    (vacía para la primera página) se usa paginación keyset, cuyo costo por
+    página no depende de la profundidad.
+
+    Args:
+        query: Query de SQLAlchemy con los filtros ya aplicados
+        columnas: Columnas de ordenamiento NOT NULL (una fila con NULL no cumple
+            el filtro keyset y desaparecería de las páginas siguientes); la
+            última debe ser única (ej: id)
+        page: Página actual (solo modo offset)
+        per_page: Items por página
+        cursor: Cursor opaco de la página anterior, '' o None
+        include_total: Si se debe ejecutar el COUNT del total
+
+    Returns:
+        dict: items, total, has_next y next_cursor
+
+    Raises:
+        ValueError: Si el cursor es inválido
+    """
+    total = query.order_by(None).count() if include_total else None
+    ordenada = query.order_by(*[columna.desc() for columna in columnas])
+
+    if cursor is None:
+        items = ordenada.offset((page - 1) * per_page).limit(per_page + 1).all()
+    else:
+        if cursor:
+            valores = decodificar_cursor(cursor, largo=len(columnas))
+            ordenada = ordenada.filter(filtro_despues_de(columnas, valores))
+        items = ordenada.limit(per_page + 1).all()
+
+    has_next = len(items) > per_page
+    items = items[:per_page]
+
+    next_cursor = None
+    if cursor is not None and has_next:
+        ultimo = items[-1]
+        next_cursor = codificar_cursor([getattr(ultimo, columna.key) for columna in columnas])
+
+    return {
+        'items': items,
+        'total': total,
+        'has_next': has_next,
+        'next_cursor': next_cursor
+    }
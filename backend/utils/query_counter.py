@@ -0,0 +1,127 @@
+"""
+Contador de consultas SQL por petición
+Permite detectar problemas N+1 y fijar un presupuesto de queries por endpoint
+"""
+import threading
+from functools import wraps
+from flask import g, current_app, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Se lanza cuando un endpoint supera su presupuesto de queries en modo estricto"""
+
+
+class ContadorQueries:
+    """
+    Cuenta las sentencias SQL ejecutadas dentro de un bloque
+
+    Con guardar_sentencias también conserva el texto de cada una (para
+    depurar); sin él solo se lleva la cuenta.
+
+    Uso:
+        with ContadorQueries() as contador:
+            client.get('/api/tickets/')
+        assert contador.total <= 4
+    """
+
+    def __init__(self, guardar_sentencias=True):
+        self.total = 0
+        self.sentencias = [] if guardar_sentencias else None
+
+    def __enter__(self):
+        _contadores_activos().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _contadores_activos().remove(self)
+        return False
+
+
+def _contadores_activos():
+    if not hasattr(_local, 'contadores'):
+        _local.contadores = []
+    return _local.contadores
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _registrar_query(conn, cursor, statement, parameters, context, executemany):
+    for contador in _contadores_activos():
+        contador.total += 1
+        if contador.sentencias is not None:
+            contador.sentencias.append(statement)
+
+
+def init_query_counter(app):
+    """
+    Registra el contador por petición en la aplicación
+
+    En producción solo se cuentan las queries; el texto de las sentencias se
+    guarda en modo debug o con QUERY_BUDGET_STRICT, para mostrarlas al
+    superar el presupuesto.
+    """
+
+    @app.before_request
+    def _iniciar_contador():
+        guardar = app.debug or app.config.get('QUERY_BUDGET_STRICT', False)
+        g.contador_queries = ContadorQueries(guardar_sentencias=guardar).__enter__()
+
+    @app.after_request
+    def _cabecera_contador(response):
+        contador = g.get('contador_queries')
+        if contador and (app.debug or app.testing):
+            response.headers['X-Query-Count'] = str(contador.total)
+        return response
+
+    @app.teardown_request
+    def _cerrar_contador(exc):
+        contador = g.pop('contador_queries', None)
+        if contador and contador in _contadores_activos():
+            contador.__exit__(None, None, None)
+
+
+def sentencias_en_peticion():
+    """Sentencias SQL de la petición actual (None si no se están guardando)"""
+    if not has_request_context():
+        return None
+    contador = g.get('contador_queries')
+    return contador.sentencias if contador else None
+
+
+def queries_en_peticion():
+    """Número de queries ejecutadas hasta ahora en la petición actual"""
+    if not has_request_context():
+        return 0
+    contador = g.get('contador_queries')
+    return contador.total if contador else 0
+
+
+def query_budget(max_queries):
+    """
+    Decorador que fija el máximo de queries SQL de un endpoint
+
+    Si se supera, registra una advertencia; con QUERY_BUDGET_STRICT activo
+    (tests) lanza QueryBudgetExceeded para que la prueba falle.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            respuesta = f(*args, **kwargs)
+            total = queries_en_peticion()
+            if total > max_queries:
+                mensaje = (
+                    f'{f.__name__} ejecutó {total} queries '
+                    f'(presupuesto: {max_queries})'
+                )
+                sentencias = sentencias_en_peticion()
+                if sentencias:
+                    mensaje += ':\n' + '\n'.join(sentencias)
+                if current_app.config.get('QUERY_BUDGET_STRICT'):
+                    raise QueryBudgetExceeded(mensaje)
+                current_app.logger.warning(mensaje)
+            return respuesta
+        return decorated_function
+    return decorator
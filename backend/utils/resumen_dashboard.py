@@ -0,0 +1,79 @@
+"""
+Datos del inicio del dashboard, compartidos por la vista HTML
+(routes/dashboard.py) y la API (api/dashboard.py)
+
+Los contadores (tickets abiertos del usuario y, para técnicos, asignados,
+nuevos y críticos) salen de una sola consulta con agregación condicional
+(SUM(CASE ...)) sobre los tickets abiertos, en lugar de un COUNT por
+contador. Con los tickets recientes y los artículos populares, el inicio
+hace siempre tres consultas.
+"""
+from sqlalchemy import desc, func
+from models import db, Ticket, BaseConocimiento
+from config import Config
+
+ESTADOS_CERRADOS = ('resuelto', 'cerrado')
+# Con IN (en lugar de NOT IN) los contadores se leen del índice ix_tickets_estado_prioridad_tecnico_usuario
+ESTADOS_ABIERTOS = tuple(estado for estado in Config.TICKET_STATES if estado not in ESTADOS_CERRADOS)
+
+
+def _contar_si(condicion):
+    """COUNT condicional que funciona igual en SQLite, PostgreSQL y MySQL"""
+    return func.coalesce(func.sum(db.case([(condicion, 1)], else_=0)), 0)
+
+
+def contadores_home(usuario):
+    """
+    Contadores del inicio en una consulta
+
+    Returns:
+        tuple: (tickets_abiertos, stats_tecnico); stats_tecnico es {} si el
+            usuario no es técnico
+    """
+    if not usuario.es_tecnico:
+        abiertos = db.session.query(func.count(Ticket.id)).filter(
+            Ticket.usuario_id == usuario.id,
+            Ticket.estado.in_(ESTADOS_ABIERTOS)
+        ).scalar()
+        return abiertos, {}
+
+    fila = db.session.query(
+        _contar_si(Ticket.usuario_id == usuario.id).label('tickets_abiertos'),
+        _contar_si(Ticket.tecnico_id == usuario.id).label('tickets_asignados'),
+        _contar_si(Ticket.estado == 'nuevo').label('tickets_nuevos'),
+        _contar_si(Ticket.prioridad == 'critica').label('tickets_criticos')
+    ).filter(
+        Ticket.estado.in_(ESTADOS_ABIERTOS)
+    ).one()
+
+    return fila.tickets_abiertos, {
+        'tickets_asignados': fila.tickets_asignados,
+        'tickets_nuevos': fila.tickets_nuevos,
+        'tickets_criticos': fila.tickets_criticos
+    }
+
+
+def resumen_home(usuario, recientes=5, populares=3):
+    """
+    Todo lo que muestra el inicio del dashboard
+
+    Returns:
+        dict: tickets_abiertos, tickets_recientes (Ticket), articulos_populares
+            (BaseConocimiento) y stats_tecnico
+    """
+    tickets_abiertos, stats_tecnico = contadores_home(usuario)
+
+    tickets_recientes = Ticket.query.filter_by(
+        usuario_id=usuario.id
+    ).order_by(desc(Ticket.fecha_creacion)).limit(recientes).all()
+
+    articulos_populares = BaseConocimiento.query.filter_by(
+        activo=True
+    ).order_by(desc(BaseConocimiento.vistas)).limit(populares).all()
+
+    return {
+        'tickets_abiertos': tickets_abiertos,
+        'tickets_recientes': tickets_recientes,
+        'articulos_populares': articulos_populares,
+        'stats_tecnico': stats_tecnico
+    }
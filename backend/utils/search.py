@@ -0,0 +1,386 @@
+"""
+Búsqueda de texto en la Base de Conocimiento
+Backends intercambiables según el motor de base de datos:
+
+- like:   LIKE '%q%' sobre titulo, contenido y palabras_clave (sin índice)
+- sqlite: tabla virtual FTS5 sincronizada por triggers, ranking BM25
+- postgres: columna tsvector generada (español) con índice GIN, ranking ts_rank
+- memoria: índice invertido en el proceso (utils/inverted_index.py)
+
+En todos los casos la relevancia se combina con las vistas del artículo.
+"""
+import re
+import threading
+import time
+from datetime import timedelta
+from sqlalchemy import desc, func, or_, case, false, literal_column, text, Float, Integer
+from models import db, BaseConocimiento
+from config import Config
+from utils.inverted_index import IndiceInvertido
+from utils.autocompletado import (
+    actualizar_autocompletado, actualizar_vistas_autocompletado, estadisticas_autocompletado
+)
+from utils.eventos import bus_eventos, ArticuloCambiado, VistasActualizadas
+
+FTS_TABLA = 'base_conocimiento_fts'
+
+
+def _impulso_vistas():
+    """Bonificación acotada (0..1) por popularidad, sin depender de log()"""
+    vistas = func.coalesce(BaseConocimiento.vistas, 0)
+    return Config.SEARCH_PESO_VISTAS * vistas / (vistas + 100.0)
+
+
+def _terminos(texto):
+    return re.findall(r'\w+', (texto or '').lower())
+
+
+class BusquedaLike:
+    """Búsqueda por subcadena, compatible con cualquier motor"""
+
+    nombre = 'like'
+
+    def aplicar(self, consulta, texto, ordenar=True):
+        consulta = consulta.filter(
+            or_(
+                BaseConocimiento.titulo.contains(texto),
+                BaseConocimiento.contenido.contains(texto),
+                BaseConocimiento.palabras_clave.contains(texto)
+            )
+        )
+        if ordenar:
+            consulta = consulta.order_by(desc(BaseConocimiento.vistas))
+        return consulta
+
+
+class BusquedaSQLiteFTS:
+    """Índice FTS5 (external content) mantenido por triggers"""
+
+    nombre = 'sqlite_fts5'
+
+    DDL = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLA} USING fts5(
+            titulo, contenido, palabras_clave,
+            content='base_conocimiento', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS base_conocimiento_fts_ai AFTER INSERT ON base_conocimiento BEGIN
+            INSERT INTO {FTS_TABLA}(rowid, titulo, contenido, palabras_clave)
+            VALUES (new.id, new.titulo, new.contenido, new.palabras_clave);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS base_conocimiento_fts_ad AFTER DELETE ON base_conocimiento BEGIN
+            INSERT INTO {FTS_TABLA}({FTS_TABLA}, rowid, titulo, contenido, palabras_clave)
+            VALUES ('delete', old.id, old.titulo, old.contenido, old.palabras_clave);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS base_conocimiento_fts_au
+            AFTER UPDATE OF titulo, contenido, palabras_clave ON base_conocimiento BEGIN
+            INSERT INTO {FTS_TABLA}({FTS_TABLA}, rowid, titulo, contenido, palabras_clave)
+            VALUES ('delete', old.id, old.titulo, old.contenido, old.palabras_clave);
+            INSERT INTO {FTS_TABLA}(rowid, titulo, contenido, palabras_clave)
+            VALUES (new.id, new.titulo, new.contenido, new.palabras_clave);
+        END""",
+    ]
+
+    @classmethod
+    def inicializar(cls, conn):
+        for sentencia in cls.DDL:
+            conn.execute(text(sentencia))
+        conn.execute(text(f"INSERT INTO {FTS_TABLA}({FTS_TABLA}) VALUES ('rebuild')"))
+
+    @staticmethod
+    def disponible(conn):
+        return conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"),
+            {'nombre': FTS_TABLA}
+        ).first() is not None
+
+    def aplicar(self, consulta, texto, ordenar=True):
+        terminos = _terminos(texto)
+        if not terminos:
+            return consulta.filter(false())
+
+        # Cada término entre comillas (evita inyección de sintaxis FTS) y como prefijo
+        expresion = ' '.join(f'"{termino}"*' for termino in terminos)
+
+        # Pesos BM25: título > palabras clave > contenido
+        coincidencias = text(
+            f"SELECT rowid AS id, bm25({FTS_TABLA}, 10.0, 1.0, 5.0) AS rango "
+            f"FROM {FTS_TABLA} WHERE {FTS_TABLA} MATCH :expresion_fts"
+        ).bindparams(expresion_fts=expresion).columns(id=Integer, rango=Float).subquery('fts')
+
+        consulta = consulta.join(coincidencias, coincidencias.c.id == BaseConocimiento.id)
+        if ordenar:
+            # bm25 devuelve valores negativos: más negativo = más relevante
+            consulta = consulta.order_by(desc(-coincidencias.c.rango + _impulso_vistas()))
+        return consulta
+
+
+class BusquedaPostgresFTS:
+    """Columna tsvector generada con stemming en español e índice GIN"""
+
+    nombre = 'postgres_tsvector'
+
+    DDL = [
+        """ALTER TABLE base_conocimiento ADD COLUMN IF NOT EXISTS busqueda tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('spanish', coalesce(titulo, '')), 'A') ||
+                setweight(to_tsvector('spanish', coalesce(palabras_clave, '')), 'B') ||
+                setweight(to_tsvector('spanish', coalesce(contenido, '')), 'C')
+            ) STORED""",
+        "CREATE INDEX IF NOT EXISTS ix_base_conocimiento_busqueda ON base_conocimiento USING GIN (busqueda)",
+    ]
+
+    @classmethod
+    def inicializar(cls, conn):
+        for sentencia in cls.DDL:
+            conn.execute(text(sentencia))
+
+    @staticmethod
+    def disponible(conn):
+        return conn.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'base_conocimiento' AND column_name = 'busqueda'"
+            )
+        ).first() is not None
+
+    def aplicar(self, consulta, texto, ordenar=True):
+        if not _terminos(texto):
+            return consulta.filter(false())
+
+        columna = literal_column('base_conocimiento.busqueda')
+        consulta_ts = func.plainto_tsquery('spanish', texto)
+
+        consulta = consulta.filter(columna.op('@@')(consulta_ts))
+        if ordenar:
+            # Normalización 32: rango / (rango + 1), acotado a 0..1
+            relevancia = func.ts_rank_cd(columna, consulta_ts, 32)
+            consulta = consulta.order_by(desc(relevancia + _impulso_vistas()))
+        return consulta
+
+
+class BusquedaMemoria:
+    """Índice invertido en memoria, construido en el primer uso"""
+
+    nombre = 'memoria'
+
+    def aplicar(self, consulta, texto, ordenar=True):
+        ids = [documento.id for documento in obtener_indice_memoria().buscar(texto, limite=None)]
+        if not ids:
+            return consulta.filter(false())
+
+        consulta = consulta.filter(BaseConocimiento.id.in_(ids))
+        if ordenar:
+            posiciones = {articulo_id: posicion for posicion, articulo_id in enumerate(ids)}
+            consulta = consulta.order_by(case(posiciones, value=BaseConocimiento.id))
+        return consulta
+
+
+_indice_memoria = IndiceInvertido(peso_vistas=Config.SEARCH_PESO_VISTAS)
+_lock_indice = threading.Lock()
+# (max(fecha_actualizacion), count) de la BD que ya refleja el índice, y cuándo se miró
+_firma_indice = None
+_verificado_indice = 0.0
+
+# Se releen los artículos cambiados desde un poco antes de la última fecha vista:
+# una transacción de otro proceso puede confirmar después con una fecha anterior
+MARGEN_SINCRONIZACION = timedelta(minutes=5)
+
+
+def _firma_articulos():
+    return tuple(db.session.query(
+        func.max(BaseConocimiento.fecha_actualizacion), func.count(BaseConocimiento.id)
+    ).one())
+
+
+def obtener_indice_memoria():
+    """
+    Devuelve el índice invertido, construyéndolo desde la BD la primera vez
+
+    Después, cada SEARCH_MEMORIA_SINCRONIZAR segundos compara la firma de la
+    tabla con la del índice y aplica los artículos cambiados por otros procesos.
+    """
+    global _firma_indice, _verificado_indice
+    if not _indice_memoria.construido:
+        with _lock_indice:
+            if not _indice_memoria.construido:
+                # La firma se toma antes de leer: lo que cambie durante la
+                # construcción se vuelve a aplicar en la siguiente sincronización
+                _firma_indice = _firma_articulos()
+                _verificado_indice = time.monotonic()
+                _indice_memoria.construir(
+                    BaseConocimiento.query.filter_by(activo=True).yield_per(1000)
+                )
+        return _indice_memoria
+
+    intervalo = Config.SEARCH_MEMORIA_SINCRONIZAR
+    if intervalo > 0 and time.monotonic() - _verificado_indice >= intervalo:
+        # Si otro hilo ya está sincronizando se responde con el índice actual
+        if _lock_indice.acquire(blocking=False):
+            try:
+                if time.monotonic() - _verificado_indice >= intervalo:
+                    _sincronizar_indice()
+            finally:
+                _lock_indice.release()
+    return _indice_memoria
+
+
+def _sincronizar_indice():
+    """Aplica al índice los artículos creados o editados desde la última firma (con _lock_indice)"""
+    global _firma_indice, _verificado_indice
+    _verificado_indice = time.monotonic()
+    firma = _firma_articulos()
+    if firma == _firma_indice:
+        return
+
+    ultima, total = _firma_indice
+    if ultima is None or total > firma[1]:
+        # Artículos borrados con SQL (la aplicación solo los desactiva)
+        _indice_memoria.construir(BaseConocimiento.query.filter_by(activo=True).yield_per(1000))
+    else:
+        cambiados = BaseConocimiento.query.filter(
+            BaseConocimiento.fecha_actualizacion >= ultima - MARGEN_SINCRONIZACION
+        )
+        for articulo in cambiados.yield_per(1000):
+            # agregar() quita los inactivos
+            _indice_memoria.agregar(articulo)
+    _firma_indice = firma
+
+
+BACKENDS_FTS = {
+    'sqlite': BusquedaSQLiteFTS,
+    'postgresql': BusquedaPostgresFTS,
+}
+
+_cache_backends = {}
+
+
+def inicializar_indice_busqueda(engine):
+    """
+    Crea (o reconstruye) el índice de texto completo para el motor actual
+
+    Returns:
+        str: Nombre del backend inicializado, o None si el motor no lo soporta
+    """
+    backend = BACKENDS_FTS.get(engine.dialect.name)
+    if not backend:
+        return None
+
+    with engine.begin() as conn:
+        backend.inicializar(conn)
+
+    _cache_backends.pop(str(engine.url), None)
+    return backend.nombre
+
+
+def obtener_backend():
+    """
+    Devuelve el backend de búsqueda según Config.SEARCH_BACKEND:
+    'auto' (FTS si el índice existe, si no LIKE), 'fts', 'memoria' o 'like'
+    """
+    modo = Config.SEARCH_BACKEND
+    if modo == 'like':
+        return BusquedaLike()
+    if modo == 'memoria':
+        return BusquedaMemoria()
+
+    engine = db.engine
+    clave = str(engine.url)
+    if clave not in _cache_backends:
+        backend = BACKENDS_FTS.get(engine.dialect.name)
+        disponible = False
+        if backend:
+            try:
+                with engine.connect() as conn:
+                    disponible = backend.disponible(conn)
+            except Exception:
+                disponible = False
+        if not disponible and modo == 'fts':
+            raise RuntimeError(
+                'SEARCH_BACKEND=fts pero el índice de búsqueda no existe. '
+                'Ejecuta: python migrate_indices.py'
+            )
+        _cache_backends[clave] = backend() if disponible else BusquedaLike()
+
+    return _cache_backends[clave]
+
+
+def buscar_articulos(consulta, texto, ordenar=True):
+    """
+    Aplica la búsqueda de texto a una consulta de BaseConocimiento
+
+    Args:
+        consulta: Query de BaseConocimiento con los filtros ya aplicados
+        texto: Texto de búsqueda del usuario
+        ordenar: Ordenar por relevancia combinada con vistas
+
+    Returns:
+        Query filtrada (y ordenada si se pidió)
+    """
+    return obtener_backend().aplicar(consulta, texto, ordenar=ordenar)
+
+
+def sugerir_articulos(texto, categoria='', subcategoria='', limite=5):
+    """
+    Búsqueda corta de artículos relacionados (tickets y dashboard)
+
+    Con el backend 'memoria' se responde desde el índice invertido sin
+    consultar la base de datos; en otro caso se usa la consulta SQL.
+
+    Returns:
+        list: Objetos con id, titulo, contenido, categoria, subcategoria y vistas
+    """
+    if Config.SEARCH_BACKEND == 'memoria':
+        return obtener_indice_memoria().buscar(
+            texto,
+            categoria=categoria or None,
+            subcategoria=subcategoria or None,
+            limite=limite
+        )
+
+    consulta = BaseConocimiento.query.filter_by(activo=True)
+    if categoria:
+        consulta = consulta.filter_by(categoria=categoria)
+    if subcategoria:
+        consulta = consulta.filter_by(subcategoria=subcategoria)
+
+    return buscar_articulos(consulta, texto).limit(limite).all()
+
+
+def articulos_para_descripcion(descripcion, limite=2):
+    """
+    Artículos más relevantes para la descripción libre de un problema (chatbot)
+
+    Siempre se responde desde el índice invertido en memoria (BM25 sobre los
+    términos con stemming y sin palabras vacías), con cualquier SEARCH_BACKEND:
+    la descripción es una frase larga, no una consulta de búsqueda.
+
+    Returns:
+        list: Documentos con id, titulo, contenido, categoria, subcategoria y vistas
+    """
+    return obtener_indice_memoria().buscar_relevantes(descripcion, limite=limite)
+
+
+@bus_eventos.suscriptor(ArticuloCambiado)
+def _actualizar_indices(evento):
+    """Lleva al índice invertido y al autocompletado un artículo creado, editado o desactivado"""
+    actualizar_autocompletado(evento.articulo)
+    if _indice_memoria.construido:
+        # agregar() quita los inactivos
+        _indice_memoria.agregar(evento.articulo)
+
+
+@bus_eventos.suscriptor(VistasActualizadas)
+def _actualizar_vistas_indices(evento):
+    """Lleva al autocompletado y al índice invertido las vistas escritas por el contador de vistas"""
+    actualizar_vistas_autocompletado(evento.vistas)
+    if _indice_memoria.construido:
+        _indice_memoria.actualizar_vistas(evento.vistas)
+
+
+def estadisticas_indices():
+    """Tamaño y memoria de los índices en memoria del proceso actual"""
+    return {
+        'autocompletado': estadisticas_autocompletado(),
+        'indice_invertido': _indice_memoria.estadisticas() if _indice_memoria.construido else None,
+    }
@@ -0,0 +1,82 @@
+"""
+Normalización de texto en español
+Plegado de acentos, tokenización, palabras vacías y stemming ligero
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+STOPWORDS_ES = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes aqui asi aun cada como con contra cual
+cuando de del desde donde dos el ella ellas ellos en entre era eran es esa esas ese eso esos esta
+estaba estan estar estas este esto estos fue fueron ha hace hacer han hasta hay la las le les lo
+los mas me mi mis mucho muy nada ni no nos nosotros o otra otras otro otros para pero poco por
+porque que quien se sea ser si sin sobre solo son su sus tambien tan tanto te tengo tiene tienen
+todo todos tu tus un una uno unos usted y ya yo
+""".split())
+
+# Sufijos derivativos, del más largo al más corto
+_SUFIJOS = (
+    'amientos', 'imientos', 'aciones', 'uciones', 'amiento', 'imiento',
+    'adoras', 'adores', 'ancias', 'encias', 'idades', 'mente',
+    'acion', 'ucion', 'adora', 'ancia', 'encia', 'idad',
+    'ables', 'ibles', 'istas', 'able', 'ible', 'ista',
+)
+
+_PATRON_TOKEN = re.compile(r'[a-z0-9ñ]+')
+
+# Caso común resuelto con translate; el resto pasa por NFKD
+_SIN_TILDES = str.maketrans('áéíóúüàèìòùâêîôû', 'aeiouuaeiouaeiou')
+
+
+def plegar_acentos(texto):
+    """Minúsculas y sin tildes (conserva la ñ)"""
+    texto = (texto or '').lower()
+    if texto.isascii():
+        return texto
+    texto = texto.translate(_SIN_TILDES)
+    if texto.replace('ñ', '').isascii():
+        return texto
+    texto = ''.join(
+        c for c in unicodedata.normalize('NFKD', texto.replace('ñ', '\0'))
+        if not unicodedata.combining(c)
+    )
+    return texto.replace('\0', 'ñ')
+
+
+def tokenizar(texto):
+    """Lista de tokens normalizados (sin tildes, en minúsculas)"""
+    return _PATRON_TOKEN.findall(plegar_acentos(texto))
+
+
+@lru_cache(maxsize=65536)
+def raiz(palabra):
+    """
+    Stemming ligero para español: quita un sufijo derivativo, el plural
+    y la vocal final. Ej: impresoras -> impresor, configuracion -> configur
+    """
+    if len(palabra) <= 4 or palabra.isdigit():
+        return palabra
+
+    for sufijo in _SUFIJOS:
+        if palabra.endswith(sufijo) and len(palabra) - len(sufijo) >= 4:
+            palabra = palabra[:-len(sufijo)]
+            break
+    else:
+        if palabra.endswith('es') and len(palabra) > 5:
+            palabra = palabra[:-2]
+        elif palabra.endswith('s'):
+            palabra = palabra[:-1]
+
+    if len(palabra) > 4 and palabra[-1] in 'aeo':
+        palabra = palabra[:-1]
+
+    return palabra
+
+
+def terminos(texto, quitar_stopwords=True):
+    """Tokens normalizados y con stemming, opcionalmente sin palabras vacías"""
+    return [
+        raiz(token) for token in tokenizar(texto)
+        if not (quitar_stopwords and token in STOPWORDS_ES)
+    ]
@@ -0,0 +1,188 @@
+"""
+Transcripciones del chatbot (tabla historial_chat) escritas por lotes
+Cada mensaje procesado deja el par usuario/bot en memoria; un hilo los
+inserta con un único INSERT ejecutado con muchos parámetros (executemany)
+cada TRANSCRIPCION_FLUSH_INTERVALO segundos o al acumular
+TRANSCRIPCION_FLUSH_UMBRAL filas, así el camino del webhook no paga un
+INSERT + commit por mensaje.
+
+La fecha de cada fila es la del momento en que se procesó el mensaje, no la
+de la escritura. Si el proceso muere sin cerrarse se pierden como máximo
+las filas del último intervalo.
+
+El barrido de sesiones (utils/barrido_sesiones.py) escribe lo pendiente
+antes de archivar cada bloque, pero una fila puede llegar después de que su
+sesión se archivó y borró: esas filas se descartan (contador sin_sesion) en
+vez de violar la clave foránea o quedar huérfanas en historial_chat.
+"""
+import atexit
+import logging
+import threading
+from datetime import datetime
+from models import db, HistorialChat, SesionChatbot
+
+logger = logging.getLogger(__name__)
+
+# Filas que se conservan en memoria si la base de datos no responde
+MAXIMO_EN_MEMORIA = 50000
+
+
+class EscritorTranscripciones:
+    """Acumula mensajes del chatbot y los inserta por lotes"""
+
+    def __init__(self, app=None, intervalo=5, umbral=200):
+        self.app = app
+        self.intervalo = intervalo
+        self.umbral = umbral
+        self.descartadas = 0
+        self.sin_sesion = 0
+        self._pendientes = []
+        self._lock = threading.Lock()
+        self._lock_escritura = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        """Arranca el hilo que escribe los lotes periódicamente"""
+        if self.intervalo > 0 and self._hilo is None:
+            self._hilo = threading.Thread(
+                target=self._bucle, name='transcripciones', daemon=True
+            )
+            self._hilo.start()
+
+    def detener(self):
+        """Detiene el hilo y escribe lo pendiente (se llama al cerrar el proceso)"""
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=10)
+            self._hilo = None
+        self.escribir()
+
+    def registrar(self, sesion_id, mensaje_usuario, respuesta_bot):
+        """Guarda en memoria el par usuario/bot de un mensaje (no toca la base de datos)"""
+        fecha = datetime.utcnow()
+        filas = [
+            {'sesion_id': sesion_id, 'emisor': 'usuario', 'mensaje': mensaje_usuario, 'fecha': fecha},
+            {'sesion_id': sesion_id, 'emisor': 'bot', 'mensaje': _texto_respuesta(respuesta_bot), 'fecha': fecha},
+        ]
+        with self._lock:
+            self._pendientes.extend(filas)
+            lleno = len(self._pendientes) >= self.umbral
+
+        if lleno:
+            if self._hilo is not None:
+                self._despertar.set()
+            else:
+                self.escribir()
+
+    def pendientes(self):
+        with self._lock:
+            return len(self._pendientes)
+
+    def escribir(self):
+        """
+        Inserta las filas acumuladas en una transacción
+
+        Las filas de sesiones que ya no existen (archivadas por el barrido)
+        se descartan.
+
+        Returns:
+            int: Número de filas insertadas
+        """
+        with self._lock_escritura:
+            with self._lock:
+                lote, self._pendientes = self._pendientes, []
+
+            if not lote:
+                return 0
+
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as conn:
+                        filas = self._con_sesion(conn, lote)
+                        if filas:
+                            conn.execute(HistorialChat.__table__.insert(), filas)
+            except Exception:
+                # Se devuelven al inicio del acumulador (conservando el orden)
+                with self._lock:
+                    self._pendientes[:0] = lote
+                    sobrantes = len(self._pendientes) - MAXIMO_EN_MEMORIA
+                    if sobrantes > 0:
+                        del self._pendientes[:sobrantes]
+                        self.descartadas += sobrantes
+                logger.exception('No se pudieron escribir %d mensajes del historial del chat', len(lote))
+                return 0
+
+            sin_sesion = len(lote) - len(filas)
+            if sin_sesion:
+                self.sin_sesion += sin_sesion
+                logger.warning('Se descartaron %d mensajes del historial de sesiones ya archivadas', sin_sesion)
+            return len(filas)
+
+    @staticmethod
+    def _con_sesion(conn, lote):
+        """Filas del lote cuya sesión sigue en sesiones_chatbot"""
+        ids = {fila['sesion_id'] for fila in lote if fila['sesion_id'] is not None}
+        if not ids:
+            return lote
+        # FOR SHARE (PostgreSQL): el barrido no puede borrar estas sesiones hasta el commit
+        existentes = {sesion_id for sesion_id, in conn.execute(
+            db.select(SesionChatbot.id).where(SesionChatbot.id.in_(ids)).with_for_update(read=True)
+        )}
+        return [fila for fila in lote if fila['sesion_id'] is None or fila['sesion_id'] in existentes]
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            if self._detener.is_set():
+                break
+            self.escribir()
+
+
+def _texto_respuesta(respuesta_bot):
+    """Texto de la respuesta con sus opciones, como lo vería el usuario"""
+    if not isinstance(respuesta_bot, dict):
+        return str(respuesta_bot)
+    texto = respuesta_bot.get('mensaje', '')
+    opciones = respuesta_bot.get('opciones') or []
+    if opciones:
+        texto += '\n' + '\n'.join(f"- {op.get('texto', '')} [{op.get('valor', '')}]" for op in opciones)
+    return texto
+
+
+_escritor = None
+
+
+def init_transcripciones(app):
+    """
+    Crea el escritor de transcripciones de la aplicación
+
+    Con INICIAR_TRABAJADORES arranca el hilo y registra la escritura al
+    cerrar; sin él (scripts, tests) cada mensaje se escribe al registrarse.
+    """
+    global _escritor
+    trabajadores = app.config.get('INICIAR_TRABAJADORES')
+    _escritor = EscritorTranscripciones(
+        app,
+        intervalo=app.config.get('TRANSCRIPCION_FLUSH_INTERVALO', 5),
+        umbral=app.config.get('TRANSCRIPCION_FLUSH_UMBRAL', 200) if trabajadores else 1
+    )
+    if trabajadores:
+        _escritor.iniciar()
+        atexit.register(_escritor.detener)
+    app.extensions['transcripciones'] = _escritor
+    return _escritor
+
+
+def registrar_transcripcion(sesion_id, mensaje_usuario, respuesta_bot):
+    """Registra el par usuario/bot para escribirlo en el próximo lote"""
+    if _escritor is not None:
+        _escritor.registrar(sesion_id, mensaje_usuario, respuesta_bot)
+
+
+def escribir_transcripciones():
+    """Escribe ya lo pendiente (p. ej. antes de exportar una transcripción)"""
+    return _escritor.escribir() if _escritor is not None else 0
@@ -1,11 +1,86 @@
 import requests
 import json
+import random
+import threading
+import time
+from collections import namedtuple
+from requests.adapters import HTTPAdapter
 from config import Config
+from utils.metricas import Histogramas
+
+# Mensaje entrante del webhook; mensaje_id es el wamid (None si no viene)
+MensajeEntrante = namedtuple('MensajeEntrante', 'telefono texto mensaje_id')
+
+# Códigos que se reintentan (límite de tasa y errores del servidor)
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+# Latencia de cada envío por tipo y resultado (ver WhatsAppClient.metricas)
+latencias_envio = Histogramas()
+
+_sesion = None
+_lock_sesion = threading.Lock()
+
+
+def _sesion_http():
+    """
+    Sesión HTTP compartida: reutiliza conexiones keep-alive (sin un nuevo
+    handshake TCP+TLS por respuesta) y lleva las cabeceras fijas
+    """
+    global _sesion
+    if _sesion is None:
+        with _lock_sesion:
+            if _sesion is None:
+                sesion = requests.Session()
+                adaptador = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=Config.WHATSAPP_POOL_SIZE,
+                    max_retries=0  # Los reintentos se manejan en _post
+                )
+                sesion.mount('https://', adaptador)
+                sesion.mount('http://', adaptador)
+                sesion.headers.update({
+                    "Authorization": f"Bearer {Config.WHATSAPP_TOKEN}",
+                    "Content-Type": "application/json"
+                })
+                _sesion = sesion
+    return _sesion
+
+
+def espera_reintento(response, intento):
+    """
+    Segundos a esperar antes del siguiente intento: Retry-After o el tiempo de
+    recuperación que informa Meta (X-Business-Use-Case-Usage); si no hay,
+    backoff exponencial con jitter
+    """
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return min(float(retry_after), Config.WHATSAPP_ESPERA_MAXIMA)
+            except ValueError:
+                pass
+
+        uso = response.headers.get('X-Business-Use-Case-Usage')
+        if uso:
+            try:
+                minutos = max(
+                    (detalle.get('estimated_time_to_regain_access') or 0)
+                    for detalles in json.loads(uso).values()
+                    for detalle in detalles
+                )
+                if minutos:
+                    return min(minutos * 60.0, Config.WHATSAPP_ESPERA_MAXIMA)
+            except (ValueError, AttributeError, TypeError):
+                pass
+
+    espera = Config.WHATSAPP_BACKOFF_BASE * (2 ** intento)
+    return min(espera + random.uniform(0, espera / 2), Config.WHATSAPP_ESPERA_MAXIMA)
+
 
 class WhatsAppClient:
     """Cliente para interactuar con la API de WhatsApp Cloud"""
     
-    BASE_URL = "https://graph.facebook.com/v17.0"
+    BASE_URL = Config.WHATSAPP_API_URL
     
     @staticmethod
     def enviar_mensaje(telefono, respuesta_bot):
@@ -20,6 +95,24 @@ class WhatsAppClient:
             print("Error: Faltan credenciales de WhatsApp (TOKEN o PHONE_NUMBER_ID)")
             return False
 
+        try:
+            tipo, data = WhatsAppClient.construir_payload(telefono, respuesta_bot)
+            response = WhatsAppClient._post(data, tipo)
+            return WhatsAppClient._procesar_respuesta(response)
+                
+        except Exception as e:
+            print(f"Error enviando mensaje a WhatsApp: {e}")
+            return False
+
+    @staticmethod
+    def construir_payload(telefono, respuesta_bot):
+        """
+        Arma el cuerpo del POST a /messages según la respuesta del bot
+        (también lo usa el envío masivo de utils/envio_masivo.py)
+
+        Returns:
+            tuple: (tipo, data) con tipo 'texto', 'botones' o 'lista'
+        """
         # Limpiar teléfono (quitar + si existe)
         telefono = telefono.replace('+', '')
         
@@ -27,27 +120,59 @@ class WhatsAppClient:
         opciones = respuesta_bot.get('opciones', [])
         tipo = respuesta_bot.get('tipo', 'texto')
         
-        try:
-            if tipo == 'opciones' and opciones:
-                if len(opciones) <= 3:
-                    return WhatsAppClient._enviar_botones(telefono, mensaje_texto, opciones)
-                else:
-                    return WhatsAppClient._enviar_lista(telefono, mensaje_texto, opciones)
+        if tipo == 'opciones' and opciones:
+            if len(opciones) <= 3:
+                return 'botones', WhatsAppClient._payload_botones(telefono, mensaje_texto, opciones)
             else:
-                # Texto simple (para 'texto_libre', 'final' o 'error')
-                return WhatsAppClient._enviar_texto(telefono, mensaje_texto)
-                
-        except Exception as e:
-            print(f"Error enviando mensaje a WhatsApp: {e}")
-            return False
+                return 'lista', WhatsAppClient._payload_lista(telefono, mensaje_texto, opciones)
+        else:
+            # Texto simple (para 'texto_libre', 'final' o 'error')
+            return 'texto', WhatsAppClient._payload_texto(telefono, mensaje_texto)
 
     @staticmethod
-    def _enviar_texto(telefono, texto):
+    def _post(data, tipo):
+        """
+        POST a /messages con la sesión compartida, timeouts y reintentos
+
+        Se reintenta ante 429/5xx y errores de conexión. Un timeout de lectura
+        no se reintenta: el mensaje pudo haberse entregado y se duplicaría.
+        """
         url = f"{WhatsAppClient.BASE_URL}/{Config.WHATSAPP_PHONE_NUMBER_ID}/messages"
-        headers = {
-            "Authorization": f"Bearer {Config.WHATSAPP_TOKEN}",
-            "Content-Type": "application/json"
-        }
+        timeout = (Config.WHATSAPP_TIMEOUT_CONEXION, Config.WHATSAPP_TIMEOUT_LECTURA)
+
+        ultimo = Config.WHATSAPP_MAX_REINTENTOS
+        for intento in range(ultimo + 1):
+            inicio = time.perf_counter()
+            response = None
+            resultado = 'excepcion'
+            try:
+                response = _sesion_http().post(url, json=data, timeout=timeout)
+                resultado = str(response.status_code)
+            except requests.exceptions.ConnectionError:
+                # Incluye ConnectTimeout: la petición no llegó a enviarse
+                resultado = 'error_conexion'
+                if intento == ultimo:
+                    raise
+            except requests.exceptions.Timeout:
+                resultado = 'timeout_lectura'
+                raise
+            finally:
+                latencias_envio.observar(f'{tipo}:{resultado}', (time.perf_counter() - inicio) * 1000)
+
+            if intento == ultimo or (response is not None and response.status_code not in CODIGOS_REINTENTABLES):
+                return response
+
+            espera = espera_reintento(response, intento)
+            print(f"WhatsApp API respondió {resultado}, reintento {intento + 1}/{ultimo} en {espera:.1f}s")
+            time.sleep(espera)
+
+    @staticmethod
+    def metricas():
+        """Histogramas de latencia de envío por tipo:código (para monitoreo)"""
+        return latencias_envio.a_dict()
+
+    @staticmethod
+    def _payload_texto(telefono, texto):
         data = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
@@ -55,18 +180,10 @@ class WhatsAppClient:
             "type": "text",
             "text": {"body": texto}
         }
-        
-        response = requests.post(url, headers=headers, json=data)
-        return WhatsAppClient._procesar_respuesta(response)
+        return data
 
     @staticmethod
-    def _enviar_botones(telefono, texto, opciones):
-        url = f"{WhatsAppClient.BASE_URL}/{Config.WHATSAPP_PHONE_NUMBER_ID}/messages"
-        headers = {
-            "Authorization": f"Bearer {Config.WHATSAPP_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
+    def _payload_botones(telefono, texto, opciones):
         buttons = []
         for op in opciones:
             # ID debe ser único y corto (usamos el valor)
@@ -96,18 +213,10 @@ class WhatsAppClient:
                 }
             }
         }
-        
-        response = requests.post(url, headers=headers, json=data)
-        return WhatsAppClient._procesar_respuesta(response)
+        return data
 
     @staticmethod
-    def _enviar_lista(telefono, texto, opciones):
-        url = f"{WhatsAppClient.BASE_URL}/{Config.WHATSAPP_PHONE_NUMBER_ID}/messages"
-        headers = {
-            "Authorization": f"Bearer {Config.WHATSAPP_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
+    def _payload_lista(telefono, texto, opciones):
         rows = []
         for op in opciones:
             # Title máx 24 caracteres
@@ -155,9 +264,7 @@ class WhatsAppClient:
                 }
             }
         }
-        
-        response = requests.post(url, headers=headers, json=data)
-        return WhatsAppClient._procesar_respuesta(response)
+        return data
 
     @staticmethod
     def _procesar_respuesta(response):
@@ -166,3 +273,35 @@ class WhatsAppClient:
         else:
             print(f"Error API WhatsApp ({response.status_code}): {response.text}")
             return False
+
+
+def extraer_mensajes(data):
+    """
+    Extrae todos los mensajes de un payload del webhook de WhatsApp
+
+    Un mismo POST puede traer varias entradas, cada una con varios cambios y
+    cada cambio con varios mensajes (p. ej. tras una caída del servicio).
+
+    Returns:
+        list[MensajeEntrante]: En el orden en que llegaron. Las respuestas a
+        botones o listas devuelven como texto el id (el valor de la opción).
+    """
+    mensajes = []
+    for entry in (data or {}).get('entry', []):
+        for change in entry.get('changes', []):
+            for message in change.get('value', {}).get('messages', []):
+                tipo = message.get('type', 'text')
+                if tipo == 'text':
+                    texto = message.get('text', {}).get('body')
+                elif tipo == 'interactive':
+                    interactive = message.get('interactive', {})
+                    respuesta = interactive.get('button_reply') or interactive.get('list_reply') or {}
+                    texto = respuesta.get('id')
+                elif tipo == 'button':
+                    texto = message.get('button', {}).get('payload')
+                else:
+                    texto = None  # imágenes, audio, ubicación... no se procesan
+
+                if message.get('from') and texto:
+                    mensajes.append(MensajeEntrante(message['from'], texto, message.get('id')))
+    return mensajes
@@ -0,0 +1,90 @@
+"""
+Benchmark de arranque de la aplicación con y sin el modelo de spaCy
+
+Cada escenario se ejecuta en un proceso nuevo (create_app desde cero) y mide
+el tiempo hasta tener la app lista y la memoria residual máxima (RSS):
+
+- off:        NLP_MODO=off, el chatbot no usa spaCy
+- lazy:       NLP_MODO=lazy, arranque sin modelo (se carga en el primer mensaje)
+- lazy+uso:   como lazy, forzando la carga (primer mensaje del chatbot)
+- background: NLP_MODO=background, la app queda lista mientras el modelo carga
+
+Uso:
+    python benchmarks/benchmark_arranque.py
+    python benchmarks/benchmark_arranque.py --repeticiones 5 --modelo es_core_news_md
+"""
+import sys
+import os
+import json
+import argparse
+import subprocess
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Código que corre en el proceso hijo
+HIJO = r"""
+import sys, time, json, resource
+inicio = time.perf_counter()
+sys.path.insert(0, {backend!r})
+from app import create_app
+app = create_app(iniciar_trabajadores=True)
+listo = time.perf_counter() - inicio
+cargado = None
+if {forzar}:
+    from utils.nlp import obtener_nlp
+    cargado = obtener_nlp() is not None
+total = time.perf_counter() - inicio
+print(json.dumps({{
+    'listo_s': listo,
+    'total_s': total,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modelo_cargado': cargado,
+}}))
+"""
+
+ESCENARIOS = [
+    ('off', 'off', False),
+    ('lazy', 'lazy', False),
+    ('lazy+uso', 'lazy', True),
+    ('background', 'background', False),
+]
+
+
+def ejecutar(modo, forzar, modelo, url_bd):
+    entorno = dict(os.environ, NLP_MODO=modo, NLP_MODELO=modelo, DATABASE_URL=url_bd)
+    codigo = HIJO.format(backend=os.path.join(RAIZ, 'backend'), forzar=forzar)
+    salida = subprocess.run(
+        [sys.executable, '-c', codigo], env=entorno, cwd=RAIZ,
+        capture_output=True, text=True, check=True
+    ).stdout
+    # La última línea es el JSON (antes puede haber avisos impresos por la app)
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tiempo de arranque y RSS con y sin spaCy')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--modelo', default='es_core_news_sm')
+    args = parser.parse_args()
+
+    archivo = tempfile.mktemp(suffix='.db')
+    url_bd = f'sqlite:///{archivo}'
+
+    print(f"{'escenario':>12} {'listo (s)':>10} {'total (s)':>10} {'RSS (MB)':>9}  modelo")
+    try:
+        for nombre, modo, forzar in ESCENARIOS:
+            medidas = [ejecutar(modo, forzar, args.modelo, url_bd) for _ in range(args.repeticiones)]
+            listo = min(m['listo_s'] for m in medidas)
+            total = min(m['total_s'] for m in medidas)
+            rss = min(m['rss_mb'] for m in medidas)
+            cargado = medidas[0]['modelo_cargado']
+            estado = '-' if cargado is None else ('cargado' if cargado else 'no disponible')
+            print(f"{nombre:>12} {listo:>10.2f} {total:>10.2f} {rss:>9.1f}  {estado}")
+    finally:
+        if os.path.exists(archivo):
+            os.remove(archivo)
+
+
+if __name__ == '__main__':
+    main()
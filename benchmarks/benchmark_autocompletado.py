@@ -0,0 +1,74 @@
+"""
+Benchmark del autocompletado de la Base de Conocimiento
+
+Compara titulo LIKE '%q%' ORDER BY vistas (implementación anterior) contra el
+trie de prefijos en memoria (utils/autocompletado.py). El tiempo del trie
+debe mantenerse constante al crecer la base.
+
+Uso:
+    python benchmarks/benchmark_autocompletado.py
+    python benchmarks/benchmark_autocompletado.py --tamanos 1000 10000 --repeticiones 200
+"""
+import sys
+import os
+import time
+import argparse
+
+# Agregar backend al path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from sqlalchemy import select, desc
+from models import BaseConocimiento
+from utils.autocompletado import TriePrefijos
+from benchmark_busqueda import generar_articulos, preparar_bd
+
+# Lo que envía app.js mientras el usuario escribe
+PREFIJOS = ['im', 'impre', 'impresora', 'co', 'contra', 'vp', 'cómo inst', 'ter']
+
+
+def sugerir_like(conn, texto):
+    tabla = BaseConocimiento.__table__
+    consulta = select(tabla.c.id, tabla.c.titulo, tabla.c.categoria).where(
+        tabla.c.activo == True,
+        tabla.c.titulo.contains(texto)
+    ).order_by(desc(tabla.c.vistas)).limit(5)
+    return conn.execute(consulta).fetchall()
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for texto in PREFIJOS:
+            funcion(texto)
+    return (time.perf_counter() - inicio) * 1e6 / (repeticiones * len(PREFIJOS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark LIKE vs trie de autocompletado')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeticiones', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'artículos':>10} {'LIKE (µs)':>12} {'trie (µs)':>12} {'construcción (s)':>17} {'nodos':>8} {'memoria (MB)':>13}")
+    for total in args.tamanos:
+        engine, archivo = preparar_bd(total)
+        try:
+            with engine.connect() as conn:
+                like_us = medir(lambda q: sugerir_like(conn, q), max(1, args.repeticiones // 10))
+
+            trie = TriePrefijos()
+            inicio = time.perf_counter()
+            trie.construir(generar_articulos(total))
+            construccion = time.perf_counter() - inicio
+            trie_us = medir(lambda q: trie.sugerir(q, limite=5), args.repeticiones)
+
+            stats = trie.estadisticas()
+            print(f"{total:>10} {like_us:>12.1f} {trie_us:>12.1f} {construccion:>17.2f} "
+                  f"{stats['nodos']:>8} {stats['bytes_total'] / 1e6:>13.1f}")
+        finally:
+            engine.dispose()
+            os.remove(archivo)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark del barrido de sesiones del chatbot (utils/barrido_sesiones.py)
+
+Crea una tabla sesiones_chatbot con muchas sesiones acumuladas (la mayoría
+inactivas y antiguas, parte abandonadas con activa=True) y mide la búsqueda
+de la sesión activa de un teléfono, la que hace cada mensaje del chatbot:
+
+1. sin índices (como antes)
+2. con los índices (usuario_telefono, activa) y (fecha_ultima_actividad)
+3. con índices y después del barrido (desactivar y archivar)
+
+También reporta cuánto tarda el barrido y cuántas filas mueve.
+
+Uso:
+    python benchmarks/benchmark_barrido_sesiones.py
+    python benchmarks/benchmark_barrido_sesiones.py --sesiones 500000 --telefonos 5000
+"""
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+
+def poblar(db, SesionChatbot, HistorialChat, args):
+    """Sesiones de varios meses: 2% quedaron abandonadas con activa=True"""
+    random.seed(1)
+    ahora = datetime.utcnow()
+    sesiones, historial = [], []
+    for i in range(1, args.sesiones + 1):
+        fecha = ahora - timedelta(minutes=random.randint(0, 180 * 24 * 60))
+        sesiones.append({
+            'id': i,
+            'usuario_telefono': f'57300{random.randrange(args.telefonos):07d}',
+            'estado_conversacion': 'seleccionar_categoria',
+            'datos_temporales': {'nombre_usuario': 'Ana'},
+            'fecha_inicio': fecha,
+            'fecha_ultima_actividad': fecha,
+            'activa': random.random() < 0.02,
+        })
+        historial.extend({'sesion_id': i, 'emisor': emisor, 'mensaje': 'hola', 'fecha': fecha}
+                         for emisor in ('usuario', 'bot'))
+    with db.engine.begin() as conn:
+        conn.execute(SesionChatbot.__table__.insert(), sesiones)
+        conn.execute(HistorialChat.__table__.insert(), historial)
+
+
+def medir_busqueda(db, SesionChatbot, args):
+    """Latencia media (ms) de la sesión activa de teléfonos al azar"""
+    random.seed(2)
+    telefonos = [f'57300{random.randrange(args.telefonos):07d}' for _ in range(args.consultas)]
+    inicio = time.perf_counter()
+    for telefono in telefonos:
+        SesionChatbot.query.filter_by(usuario_telefono=telefono, activa=True).first()
+        db.session.rollback()
+    return (time.perf_counter() - inicio) * 1000 / len(telefonos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Barrido de sesiones: búsqueda de la sesión activa')
+    parser.add_argument('--sesiones', type=int, default=200000)
+    parser.add_argument('--telefonos', type=int, default=2000)
+    parser.add_argument('--consultas', type=int, default=500)
+    args = parser.parse_args()
+
+    archivo = tempfile.mktemp(suffix='.db')
+    from config import Config
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{archivo}'
+    Config.WEBHOOK_ASINCRONO = False
+    Config.BANDEJA_SALIDA = False
+    Config.NLP_MODO = 'off'
+    Config.SESIONES_BARRIDO_INTERVALO = 0
+
+    from app import create_app
+    from models import db, SesionChatbot, HistorialChat, SesionChatbotArchivada
+    app = create_app()
+
+    with app.app_context():
+        db.create_all()
+        indices = [indice for indice in SesionChatbot.__table__.indexes]
+        for indice in indices:
+            indice.drop(bind=db.engine)
+
+        t = time.perf_counter()
+        poblar(db, SesionChatbot, HistorialChat, args)
+        print(f"{args.sesiones} sesiones, {args.telefonos} teléfonos "
+              f"(poblado en {time.perf_counter() - t:.1f} s)\n")
+
+        print(f"{'escenario':>24} {'ms/búsqueda':>12} {'filas vivas':>12}")
+        vivas = SesionChatbot.query.count()
+        print(f"{'sin índices':>24} {medir_busqueda(db, SesionChatbot, args):>12.3f} {vivas:>12}")
+
+        for indice in indices:
+            indice.create(bind=db.engine)
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('ANALYZE')
+        print(f"{'con índices':>24} {medir_busqueda(db, SesionChatbot, args):>12.3f} {vivas:>12}")
+
+        barredor = app.extensions['barrido_sesiones']
+        t = time.perf_counter()
+        resultado = barredor.barrer()
+        duracion = time.perf_counter() - t
+        vivas = SesionChatbot.query.count()
+        print(f"{'índices + barrido':>24} {medir_busqueda(db, SesionChatbot, args):>12.3f} {vivas:>12}")
+
+        archivadas = db.session.query(db.func.count(SesionChatbotArchivada.id)).scalar()
+        print(f"\nBarrido: {resultado['desactivadas']} desactivadas, {resultado['archivadas']} archivadas "
+              f"({archivadas} en sesiones_chatbot_archivo) en {duracion:.1f} s, "
+              f"lotes de {barredor.lote}")
+        print(f"Historial vivo restante: {HistorialChat.query.count()} filas")
+        db.engine.dispose()
+
+    app.extensions['transcripciones'].detener()
+    os.remove(archivo)
+
+
+if __name__ == '__main__':
+    main()
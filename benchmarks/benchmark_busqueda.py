@@ -0,0 +1,127 @@
+"""
+Benchmark de búsqueda en la Base de Conocimiento
+
+Compara la búsqueda actual con LIKE '%q%' (.contains()) contra el índice
+invertido en memoria (utils/inverted_index.py) con 1k, 10k y 100k artículos.
+
+Uso:
+    python benchmarks/benchmark_busqueda.py
+    python benchmarks/benchmark_busqueda.py --tamanos 1000 10000 --repeticiones 50
+"""
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+from collections import namedtuple
+from itertools import accumulate
+
+# Agregar backend al path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from sqlalchemy import create_engine, select, or_, desc
+from models import db, BaseConocimiento
+from utils.inverted_index import IndiceInvertido
+
+VOCABULARIO = (
+    'impresora computador celular pantalla teclado monitor red servidor carpeta archivo '
+    'contraseña acceso clave sesión correo outlook agilmed software aplicativo citas historia '
+    'actualización instalación licencia windows office excel factura tóner tinta atasco papel '
+    'wifi internet cable conexión lento error falla reiniciar configurar instalar permisos '
+    'usuario sistema backup escáner cámara audio micrófono vpn navegador chrome'
+).split()
+
+CONSULTAS = ['impresora', 'contraseña correo', 'red carpeta', 'instalar office', 'vpn', 'agilm']
+
+# Además del vocabulario del dominio, términos poco frecuentes con distribución
+# tipo Zipf (como en una base de conocimiento real)
+TERMINOS_RAROS = [f'termino{i}' for i in range(20000)]
+PESOS_ACUMULADOS = list(accumulate(1.0 / (i + 1) for i in range(len(TERMINOS_RAROS))))
+
+Articulo = namedtuple('Articulo', 'id titulo contenido palabras_clave categoria subcategoria vistas activo')
+
+
+def texto_aleatorio(dominio, raros):
+    palabras = random.choices(VOCABULARIO, k=dominio) + random.choices(TERMINOS_RAROS, cum_weights=PESOS_ACUMULADOS, k=raros)
+    random.shuffle(palabras)
+    return ' '.join(palabras)
+
+
+def generar_articulos(total):
+    random.seed(total)
+    for i in range(1, total + 1):
+        yield Articulo(
+            id=i,
+            titulo='Cómo ' + texto_aleatorio(2, 2),
+            contenido=texto_aleatorio(8, 72),
+            palabras_clave=', '.join(random.choices(VOCABULARIO, k=3)),
+            categoria='problemas_tecnicos',
+            subcategoria='impresoras',
+            vistas=random.randint(0, 500),
+            activo=True
+        )
+
+
+def preparar_bd(total):
+    archivo = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f'sqlite:///{archivo}')
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(db.metadata.tables['usuarios'].insert(), [{'nombre': 'Autor', 'email': 'a@bench.local'}])
+        filas = [dict(a._asdict(), autor_id=1) for a in generar_articulos(total)]
+        conn.execute(BaseConocimiento.__table__.insert(), filas)
+    return engine, archivo
+
+
+def buscar_like(conn, texto):
+    tabla = BaseConocimiento.__table__
+    consulta = select(tabla.c.id, tabla.c.titulo).where(
+        tabla.c.activo == True,
+        or_(
+            tabla.c.titulo.contains(texto),
+            tabla.c.contenido.contains(texto),
+            tabla.c.palabras_clave.contains(texto)
+        )
+    ).order_by(desc(tabla.c.vistas)).limit(5)
+    return conn.execute(consulta).fetchall()
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for texto in CONSULTAS:
+            funcion(texto)
+    return (time.perf_counter() - inicio) * 1e6 / (repeticiones * len(CONSULTAS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark LIKE vs índice invertido')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'artículos':>10} {'LIKE (µs)':>12} {'índice (µs)':>12} {'x':>8} {'construcción (s)':>17} {'postings':>10}")
+    for total in args.tamanos:
+        engine, archivo = preparar_bd(total)
+        try:
+            with engine.connect() as conn:
+                like_us = medir(lambda q: buscar_like(conn, q), args.repeticiones)
+
+            articulos = list(generar_articulos(total))
+            indice = IndiceInvertido()
+            inicio = time.perf_counter()
+            indice.construir(articulos)
+            construccion = time.perf_counter() - inicio
+            indice_us = medir(lambda q: indice.buscar(q, limite=5), args.repeticiones)
+
+            stats = indice.estadisticas()
+            print(f"{total:>10} {like_us:>12.1f} {indice_us:>12.1f} {like_us / indice_us:>8.1f} "
+                  f"{construccion:>17.2f} {stats['postings']:>10}")
+        finally:
+            engine.dispose()
+            os.remove(archivo)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark de la caché de respuestas de estadísticas (utils/cache_respuestas.py)
+
+Varios técnicos (hilos) piden GET /api/dashboard/estadisticas y
+GET /api/tickets/estadisticas sin pausa durante --segundos, mientras otro
+hilo crea un ticket cada --escritura segundos (cada commit invalida las
+respuestas del grupo 'tickets'). Compara sin caché (CACHE_RESPUESTAS_TTL=0)
+y con caché: peticiones por segundo, milisegundos por petición y cuántas
+veces se recalcularon las estadísticas.
+
+Uso:
+    python benchmarks/benchmark_cache_estadisticas.py
+    python benchmarks/benchmark_cache_estadisticas.py --tickets 50000 --tecnicos 50 --ttl 5
+"""
+import sys
+import os
+import time
+import threading
+import argparse
+import tempfile
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+from benchmark_estadisticas_tickets import poblar
+
+URLS = ('/api/dashboard/estadisticas', '/api/tickets/estadisticas',
+        '/api/tickets/estadisticas?categoria=problemas_tecnicos')
+
+
+def cliente_tecnico(app, tecnico_id):
+    """Cliente de pruebas con la sesión de Flask-Login de un técnico"""
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['_user_id'] = str(tecnico_id)
+        sesion['_fresh'] = True
+    return cliente
+
+
+def ejecutar(app, db, Ticket, args, ttl):
+    """(peticiones/s, ms por petición, recálculos) con la caché en `ttl` segundos"""
+    from utils.cache_respuestas import init_cache_respuestas
+    app.config['CACHE_RESPUESTAS_TTL'] = ttl
+    cache = init_cache_respuestas(app)
+
+    fin = time.perf_counter() + args.segundos
+    duraciones = []
+    lock = threading.Lock()
+
+    def tecnico(numero):
+        cliente = cliente_tecnico(app, numero % args.tecnicos + 1)
+        propias = []
+        i = numero
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            respuesta = cliente.get(URLS[i % len(URLS)])
+            assert respuesta.status_code == 200, respuesta.data
+            propias.append(time.perf_counter() - inicio)
+            i += 1
+        with lock:
+            duraciones.extend(propias)
+
+    def escritor():
+        i = 0
+        while time.perf_counter() < fin:
+            time.sleep(args.escritura)
+            with app.app_context():
+                db.session.add(Ticket(usuario_id=args.tecnicos + 1, categoria='solicitudes', subcategoria='compras',
+                                      titulo=f'Nuevo {i}', descripcion='Descripción', prioridad='media'))
+                db.session.commit()
+            i += 1
+
+    hilos = [threading.Thread(target=tecnico, args=(n,)) for n in range(args.tecnicos)]
+    hilos.append(threading.Thread(target=escritor))
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    total = time.perf_counter() - inicio
+
+    recalculos = sum(endpoint['fallos'] for endpoint in cache.estadisticas()['endpoints'].values()) if ttl \
+        else len(duraciones)
+    return len(duraciones) / total, sum(duraciones) * 1000 / len(duraciones), len(duraciones), recalculos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Estadísticas de técnicos con y sin caché de respuestas')
+    parser.add_argument('--tickets', type=int, default=200000)
+    parser.add_argument('--usuarios', type=int, default=2000)
+    parser.add_argument('--tecnicos', type=int, default=20)
+    parser.add_argument('--dias', type=int, default=365)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--escritura', type=float, default=2, help='Segundos entre tickets nuevos')
+    parser.add_argument('--ttl', type=float, default=10)
+    args = parser.parse_args()
+
+    archivo = tempfile.mktemp(suffix='.db')
+    from config import Config
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{archivo}'
+    Config.WEBHOOK_ASINCRONO = False
+    Config.BANDEJA_SALIDA = False
+    Config.NLP_MODO = 'off'
+    Config.SESIONES_BARRIDO_INTERVALO = 0
+
+    from app import create_app
+    from models import db, Ticket, Usuario
+    app = create_app()
+
+    with app.app_context():
+        db.create_all()
+        poblar(db, Ticket, Usuario, args)
+
+    print(f"{args.tickets} tickets, {args.tecnicos} técnicos, {args.segundos:.0f} s, "
+          f"un ticket nuevo cada {args.escritura} s\n")
+    print(f"{'caché':>10} {'peticiones':>11} {'pet/s':>8} {'ms/pet':>8} {'recálculos':>11}")
+    for ttl in (0, args.ttl):
+        por_segundo, ms, peticiones, recalculos = ejecutar(app, db, Ticket, args, ttl)
+        nombre = f'ttl {ttl:g} s' if ttl else 'sin caché'
+        print(f"{nombre:>10} {peticiones:>11} {por_segundo:>8.1f} {ms:>8.1f} {recalculos:>11}")
+
+    with app.app_context():
+        db.engine.dispose()
+    app.extensions['contador_vistas'].detener()
+    app.extensions['transcripciones'].detener()
+    os.remove(archivo)
+
+
+if __name__ == '__main__':
+    main()
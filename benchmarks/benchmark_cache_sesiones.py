@@ -0,0 +1,157 @@
+"""
+Benchmark de la caché de sesiones del chatbot (utils/cache_sesiones.py)
+
+Muchos teléfonos conversan a la vez (los mensajes se intercalan entre
+teléfonos) y cada conversación llega hasta crear un ticket. Se compara
+SESION_CACHE=off (dos SELECT y el UPDATE de la sesión en cada mensaje) con
+SESION_CACHE=memoria (sesión servida desde la caché y cambios escritos por
+lotes).
+
+Mide mensajes/s, latencia por mensaje, sentencias SQL por mensaje y revisa
+que al final la base de datos quede igual en los dos modos (mismas sesiones
+con el mismo estado y los mismos tickets).
+
+Uso:
+    python benchmarks/benchmark_cache_sesiones.py
+    python benchmarks/benchmark_cache_sesiones.py --telefonos 500 --rondas 3 --hilos 4
+"""
+import sys
+import os
+import time
+import queue
+import argparse
+import tempfile
+import threading
+import contextlib
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+CONVERSACION = ['hola', 'problema', 'impresoras', 'si_crear',
+                'La impresora del segundo piso no imprime', 'confirmar']
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def ejecutar(modo, args):
+    from config import Config
+    from sqlalchemy import event
+    Config.SESION_CACHE = modo
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{tempfile.mktemp(suffix=".db")}'
+
+    from app import create_app
+    from models import db, Usuario, SesionChatbot, Ticket
+    import routes.chatbot as chatbot
+    # Como el proceso que atiende peticiones: hilos de escritura por lotes (y cola del webhook)
+    app = create_app(iniciar_trabajadores=True)
+    archivo = Config.SQLALCHEMY_DATABASE_URI[len('sqlite:///'):]
+
+    telefonos = [f'57300{i:07d}' for i in range(args.telefonos)]
+    with app.app_context():
+        db.create_all()
+        # La mitad de los teléfonos están registrados (pueden crear tickets)
+        db.session.add_all([
+            Usuario(nombre=f'Usuario {i}', email=f'u{i}@x.com', telefono=telefono, activo=True)
+            for i, telefono in enumerate(telefonos) if i % 2 == 0
+        ])
+        db.session.commit()
+
+        sentencias = [0]
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def contar(*_):
+            sentencias[0] += 1
+
+    # Intercalados: cada teléfono envía su siguiente mensaje después de que
+    # todos los demás enviaron el suyo
+    pendientes = queue.Queue()
+    for _ in range(args.rondas):
+        for texto in CONVERSACION:
+            for telefono in telefonos:
+                pendientes.put((telefono, texto))
+    total_mensajes = pendientes.qsize()
+    latencias = []
+
+    def trabajar():
+        propias = []
+        with app.app_context():
+            while True:
+                try:
+                    telefono, texto = pendientes.get_nowait()
+                except queue.Empty:
+                    break
+                t = time.perf_counter()
+                chatbot.procesar_mensaje_whatsapp(telefono, texto)
+                propias.append((time.perf_counter() - t) * 1000)
+                db.session.remove()
+        latencias.extend(propias)
+
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        trabajadores = [threading.Thread(target=trabajar) for _ in range(args.hilos)]
+        for t in trabajadores:
+            t.start()
+        for t in trabajadores:
+            t.join()
+    duracion = time.perf_counter() - inicio
+    sentencias_mensajes = sentencias[0]
+
+    cache = app.extensions.get('cache_sesiones')
+    if cache is not None:
+        cache.detener()
+    app.extensions['transcripciones'].detener()
+
+    with app.app_context():
+        estado = sorted(
+            db.session.query(SesionChatbot.usuario_telefono, SesionChatbot.activa,
+                             SesionChatbot.estado_conversacion).all()
+        )
+        tickets = Ticket.query.count()
+        db.engine.dispose()
+    os.remove(archivo)
+
+    return {
+        'mensajes_s': total_mensajes / duracion,
+        'p50': percentil(latencias, 0.5),
+        'p99': percentil(latencias, 0.99),
+        'sql_por_mensaje': sentencias_mensajes / total_mensajes,
+        'estado': estado,
+        'tickets': tickets,
+        'cache': cache.estadisticas() if cache is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Caché de sesiones del chatbot: con y sin caché')
+    parser.add_argument('--telefonos', type=int, default=200)
+    parser.add_argument('--rondas', type=int, default=2, help='Conversaciones completas por teléfono')
+    parser.add_argument('--hilos', type=int, default=1)
+    args = parser.parse_args()
+
+    from config import Config
+    Config.WEBHOOK_ASINCRONO = False
+    Config.BANDEJA_SALIDA = False
+    Config.NLP_MODO = 'off'
+    Config.SESION_CACHE_FLUSH_INTERVALO = 2
+
+    print(f"{args.telefonos} teléfonos x {args.rondas} conversaciones de {len(CONVERSACION)} mensajes, "
+          f"{args.hilos} hilo(s)\n")
+    print(f"{'caché':>8} {'msg/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'SQL/msg':>8} {'tickets':>8}")
+    resultados = {}
+    for modo in ('off', 'memoria'):
+        r = resultados[modo] = ejecutar(modo, args)
+        print(f"{modo:>8} {r['mensajes_s']:>8.1f} {r['p50']:>9.2f} {r['p99']:>9.2f} "
+              f"{r['sql_por_mensaje']:>8.2f} {r['tickets']:>8}")
+
+    print(f"\nCaché: {resultados['memoria']['cache']}")
+    iguales = (resultados['off']['estado'] == resultados['memoria']['estado'] and
+               resultados['off']['tickets'] == resultados['memoria']['tickets'])
+    print(f"Estado final de la base de datos igual en los dos modos: {'sí' if iguales else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark de concurrencia por conversación del chatbot
+
+Varios hilos procesan mensajes de muchos teléfonos a la vez (como varios
+workers o peticiones simultáneas a /api/chatbot/mensaje). Cada teléfono
+envía una ráfaga seguida que cae en hilos distintos al mismo tiempo.
+
+Se mide el rendimiento (mensajes/s) según el número de hilos y cuántos
+teléfonos terminan con más de una sesión activa, con el bloqueo por
+teléfono (utils/bloqueos.py) y sin él.
+
+Uso:
+    python benchmarks/benchmark_conversaciones.py
+    python benchmarks/benchmark_conversaciones.py --telefonos 200 --hilos 1 4 16 --latencia-ms 80
+"""
+import sys
+import os
+import time
+import queue
+import random
+import argparse
+import tempfile
+import threading
+import contextlib
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+from fake_graph_api import ServidorGraphFalso
+
+RAFAGA = ['hola', 'hola', 'problema', 'problemas_tecnicos', 'impresoras']
+
+
+class SinBloqueo:
+    """Reemplazo del gestor de bloqueos para medir el comportamiento anterior"""
+
+    @contextlib.contextmanager
+    def bloquear(self, clave, timeout=None):
+        yield
+
+
+def ejecutar(hilos, con_bloqueo, args):
+    from config import Config
+    from models import db, SesionChatbot
+    import routes.chatbot as chatbot
+    from utils.bloqueos import bloqueos_conversacion
+
+    archivo = tempfile.mktemp(suffix='.db')
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{archivo}'
+    Config.WEBHOOK_ASINCRONO = False
+    # Respuesta enviada dentro del procesamiento, como un worker sin bandeja de salida
+    Config.BANDEJA_SALIDA = False
+
+    from app import create_app
+    # Como el proceso que atiende peticiones: hilos de escritura por lotes (y cola del webhook)
+    app = create_app(iniciar_trabajadores=True)
+    with app.app_context():
+        db.create_all()
+
+    chatbot.bloqueos_conversacion = bloqueos_conversacion if con_bloqueo else SinBloqueo()
+
+    # Las ráfagas van seguidas en la cola: los mensajes de un teléfono los
+    # toman hilos distintos casi al mismo tiempo
+    telefonos = [f'57300{i:07d}' for i in range(args.telefonos)]
+    random.seed(hilos)
+    random.shuffle(telefonos)
+    mensajes = [(telefono, texto) for telefono in telefonos for texto in RAFAGA]
+    pendientes = queue.Queue()
+    for mensaje in mensajes:
+        pendientes.put(mensaje)
+
+    errores = []
+
+    def trabajar():
+        with app.app_context():
+            while True:
+                try:
+                    telefono, texto = pendientes.get_nowait()
+                except queue.Empty:
+                    return
+                error, = chatbot.responder_mensajes([(telefono, texto)])
+                if error:
+                    errores.append(error)
+
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        trabajadores = [threading.Thread(target=trabajar) for _ in range(hilos)]
+        for t in trabajadores:
+            t.start()
+        for t in trabajadores:
+            t.join()
+    total = time.perf_counter() - inicio
+
+    with app.app_context():
+        duplicadas = db.session.query(SesionChatbot.usuario_telefono).filter_by(activa=True).group_by(
+            SesionChatbot.usuario_telefono
+        ).having(db.func.count(SesionChatbot.id) > 1).count()
+        db.engine.dispose()
+    os.remove(archivo)
+    chatbot.bloqueos_conversacion = bloqueos_conversacion
+
+    return len(mensajes) / total, duplicadas, len(errores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bloqueo por teléfono: rendimiento y carreras')
+    parser.add_argument('--telefonos', type=int, default=60)
+    parser.add_argument('--hilos', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--latencia-ms', type=float, default=50, help='Latencia de la Graph API falsa')
+    args = parser.parse_args()
+
+    servidor = ServidorGraphFalso(latencia_ms=args.latencia_ms).iniciar()
+    os.environ.update(
+        WHATSAPP_API_URL=servidor.url, WHATSAPP_TOKEN='token-falso',
+        WHATSAPP_PHONE_NUMBER_ID='123456', NLP_MODO='off'
+    )
+
+    print(f"{args.telefonos} teléfonos x {len(RAFAGA)} mensajes, Graph API falsa con {args.latencia_ms:.0f} ms\n")
+    print(f"{'hilos':>6} {'bloqueo':>8} {'msg/s':>8} {'sesiones dup.':>14} {'errores':>8}")
+    try:
+        for hilos in args.hilos:
+            for con_bloqueo in (False, True):
+                rendimiento, duplicadas, errores = ejecutar(hilos, con_bloqueo, args)
+                print(f"{hilos:>6} {'sí' if con_bloqueo else 'no':>8} {rendimiento:>8.1f} "
+                      f"{duplicadas:>14} {errores:>8}")
+    finally:
+        servidor.detener()
+
+
+if __name__ == '__main__':
+    main()
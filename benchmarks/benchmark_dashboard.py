@@ -0,0 +1,167 @@
+"""
+Benchmark del inicio del dashboard (GET / y GET /api/dashboard/home)
+
+Compara, por render del inicio:
+
+- anterior: un COUNT por contador (abiertos, asignados, nuevos, críticos),
+  más tickets recientes y artículos populares: hasta seis consultas
+- nuevo:    utils/resumen_dashboard.resumen_home, con los contadores en una
+  consulta de agregación condicional: tres consultas
+
+Reporta consultas (idas y vueltas a la base de datos) y milisegundos por
+render, para un técnico y para un usuario. Con --rtt-ms se agrega esa
+latencia a cada consulta, como si la base de datos estuviera en otra máquina.
+
+Uso:
+    python benchmarks/benchmark_dashboard.py
+    python benchmarks/benchmark_dashboard.py --tickets 500000 --rtt-ms 1
+"""
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+from sqlalchemy import desc, event
+from sqlalchemy.engine import Engine
+
+
+def home_anterior(db, Ticket, BaseConocimiento, usuario):
+    """Consultas que hacía home() antes de resumen_home"""
+    tickets_abiertos = Ticket.query.filter_by(
+        usuario_id=usuario.id
+    ).filter(
+        Ticket.estado.notin_(['resuelto', 'cerrado'])
+    ).count()
+    tickets_recientes = Ticket.query.filter_by(
+        usuario_id=usuario.id
+    ).order_by(desc(Ticket.fecha_creacion)).limit(5).all()
+    articulos_populares = BaseConocimiento.query.filter_by(
+        activo=True
+    ).order_by(desc(BaseConocimiento.vistas)).limit(3).all()
+    stats_tecnico = {}
+    if usuario.es_tecnico:
+        stats_tecnico = {
+            'tickets_asignados': Ticket.query.filter_by(
+                tecnico_id=usuario.id
+            ).filter(
+                Ticket.estado.notin_(['resuelto', 'cerrado'])
+            ).count(),
+            'tickets_nuevos': Ticket.query.filter_by(estado='nuevo').count(),
+            'tickets_criticos': Ticket.query.filter_by(prioridad='critica').filter(
+                Ticket.estado.notin_(['resuelto', 'cerrado'])
+            ).count()
+        }
+    return {
+        'tickets_abiertos': tickets_abiertos,
+        'tickets_recientes': tickets_recientes,
+        'articulos_populares': articulos_populares,
+        'stats_tecnico': stats_tecnico
+    }
+
+
+def poblar(db, Ticket, BaseConocimiento, Usuario, args):
+    """Usuarios, técnicos, artículos y tickets (la mayoría ya cerrados)"""
+    random.seed(1)
+    ahora = datetime.utcnow()
+    usuarios = [{'id': i, 'nombre': f'Usuario {i}', 'email': f'u{i}@bench.local', 'es_tecnico': i <= args.tecnicos,
+                 'activo': True} for i in range(1, args.usuarios + 1)]
+    estados = ['nuevo', 'asignado_a_tecnico', 'en_proceso', 'esperando_respuesta_usuario', 'resuelto', 'cerrado']
+    tickets = [{
+        'usuario_id': random.randint(args.tecnicos + 1, args.usuarios),
+        'tecnico_id': random.randint(1, args.tecnicos) if random.random() < 0.8 else None,
+        'categoria': 'problemas_tecnicos',
+        'subcategoria': 'impresoras',
+        'titulo': f'Ticket {i}',
+        'descripcion': 'La impresora no imprime',
+        'estado': random.choices(estados, weights=[3, 2, 3, 1, 40, 51])[0],
+        'prioridad': random.choice(['baja', 'media', 'alta', 'critica']),
+        'fecha_creacion': ahora - timedelta(minutes=random.randint(0, 365 * 24 * 60)),
+    } for i in range(args.tickets)]
+    articulos = [{'titulo': f'Artículo {i}', 'contenido': 'Pasos para resolverlo', 'categoria': 'problemas_tecnicos',
+                  'autor_id': 1, 'vistas': random.randint(0, 5000), 'activo': True} for i in range(1000)]
+    with db.engine.begin() as conn:
+        conn.execute(Usuario.__table__.insert(), usuarios)
+        conn.execute(Ticket.__table__.insert(), tickets)
+        conn.execute(BaseConocimiento.__table__.insert(), articulos)
+        conn.exec_driver_sql('ANALYZE')
+
+
+def medir(funcion, usuarios, rtt):
+    """(consultas por render, ms por render)"""
+    from utils.query_counter import ContadorQueries
+    from models import db
+    with ContadorQueries() as contador:
+        inicio = time.perf_counter()
+        for usuario in usuarios:
+            funcion(usuario)
+            db.session.rollback()
+        duracion = time.perf_counter() - inicio
+    return contador.total / len(usuarios), duracion * 1000 / len(usuarios)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inicio del dashboard: consultas y latencia por render')
+    parser.add_argument('--tickets', type=int, default=200000)
+    parser.add_argument('--usuarios', type=int, default=2000)
+    parser.add_argument('--tecnicos', type=int, default=20)
+    parser.add_argument('--renders', type=int, default=200)
+    parser.add_argument('--rtt-ms', type=float, default=0.0,
+                        help='Latencia de red simulada por consulta (ms)')
+    args = parser.parse_args()
+
+    archivo = tempfile.mktemp(suffix='.db')
+    from config import Config
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{archivo}'
+    Config.WEBHOOK_ASINCRONO = False
+    Config.BANDEJA_SALIDA = False
+    Config.NLP_MODO = 'off'
+    Config.SESIONES_BARRIDO_INTERVALO = 0
+
+    from app import create_app
+    from models import db, Ticket, BaseConocimiento, Usuario
+    from utils.resumen_dashboard import resumen_home
+    app = create_app()
+
+    if args.rtt_ms:
+        @event.listens_for(Engine, 'before_cursor_execute')
+        def _latencia(conn, cursor, statement, parameters, context, executemany):
+            time.sleep(args.rtt_ms / 1000)
+
+    with app.app_context():
+        db.create_all()
+        poblar(db, Ticket, BaseConocimiento, Usuario, args)
+
+        random.seed(2)
+        tecnicos = [db.session.get(Usuario, random.randint(1, args.tecnicos)) for _ in range(args.renders)]
+        usuarios = [db.session.get(Usuario, random.randint(args.tecnicos + 1, args.usuarios))
+                    for _ in range(args.renders)]
+        db.session.expunge_all()
+
+        assert home_anterior(db, Ticket, BaseConocimiento, tecnicos[0])['stats_tecnico'] == \
+            resumen_home(tecnicos[0])['stats_tecnico']
+
+        print(f"{args.tickets} tickets, {args.renders} renders por caso, rtt simulado {args.rtt_ms} ms\n")
+        print(f"{'caso':>10} {'método':>10} {'consultas':>10} {'ms/render':>10}")
+        for nombre, grupo in (('técnico', tecnicos), ('usuario', usuarios)):
+            for metodo, funcion in (
+                ('anterior', lambda u: home_anterior(db, Ticket, BaseConocimiento, u)),
+                ('nuevo', resumen_home),
+            ):
+                consultas, ms = medir(funcion, grupo, args.rtt_ms)
+                print(f"{nombre:>10} {metodo:>10} {consultas:>10.1f} {ms:>10.2f}")
+        db.engine.dispose()
+
+    app.extensions['contador_vistas'].detener()
+    app.extensions['transcripciones'].detener()
+    os.remove(archivo)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark de envío de respuestas a WhatsApp contra una Graph API falsa
+
+Compara el envío anterior (un `requests.post` suelto por mensaje: conexión
+nueva, sin timeout ni reintentos) con WhatsAppClient (sesión compartida con
+pool keep-alive, timeouts y reintentos con backoff ante 429/5xx).
+
+Mide mensajes/s, conexiones TCP abiertas y mensajes que no llegaron
+cuando la API falsa responde errores con la tasa indicada. En local no hay
+handshake TLS, así que la ganancia real contra graph.facebook.com es mayor.
+
+Uso:
+    python benchmarks/benchmark_envio.py
+    python benchmarks/benchmark_envio.py --mensajes 500 --hilos 8 --latencia-ms 30 --tasa-error 0.1
+"""
+import sys
+import os
+import time
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+from fake_graph_api import ServidorGraphFalso
+
+
+def enviar_sin_sesion(telefono, texto):
+    """Envío como antes: headers armados y conexión nueva en cada llamada"""
+    from config import Config
+    url = f"{Config.WHATSAPP_API_URL}/{Config.WHATSAPP_PHONE_NUMBER_ID}/messages"
+    headers = {
+        "Authorization": f"Bearer {Config.WHATSAPP_TOKEN}",
+        "Content-Type": "application/json"
+    }
+    data = {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": telefono,
+        "type": "text",
+        "text": {"body": texto}
+    }
+    return requests.post(url, headers=headers, json=data).status_code == 200
+
+
+def enviar_con_sesion(telefono, texto):
+    from utils.whatsapp_client import WhatsAppClient
+    return WhatsAppClient.enviar_mensaje(telefono, {'mensaje': texto, 'tipo': 'texto'})
+
+
+def ejecutar(enviar, args, servidor):
+    conexiones, recibidos = servidor.conexiones, servidor.recibidos
+    telefonos = [f'57300{i:07d}' for i in range(args.mensajes)]
+
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        with ThreadPoolExecutor(args.hilos) as pool:
+            resultados = list(pool.map(lambda telefono: enviar(telefono, 'Hola'), telefonos))
+    total = time.perf_counter() - inicio
+
+    return {
+        'msg_s': args.mensajes / total,
+        'conexiones': servidor.conexiones - conexiones,
+        'entregados': servidor.recibidos - recibidos,
+        'fallidos': resultados.count(False),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Envío a WhatsApp: requests.post suelto vs sesión con pool')
+    parser.add_argument('--mensajes', type=int, default=300)
+    parser.add_argument('--hilos', type=int, default=4)
+    parser.add_argument('--latencia-ms', type=float, default=20, help='Latencia de la Graph API falsa')
+    parser.add_argument('--tasa-error', type=float, default=0.05, help='Fracción de respuestas 429/500/503')
+    args = parser.parse_args()
+
+    servidor = ServidorGraphFalso(latencia_ms=args.latencia_ms, tasa_error=args.tasa_error).iniciar()
+    os.environ.update(
+        WHATSAPP_API_URL=servidor.url, WHATSAPP_TOKEN='token-falso',
+        WHATSAPP_PHONE_NUMBER_ID='123456', WHATSAPP_BACKOFF_BASE='0.05'
+    )
+
+    print(f"{args.mensajes} mensajes, {args.hilos} hilos, Graph API falsa con {args.latencia_ms:.0f} ms "
+          f"y {args.tasa_error:.0%} de errores\n")
+    print(f"{'modo':>12} {'msg/s':>8} {'conexiones':>11} {'entregados':>11} {'fallidos':>9}")
+    try:
+        for nombre, enviar in (('sin sesión', enviar_sin_sesion), ('con sesión', enviar_con_sesion)):
+            r = ejecutar(enviar, args, servidor)
+            print(f"{nombre:>12} {r['msg_s']:>8.1f} {r['conexiones']:>11} {r['entregados']:>11} {r['fallidos']:>9}")
+
+        from utils.whatsapp_client import WhatsAppClient
+        print("\nLatencia por intento (con sesión):")
+        for nombre, h in WhatsAppClient.metricas().items():
+            print(f"  {nombre:<12} n={h['total']:<5} p50<={h['p50_ms']} ms  p95<={h['p95_ms']} ms  "
+                  f"máx={h['maximo_ms']} ms")
+    finally:
+        servidor.detener()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark de envío masivo a WhatsApp contra una Graph API falsa
+
+Compara enviar los mensajes uno a uno con WhatsAppClient.enviar_mensaje
+(bloqueante) con el envío asíncrono de utils/envio_masivo.py, con varias
+concurrencias y con el token bucket activo (tasa) o prácticamente libre.
+
+Mide mensajes/s, mensajes entregados y el pico de peticiones simultáneas
+que vio la API falsa.
+
+Uso:
+    python benchmarks/benchmark_envio_masivo.py
+    python benchmarks/benchmark_envio_masivo.py --mensajes 2000 --concurrencias 10 50 --tasa 80 --tasa-error 0.05
+"""
+import sys
+import os
+import time
+import argparse
+import contextlib
+import threading
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+from fake_graph_api import ServidorGraphFalso
+
+
+class MedidorConcurrencia:
+    """Cuenta las peticiones en vuelo en la API falsa (envolviendo su latencia)"""
+
+    def __init__(self, servidor):
+        self.actuales = 0
+        self.pico = 0
+        self._lock = threading.Lock()
+        handler = servidor._servidor.RequestHandlerClass
+        original = handler.do_POST
+        medidor = self
+
+        def do_POST(self_handler):
+            with medidor._lock:
+                medidor.actuales += 1
+                medidor.pico = max(medidor.pico, medidor.actuales)
+            try:
+                original(self_handler)
+            finally:
+                with medidor._lock:
+                    medidor.actuales -= 1
+
+        handler.do_POST = do_POST
+
+    def reiniciar(self):
+        with self._lock:
+            self.pico = 0
+
+
+def mensajes(n):
+    for i in range(n):
+        yield f'57300{i:07d}', {'mensaje': f'🎫 Ticket #{i}: Estado: En Proceso', 'tipo': 'texto'}
+
+
+def ejecutar(nombre, enviar, args, servidor, medidor):
+    recibidos = servidor.recibidos
+    medidor.reiniciar()
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        enviar()
+    total = time.perf_counter() - inicio
+    print(f"{nombre:>26} {args.mensajes / total:>8.1f} {servidor.recibidos - recibidos:>11} {medidor.pico:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Envío masivo: secuencial vs asyncio con límites')
+    parser.add_argument('--mensajes', type=int, default=300)
+    parser.add_argument('--concurrencias', type=int, nargs='+', default=[5, 20, 50])
+    parser.add_argument('--tasa', type=float, default=80, help='Mensajes/s del token bucket')
+    parser.add_argument('--latencia-ms', type=float, default=50, help='Latencia de la Graph API falsa')
+    parser.add_argument('--tasa-error', type=float, default=0.0, help='Fracción de respuestas 429/500/503')
+    args = parser.parse_args()
+
+    servidor = ServidorGraphFalso(latencia_ms=args.latencia_ms, tasa_error=args.tasa_error).iniciar()
+    medidor = MedidorConcurrencia(servidor)
+    os.environ.update(
+        WHATSAPP_API_URL=servidor.url, WHATSAPP_TOKEN='token-falso',
+        WHATSAPP_PHONE_NUMBER_ID='123456', WHATSAPP_BACKOFF_BASE='0.05'
+    )
+
+    from utils.whatsapp_client import WhatsAppClient
+    from utils.envio_masivo import enviar_masivo
+
+    print(f"{args.mensajes} mensajes, Graph API falsa con {args.latencia_ms:.0f} ms "
+          f"y {args.tasa_error:.0%} de errores\n")
+    print(f"{'modo':>26} {'msg/s':>8} {'entregados':>11} {'pico':>6}")
+    try:
+        ejecutar('secuencial', lambda: [WhatsAppClient.enviar_mensaje(t, r) for t, r in mensajes(args.mensajes)],
+                 args, servidor, medidor)
+        for concurrencia in args.concurrencias:
+            for tasa in (args.tasa, 100000):
+                etiqueta = f'{tasa:.0f} msg/s' if tasa == args.tasa else 'sin límite'
+                ejecutar(f'async x{concurrencia}, {etiqueta}',
+                         lambda: enviar_masivo(mensajes(args.mensajes), concurrencia=concurrencia, tasa=tasa),
+                         args, servidor, medidor)
+    finally:
+        servidor.detener()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Benchmark de las estadísticas de tickets (GET /api/dashboard/estadisticas
+y GET /api/tickets/estadisticas)
+
+Compara, por petición:
+
+- tickets: GROUP BY sobre la tabla tickets completa (TICKET_STATS_ROLLUP=false)
+- rollup:  las mismas agregaciones sobre ticket_stats (TICKET_STATS_ROLLUP=true)
+
+Reporta milisegundos por petición y filas de la tabla leída. Las filas del
+resumen son los grupos (día, estado, categoría, subcategoría, prioridad,
+técnico) con tickets: la ganancia crece con los tickets por grupo, así que
+depende de --dias y --tecnicos además de --tickets. También mide
+cuánto agrega el mantenimiento del resumen a crear y cambiar de estado un
+ticket con el ORM.
+
+Uso:
+    python benchmarks/benchmark_estadisticas_tickets.py
+    python benchmarks/benchmark_estadisticas_tickets.py --tickets 1000000 --peticiones 50
+    python benchmarks/benchmark_estadisticas_tickets.py --tecnicos 5 --dias 90
+"""
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+
+def poblar(db, Ticket, Usuario, args):
+    """Usuarios, técnicos y tickets repartidos en los últimos `--dias` días"""
+    random.seed(1)
+    ahora = datetime.utcnow()
+    usuarios = [{'id': i, 'nombre': f'Usuario {i}', 'email': f'u{i}@bench.local', 'es_tecnico': i <= args.tecnicos,
+                 'activo': True} for i in range(1, args.usuarios + 1)]
+    categorias = {
+        'problemas_tecnicos': ['impresoras', 'equipos', 'internet', 'software'],
+        'permisos_accesos': ['correo', 'carpetas', 'sistemas'],
+        'solicitudes': ['compras', 'instalaciones'],
+    }
+    estados = ['nuevo', 'asignado_a_tecnico', 'en_proceso', 'esperando_respuesta_usuario', 'resuelto', 'cerrado']
+    tickets = []
+    for i in range(args.tickets):
+        categoria = random.choice(list(categorias))
+        tickets.append({
+            'usuario_id': random.randint(args.tecnicos + 1, args.usuarios),
+            'tecnico_id': random.randint(1, args.tecnicos) if random.random() < 0.8 else None,
+            'categoria': categoria,
+            'subcategoria': random.choice(categorias[categoria]),
+            'titulo': f'Ticket {i}',
+            'descripcion': 'Descripción del problema',
+            'estado': random.choices(estados, weights=[3, 2, 3, 1, 40, 51])[0],
+            'prioridad': random.choice(['baja', 'media', 'alta', 'critica']),
+            'fecha_creacion': ahora - timedelta(minutes=random.randint(0, args.dias * 24 * 60)),
+        })
+    with db.engine.begin() as conn:
+        conn.execute(Usuario.__table__.insert(), usuarios)
+        conn.execute(Ticket.__table__.insert(), tickets)
+        conn.exec_driver_sql('ANALYZE')
+
+
+def peticion(resumen_general, totales_por_categoria):
+    """Lo que calculan juntas las dos vistas de estadísticas"""
+    resumen_general(dias=30)
+    totales_por_categoria()
+    totales_por_categoria('problemas_tecnicos')
+
+
+def comparable(resultados):
+    """
+    Sin los conteos de los últimos 30 días: con el resumen la ventana se
+    cuenta por día de creación y abarca el día completo de la fecha límite
+    """
+    resumen, *totales = resultados
+    return {clave: resumen[clave] for clave in ('total_tickets', 'tickets_abiertos', 'tickets_por_estado')}, totales
+
+
+def medir(app, db, funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+        db.session.rollback()
+    return (time.perf_counter() - inicio) * 1000 / repeticiones
+
+
+def escrituras(app, db, Ticket, cantidad):
+    """ms por ticket creado y luego cerrado, cada cambio en su propio commit"""
+    inicio = time.perf_counter()
+    for i in range(cantidad):
+        ticket = Ticket(usuario_id=30, categoria='solicitudes', subcategoria='compras', titulo=f'Nuevo {i}',
+                        descripcion='Descripción', prioridad='media')
+        db.session.add(ticket)
+        db.session.commit()
+        ticket.estado = 'cerrado'
+        ticket.tecnico_id = 1
+        db.session.commit()
+    return (time.perf_counter() - inicio) * 1000 / cantidad
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Estadísticas de tickets: GROUP BY sobre tickets vs ticket_stats')
+    parser.add_argument('--tickets', type=int, default=200000)
+    parser.add_argument('--usuarios', type=int, default=2000)
+    parser.add_argument('--tecnicos', type=int, default=20)
+    parser.add_argument('--dias', type=int, default=365, help='Días sobre los que se reparten los tickets')
+    parser.add_argument('--peticiones', type=int, default=20)
+    parser.add_argument('--escrituras', type=int, default=200)
+    args = parser.parse_args()
+
+    archivo = tempfile.mktemp(suffix='.db')
+    from config import Config
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{archivo}'
+    Config.WEBHOOK_ASINCRONO = False
+    Config.BANDEJA_SALIDA = False
+    Config.NLP_MODO = 'off'
+    Config.SESIONES_BARRIDO_INTERVALO = 0
+    Config.TICKET_STATS_ROLLUP = False
+
+    from app import create_app
+    from models import db, Ticket, Usuario, EstadisticaTicket
+    from utils.estadisticas_tickets import (
+        reconstruir, verificar, resumen_general, totales_por_categoria, _motores_con_resumen
+    )
+    app = create_app()
+
+    with app.test_request_context():
+        db.create_all()
+        poblar(db, Ticket, Usuario, args)
+
+        # Escritura sin resumen: la tabla ticket_stats se mantiene siempre que exista
+        EstadisticaTicket.__table__.drop(bind=db.engine)
+        _motores_con_resumen.discard(db.engine)
+        ms_escritura_sin = escrituras(app, db, Ticket, args.escrituras)
+        EstadisticaTicket.__table__.create(bind=db.engine)
+
+        inicio = time.perf_counter()
+        grupos = reconstruir()
+        ms_reconstruir = (time.perf_counter() - inicio) * 1000
+
+        ms_tickets = medir(app, db, lambda: peticion(resumen_general, totales_por_categoria), args.peticiones)
+        esperado = (resumen_general(dias=30), totales_por_categoria(), totales_por_categoria('problemas_tecnicos'))
+
+        app.config['TICKET_STATS_ROLLUP'] = True
+        obtenido = (resumen_general(dias=30), totales_por_categoria(), totales_por_categoria('problemas_tecnicos'))
+        assert comparable(esperado) == comparable(obtenido), 'el resumen no coincide con los tickets'
+        ms_rollup = medir(app, db, lambda: peticion(resumen_general, totales_por_categoria), args.peticiones)
+        ms_escritura_con = escrituras(app, db, Ticket, args.escrituras)
+        assert verificar() == []
+
+        filas_tickets = Ticket.query.count()
+        filas_rollup = EstadisticaTicket.query.count()
+        db.session.rollback()
+
+        print(f"{args.tickets} tickets, {grupos} grupos en ticket_stats (reconstruir: {ms_reconstruir:.0f} ms)\n")
+        print(f"{'lectura':>10} {'filas':>10} {'ms/petición':>12}")
+        print(f"{'tickets':>10} {filas_tickets:>10} {ms_tickets:>12.2f}")
+        print(f"{'rollup':>10} {filas_rollup:>10} {ms_rollup:>12.2f}")
+        print(f"\n{'x':>10} {'':>10} {ms_tickets / ms_rollup:>12.1f}")
+        print(f"\nEscritura (crear + cerrar un ticket): {ms_escritura_sin:.2f} ms sin resumen, "
+              f"{ms_escritura_con:.2f} ms con resumen")
+        db.engine.dispose()
+
+    app.extensions['contador_vistas'].detener()
+    app.extensions['transcripciones'].detener()
+    os.remove(archivo)
+
+
+if __name__ == '__main__':
+    main()
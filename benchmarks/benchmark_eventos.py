@@ -0,0 +1,76 @@
+"""
+Benchmark del bus de eventos (utils/eventos.py)
+
+1. Costo para quien publica: --eventos eventos con un suscriptor que tarda
+   --trabajo milisegundos (p. ej. una llamada externa). Síncrono, el commit
+   espera al suscriptor; en hilos solo paga encolar el evento.
+2. Contrapresión: el mismo suscriptor lento con una cola de --cola eventos
+   recibe ráfagas más rápido de lo que procesa. Con EVENTOS_ESPERA=0 se
+   descarta en cuanto la cola se llena; con espera, quien publica se frena
+   hasta que hay lugar y se descarta menos.
+
+Uso:
+    python benchmarks/benchmark_eventos.py
+    python benchmarks/benchmark_eventos.py --eventos 500 --trabajo 5 --hilos 4
+"""
+import sys
+import os
+import time
+import argparse
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+from flask import Flask
+from utils.eventos import BusEventos, TicketCreado
+
+
+def publicar(bus, eventos):
+    """Milisegundos de quien publica por evento (promedio y máximo)"""
+    tiempos = []
+    for i in range(eventos):
+        inicio = time.perf_counter()
+        bus.publicar(TicketCreado({'id': i, 'estado': 'nuevo'}, 'benchmark'))
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return sum(tiempos) / len(tiempos), max(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bus de eventos: suscriptores síncronos vs en hilos')
+    parser.add_argument('--eventos', type=int, default=200)
+    parser.add_argument('--trabajo', type=float, default=2, help='Milisegundos que tarda el suscriptor')
+    parser.add_argument('--hilos', type=int, default=2)
+    parser.add_argument('--cola', type=int, default=50)
+    parser.add_argument('--espera', type=float, default=0.05, help='EVENTOS_ESPERA del segundo escenario')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+
+    def suscriptor(evento):
+        time.sleep(args.trabajo / 1000)
+
+    print(f"{args.eventos} eventos, suscriptor de {args.trabajo:g} ms\n")
+    print(f"{'modo':>22} {'ms/publicar':>12} {'máx ms':>8} {'total s':>8} {'procesados':>11} {'descartados':>12}")
+
+    for nombre, hilos, cola, espera in (
+        ('síncrono', 0, None, 0),
+        (f'{args.hilos} hilos', args.hilos, args.eventos, 0),
+        (f'cola {args.cola}, sin espera', args.hilos, args.cola, 0),
+        (f'cola {args.cola}, espera {args.espera:g}', args.hilos, args.cola, args.espera),
+    ):
+        bus = BusEventos(espera=espera)
+        bus.suscribir(TicketCreado, suscriptor, hilos=hilos, maximo_cola=cola, nombre='suscriptor')
+        bus.iniciar(app)
+        inicio = time.perf_counter()
+        promedio, maximo = publicar(bus, args.eventos)
+        bus.esperar()
+        total = time.perf_counter() - inicio
+        bus.detener()
+        st = bus.estadisticas()['suscriptores']['suscriptor']
+        print(f"{nombre:>22} {promedio:>12.3f} {maximo:>8.1f} {total:>8.2f} "
+              f"{st['procesados']:>11} {st.get('descartados', 0):>12}")
+
+
+if __name__ == '__main__':
+    main()
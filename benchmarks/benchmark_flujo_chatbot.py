@@ -0,0 +1,153 @@
+"""
+Reproducción de conversaciones del chatbot contra ChatbotFlowManager
+
+Genera miles de conversaciones guionizadas (recorridos aleatorios con
+semilla fija: casi siempre se elige una de las opciones que ofreció el bot,
+a veces se escribe texto libre o algo inválido) y las pasa por el gestor de
+flujo sin WhatsApp ni webhook. Reporta la latencia por estado (el estado en
+que estaba la sesión al llegar el mensaje) y una huella de todas las
+respuestas: dos versiones del flujo que respondan igual dan la misma huella.
+
+Los artículos de la base de conocimiento y los tickets usan una base SQLite
+temporal; cada conversación se deshace al terminar (rollback).
+
+Uso:
+    python benchmarks/benchmark_flujo_chatbot.py
+    python benchmarks/benchmark_flujo_chatbot.py --conversaciones 5000
+    # Otra versión del backend (p. ej. un git worktree) para comparar
+    python benchmarks/benchmark_flujo_chatbot.py --backend /tmp/otra_version/backend
+"""
+import sys
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import contextlib
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DESCRIPCIONES = [
+    'La impresora del segundo piso no imprime y muestra error de papel',
+    'No puedo entrar al sistema, necesito restablecer la contraseña',
+    'El computador se reinicia solo cada media hora',
+    'corto',
+    'Necesito instalar el programa de facturación en mi equipo nuevo',
+    'La carpeta compartida de ventas no abre desde ayer',
+]
+TEXTOS_INVALIDOS = ['qué?', 'xyz', '42', 'no sé', 'problema', 'impresoras', 'confirmar']
+
+ARTICULOS = [
+    ('Cómo solucionar atascos de papel en la impresora', 'problemas_tecnicos', 'impresoras',
+     'impresora, papel, atasco'),
+    ('La impresora no imprime: revisar cola de impresión', 'problemas_tecnicos', 'impresoras',
+     'impresora, cola, error'),
+    ('Restablecer la contraseña del sistema interno', 'permisos_accesos', 'reset_password',
+     'contraseña, sistema, acceso'),
+    ('Acceso a carpetas compartidas de la red', 'permisos_accesos', 'carpetas_compartidas',
+     'carpeta, compartida, red'),
+]
+
+
+def siguiente_mensaje(rnd, respuesta):
+    """Lo que escribiría el usuario ante la respuesta del bot"""
+    opciones = respuesta.get('opciones') or []
+    if respuesta.get('tipo') == 'texto_libre':
+        return rnd.choice(DESCRIPCIONES)
+    if opciones and rnd.random() < 0.85:
+        return rnd.choice(opciones)['valor']
+    return rnd.choice(TEXTOS_INVALIDOS)
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reproducción de conversaciones: latencia por estado')
+    parser.add_argument('--conversaciones', type=int, default=2000)
+    parser.add_argument('--max-pasos', type=int, default=10)
+    parser.add_argument('--semilla', type=int, default=7)
+    parser.add_argument('--backend', default=os.path.join(RAIZ, 'backend'),
+                        help='Directorio backend a medir (por defecto el de este repositorio)')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.backend))
+    archivo = tempfile.mktemp(suffix='.db')
+    from config import Config
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{archivo}'
+    Config.WEBHOOK_ASINCRONO = False
+    Config.BANDEJA_SALIDA = False
+    Config.NLP_MODO = 'off'
+
+    from app import create_app
+    from models import db, Usuario, BaseConocimiento, SesionChatbot
+    import routes.chatbot as chatbot
+    # Como el proceso que atiende peticiones: hilos de escritura por lotes (y cola del webhook)
+    app = create_app(iniciar_trabajadores=True)
+
+    with app.app_context():
+        db.create_all()
+        autor = Usuario(nombre='Técnico', email='tec@x.com', telefono='573000000000', es_tecnico=True, activo=True)
+        db.session.add(autor)
+        db.session.add(Usuario(nombre='Ana Gómez', email='ana@x.com', telefono='573001111111', activo=True))
+        db.session.flush()
+        for i, (titulo, categoria, subcategoria, claves) in enumerate(ARTICULOS):
+            db.session.add(BaseConocimiento(
+                titulo=titulo, contenido=f'{titulo}. Pasos detallados para resolverlo. ' * 4,
+                categoria=categoria, subcategoria=subcategoria, palabras_clave=claves,
+                autor_id=autor.id, vistas=i
+            ))
+        db.session.commit()
+
+    rnd = random.Random(args.semilla)
+    latencias = defaultdict(list)
+    huella = hashlib.sha256()
+    mensajes = 0
+
+    with app.test_request_context(), open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        flujo = chatbot.flow_manager
+        inicio = time.perf_counter()
+        for n in range(args.conversaciones):
+            registrado = n % 2 == 0
+            sesion = SesionChatbot(
+                usuario_telefono='573001111111' if registrado else '573002222222',
+                estado_conversacion='inicio',
+                datos_temporales={'nombre_usuario': 'Ana' if registrado else ''},
+                activa=True
+            )
+            texto = 'hola'
+            for _ in range(args.max_pasos):
+                estado = sesion.estado_conversacion
+                t = time.perf_counter()
+                respuesta = flujo.procesar_mensaje(sesion, texto)
+                latencias[estado].append((time.perf_counter() - t) * 1e6)
+                mensajes += 1
+                huella.update(json.dumps([estado, texto, respuesta], ensure_ascii=False, sort_keys=True).encode())
+                if respuesta.get('tipo') == 'final':
+                    break
+                texto = siguiente_mensaje(rnd, respuesta)
+            db.session.rollback()
+        duracion = time.perf_counter() - inicio
+
+    print(f"{args.conversaciones} conversaciones, {mensajes} mensajes en {duracion:.2f} s "
+          f"({mensajes / duracion:.0f} msg/s)\n")
+    print(f"{'estado':>24} {'mensajes':>9} {'media (µs)':>11} {'p50 (µs)':>9} {'p99 (µs)':>9}")
+    for estado, valores in sorted(latencias.items(), key=lambda item: -len(item[1])):
+        print(f"{estado:>24} {len(valores):>9} {sum(valores) / len(valores):>11.1f} "
+              f"{percentil(valores, 0.5):>9.1f} {percentil(valores, 0.99):>9.1f}")
+    print(f"\nHuella de las respuestas: {huella.hexdigest()[:16]}")
+
+    app.extensions['contador_vistas'].detener()
+    app.extensions['transcripciones'].detener()
+    with app.app_context():
+        db.engine.dispose()
+    os.remove(archivo)
+
+
+if __name__ == '__main__':
+    main()
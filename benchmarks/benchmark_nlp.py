@@ -0,0 +1,130 @@
+"""
+Micro-benchmark de la detección de intención del chatbot
+
+Compara, sobre un corpus de mensajes reales (benchmarks/datos/mensajes_chatbot.txt):
+
+- anterior: pipeline completo de spaCy (tagger, parser, NER) y búsqueda de
+  cada lema en las listas de mapa_entidades
+- nuevo:    pipeline recortado (Config.NLP_EXCLUIR) y diccionario compilado
+  forma -> subcategoría (utils/intenciones.py)
+
+También se mide solo el emparejamiento (lemas ya calculados), se informa
+cuántos mensajes obtienen un resultado distinto y se compara una ráfaga del
+webhook (--rafaga mensajes) procesada uno a uno contra nlp.pipe por lotes.
+
+Uso:
+    python benchmarks/benchmark_nlp.py
+    python benchmarks/benchmark_nlp.py --repeticiones 50 --modelo es_core_news_md
+    python benchmarks/benchmark_nlp.py --rafaga 500 --batch-size 128
+"""
+import sys
+import os
+import time
+import argparse
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+import spacy
+from config import Config
+from utils.intenciones import analizar_lemas, lemas_de, PALABRAS_PROBLEMA, MAPA_ENTIDADES
+from itertools import cycle, islice
+
+CORPUS = os.path.join(RAIZ, 'benchmarks', 'datos', 'mensajes_chatbot.txt')
+
+
+def entender_anterior(doc):
+    """Implementación anterior de entender_mensaje_nlp (recorrido de listas)"""
+    intencion = None
+    entidades = {}
+    if any(token.lemma_ in PALABRAS_PROBLEMA for token in doc):
+        intencion = 'reportar_problema'
+    for token in doc:
+        lemma = token.lemma_
+        for subcategoria, keywords in MAPA_ENTIDADES.items():
+            if lemma in keywords:
+                entidades['subcategoria'] = subcategoria
+                for cat, data in Config.MAIN_CATEGORIES.items():
+                    if subcategoria in data.get('subcategories', {}):
+                        entidades['categoria'] = cat
+                        break
+                break
+        if 'categoria' in entidades:
+            break
+    if intencion and 'categoria' in entidades:
+        return {'intencion': intencion, 'entidades': entidades}
+    return None
+
+
+def cargar(modelo, excluir):
+    try:
+        return spacy.load(modelo, exclude=excluir), True
+    except IOError:
+        # Sin el modelo instalado solo se mide el tokenizador
+        return spacy.blank('es'), False
+
+
+def medir(funcion, mensajes, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for mensaje in mensajes:
+            funcion(mensaje)
+    return (time.perf_counter() - inicio) * 1e6 / (repeticiones * len(mensajes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia de NLP por mensaje del chatbot')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--modelo', default=Config.NLP_MODELO)
+    parser.add_argument('--rafaga', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=Config.NLP_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with open(CORPUS, encoding='utf-8') as archivo:
+        mensajes = [linea.strip() for linea in archivo if linea.strip()]
+
+    completo, disponible = cargar(args.modelo, [])
+    recortado, _ = cargar(args.modelo, Config.NLP_EXCLUIR)
+    if not disponible:
+        print(f"⚠️  Modelo '{args.modelo}' no instalado: se usa spacy.blank('es') (solo tokenizador)")
+    print(f"Pipeline completo:  {completo.pipe_names}")
+    print(f"Pipeline recortado: {recortado.pipe_names}")
+    print(f"Mensajes: {len(mensajes)}\n")
+
+    anterior_us = medir(lambda m: entender_anterior(completo(m.lower())), mensajes, args.repeticiones)
+    nuevo_us = medir(lambda m: analizar_lemas(lemas_de(recortado(m.lower()))), mensajes, args.repeticiones)
+
+    lemas = {m: lemas_de(recortado(m.lower())) for m in mensajes}
+    docs = {m: completo(m.lower()) for m in mensajes}
+    match_anterior_us = medir(lambda m: entender_anterior(docs[m]), mensajes, args.repeticiones * 10)
+    match_nuevo_us = medir(lambda m: analizar_lemas(lemas[m]), mensajes, args.repeticiones * 10)
+
+    distintos = sum(1 for m in mensajes if entender_anterior(docs[m]) != analizar_lemas(lemas[m]))
+    detectados = sum(1 for m in mensajes if analizar_lemas(lemas[m]))
+
+    print(f"{'':>24} {'anterior (µs)':>14} {'nuevo (µs)':>12} {'x':>7}")
+    print(f"{'pipeline + intención':>24} {anterior_us:>14.1f} {nuevo_us:>12.1f} {anterior_us / nuevo_us:>7.1f}")
+    print(f"{'solo emparejamiento':>24} {match_anterior_us:>14.1f} {match_nuevo_us:>12.1f} "
+          f"{match_anterior_us / match_nuevo_us:>7.1f}")
+    print(f"\nIntención detectada (nuevo): {detectados}/{len(mensajes)}")
+    if disponible:
+        print(f"Resultados distintos al anterior: {distintos}")
+
+    # Ráfaga del webhook: N mensajes uno a uno vs nlp.pipe
+    rafaga = [m.lower() for m in islice(cycle(mensajes), args.rafaga)]
+    inicio = time.perf_counter()
+    uno_a_uno = [analizar_lemas(lemas_de(recortado(m))) for m in rafaga]
+    uno_a_uno_s = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    por_lotes = [analizar_lemas(lemas_de(doc)) for doc in recortado.pipe(rafaga, batch_size=args.batch_size)]
+    por_lotes_s = time.perf_counter() - inicio
+    assert uno_a_uno == por_lotes
+
+    print(f"\nRáfaga de {len(rafaga)} mensajes: uno a uno {uno_a_uno_s * 1000:.1f} ms, "
+          f"nlp.pipe (batch_size={args.batch_size}) {por_lotes_s * 1000:.1f} ms "
+          f"({uno_a_uno_s / por_lotes_s:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
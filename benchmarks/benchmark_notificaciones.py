@@ -0,0 +1,130 @@
+"""
+Benchmark de las notificaciones de técnicos: consulta periódica vs SSE
+
+- consulta: cada técnico pide /dashboard/notificaciones cada --intervalo
+  segundos (tres consultas por petición)
+- SSE:      cada técnico calcula el estado al conectarse
+  (GET /api/dashboard/notificaciones/stream) y luego lo actualiza con los
+  eventos de tickets del bus del proceso (utils/notificaciones.py)
+
+Con --tecnicos conectados y --tickets-minuto tickets nuevos (y otros tantos
+cambios de estado) por minuto, reporta consultas por minuto y milisegundos
+de trabajo del servidor por minuto en cada modo. Los streams se recorren
+desde un solo hilo; el costo por evento es su reparto y la actualización del
+estado de cada técnico.
+
+Uso:
+    python benchmarks/benchmark_notificaciones.py
+    python benchmarks/benchmark_notificaciones.py --tecnicos 200 --tickets-minuto 30
+"""
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+from benchmark_estadisticas_tickets import poblar
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Notificaciones de técnicos: consulta periódica vs SSE')
+    parser.add_argument('--tickets', type=int, default=200000)
+    parser.add_argument('--usuarios', type=int, default=2000)
+    parser.add_argument('--tecnicos', type=int, default=50)
+    parser.add_argument('--dias', type=int, default=365)
+    parser.add_argument('--intervalo', type=float, default=30, help='Segundos entre consultas (modo consulta)')
+    parser.add_argument('--tickets-minuto', type=int, default=10)
+    args = parser.parse_args()
+
+    archivo = tempfile.mktemp(suffix='.db')
+    from config import Config
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{archivo}'
+    Config.WEBHOOK_ASINCRONO = False
+    Config.BANDEJA_SALIDA = False
+    Config.NLP_MODO = 'off'
+    Config.SESIONES_BARRIDO_INTERVALO = 0
+    Config.NOTIFICACIONES_SSE_COLA = 10000
+    Config.NOTIFICACIONES_SSE_MAXIMO = 0
+
+    from app import create_app
+    from models import db, Ticket, Usuario
+    from utils.query_counter import ContadorQueries
+    from utils.notificaciones import EstadoNotificaciones, stream_notificaciones, obtener_bus_notificaciones
+    from utils.eventos import bus_eventos, registrar_evento, ticket_creado, ticket_estado_cambiado
+    app = create_app()
+
+    with app.app_context():
+        db.create_all()
+        poblar(db, Ticket, Usuario, args)
+        tecnicos = list(range(1, args.tecnicos + 1))
+
+        # Consulta periódica: una ronda de todos los técnicos
+        with ContadorQueries() as contador:
+            inicio = time.perf_counter()
+            for tecnico_id in tecnicos:
+                EstadoNotificaciones.desde_bd(tecnico_id).a_dict()
+                db.session.rollback()
+            ms_ronda = (time.perf_counter() - inicio) * 1000
+        rondas_minuto = 60 / args.intervalo
+        consulta = (contador.total * rondas_minuto, ms_ronda * rondas_minuto)
+
+        # SSE: conexión de todos los técnicos (una vez) y un minuto de eventos
+        with ContadorQueries() as contador:
+            inicio = time.perf_counter()
+            streams = [stream_notificaciones(tecnico_id, obtener_bus_notificaciones().suscribir(), latido=0.001,
+                                             resincronizar=0, duracion=0) for tecnico_id in tecnicos]
+            for stream in streams:
+                next(stream)
+            ms_conexion = (time.perf_counter() - inicio) * 1000
+        consultas_conexion = contador.total
+
+        random.seed(3)
+        ms_reparto = 0.0
+        with ContadorQueries() as contador:
+            for i in range(args.tickets_minuto):
+                usuario = db.session.get(Usuario, random.randint(args.tecnicos + 1, args.usuarios))
+                ticket = Ticket(usuario_id=usuario.id, categoria='solicitudes', subcategoria='compras',
+                                titulo=f'Nuevo {i}', descripcion='Descripción', prioridad=random.choice(
+                                    ['media', 'alta', 'critica']))
+                db.session.add(ticket)
+                db.session.flush()
+                registrar_evento(ticket_creado(ticket, 'portal', usuario.nombre))
+                db.session.commit()
+                ticket.estado = 'en_proceso'
+                ticket.tecnico_id = random.choice(tecnicos)
+                registrar_evento(ticket_estado_cambiado(ticket))
+                db.session.commit()
+                # El reparto a los streams corre en un hilo del bus de eventos
+                bus_eventos.esperar()
+
+                inicio = time.perf_counter()
+                consultas_escritura = contador.total
+                for stream in streams:
+                    next(stream)
+                    next(stream)
+                ms_reparto += (time.perf_counter() - inicio) * 1000
+                assert contador.total == consultas_escritura, 'el reparto no debe consultar la base de datos'
+
+        for stream in streams:
+            stream.close()
+
+        print(f"{args.tickets} tickets, {args.tecnicos} técnicos conectados, consulta cada {args.intervalo:g} s, "
+              f"{args.tickets_minuto} tickets nuevos y {args.tickets_minuto} cambios de estado por minuto\n")
+        print(f"{'modo':>10} {'consultas/min':>14} {'ms servidor/min':>16}")
+        print(f"{'consulta':>10} {consulta[0]:>14.0f} {consulta[1]:>16.1f}")
+        print(f"{'SSE':>10} {0:>14} {ms_reparto:>16.1f}")
+        print(f"\nConexión SSE (una vez por técnico): {consultas_conexion} consultas, {ms_conexion:.1f} ms en total")
+        db.engine.dispose()
+
+    app.extensions['contador_vistas'].detener()
+    app.extensions['transcripciones'].detener()
+    os.remove(archivo)
+
+
+if __name__ == '__main__':
+    main()
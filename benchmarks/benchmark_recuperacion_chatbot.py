@@ -0,0 +1,164 @@
+"""
+Benchmark de la búsqueda de artículos con la descripción del chatbot
+
+Compara, para el estado buscar_con_descripcion:
+
+- anterior: un LIKE '%palabra%' por cada palabra de más de 3 letras sobre
+  titulo, contenido y palabras_clave, unidos con OR y ordenados por vistas
+- nuevo:    BM25 sobre el índice invertido en memoria
+  (IndiceInvertido.buscar_relevantes, términos con stemming y sin palabras vacías)
+
+Calidad: descripciones etiquetadas con sus artículos relevantes
+(benchmarks/datos/recuperacion_chatbot.json); se reporta acierto@2 (algún
+relevante entre los dos mostrados), precisión@2 y MRR@2.
+Latencia: los artículos etiquetados más artículos de relleno aleatorios
+(ver benchmark_busqueda.py) hasta cada tamaño. Para BM25 se separa la
+primera pasada (calcula los aportes de cada término, lo que vuelve a pasar
+después de cada escritura en la base de conocimiento) de las siguientes.
+
+Uso:
+    python benchmarks/benchmark_recuperacion_chatbot.py
+    python benchmarks/benchmark_recuperacion_chatbot.py --tamanos 1000 10000 --repeticiones 10
+"""
+import sys
+import os
+import re
+import json
+import time
+import random
+import argparse
+import tempfile
+from collections import namedtuple
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+from sqlalchemy import create_engine, select, or_, desc
+from models import db, BaseConocimiento
+from utils.inverted_index import IndiceInvertido
+from benchmark_busqueda import generar_articulos
+
+FIXTURE = os.path.join(RAIZ, 'benchmarks', 'datos', 'recuperacion_chatbot.json')
+
+Articulo = namedtuple('Articulo', 'id titulo contenido palabras_clave categoria subcategoria vistas activo')
+
+
+def cargar_fixture():
+    with open(FIXTURE, encoding='utf-8') as f:
+        datos = json.load(f)
+    random.seed(3)
+    articulos, claves = [], {}
+    for i, fila in enumerate(datos['articulos'], 1):
+        claves[i] = fila['clave']
+        articulos.append(Articulo(
+            id=i, titulo=fila['titulo'], contenido=fila['contenido'], palabras_clave=fila['palabras_clave'],
+            categoria=fila['categoria'], subcategoria=fila['subcategoria'],
+            vistas=random.randint(0, 500), activo=True
+        ))
+    return articulos, claves, datos['descripciones']
+
+
+def relleno(total, desde):
+    """Artículos aleatorios con ids a partir de `desde` hasta completar `total`"""
+    if total < desde:
+        return []
+    return [articulo._replace(id=articulo.id + desde - 1) for articulo in generar_articulos(total - desde + 1)]
+
+
+def preparar_bd(articulos):
+    archivo = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f'sqlite:///{archivo}')
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(db.metadata.tables['usuarios'].insert(), [{'nombre': 'Autor', 'email': 'a@bench.local'}])
+        conn.execute(BaseConocimiento.__table__.insert(), [dict(a._asdict(), autor_id=1) for a in articulos])
+    return engine, archivo
+
+
+def buscar_anterior(conn, descripcion):
+    """Consulta que hacía estado_buscar_con_descripcion"""
+    palabras_clave = [p for p in re.split(r'\s+|,|\.', descripcion) if len(p) > 3]
+    if not palabras_clave:
+        return []
+    tabla = BaseConocimiento.__table__
+    consulta = select(tabla.c.id).where(
+        tabla.c.activo == True,
+        or_(*[
+            or_(
+                tabla.c.titulo.contains(palabra),
+                tabla.c.contenido.contains(palabra),
+                tabla.c.palabras_clave.contains(palabra)
+            ) for palabra in palabras_clave
+        ])
+    ).order_by(desc(tabla.c.vistas)).limit(2)
+    return [fila.id for fila in conn.execute(consulta)]
+
+
+def calidad(funcion, descripciones, claves):
+    aciertos = precision = mrr = 0.0
+    for caso in descripciones:
+        encontrados = [claves.get(articulo_id) for articulo_id in funcion(caso['texto'])]
+        relevantes = set(caso['relevantes'])
+        utiles = [clave in relevantes for clave in encontrados]
+        aciertos += any(utiles)
+        precision += sum(utiles) / 2
+        mrr += next((1 / posicion for posicion, util in enumerate(utiles, 1) if util), 0)
+    total = len(descripciones)
+    return aciertos / total, precision / total, mrr / total
+
+
+def medir(funcion, descripciones, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for caso in descripciones:
+            funcion(caso['texto'])
+    return (time.perf_counter() - inicio) * 1e6 / (repeticiones * len(descripciones))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Artículos para la descripción del chatbot: LIKE vs BM25')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    articulos, claves, descripciones = cargar_fixture()
+
+    engine, archivo = preparar_bd(articulos)
+    try:
+        indice = IndiceInvertido()
+        indice.construir(articulos)
+        with engine.connect() as conn:
+            anterior = calidad(lambda texto: buscar_anterior(conn, texto), descripciones, claves)
+        nuevo = calidad(
+            lambda texto: [doc.id for doc in indice.buscar_relevantes(texto, limite=2)], descripciones, claves
+        )
+    finally:
+        engine.dispose()
+        os.remove(archivo)
+
+    print(f"Calidad: {len(descripciones)} descripciones etiquetadas, {len(articulos)} artículos\n")
+    print(f"{'método':>10} {'acierto@2':>10} {'precisión@2':>12} {'MRR@2':>8}")
+    for nombre, (aciertos, precision, mrr) in (('anterior', anterior), ('BM25', nuevo)):
+        print(f"{nombre:>10} {aciertos:>10.3f} {precision:>12.3f} {mrr:>8.3f}")
+
+    print(f"\n{'artículos':>10} {'anterior (µs)':>14} {'BM25 1ª (µs)':>13} {'BM25 (µs)':>10} {'x':>8}")
+    for total in args.tamanos:
+        todos = articulos + relleno(total, len(articulos) + 1)
+        engine, archivo = preparar_bd(todos)
+        try:
+            with engine.connect() as conn:
+                anterior_us = medir(lambda texto: buscar_anterior(conn, texto), descripciones, args.repeticiones)
+            indice = IndiceInvertido()
+            indice.construir(todos)
+            primera_us = medir(lambda texto: indice.buscar_relevantes(texto, limite=2), descripciones, 1)
+            nuevo_us = medir(lambda texto: indice.buscar_relevantes(texto, limite=2), descripciones, args.repeticiones)
+            print(f"{len(todos):>10} {anterior_us:>14.1f} {primera_us:>13.1f} {nuevo_us:>10.1f} "
+                  f"{anterior_us / nuevo_us:>8.1f}")
+        finally:
+            engine.dispose()
+            os.remove(archivo)
+
+
+if __name__ == '__main__':
+    main()
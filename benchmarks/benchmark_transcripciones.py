@@ -0,0 +1,107 @@
+"""
+Benchmark de escritura de transcripciones del chatbot (historial_chat)
+
+Compara guardar cada par usuario/bot con su propio INSERT + commit (lo que
+costaría hacerlo dentro del webhook) con el escritor por lotes de
+utils/transcripciones.py (se acumula en memoria y se inserta con executemany).
+
+Mide el tiempo que el mensaje pasa escribiendo (lo que suma a cada
+respuesta) y el tiempo total hasta que todo quedó en la base de datos.
+
+Uso:
+    python benchmarks/benchmark_transcripciones.py
+    python benchmarks/benchmark_transcripciones.py --mensajes 5000 --umbral 500
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+RESPUESTA = {
+    'mensaje': 'Perfecto, me dices que necesitas ayuda con: **Problemas Técnicos**',
+    'opciones': [{'texto': 'Impresoras', 'valor': 'impresoras'}],
+    'tipo': 'opciones'
+}
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def por_mensaje(app, args):
+    from models import db, HistorialChat
+    from utils.transcripciones import _texto_respuesta
+
+    latencias = []
+    with app.app_context():
+        for i in range(args.mensajes):
+            t = time.perf_counter()
+            db.session.add(HistorialChat(sesion_id=i % args.sesiones + 1, emisor='usuario', mensaje='impresoras'))
+            db.session.add(HistorialChat(sesion_id=i % args.sesiones + 1, emisor='bot',
+                                         mensaje=_texto_respuesta(RESPUESTA)))
+            db.session.commit()
+            latencias.append((time.perf_counter() - t) * 1000)
+    return latencias
+
+
+def por_lotes(app, args):
+    from utils.transcripciones import EscritorTranscripciones
+
+    escritor = EscritorTranscripciones(app, intervalo=args.intervalo, umbral=args.umbral)
+    escritor.iniciar()
+    latencias = []
+    for i in range(args.mensajes):
+        t = time.perf_counter()
+        escritor.registrar(i % args.sesiones + 1, 'impresoras', RESPUESTA)
+        latencias.append((time.perf_counter() - t) * 1000)
+    escritor.detener()
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transcripciones: INSERT por mensaje vs lotes')
+    parser.add_argument('--mensajes', type=int, default=2000)
+    parser.add_argument('--sesiones', type=int, default=50)
+    parser.add_argument('--umbral', type=int, default=200)
+    parser.add_argument('--intervalo', type=float, default=5)
+    args = parser.parse_args()
+
+    from config import Config
+    Config.WEBHOOK_ASINCRONO = False
+    Config.BANDEJA_SALIDA = False
+    Config.NLP_MODO = 'off'
+
+    print(f"{args.mensajes} mensajes (pares usuario/bot), lotes de {args.umbral} filas\n")
+    print(f"{'modo':>12} {'p50 (ms)':>9} {'p99 (ms)':>9} {'máx (ms)':>9} {'total (s)':>10} {'filas':>7}")
+    for nombre, ejecutar in (('por mensaje', por_mensaje), ('por lotes', por_lotes)):
+        archivo = tempfile.mktemp(suffix='.db')
+        Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{archivo}'
+
+        from app import create_app
+        from models import db, HistorialChat
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+
+        inicio = time.perf_counter()
+        latencias = ejecutar(app, args)
+        total = time.perf_counter() - inicio
+
+        with app.app_context():
+            filas = HistorialChat.query.count()
+            db.engine.dispose()
+        app.extensions['transcripciones'].detener()
+        os.remove(archivo)
+
+        print(f"{nombre:>12} {percentil(latencias, 0.5):>9.3f} {percentil(latencias, 0.99):>9.3f} "
+              f"{max(latencias):>9.2f} {total:>10.2f} {filas:>7}")
+
+
+if __name__ == '__main__':
+    main()
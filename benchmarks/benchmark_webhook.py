@@ -0,0 +1,130 @@
+"""
+Prueba de carga del webhook de WhatsApp contra una Graph API falsa
+
+Envía N mensajes (un POST por mensaje, como hace Meta) repartidos entre
+varios teléfonos y mide:
+
+- latencia de respuesta del webhook (lo que ve Meta: p50 / p95 / máx)
+- tiempo hasta que la Graph API falsa recibió todas las respuestas
+- teléfonos que terminaron con más de una sesión activa (carreras)
+
+Modos: 'sincrono' (procesa dentro de la petición) y 'asincrono' (cola
+persistente + workers).
+
+Uso:
+    python benchmarks/benchmark_webhook.py
+    python benchmarks/benchmark_webhook.py --mensajes 1000 --telefonos 100 --workers 8 --latencia-ms 80
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+import contextlib
+from itertools import cycle
+
+# Agregar backend al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+from fake_graph_api import ServidorGraphFalso
+
+# Conversación típica: saludo, menú, categoría, subcategoría...
+CONVERSACION = ['hola', 'problema', 'problemas_tecnicos', 'impresoras', 'crear_ticket', 'no imprime nada']
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def ejecutar(modo, args, servidor):
+    from config import Config
+    from models import db, SesionChatbot
+
+    archivo = tempfile.mktemp(suffix='.db')
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{archivo}'
+    Config.WEBHOOK_ASINCRONO = modo == 'asincrono'
+    Config.WEBHOOK_WORKERS = args.workers
+    Config.WEBHOOK_INTERVALO_SONDEO = 0.5
+
+    from app import create_app
+    # Como el proceso que atiende peticiones: hilos de escritura por lotes (y cola del webhook)
+    app = create_app(iniciar_trabajadores=True)
+    with app.app_context():
+        db.create_all()
+    cliente = app.test_client()
+
+    telefonos = [f'57300{i:07d}' for i in range(args.telefonos)]
+    textos = {telefono: cycle(CONVERSACION) for telefono in telefonos}
+    inicial = servidor.recibidos
+
+    latencias = []
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        for i in range(args.mensajes):
+            telefono = telefonos[i % len(telefonos)]
+            payload = {'entry': [{'changes': [{'value': {'messages': [{
+                'from': telefono, 'id': f'wamid.{modo}.{i}', 'type': 'text',
+                'text': {'body': next(textos[telefono])}
+            }]}}]}]}
+            t = time.perf_counter()
+            respuesta = cliente.post('/api/chatbot/webhook', json=payload)
+            latencias.append((time.perf_counter() - t) * 1000)
+            assert respuesta.status_code == 200, respuesta.status_code
+
+        completo = servidor.esperar(inicial + args.mensajes, timeout=args.timeout)
+    total = time.perf_counter() - inicio
+
+    with app.app_context():
+        for extension in ('cola_webhook', 'bandeja_salida'):
+            if app.extensions.get(extension):
+                app.extensions[extension].detener()
+        duplicadas = db.session.query(SesionChatbot.usuario_telefono).filter_by(activa=True).group_by(
+            SesionChatbot.usuario_telefono
+        ).having(db.func.count(SesionChatbot.id) > 1).count()
+        db.engine.dispose()
+    os.remove(archivo)
+
+    return {
+        'p50': percentil(latencias, 0.50),
+        'p95': percentil(latencias, 0.95),
+        'max': max(latencias),
+        'total': total,
+        'completo': completo,
+        'duplicadas': duplicadas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga del webhook: síncrono vs cola asíncrona')
+    parser.add_argument('--mensajes', type=int, default=300)
+    parser.add_argument('--telefonos', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latencia-ms', type=float, default=50, help='Latencia de la Graph API falsa')
+    parser.add_argument('--modos', nargs='+', default=['sincrono', 'asincrono'])
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    servidor = ServidorGraphFalso(latencia_ms=args.latencia_ms).iniciar()
+    os.environ.update(
+        WHATSAPP_API_URL=servidor.url, WHATSAPP_TOKEN='token-falso',
+        WHATSAPP_PHONE_NUMBER_ID='123456', NLP_MODO='off'
+    )
+
+    print(f"{args.mensajes} mensajes, {args.telefonos} teléfonos, {args.workers} workers, "
+          f"Graph API falsa con {args.latencia_ms:.0f} ms\n")
+    print(f"{'modo':>10} {'ack p50 (ms)':>13} {'ack p95 (ms)':>13} {'ack máx (ms)':>13} "
+          f"{'total (s)':>10} {'msg/s':>8} {'sesiones dup.':>14}")
+    try:
+        for modo in args.modos:
+            r = ejecutar(modo, args, servidor)
+            aviso = '' if r['completo'] else '  (incompleto)'
+            print(f"{modo:>10} {r['p50']:>13.1f} {r['p95']:>13.1f} {r['max']:>13.1f} "
+                  f"{r['total']:>10.2f} {args.mensajes / r['total']:>8.1f} {r['duplicadas']:>14}{aviso}")
+    finally:
+        servidor.detener()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Servidor falso de la Graph API de WhatsApp para pruebas de carga
+
+Acepta POST /<phone_number_id>/messages como la API real, espera una
+latencia configurable y responde 200 (o 429/500 con la tasa de error
+indicada; los 429 traen Retry-After). Mantiene las conexiones abiertas
+(HTTP/1.1) y lleva la cuenta de los mensajes recibidos por destinatario y
+de las conexiones TCP aceptadas.
+
+Uso como servidor:
+    python benchmarks/fake_graph_api.py --puerto 8089 --latencia-ms 80
+    WHATSAPP_API_URL=http://localhost:8089 python run.py
+
+Uso desde otro script:
+    servidor = ServidorGraphFalso(latencia_ms=50).iniciar()
+    ... servidor.url ...
+    servidor.detener()
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Servidor(ThreadingHTTPServer):
+    # La cola de listen() por defecto es de 5: con decenas de clientes
+    # conectando a la vez se rechazarían conexiones (ReadError en el cliente)
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class ServidorGraphFalso:
+    """Graph API falsa en un hilo (puerto 0 = uno libre)"""
+
+    def __init__(self, puerto=0, latencia_ms=50, tasa_error=0.0):
+        self.latencia_ms = latencia_ms
+        self.tasa_error = tasa_error
+        self.recibidos = 0
+        self.errores = 0
+        self.conexiones = 0
+        self.por_destinatario = Counter()
+        self._lock = threading.Lock()
+        self._servidor = _Servidor(('127.0.0.1', puerto), self._crear_handler())
+        self._hilo = None
+
+    @property
+    def url(self):
+        host, puerto = self._servidor.server_address
+        return f'http://{host}:{puerto}'
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name='graph-falsa', daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def esperar(self, total, timeout=120):
+        """Espera hasta recibir `total` mensajes; devuelve False si vence el plazo"""
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            if self.recibidos >= total:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def _crear_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1: la conexión se mantiene abierta (keep-alive) entre peticiones
+            protocol_version = 'HTTP/1.1'
+            # Cabeceras y cuerpo salen en escrituras separadas: sin TCP_NODELAY
+            # el ACK retrasado sumaría ~40 ms a cada respuesta keep-alive
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with servidor._lock:
+                    servidor.conexiones += 1
+
+            def do_POST(self):
+                largo = int(self.headers.get('Content-Length') or 0)
+                cuerpo = json.loads(self.rfile.read(largo) or b'{}')
+
+                if servidor.latencia_ms:
+                    time.sleep(servidor.latencia_ms / 1000.0)
+
+                if not self.path.endswith('/messages'):
+                    return self._responder(404, {'error': {'message': 'Unknown path'}})
+
+                if servidor.tasa_error and random.random() < servidor.tasa_error:
+                    with servidor._lock:
+                        servidor.errores += 1
+                    codigo = random.choice([429, 500, 503])
+                    cabeceras = {'Retry-After': '0.05'} if codigo == 429 else {}
+                    return self._responder(codigo, {'error': {'message': 'Fake error', 'code': codigo}}, cabeceras)
+
+                destinatario = cuerpo.get('to', '')
+                with servidor._lock:
+                    servidor.recibidos += 1
+                    servidor.por_destinatario[destinatario] += 1
+                    numero = servidor.recibidos
+
+                self._responder(200, {
+                    'messaging_product': 'whatsapp',
+                    'contacts': [{'input': destinatario, 'wa_id': destinatario}],
+                    'messages': [{'id': f'wamid.FAKE{numero}'}]
+                })
+
+            def _responder(self, codigo, datos, cabeceras=None):
+                cuerpo = json.dumps(datos).encode()
+                self.send_response(codigo)
+                for nombre, valor in (cabeceras or {}).items():
+                    self.send_header(nombre, valor)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Graph API de WhatsApp falsa')
+    parser.add_argument('--puerto', type=int, default=8089)
+    parser.add_argument('--latencia-ms', type=float, default=50)
+    parser.add_argument('--tasa-error', type=float, default=0.0)
+    args = parser.parse_args()
+
+    servidor = ServidorGraphFalso(args.puerto, args.latencia_ms, args.tasa_error).iniciar()
+    print(f"📡 Graph API falsa en {servidor.url} (latencia {args.latencia_ms} ms, errores {args.tasa_error:.0%})")
+    print("   Usar con: WHATSAPP_API_URL=" + servidor.url)
+    try:
+        while True:
+            time.sleep(5)
+            print(f"   recibidos={servidor.recibidos} errores={servidor.errores}")
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == '__main__':
+    main()
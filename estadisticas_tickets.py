@@ -0,0 +1,57 @@
+"""
+Mantenimiento de la tabla resumen ticket_stats (utils/estadisticas_tickets.py)
+
+Uso:
+    python estadisticas_tickets.py reconstruir          # crea la tabla si falta y la carga desde tickets
+    python estadisticas_tickets.py verificar            # compara el resumen con los tickets
+    python estadisticas_tickets.py verificar --reparar  # y reconstruye si hay diferencias
+"""
+import sys
+import os
+import argparse
+from dotenv import load_dotenv
+
+# Cargar variables de entorno explícitamente
+load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+
+# Agregar backend al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from app import create_app
+from models import db, EstadisticaTicket
+from utils.estadisticas_tickets import reconstruir, verificar
+
+parser = argparse.ArgumentParser(description='Tabla resumen ticket_stats')
+parser.add_argument('accion', choices=['reconstruir', 'verificar'])
+parser.add_argument('--reparar', action='store_true', help='Con verificar: reconstruir si hay diferencias')
+parser.add_argument('--mostrar', type=int, default=20, help='Diferencias a listar')
+args = parser.parse_args()
+
+app = create_app()
+
+print(f"🔌 Conectando a: {app.config['SQLALCHEMY_DATABASE_URI']}")
+
+with app.app_context():
+    EstadisticaTicket.__table__.create(bind=db.engine, checkfirst=True)
+
+    if args.accion == 'reconstruir':
+        grupos = reconstruir()
+        print(f"✅ ticket_stats reconstruida: {grupos} grupos.")
+        if not app.config.get('TICKET_STATS_ROLLUP'):
+            print("ℹ️ La aplicación ya la mantiene; activa TICKET_STATS_ROLLUP=true para usarla en las estadísticas.")
+        sys.exit(0)
+
+    diferencias = verificar()
+    if not diferencias:
+        print("✅ ticket_stats coincide con la tabla tickets.")
+        sys.exit(0)
+
+    print(f"❌ {len(diferencias)} grupos con diferencias (grupo: esperado / en el resumen):")
+    for diferencia in diferencias[:args.mostrar]:
+        print(f"   {diferencia['grupo']}: {diferencia['esperado']} / {diferencia['resumen']}")
+
+    if args.reparar:
+        grupos = reconstruir()
+        print(f"🔧 ticket_stats reconstruida: {grupos} grupos.")
+        sys.exit(0)
+    sys.exit(1)
@@ -191,6 +191,25 @@ class NotificationManager {
         return container;
     }
     
+    connectStream(url, onClosed) {
+        // Stream SSE: el servidor envía el estado al conectarse y cada vez que cambia
+        const source = new EventSource(url);
+        
+        source.addEventListener('notificaciones', (event) => {
+            this.processNotifications(JSON.parse(event.data));
+        });
+        
+        source.onerror = () => {
+            // EventSource reconecta solo; si la conexión quedó cerrada, usar la consulta periódica
+            if (source.readyState === EventSource.CLOSED && onClosed) {
+                onClosed();
+            }
+        };
+        
+        this.stream = source;
+        return source;
+    }
+    
     processNotifications(data) {
         if (!data.notificaciones || data.notificaciones.length === 0) {
             this.updateBadge(0);
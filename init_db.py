@@ -10,6 +10,7 @@ sys.path.insert(0, backend_path)
 
 from backend.app import create_app
 from models import db, Usuario, BaseConocimiento
+from utils.search import inicializar_indice_busqueda
 from datetime import datetime
 
 def init_database():
@@ -199,6 +200,9 @@ def init_database():
         # Guardar todos los cambios
         db.session.commit()
         
+        # Índice de texto completo de la base de conocimiento
+        inicializar_indice_busqueda(db.engine)
+        
         print("\n" + "="*60)
         print("✅ Base de datos inicializada correctamente")
         print("="*60)
@@ -0,0 +1,88 @@
+import sys
+import os
+from dotenv import load_dotenv
+
+# Cargar variables de entorno explícitamente
+load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+
+# Agregar backend al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from app import create_app
+from models import db
+from sqlalchemy import text
+from utils.search import inicializar_indice_busqueda
+
+app = create_app()
+
+# Índices reemplazados por otros declarados en los modelos: mantenerlos solo
+# encarece cada escritura (sus columnas son el prefijo del índice nuevo)
+INDICES_REEMPLAZADOS = [
+    'ix_tickets_estado_prioridad_tecnico',  # -> ix_tickets_estado_prioridad_tecnico_usuario
+]
+
+# Columnas de la paginación por cursor que pasaron a NOT NULL: el filtro keyset
+# no devuelve filas con NULL. (tabla, columna, valor para las filas antiguas)
+COLUMNAS_SIN_NULOS = [
+    ('base_conocimiento', 'vistas', '0'),
+    ('base_conocimiento', 'fecha_creacion', 'COALESCE(fecha_actualizacion, CURRENT_TIMESTAMP)'),
+    ('tickets', 'fecha_creacion', 'COALESCE(fecha_actualizacion, CURRENT_TIMESTAMP)'),
+]
+
+print(f"🔌 Conectando a: {app.config['SQLALCHEMY_DATABASE_URI']}")
+
+with app.app_context():
+    # Crear tablas si no existen (las tablas nuevas ya incluyen sus índices)
+    db.create_all()
+    print("✅ Tablas verificadas/creadas.")
+
+    # Rellenar los NULL de las columnas de paginación (SQLite no permite
+    # ALTER COLUMN: ahí basta con el NOT NULL de los modelos para filas nuevas)
+    for tabla, columna, valor in COLUMNAS_SIN_NULOS:
+        try:
+            with db.engine.begin() as conn:
+                filas = conn.execute(text(
+                    f"UPDATE {tabla} SET {columna} = {valor} WHERE {columna} IS NULL"
+                )).rowcount
+                if conn.dialect.name == 'postgresql':
+                    conn.execute(text(f"ALTER TABLE {tabla} ALTER COLUMN {columna} SET NOT NULL"))
+            print(f"✅ {tabla}.{columna} sin NULL ({filas} filas rellenadas).")
+        except Exception as e:
+            print(f"❌ Error rellenando {tabla}.{columna}: {e}")
+
+    # Eliminar los índices reemplazados antes de crear los nuevos
+    for nombre in INDICES_REEMPLAZADOS:
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text(f"DROP INDEX IF EXISTS {nombre}"))
+            print(f"🗑️ Índice reemplazado {nombre} eliminado (si existía).")
+        except Exception as e:
+            print(f"❌ Error eliminando {nombre}: {e}")
+
+    # Crear los índices declarados en los modelos que falten en tablas existentes
+    for table in db.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            try:
+                index.create(bind=db.engine, checkfirst=True)
+                print(f"✅ Índice {index.name} verificado en '{table.name}'.")
+            except Exception as e:
+                print(f"❌ Error creando {index.name}: {e}")
+
+    # Índice de texto completo de la base de conocimiento (FTS5 / tsvector)
+    try:
+        backend = inicializar_indice_busqueda(db.engine)
+        if backend:
+            print(f"🔍 Índice de búsqueda '{backend}' creado/reconstruido.")
+        else:
+            print("ℹ️ El motor actual no soporta búsqueda de texto completo, se usará LIKE.")
+    except Exception as e:
+        print(f"❌ Error creando el índice de búsqueda: {e}")
+
+    # Actualizar estadísticas del planificador para que use los índices nuevos
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text("ANALYZE"))
+            conn.commit()
+        print("📊 Estadísticas del planificador actualizadas (ANALYZE).")
+    except Exception as e:
+        print(f"ℹ️ No se pudo ejecutar ANALYZE: {e}")
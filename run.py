@@ -11,7 +11,8 @@ sys.path.insert(0, backend_path)
 from backend.app import create_app
 
 if __name__ == '__main__':
-    app = create_app()
+    # Con el recargador de debug solo el proceso hijo atiende peticiones
+    app = create_app(iniciar_trabajadores=os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
     with app.app_context():
         from models import db
         db.create_all()
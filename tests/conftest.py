@@ -0,0 +1,103 @@
+"""
+Configuración común de los tests (pytest)
+
+La aplicación corre sobre una base SQLite temporal, sin hilos en segundo
+plano (INICIAR_TRABAJADORES) y con el presupuesto de queries en modo
+estricto: un endpoint que supere su query_budget hace fallar la prueba.
+
+Uso:
+    pip install -r requirements-dev.txt
+    python -m pytest
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'backend'))
+
+# Antes de importar config: Config lee el entorno al importarse
+_ARCHIVO_BD = tempfile.mktemp(suffix='.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{_ARCHIVO_BD}'
+os.environ['INICIAR_TRABAJADORES'] = 'false'
+os.environ['QUERY_BUDGET_STRICT'] = 'true'
+os.environ['NLP_MODO'] = 'off'
+# Sin caché de respuestas: cada prueba parte de tablas vacías
+os.environ['CACHE_RESPUESTAS_TTL'] = '0'
+# El índice en memoria solo se sincroniza cuando una prueba lo pide
+os.environ['SEARCH_MEMORIA_SINCRONIZAR'] = '0'
+
+from app import create_app
+from models import db as _db, Usuario, Ticket
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    yield app
+    with app.app_context():
+        _db.engine.dispose()
+    if os.path.exists(_ARCHIVO_BD):
+        os.remove(_ARCHIVO_BD)
+
+
+@pytest.fixture
+def db(app):
+    """Tablas vacías para cada prueba, dentro de un contexto de la aplicación"""
+    with app.app_context():
+        _db.create_all()
+        yield _db
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def tecnico(db):
+    usuario = Usuario(nombre='Técnico Uno', email='tecnico@focusit.com', es_tecnico=True, activo=True)
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+@pytest.fixture
+def usuario(db):
+    usuario = Usuario(nombre='Usuario Dos', email='usuario@focusit.com', es_tecnico=False, activo=True)
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+@pytest.fixture
+def crear_ticket(db, usuario):
+    """Fábrica de tickets del usuario de prueba"""
+    def crear(**campos):
+        datos = {
+            'usuario_id': usuario.id,
+            'categoria': 'problemas_tecnicos',
+            'subcategoria': 'impresoras',
+            'titulo': 'La impresora no imprime',
+            'descripcion': 'No imprime desde ayer en la tarde',
+            'estado': 'nuevo',
+            'prioridad': 'media',
+            'fecha_creacion': datetime.utcnow(),
+        }
+        datos.update(campos)
+        ticket = Ticket(**datos)
+        db.session.add(ticket)
+        db.session.commit()
+        return ticket
+    return crear
+
+
+@pytest.fixture
+def login(app):
+    """Cliente de pruebas con la sesión iniciada por email"""
+    def login(email):
+        cliente = app.test_client()
+        respuesta = cliente.post('/api/auth/login', json={'email': email})
+        assert respuesta.status_code == 200, respuesta.get_json()
+        return cliente
+    return login
@@ -0,0 +1,160 @@
+"""
+Autocompletado (utils/autocompletado.py): actualización incremental del trie
+
+Crear, editar o desactivar un artículo y escribir sus vistas se aplica al
+trie sin reconstruirlo; el resultado debe ser el mismo que construirlo de
+nuevo desde cero.
+"""
+import random
+from collections import namedtuple
+
+import pytest
+
+from models import BaseConocimiento
+from utils import autocompletado
+from utils.autocompletado import TriePrefijos, LARGO_MAXIMO_PREFIJO
+from utils.contador_vistas import registrar_vista
+
+Fila = namedtuple('Fila', 'id titulo palabras_clave categoria vistas activo')
+
+PALABRAS = ['impresora', 'impresion', 'importar', 'imagen', 'correo', 'contraseña',
+            'conexion', 'configurar', 'red', 'reiniciar', 'agilmed',
+            'desfragmentacionprogramadaautomatica']
+
+
+def _fila(articulo_id, azar, activo=True):
+    titulo = ' '.join(azar.sample(PALABRAS, azar.randint(1, 3)))
+    return Fila(articulo_id, titulo, azar.choice(PALABRAS), 'problemas_tecnicos', azar.randint(0, 50), activo)
+
+
+def _consultas():
+    consultas = {palabra[:largo] for palabra in PALABRAS for largo in range(1, len(palabra) + 1)}
+    consultas |= {'impre red', 'con impresora', 'i c', 'r agilmed', 'desfragmentacionprogramadaauto'}
+    return sorted(consultas)
+
+
+def test_actualizar_equivale_a_reconstruir():
+    azar = random.Random(7)
+    filas = {i: _fila(i, azar) for i in range(1, 41)}
+    trie = TriePrefijos(top_k=3)
+    trie.construir(filas.values())
+
+    for _ in range(200):
+        articulo_id = azar.randint(1, 50)
+        if articulo_id in filas and azar.random() < 0.3:
+            vistas = azar.randint(0, 50)
+            trie.actualizar_vistas({articulo_id: vistas, 999: 1})
+            filas[articulo_id] = filas[articulo_id]._replace(vistas=vistas)
+            continue
+        fila = _fila(articulo_id, azar, activo=azar.random() > 0.3)
+        trie.actualizar(fila)
+        if fila.activo:
+            filas[articulo_id] = fila
+        else:
+            filas.pop(articulo_id, None)
+
+    referencia = TriePrefijos(top_k=3)
+    referencia.construir(filas.values())
+
+    for clave in ('articulos', 'nodos'):
+        assert trie.estadisticas()[clave] == referencia.estadisticas()[clave]
+    for consulta in _consultas():
+        assert trie.sugerir(consulta, limite=3) == referencia.sugerir(consulta, limite=3), consulta
+
+
+def test_quitar_articulo_rellena_el_top_k():
+    trie = TriePrefijos(top_k=2)
+    trie.construir([
+        Fila(1, 'impresora atascada', '', 'a', 30, True),
+        Fila(2, 'impresora sin tinta', '', 'a', 20, True),
+        Fila(3, 'importar contactos', '', 'a', 10, True),
+    ])
+    assert [s.id for s in trie.sugerir('imp')] == [1, 2]
+
+    trie.actualizar(Fila(1, 'impresora atascada', '', 'a', 30, False))
+    assert [s.id for s in trie.sugerir('imp')] == [2, 3]
+    assert trie.sugerir('atasc') == []
+
+
+def test_varias_palabras_fuera_del_top_k_del_ultimo_termino():
+    # 'red' tiene más de K artículos; el único con 'agilmed' no está entre sus K más vistos
+    filas = [Fila(i, f'red oficina {i}', '', 'a', 100 - i, True) for i in range(1, 6)]
+    filas.append(Fila(9, 'red agilmed', '', 'a', 0, True))
+    trie = TriePrefijos(top_k=2)
+    trie.construir(filas)
+
+    assert [s.id for s in trie.sugerir('agilmed red')] == [9]
+
+
+def test_palabra_mas_larga_que_el_prefijo_maximo():
+    trie = TriePrefijos(top_k=2)
+    larga = 'x' * (LARGO_MAXIMO_PREFIJO + 5)
+    trie.construir([Fila(1, larga, '', 'a', 1, True), Fila(2, larga[:-1] + 'y', '', 'a', 2, True)])
+
+    trie.actualizar(Fila(2, 'otra cosa', '', 'a', 2, True))
+    assert [s.id for s in trie.sugerir(larga)] == [1]
+    assert [s.id for s in trie.sugerir('x' * 3)] == [1]
+
+
+@pytest.fixture
+def construcciones(db, monkeypatch):
+    """Cuenta las reconstrucciones del trie global (parte de uno vacío)"""
+    autocompletado.invalidar_autocompletado()
+    llamadas = []
+    construir = TriePrefijos.construir
+
+    def contar(self, articulos):
+        llamadas.append(1)
+        return construir(self, articulos)
+
+    monkeypatch.setattr(TriePrefijos, 'construir', contar)
+    yield llamadas
+    autocompletado.invalidar_autocompletado()
+
+
+def _sugerencias(cliente, q):
+    respuesta = cliente.get('/api/knowledge/buscar-sugerencias', query_string={'q': q})
+    assert respuesta.status_code == 200
+    return [s['titulo'] for s in respuesta.get_json()['data']['sugerencias']]
+
+
+def test_cambios_de_articulos_sin_reconstruir(construcciones, tecnico, login):
+    cliente = login(tecnico.email)
+    assert _sugerencias(cliente, 'impre') == []
+    assert len(construcciones) == 1
+
+    datos = {
+        'titulo': 'Impresora no imprime',
+        'contenido': 'Revisar el cable y reiniciar la cola de impresión.',
+        'palabras_clave': 'impresora, cola',
+        'categoria': 'problemas_tecnicos',
+    }
+    articulo_id = cliente.post('/api/knowledge/', json=datos).get_json()['data']['articulo']['id']
+    assert _sugerencias(cliente, 'impre') == ['Impresora no imprime']
+
+    respuesta = cliente.put(f'/api/knowledge/{articulo_id}', json={**datos, 'titulo': 'Escáner no escanea',
+                                                                   'palabras_clave': 'escaner'})
+    assert respuesta.status_code == 200
+    assert _sugerencias(cliente, 'impre') == []
+    assert _sugerencias(cliente, 'escan') == ['Escáner no escanea']
+
+    assert cliente.delete(f'/api/knowledge/{articulo_id}').status_code == 200
+    assert _sugerencias(cliente, 'escan') == []
+
+    assert len(construcciones) == 1
+    assert BaseConocimiento.query.count() == 1
+
+
+def test_vistas_escritas_reordenan_sin_reconstruir(construcciones, tecnico, login):
+    cliente = login(tecnico.email)
+    ids = []
+    for titulo in ('Impresora atascada', 'Impresora sin tinta'):
+        datos = {'titulo': titulo, 'contenido': 'Pasos para la impresora.', 'categoria': 'problemas_tecnicos'}
+        ids.append(cliente.post('/api/knowledge/', json=datos).get_json()['data']['articulo']['id'])
+    assert _sugerencias(cliente, 'impre') == ['Impresora atascada', 'Impresora sin tinta']
+
+    # Sin hilos, el contador escribe cada vista al registrarla
+    for _ in range(3):
+        registrar_vista(ids[1])
+    assert _sugerencias(cliente, 'impre') == ['Impresora sin tinta', 'Impresora atascada']
+    assert len(construcciones) == 1
@@ -0,0 +1,75 @@
+"""
+Barrido de sesiones (utils/barrido_sesiones.py) y transcripciones por lotes
+
+Los mensajes que siguen en el acumulador de utils/transcripciones.py deben
+archivarse con su sesión, y los que llegan después de archivarla no pueden
+quedar huérfanos en historial_chat.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models import SesionChatbot, SesionChatbotArchivada, HistorialChat
+from utils import transcripciones
+from utils.barrido_sesiones import BarredorSesiones
+from utils.transcripciones import EscritorTranscripciones
+
+
+@pytest.fixture
+def escritor(app, db, monkeypatch):
+    """Escritor que acumula sin escribir hasta que se le pide (como con el hilo en marcha)"""
+    escritor = EscritorTranscripciones(app, intervalo=0, umbral=10000)
+    monkeypatch.setattr(transcripciones, '_escritor', escritor)
+    return escritor
+
+
+@pytest.fixture
+def barredor(app):
+    return BarredorSesiones(app, intervalo=0, ttl_minutos=60, retencion_dias=30)
+
+
+def _sesion(db, telefono, dias_inactiva):
+    fecha = datetime.utcnow() - timedelta(days=dias_inactiva)
+    sesion = SesionChatbot(usuario_telefono=telefono, activa=False, fecha_inicio=fecha,
+                           fecha_ultima_actividad=fecha)
+    db.session.add(sesion)
+    db.session.commit()
+    return sesion.id
+
+
+def test_archiva_las_transcripciones_pendientes(db, escritor, barredor):
+    antigua = _sesion(db, '3001', dias_inactiva=60)
+    reciente = _sesion(db, '3002', dias_inactiva=1)
+    escritor.registrar(antigua, 'hola', {'mensaje': 'Bienvenido'})
+    escritor.registrar(reciente, 'ayuda', 'Claro')
+
+    assert barredor.barrer()['archivadas'] == 1
+
+    assert escritor.pendientes() == 0
+    archivada = db.session.get(SesionChatbotArchivada, antigua)
+    assert [m['mensaje'] for m in archivada.historial] == ['hola', 'Bienvenido']
+    assert db.session.get(SesionChatbot, antigua) is None
+    assert {fila.sesion_id for fila in HistorialChat.query} == {reciente}
+
+
+def test_descarta_mensajes_de_sesiones_ya_archivadas(db, escritor, barredor):
+    antigua = _sesion(db, '3001', dias_inactiva=60)
+    reciente = _sesion(db, '3002', dias_inactiva=1)
+    assert barredor.barrer()['archivadas'] == 1
+
+    # Mensajes registrados antes del barrido pero escritos después
+    escritor.registrar(antigua, 'sigo aquí', 'Respuesta')
+    escritor.registrar(reciente, 'ayuda', 'Claro')
+    assert escritor.escribir() == 2
+
+    assert escritor.sin_sesion == 2
+    assert escritor.pendientes() == 0
+    assert {fila.sesion_id for fila in HistorialChat.query} == {reciente}
+
+
+def test_bloque_reclamado_sin_repetir_entre_procesos(db, barredor):
+    # Cada worker toma filas distintas: las bloqueadas por otro barrido se saltan
+    consulta = barredor._bloque_para_archivar(datetime.utcnow()).statement
+    sql = str(consulta.compile(dialect=postgresql.dialect()))
+    assert sql.rstrip().endswith('FOR UPDATE SKIP LOCKED')
@@ -0,0 +1,50 @@
+"""
+Bloqueos por teléfono (utils/bloqueos.py) entre procesos
+"""
+import threading
+
+from sqlalchemy.dialects import postgresql
+
+from utils.bloqueos import BloqueosPorClave, bloquear_en_bd, _clave_bd
+
+
+def test_clave_estable_de_64_bits():
+    assert _clave_bd('573001234567') == _clave_bd('573001234567')
+    assert _clave_bd('573001234567') != _clave_bd('573001234568')
+    assert -2 ** 63 <= _clave_bd('573001234567') < 2 ** 63
+
+
+def test_advisory_lock_solo_en_postgresql(app, db, monkeypatch):
+    ejecutadas = []
+    monkeypatch.setattr(db.session, 'execute', lambda sentencia, parametros=None: ejecutadas.append(
+        (str(sentencia), parametros)))
+
+    bloquear_en_bd('3001')
+    assert ejecutadas == []
+
+    monkeypatch.setattr(db.engine, 'dialect', postgresql.dialect())
+    bloquear_en_bd('3001')
+    assert ejecutadas == [('SELECT pg_advisory_xact_lock(:clave)', {'clave': _clave_bd('3001')})]
+
+
+def test_mismo_telefono_de_a_uno():
+    bloqueos = BloqueosPorClave()
+    dentro, maximo = [0], [0]
+    lock = threading.Lock()
+
+    def trabajar():
+        with bloqueos.bloquear('3001'):
+            with lock:
+                dentro[0] += 1
+                maximo[0] = max(maximo[0], dentro[0])
+            threading.Event().wait(0.01)
+            with lock:
+                dentro[0] -= 1
+
+    hilos = [threading.Thread(target=trabajar) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert maximo[0] == 1
+    assert bloqueos.estadisticas()['claves_activas'] == 0
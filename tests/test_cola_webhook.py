@@ -0,0 +1,74 @@
+"""
+Cola del webhook (utils/cola_webhook.py): orden por teléfono entre procesos
+
+Se reclama sin arrancar los hilos; cada ColaWebhook hace de un proceso
+distinto que comparte la tabla cola_webhook.
+"""
+import pytest
+
+from models import MensajeWebhook
+from utils.cola_webhook import ColaWebhook
+
+
+def _sin_procesar(mensajes):
+    raise AssertionError('Los tests procesan a mano')
+
+
+@pytest.fixture
+def mensajes(db):
+    def crear(*filas):
+        for telefono, texto in filas:
+            db.session.add(MensajeWebhook(telefono=telefono, texto=texto))
+        db.session.commit()
+    return crear
+
+
+def _reclamados(cola):
+    """Reclama una vez y devuelve los mensajes repartidos a los workers"""
+    cola._reclamar()
+    items = []
+    for particion in cola._colas:
+        while not particion.empty():
+            items.append(particion.get_nowait())
+    return items
+
+
+def test_un_mensaje_por_telefono_entre_procesos(app, db, mensajes):
+    mensajes(('3001', 'hola'), ('3001', '1'), ('3002', 'hola'))
+    proceso_a = ColaWebhook(app, _sin_procesar, workers=2)
+    proceso_b = ColaWebhook(app, _sin_procesar, workers=2)
+
+    assert [(telefono, texto) for _, telefono, texto, _ in _reclamados(proceso_a)] == [
+        ('3001', 'hola'), ('3002', 'hola')
+    ]
+    # El segundo mensaje de 3001 espera aunque lo intente otro proceso
+    assert _reclamados(proceso_b) == []
+    assert _reclamados(proceso_a) == []
+
+
+def test_reintento_retiene_los_mensajes_siguientes(app, db, mensajes):
+    mensajes(('3001', 'hola'), ('3001', '1'))
+    resultados = iter([['falló'], [None], [None]])
+    cola = ColaWebhook(app, lambda lote: next(resultados), workers=1, max_intentos=3)
+
+    lote = _reclamados(cola)
+    assert [texto for _, _, texto, _ in lote] == ['hola']
+    cola._procesar_lote(lote)
+
+    # Vuelve a 'pendiente' y sale antes que el mensaje posterior
+    lote = _reclamados(cola)
+    assert [(texto, intentos) for _, _, texto, intentos in lote] == [('hola', 2)]
+    cola._procesar_lote(lote)
+
+    lote = _reclamados(cola)
+    assert [texto for _, _, texto, _ in lote] == ['1']
+    cola._procesar_lote(lote)
+    assert {m.estado for m in MensajeWebhook.query} == {'procesado'}
+
+
+def test_mensaje_en_error_no_bloquea_el_telefono(app, db, mensajes):
+    mensajes(('3001', 'hola'), ('3001', '1'))
+    cola = ColaWebhook(app, lambda lote: ['falló'] * len(lote), workers=1, max_intentos=1)
+
+    cola._procesar_lote(_reclamados(cola))
+    assert [texto for _, _, texto, _ in _reclamados(cola)] == ['1']
@@ -0,0 +1,43 @@
+"""
+Tabla resumen ticket_stats (utils/estadisticas_tickets.py)
+
+Se mantiene con cada cambio de tickets aunque TICKET_STATS_ROLLUP esté
+apagado: el flag solo decide si las estadísticas la leen.
+"""
+import pytest
+
+from utils.estadisticas_tickets import reconstruir, verificar, resumen_general
+
+
+@pytest.mark.parametrize('rollup', [False, True])
+def test_resumen_se_mantiene_con_o_sin_el_flag(app, db, tecnico, crear_ticket, monkeypatch, rollup):
+    monkeypatch.setitem(app.config, 'TICKET_STATS_ROLLUP', rollup)
+    ticket = crear_ticket(prioridad='alta')
+    reconstruir()
+
+    crear_ticket(prioridad='critica')
+    ticket.estado = 'en_proceso'
+    ticket.tecnico_id = tecnico.id
+    db.session.commit()
+    db.session.delete(ticket)
+    db.session.commit()
+
+    assert verificar() == []
+
+
+def test_apagar_y_encender_el_flag_no_desvia(app, db, tecnico, crear_ticket, monkeypatch):
+    reconstruir()
+    monkeypatch.setitem(app.config, 'TICKET_STATS_ROLLUP', True)
+    crear_ticket()
+
+    monkeypatch.setitem(app.config, 'TICKET_STATS_ROLLUP', False)
+    ticket = crear_ticket()
+    ticket.estado = 'cerrado'
+    db.session.commit()
+    sobre_tickets = resumen_general()
+
+    monkeypatch.setitem(app.config, 'TICKET_STATS_ROLLUP', True)
+    assert verificar() == []
+    desde_resumen = resumen_general()
+    assert desde_resumen['total_tickets'] == sobre_tickets['total_tickets'] == 2
+    assert dict(desde_resumen['tickets_por_estado']) == dict(sobre_tickets['tickets_por_estado'])
@@ -0,0 +1,72 @@
+"""Bus de eventos (utils/eventos.py)"""
+import pytest
+from utils.eventos import bus_eventos, TicketEstadoCambiado
+
+
+@pytest.fixture
+def eventos():
+    """Eventos de cambio de estado publicados durante la prueba"""
+    recibidos = []
+    suscriptor = bus_eventos.suscribir(TicketEstadoCambiado, recibidos.append, nombre='tests.eventos')
+    yield recibidos
+    bus_eventos.cancelar(suscriptor)
+
+
+@pytest.mark.parametrize('antes, despues', [
+    ('nuevo', 'en_proceso'),
+    ('en_proceso', 'nuevo'),
+])
+def test_cambio_de_estado_publica_el_estado_anterior(db, tecnico, crear_ticket, login, eventos, antes, despues):
+    ticket = crear_ticket(estado=antes)
+    cliente = login(tecnico.email)
+
+    respuesta = cliente.patch(f'/api/tickets/{ticket.id}/estado', json={'estado': despues})
+
+    assert respuesta.status_code == 200, respuesta.get_json()
+    assert len(eventos) == 1
+    assert eventos[0].anterior['estado'] == antes
+    assert eventos[0].ticket['estado'] == despues
+
+
+def test_volver_a_nuevo_y_salir_de_nuevo(db, tecnico, crear_ticket, login, eventos):
+    ticket = crear_ticket(estado='en_proceso')
+    cliente = login(tecnico.email)
+
+    for estado in ('nuevo', 'en_proceso'):
+        respuesta = cliente.patch(f'/api/tickets/{ticket.id}/estado', json={'estado': estado})
+        assert respuesta.status_code == 200, respuesta.get_json()
+
+    assert [(e.anterior['estado'], e.ticket['estado']) for e in eventos] == [
+        ('en_proceso', 'nuevo'),
+        ('nuevo', 'en_proceso'),
+    ]
+    # Al volver a 'nuevo' la instantánea lleva el usuario (lo muestran las notificaciones)
+    assert eventos[0].ticket['usuario'] == 'Usuario Dos'
+
+
+def test_rollback_no_publica(db, crear_ticket, eventos):
+    from utils.eventos import registrar_evento, ticket_estado_cambiado
+    ticket = crear_ticket(estado='nuevo')
+
+    ticket.estado = 'cerrado'
+    registrar_evento(ticket_estado_cambiado(ticket))
+    db.session.rollback()
+
+    assert eventos == []
+
+
+def test_notificaciones_no_se_desvian_con_los_eventos(db, tecnico, crear_ticket, login, eventos):
+    from utils.notificaciones import EstadoNotificaciones
+    critico = crear_ticket(prioridad='critica')
+    pendiente = crear_ticket(estado='en_proceso', tecnico_id=tecnico.id)
+    cliente = login(tecnico.email)
+    estado = EstadoNotificaciones.desde_bd(tecnico.id)
+
+    for ticket_id, nuevo_estado in ((pendiente.id, 'nuevo'), (critico.id, 'en_proceso'),
+                                    (pendiente.id, 'en_proceso'), (critico.id, 'nuevo')):
+        respuesta = cliente.patch(f'/api/tickets/{ticket_id}/estado', json={'estado': nuevo_estado})
+        assert respuesta.status_code == 200, respuesta.get_json()
+
+    for evento in eventos:
+        estado.aplicar(evento)
+    assert estado.a_dict() == EstadoNotificaciones.desde_bd(tecnico.id).a_dict()
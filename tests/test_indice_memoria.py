@@ -0,0 +1,54 @@
+"""
+Índice invertido en memoria (utils/search.py): vistas y cambios de otros procesos
+
+Los artículos se escriben con db.session sin registrar eventos, como lo haría
+otro worker; el índice solo los ve al sincronizarse con la BD.
+"""
+import pytest
+
+from models import BaseConocimiento
+from utils import search
+from utils.contador_vistas import registrar_vista
+
+
+@pytest.fixture
+def indice(db, tecnico):
+    search._indice_memoria.construido = False
+
+    def crear(titulo, contenido, **campos):
+        articulo = BaseConocimiento(titulo=titulo, contenido=contenido, autor_id=tecnico.id, **campos)
+        db.session.add(articulo)
+        db.session.commit()
+        return articulo
+    yield crear
+    search._indice_memoria.construido = False
+
+
+def test_vistas_del_contador_reordenan_el_indice(db, indice):
+    primero = indice('Impresora atascada', 'Retirar el papel atascado de la impresora', vistas=5)
+    segundo = indice('Impresora sin tinta', 'Cambiar el cartucho de la impresora', vistas=0)
+    fecha = segundo.fecha_actualizacion
+    assert [d.id for d in search.obtener_indice_memoria().buscar('impresora')] == [primero.id, segundo.id]
+
+    for _ in range(50):
+        registrar_vista(segundo.id)
+
+    documentos = search.obtener_indice_memoria().buscar('impresora')
+    assert [(d.id, d.vistas) for d in documentos] == [(segundo.id, 50), (primero.id, 5)]
+    db.session.refresh(segundo)
+    assert segundo.fecha_actualizacion == fecha
+
+
+def test_sincroniza_articulos_de_otros_procesos(db, indice, monkeypatch):
+    viejo = indice('Correo no sincroniza', 'Revisar la cuenta de correo en Outlook')
+    assert [d.id for d in search.obtener_indice_memoria().buscar('correo')] == [viejo.id]
+
+    viejo.activo = False
+    nuevo = indice('Correo rebotado', 'El buzón de correo está lleno')
+    monkeypatch.setattr(search, '_verificado_indice', 0.0)
+    # Sin sincronización periódica sigue respondiendo con lo que construyó
+    assert [d.id for d in search.obtener_indice_memoria().buscar('correo')] == [viejo.id]
+
+    monkeypatch.setattr(search.Config, 'SEARCH_MEMORIA_SINCRONIZAR', 30)
+    assert [d.id for d in search.obtener_indice_memoria().buscar('correo')] == [nuevo.id]
+    assert search.obtener_indice_memoria().buscar_relevantes('el correo rebota')[0].id == nuevo.id
@@ -0,0 +1,38 @@
+"""
+Stream SSE de notificaciones (utils/notificaciones.py): cupo por proceso y
+duración máxima de cada stream
+"""
+from utils.notificaciones import obtener_bus_notificaciones
+
+URL = '/api/dashboard/notificaciones/stream'
+
+
+def test_stream_termina_y_libera_el_cupo(app, db, tecnico, login, monkeypatch):
+    monkeypatch.setitem(app.config, 'NOTIFICACIONES_SSE_LATIDO', 0.01)
+    monkeypatch.setitem(app.config, 'NOTIFICACIONES_SSE_DURACION', 0.05)
+    cliente = login(tecnico.email)
+
+    respuesta = cliente.get(URL)
+    cuerpo = respuesta.get_data(as_text=True)
+
+    assert respuesta.status_code == 200
+    assert cuerpo.startswith('retry: 5000\nevent: notificaciones\n')
+    assert obtener_bus_notificaciones().estadisticas()['suscriptores'] == 0
+
+
+def test_cupo_lleno_responde_503(app, db, tecnico, login, monkeypatch):
+    bus = obtener_bus_notificaciones()
+    monkeypatch.setattr(bus, 'maximo_streams', 1)
+    cliente = login(tecnico.email)
+
+    abierto = cliente.get(URL, buffered=False)
+    assert abierto.status_code == 200
+    rechazado = cliente.get(URL)
+    assert rechazado.status_code == 503
+    assert rechazado.get_json()['error']['code'] == 'SERVICE_UNAVAILABLE'
+
+    abierto.close()
+    assert bus.estadisticas()['suscriptores'] == 0
+    otro = cliente.get(URL, buffered=False)
+    assert otro.status_code == 200
+    otro.close()
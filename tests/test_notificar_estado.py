@@ -0,0 +1,31 @@
+"""
+POST /api/tickets/notificar-estado: encola en la bandeja de salida y responde 202
+"""
+from models import MensajeSaliente, Usuario
+
+URL = '/api/tickets/notificar-estado'
+
+
+def test_encola_sin_enviar_en_la_peticion(db, tecnico, usuario, crear_ticket, login, monkeypatch):
+    monkeypatch.setattr('utils.envio_masivo.EnviadorMasivo.enviar', lambda *a, **k: 1 / 0)
+    usuario.telefono = '573001112233'
+    sin_telefono = Usuario(nombre='Sin Teléfono', email='sin@focusit.com', activo=True)
+    db.session.add(sin_telefono)
+    db.session.commit()
+    tickets = [crear_ticket(), crear_ticket(estado='en_proceso'), crear_ticket(usuario_id=sin_telefono.id)]
+
+    respuesta = login(tecnico.email).post(URL, json={'ids': [t.id for t in tickets] + [9999], 'mensaje': 'Gracias'})
+
+    assert respuesta.status_code == 202
+    assert respuesta.get_json()['data'] == {'encolados': 2, 'omitidos': 2}
+    filas = MensajeSaliente.query.order_by(MensajeSaliente.id).all()
+    assert [(f.telefono, f.estado) for f in filas] == [('573001112233', 'pendiente')] * 2
+    assert filas[0].respuesta['mensaje'].startswith(f'🎫 Ticket #{tickets[0].id}')
+    assert filas[1].respuesta['mensaje'].endswith('Gracias')
+
+
+def test_sin_bandeja_responde_503(app, db, tecnico, login, monkeypatch):
+    monkeypatch.setitem(app.config, 'BANDEJA_SALIDA', False)
+    respuesta = login(tecnico.email).post(URL, json={'ids': [1]})
+    assert respuesta.status_code == 503
+    assert MensajeSaliente.query.count() == 0
@@ -0,0 +1,63 @@
+"""
+Paginación por cursor (utils/pagination.py)
+
+Un cursor manipulado por el cliente debe responder 400, no 500, y recorrer
+todas las páginas debe devolver cada fila una sola vez.
+"""
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from models import BaseConocimiento
+from utils.pagination import codificar_cursor, decodificar_cursor
+
+
+def _cursor(valores):
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('valores', [
+    [{'$dt': 5}, 1],
+    [{'$dt': 'ayer'}, 1],
+    [{'$dt': '2024-01-01T00:00:00', 'x': 1}, 1],
+    [None, 1],
+    [True, 1],
+    [[1], 1],
+    [1],
+    [1, 2, 3],
+    {'vistas': 1},
+])
+def test_cursor_invalido(valores):
+    with pytest.raises(ValueError):
+        decodificar_cursor(_cursor(valores), largo=2)
+
+
+def test_cursor_ida_y_vuelta():
+    valores = [3, datetime(2024, 5, 1, 10, 30), 'a', 1.5]
+    assert decodificar_cursor(codificar_cursor(valores), largo=4) == valores
+
+
+def test_cursor_manipulado_responde_400(tecnico, login):
+    cliente = login(tecnico.email)
+    for cursor in (_cursor([{'$dt': 5}, 1]), _cursor([1, 2, 3, 4]), 'no-es-base64!'):
+        respuesta = cliente.get('/api/tickets/', query_string={'cursor': cursor})
+        assert respuesta.status_code == 400, cursor
+        respuesta = cliente.get('/api/knowledge/', query_string={'cursor': cursor})
+        assert respuesta.status_code == 400, cursor
+
+
+def test_recorrer_todas_las_paginas(db, tecnico, login):
+    for i in range(7):
+        db.session.add(BaseConocimiento(titulo=f'Artículo {i}', contenido='...', autor_id=tecnico.id,
+                                        vistas=i % 3))
+    db.session.commit()
+    cliente = login(tecnico.email)
+
+    vistos, cursor = [], ''
+    while cursor is not None:
+        datos = cliente.get('/api/knowledge/', query_string={'cursor': cursor, 'per_page': 2}).get_json()
+        vistos += [articulo['id'] for articulo in datos['data']['articulos']]
+        cursor = datos['meta']['pagination']['next_cursor']
+    assert sorted(vistos) == [a.id for a in BaseConocimiento.query.order_by(BaseConocimiento.id)]
@@ -0,0 +1,111 @@
+"""
+Presupuesto de queries de los endpoints (utils/query_counter.py)
+
+Con QUERY_BUDGET_STRICT (conftest.py) un endpoint que supere su
+query_budget lanza QueryBudgetExceeded y la prueba falla. Los datos tienen
+un usuario, un técnico y un autor de comentario distintos por ticket: si una
+relación se carga de forma perezosa, cada fila cuesta una consulta.
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import lazyload
+from models import Usuario, ComentarioTicket, BaseConocimiento
+from utils.query_counter import QueryBudgetExceeded, queries_en_peticion, sentencias_en_peticion
+
+TICKETS = 12
+
+
+@pytest.fixture
+def datos(db, tecnico, crear_ticket):
+    tickets = []
+    for i in range(TICKETS):
+        solicitante = Usuario(nombre=f'Usuario {i}', email=f'usuario{i}@focusit.com', activo=True)
+        asignado = Usuario(nombre=f'Técnico {i}', email=f'tecnico{i}@focusit.com', es_tecnico=True, activo=True)
+        db.session.add_all([solicitante, asignado])
+        db.session.flush()
+        ticket = crear_ticket(usuario_id=solicitante.id, tecnico_id=asignado.id, titulo=f'Ticket {i}',
+                              estado=['nuevo', 'en_proceso', 'asignado_a_tecnico'][i % 3],
+                              prioridad=['media', 'critica'][i % 2])
+        tickets.append(ticket)
+
+    # Comentarios de autores distintos en el primer ticket
+    for i in range(TICKETS):
+        autor = Usuario(nombre=f'Autor {i}', email=f'autor{i}@focusit.com', activo=True)
+        db.session.add(autor)
+        db.session.flush()
+        db.session.add(ComentarioTicket(ticket_id=tickets[0].id, autor_id=autor.id, contenido=f'Comentario {i}'))
+
+    for i in range(TICKETS):
+        db.session.add(BaseConocimiento(titulo=f'Configurar impresora {i}', contenido='Revisar el tóner y el cable',
+                                        palabras_clave='impresora', categoria='problemas_tecnicos',
+                                        subcategoria='impresoras', autor_id=tecnico.id, activo=True))
+    db.session.commit()
+    return tickets
+
+
+def _consultar(cliente, url):
+    respuesta = cliente.get(url)
+    assert respuesta.status_code == 200, respuesta.get_json()
+    return respuesta
+
+
+@pytest.mark.parametrize('url', [
+    '/api/tickets/',
+    '/api/tickets/?estado=nuevo&per_page=50',
+    '/api/tickets/?cursor=&per_page=5',
+    '/api/dashboard/home',
+    '/api/dashboard/notificaciones',
+    '/api/knowledge/',
+    '/api/knowledge/?q=impresora',
+])
+def test_endpoints_de_tecnico_dentro_del_presupuesto(datos, tecnico, login, url):
+    _consultar(login(tecnico.email), url)
+
+
+def test_detalle_dentro_del_presupuesto(datos, tecnico, login):
+    respuesta = _consultar(login(tecnico.email), f'/api/tickets/{datos[0].id}')
+    assert len(respuesta.get_json()['data']['ticket']['comentarios']) == TICKETS
+
+
+def test_endpoints_de_usuario_dentro_del_presupuesto(datos, login):
+    cliente = login('usuario0@focusit.com')
+    _consultar(cliente, '/api/tickets/')
+    _consultar(cliente, f'/api/tickets/{datos[0].id}')
+    _consultar(cliente, '/api/dashboard/home')
+
+
+def test_regresion_n_mas_1_en_la_lista(datos, tecnico, login, monkeypatch):
+    # Simula quitar el joinedload: usuario y técnico se cargan por ticket
+    monkeypatch.setattr('api.tickets.joinedload', lazyload)
+    cliente = login(tecnico.email)
+
+    with pytest.raises(QueryBudgetExceeded, match='lista_tickets'):
+        cliente.get('/api/tickets/?per_page=50')
+
+
+def test_regresion_n_mas_1_en_el_detalle(datos, tecnico, login, monkeypatch):
+    monkeypatch.setattr('api.tickets.joinedload', lazyload)
+    cliente = login(tecnico.email)
+
+    # El error lista las sentencias ejecutadas
+    with pytest.raises(QueryBudgetExceeded, match=r'(?s)detalle_ticket.*SELECT'):
+        cliente.get(f'/api/tickets/{datos[0].id}')
+
+
+def test_sin_modo_estricto_solo_advierte(app, datos, tecnico, login, monkeypatch):
+    monkeypatch.setattr('api.tickets.joinedload', lazyload)
+    monkeypatch.setitem(app.config, 'QUERY_BUDGET_STRICT', False)
+    cliente = login(tecnico.email)
+
+    respuesta = _consultar(cliente, '/api/tickets/?per_page=50')
+    assert int(respuesta.headers['X-Query-Count']) > 4
+
+
+def test_en_produccion_solo_cuenta(app, db, monkeypatch):
+    monkeypatch.setitem(app.config, 'QUERY_BUDGET_STRICT', False)
+    with app.test_request_context('/'):
+        app.preprocess_request()
+        antes = queries_en_peticion()
+        db.session.execute(text('SELECT 1'))
+        assert queries_en_peticion() == antes + 1
+        assert sentencias_en_peticion() is None